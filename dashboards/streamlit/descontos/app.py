@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import os
+import sys
+import time
 from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Any
@@ -15,9 +17,34 @@ try:
 except ImportError:  # pragma: no cover
     pyodbc = None
 
+STREAMLIT_DIR = Path(__file__).resolve().parents[1]
+if str(STREAMLIT_DIR) not in sys.path:
+    sys.path.insert(0, str(STREAMLIT_DIR))
+
+import result_cache as rc  # noqa: E402
+
 
 VIEW_NAME = "fact.VW_DASH_DESCONTOS_R1"
 DEFAULT_SNAPSHOT_FILE = "descontos_r1.csv.gz"
+# Entidades do ETL lidas por `VIEW_NAME`.
+DATA_VERSION_ENTITIES = (
+    "dim_cliente",
+    "dim_desconto",
+    "dim_produto",
+    "dim_regiao",
+    "dim_vendedor",
+    "fact_descontos",
+    "fact_vendas",
+)
+
+# O cache das consultas SQL e chaveado pela versao de dados do DW
+# (`fact.VW_DASH_DATA_VERSION`): o TTL longo so limita memoria, e a consulta
+# leve da versao roda no maximo a cada `DATA_VERSION_TTL_SECONDS`.
+DATA_VERSION_TTL_SECONDS = 30
+DATA_CACHE_TTL_SECONDS = 12 * 60 * 60
+# "Atualizar dados" grava um nonce na sessao que entra na versao de dados:
+# as entradas antigas do cache compartilhado deixam de casar para a sessao.
+REFRESH_NONCE_KEY = "refresh_nonce"
 
 NUMERIC_COLUMNS = [
     "valor_sem_desconto",
@@ -343,18 +370,42 @@ def _build_in_filter(column_name: str, values: tuple[str, ...], params: list[Any
     params.extend(values)
     return f" AND {column_name} IN ({placeholders})"
 
-@st.cache_data(ttl=600, show_spinner=False)
-def _load_metadata(conn_str: str) -> dict[str, Any]:
+@st.cache_resource(show_spinner=False)
+def _result_cache() -> rc.ResultCache:
+    return rc.from_env()
+
+
+def _cached_reader(conn_str: str, data_version: str) -> rc.CachedReader:
+    """Leitura pelo cache compartilhado entre replicas; a conexao so abre em falta."""
+    return rc.CachedReader(
+        _result_cache(),
+        lambda: _open_connection(conn_str),
+        scope=rc.connection_scope(conn_str),
+        version=data_version,
+        ttl_seconds=DATA_CACHE_TTL_SECONDS,
+    )
+
+
+@st.cache_data(ttl=DATA_VERSION_TTL_SECONDS, show_spinner=False)
+def _load_data_version(conn_str: str) -> str:
     connection = _open_connection(conn_str)
     try:
-        bounds = pd.read_sql(
+        return rc.load_data_version(connection, DATA_VERSION_ENTITIES)
+    finally:
+        connection.close()
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL_SECONDS, show_spinner=False)
+def _load_metadata(conn_str: str, data_version: str = "") -> dict[str, Any]:
+    reader = _cached_reader(conn_str, data_version)
+    try:
+        bounds = reader.read_sql(
             f"""
             SELECT
                 CAST(MIN(data_completa) AS date) AS min_data,
                 CAST(MAX(data_completa) AS date) AS max_data
             FROM {VIEW_NAME};
             """,
-            connection,
         )
         if bounds.empty or bounds.loc[0, "min_data"] is None or bounds.loc[0, "max_data"] is None:
             raise ValueError("A view de descontos nao retornou datas validas.")
@@ -362,25 +413,20 @@ def _load_metadata(conn_str: str) -> dict[str, Any]:
         min_data = pd.to_datetime(bounds.loc[0, "min_data"]).date()
         max_data = pd.to_datetime(bounds.loc[0, "max_data"]).date()
 
-        regioes = pd.read_sql(
+        regioes = reader.read_sql(
             f"SELECT DISTINCT regiao_pais FROM {VIEW_NAME} WHERE regiao_pais IS NOT NULL ORDER BY regiao_pais;",
-            connection,
         )["regiao_pais"].astype(str).tolist()
-        tipos = pd.read_sql(
+        tipos = reader.read_sql(
             f"SELECT DISTINCT tipo_desconto FROM {VIEW_NAME} WHERE tipo_desconto IS NOT NULL ORDER BY tipo_desconto;",
-            connection,
         )["tipo_desconto"].astype(str).tolist()
-        metodos = pd.read_sql(
+        metodos = reader.read_sql(
             f"SELECT DISTINCT metodo_desconto FROM {VIEW_NAME} WHERE metodo_desconto IS NOT NULL ORDER BY metodo_desconto;",
-            connection,
         )["metodo_desconto"].astype(str).tolist()
-        codigos = pd.read_sql(
+        codigos = reader.read_sql(
             f"SELECT DISTINCT codigo_desconto FROM {VIEW_NAME} WHERE codigo_desconto IS NOT NULL ORDER BY codigo_desconto;",
-            connection,
         )["codigo_desconto"].astype(str).tolist()
-        niveis = pd.read_sql(
+        niveis = reader.read_sql(
             f"SELECT DISTINCT nivel_aplicacao FROM {VIEW_NAME} WHERE nivel_aplicacao IS NOT NULL ORDER BY nivel_aplicacao;",
-            connection,
         )["nivel_aplicacao"].astype(str).tolist()
 
         return {
@@ -393,7 +439,7 @@ def _load_metadata(conn_str: str) -> dict[str, Any]:
             "niveis_aplicacao": niveis,
         }
     finally:
-        connection.close()
+        reader.close()
 
 
 @st.cache_data(ttl=600, show_spinner=False)
@@ -423,7 +469,7 @@ def _load_metadata_snapshot(snapshot_path: str) -> dict[str, Any]:
     }
 
 
-@st.cache_data(ttl=180, show_spinner=False)
+@st.cache_data(ttl=DATA_CACHE_TTL_SECONDS, show_spinner=False)
 def _load_discount_data(
     conn_str: str,
     start_date: date,
@@ -433,6 +479,7 @@ def _load_discount_data(
     metodos_desconto: tuple[str, ...],
     codigos_desconto: tuple[str, ...],
     niveis_aplicacao: tuple[str, ...],
+    data_version: str = "",
 ) -> pd.DataFrame:
     params: list[Any] = [start_date, end_date]
     where = "WHERE CAST(data_completa AS date) BETWEEN ? AND ?"
@@ -474,11 +521,11 @@ def _load_discount_data(
     {where};
     """
 
-    connection = _open_connection(conn_str)
+    reader = _cached_reader(conn_str, data_version)
     try:
-        df = pd.read_sql(query, connection, params=params)
+        df = reader.read_sql(query, params)
     finally:
-        connection.close()
+        reader.close()
 
     return _normalize_discount_df(df)
 
@@ -876,10 +923,15 @@ def main() -> None:
     try:
         if use_snapshot:
             conn_str = ""
+            data_version = ""
             metadata = _load_metadata_snapshot(snapshot_path)
         else:
             conn_str = _build_conn_str()
-            metadata = _load_metadata(conn_str)
+            data_version = _load_data_version(conn_str)
+            refresh_nonce = st.session_state.get(REFRESH_NONCE_KEY)
+            if refresh_nonce is not None:
+                data_version = f"{data_version};refresh={refresh_nonce}"
+            metadata = _load_metadata(conn_str, data_version)
     except Exception as exc:  # noqa: BLE001
         if use_snapshot:
             st.error("Nao foi possivel inicializar o dashboard de descontos em modo snapshot.")
@@ -923,6 +975,7 @@ def main() -> None:
         compare_previous = st.toggle("Comparar com periodo anterior", value=True)
 
         if st.button("Atualizar dados", use_container_width=True):
+            st.session_state[REFRESH_NONCE_KEY] = time.time_ns()
             st.cache_data.clear()
             st.rerun()
 
@@ -959,6 +1012,7 @@ def main() -> None:
                     metodos_desconto=selected_metodos,
                     codigos_desconto=selected_codigos,
                     niveis_aplicacao=selected_niveis,
+                    data_version=data_version,
                 )
         except Exception as exc:  # noqa: BLE001
             if use_snapshot:
@@ -1003,6 +1057,7 @@ def main() -> None:
                 metodos_desconto=selected_metodos,
                 codigos_desconto=selected_codigos,
                 niveis_aplicacao=selected_niveis,
+                data_version=data_version,
             )
         if not prev_df.empty:
             previous_kpis = _compute_kpis(prev_df)
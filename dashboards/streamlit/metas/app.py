@@ -2,6 +2,8 @@
 from __future__ import annotations
 
 import os
+import sys
+import time
 from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Any
@@ -16,9 +18,26 @@ try:
 except ImportError:  # pragma: no cover
     pyodbc = None
 
+STREAMLIT_DIR = Path(__file__).resolve().parents[1]
+if str(STREAMLIT_DIR) not in sys.path:
+    sys.path.insert(0, str(STREAMLIT_DIR))
+
+import result_cache as rc  # noqa: E402
+
 
 VIEW_NAME = "fact.VW_DASH_METAS_R1"
 DEFAULT_SNAPSHOT_FILE = "metas_r1.csv.gz"
+# Entidades do ETL lidas por `VIEW_NAME`.
+DATA_VERSION_ENTITIES = ("dim_equipe", "dim_vendedor", "fact_vendas")
+
+# O cache das consultas SQL e chaveado pela versao de dados do DW
+# (`fact.VW_DASH_DATA_VERSION`): o TTL longo so limita memoria, e a consulta
+# leve da versao roda no maximo a cada `DATA_VERSION_TTL_SECONDS`.
+DATA_VERSION_TTL_SECONDS = 30
+DATA_CACHE_TTL_SECONDS = 12 * 60 * 60
+# "Atualizar dados" grava um nonce na sessao que entra na versao de dados:
+# as entradas antigas do cache compartilhado deixam de casar para a sessao.
+REFRESH_NONCE_KEY = "refresh_nonce"
 
 NUMERIC_COLUMNS = [
     "valor_meta",
@@ -334,18 +353,44 @@ def _build_in_filter(column_name: str, values: tuple[str, ...], params: list[Any
     return f" AND {column_name} IN ({placeholders})"
 
 
-@st.cache_data(ttl=600, show_spinner=False)
-def _load_metadata(conn_str: str) -> dict[str, Any]:
+@st.cache_resource(show_spinner=False)
+def _result_cache() -> rc.ResultCache:
+    return rc.from_env()
+
+
+def _cached_reader(conn_str: str, data_version: str) -> rc.CachedReader:
+    """Leitura pelo cache compartilhado entre replicas; a conexao so abre em falta."""
+    return rc.CachedReader(
+        _result_cache(),
+        lambda: _open_connection(conn_str),
+        scope=rc.connection_scope(conn_str),
+        version=data_version,
+        ttl_seconds=DATA_CACHE_TTL_SECONDS,
+    )
+
+
+@st.cache_data(ttl=DATA_VERSION_TTL_SECONDS, show_spinner=False)
+def _load_data_version(conn_str: str) -> str:
+    # A janela de 24 meses da view anda com GETDATE(): a data do servidor
+    # entra no token para a virada do mes nao servir a janela anterior.
     connection = _open_connection(conn_str)
     try:
-        bounds = pd.read_sql(
+        return rc.load_data_version(connection, DATA_VERSION_ENTITIES, with_server_date=True)
+    finally:
+        connection.close()
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL_SECONDS, show_spinner=False)
+def _load_metadata(conn_str: str, data_version: str = "") -> dict[str, Any]:
+    reader = _cached_reader(conn_str, data_version)
+    try:
+        bounds = reader.read_sql(
             f"""
             SELECT
                 CAST(MIN(data_completa) AS date) AS min_data,
                 CAST(MAX(data_completa) AS date) AS max_data
             FROM {VIEW_NAME};
             """,
-            connection,
         )
         if bounds.empty or bounds.loc[0, "min_data"] is None or bounds.loc[0, "max_data"] is None:
             raise ValueError("A view de metas nao retornou datas validas.")
@@ -353,21 +398,17 @@ def _load_metadata(conn_str: str) -> dict[str, Any]:
         min_data = pd.to_datetime(bounds.loc[0, "min_data"]).date()
         max_data = pd.to_datetime(bounds.loc[0, "max_data"]).date()
 
-        regionais = pd.read_sql(
+        regionais = reader.read_sql(
             f"SELECT DISTINCT regional FROM {VIEW_NAME} WHERE regional IS NOT NULL ORDER BY regional;",
-            connection,
         )["regional"].astype(str).tolist()
-        equipes = pd.read_sql(
+        equipes = reader.read_sql(
             f"SELECT DISTINCT nome_equipe FROM {VIEW_NAME} WHERE nome_equipe IS NOT NULL ORDER BY nome_equipe;",
-            connection,
         )["nome_equipe"].astype(str).tolist()
-        vendedores = pd.read_sql(
+        vendedores = reader.read_sql(
             f"SELECT DISTINCT nome_vendedor FROM {VIEW_NAME} WHERE nome_vendedor IS NOT NULL ORDER BY nome_vendedor;",
-            connection,
         )["nome_vendedor"].astype(str).tolist()
-        tipos_equipe = pd.read_sql(
+        tipos_equipe = reader.read_sql(
             f"SELECT DISTINCT tipo_equipe FROM {VIEW_NAME} WHERE tipo_equipe IS NOT NULL ORDER BY tipo_equipe;",
-            connection,
         )["tipo_equipe"].astype(str).tolist()
 
         return {
@@ -379,7 +420,7 @@ def _load_metadata(conn_str: str) -> dict[str, Any]:
             "tipos_equipe": tipos_equipe,
         }
     finally:
-        connection.close()
+        reader.close()
 
 
 @st.cache_data(ttl=600, show_spinner=False)
@@ -408,7 +449,7 @@ def _load_metadata_snapshot(snapshot_path: str) -> dict[str, Any]:
     }
 
 
-@st.cache_data(ttl=180, show_spinner=False)
+@st.cache_data(ttl=DATA_CACHE_TTL_SECONDS, show_spinner=False)
 def _load_goals_data(
     conn_str: str,
     start_date: date,
@@ -417,6 +458,7 @@ def _load_goals_data(
     equipes: tuple[str, ...],
     vendedores: tuple[str, ...],
     tipos_equipe: tuple[str, ...],
+    data_version: str = "",
 ) -> pd.DataFrame:
     params: list[Any] = [start_date, end_date]
     where = "WHERE CAST(data_completa AS date) BETWEEN ? AND ?"
@@ -453,11 +495,11 @@ def _load_goals_data(
     {where};
     """
 
-    connection = _open_connection(conn_str)
+    reader = _cached_reader(conn_str, data_version)
     try:
-        df = pd.read_sql(query, connection, params=params)
+        df = reader.read_sql(query, params)
     finally:
-        connection.close()
+        reader.close()
 
     return _normalize_goals_df(df)
 
@@ -782,10 +824,15 @@ def main() -> None:
     try:
         if use_snapshot:
             conn_str = ""
+            data_version = ""
             metadata = _load_metadata_snapshot(snapshot_path)
         else:
             conn_str = _build_conn_str()
-            metadata = _load_metadata(conn_str)
+            data_version = _load_data_version(conn_str)
+            refresh_nonce = st.session_state.get(REFRESH_NONCE_KEY)
+            if refresh_nonce is not None:
+                data_version = f"{data_version};refresh={refresh_nonce}"
+            metadata = _load_metadata(conn_str, data_version)
     except Exception as exc:  # noqa: BLE001
         if use_snapshot:
             st.error("Nao foi possivel inicializar o dashboard de metas em modo snapshot.")
@@ -828,6 +875,7 @@ def main() -> None:
         compare_previous = st.toggle("Comparar com periodo anterior", value=True)
 
         if st.button("Atualizar dados", use_container_width=True):
+            st.session_state[REFRESH_NONCE_KEY] = time.time_ns()
             st.cache_data.clear()
             st.rerun()
 
@@ -862,6 +910,7 @@ def main() -> None:
                     equipes=selected_equipes,
                     vendedores=selected_vendedores,
                     tipos_equipe=selected_tipos_equipe,
+                    data_version=data_version,
                 )
         except Exception as exc:  # noqa: BLE001
             if use_snapshot:
@@ -904,6 +953,7 @@ def main() -> None:
                 equipes=selected_equipes,
                 vendedores=selected_vendedores,
                 tipos_equipe=selected_tipos_equipe,
+                data_version=data_version,
             )
         if not prev_df.empty:
             previous_kpis = _compute_kpis(prev_df)
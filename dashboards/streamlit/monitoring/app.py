@@ -17,8 +17,18 @@ ETL_DIR = PROJECT_ROOT / "python" / "etl"
 if str(ETL_DIR) not in sys.path:
     sys.path.append(str(ETL_DIR))
 
+STREAMLIT_DIR = Path(__file__).resolve().parents[1]
+if str(STREAMLIT_DIR) not in sys.path:
+    sys.path.append(str(STREAMLIT_DIR))
+
 from config import ETLConfig  # noqa: E402
 from db import close_quietly, connect_sqlserver, execute, query_all, query_one  # noqa: E402
+import result_cache as rc  # noqa: E402
+
+
+# Mesmo prazo do `st.cache_data` das consultas: entre sessoes com
+# auto-refresh, cada consulta roda no maximo uma vez a cada 5s.
+RESULT_CACHE_TTL_SECONDS = 5
 
 
 st.set_page_config(
@@ -430,8 +440,27 @@ def _enrich_failure_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     return enriched
 
 
+@st.cache_resource(show_spinner=False)
+def _result_cache() -> rc.ResultCache:
+    # Memoria do processo, nunca o volume dos dashboards: o monitor tem
+    # credencial do ETL e so precisa segurar resultados por 5 segundos.
+    return rc.MemoryResultCache(
+        max_bytes=rc.DEFAULT_MEMORY_MAX_MB * 1024 * 1024,
+        max_entry_bytes=rc.DEFAULT_MAX_ENTRY_MB * 1024 * 1024,
+    )
+
+
 def _fetch_df(sql: str, params: tuple[Any, ...] = ()) -> pd.DataFrame:
     config = ETLConfig.from_env()
+    key = rc.query_key(sql, params, scope=rc.connection_scope(config.dw_conn_str))
+    return _result_cache().get_or_compute(
+        key,
+        lambda: _fetch_df_uncached(config, sql, params),
+        ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+    )
+
+
+def _fetch_df_uncached(config: ETLConfig, sql: str, params: tuple[Any, ...]) -> pd.DataFrame:
     connection = None
     try:
         connection = connect_sqlserver(
@@ -925,6 +954,117 @@ def get_execution_timeline(limit: int = 400) -> pd.DataFrame:
     return _fetch_df(query, (int(limit),))
 
 
+@st.cache_data(ttl=5)
+def get_batch_stage_metrics(days: int = 7) -> pd.DataFrame:
+    query = """
+    SELECT
+        re.entity_name,
+        bm.recorded_at,
+        bm.extract_ms,
+        bm.transform_ms,
+        bm.upsert_ms,
+        bm.commit_ms,
+        bm.rows_per_second
+    FROM audit.etl_batch_metrics AS bm
+    INNER JOIN audit.etl_run_entity AS re
+        ON re.run_entity_id = bm.run_entity_id
+    WHERE bm.recorded_at >= DATEADD(DAY, -?, SYSUTCDATETIME());
+    """
+    return _fetch_df(query, (int(days),))
+
+
+@st.cache_data(ttl=5)
+def get_freshness_percentiles() -> pd.DataFrame:
+    query = """
+    SELECT
+        entity_name,
+        sample_rows,
+        p50_seconds,
+        p95_seconds,
+        p99_seconds,
+        last_committed_at
+    FROM audit.vw_etl_freshness_percentiles
+    ORDER BY entity_name;
+    """
+    return _fetch_df(query)
+
+
+@st.cache_data(ttl=5)
+def get_freshness_histogram(hours: int = 24) -> pd.DataFrame:
+    query = """
+    SELECT
+        re.entity_name,
+        h.bucket_upper_seconds,
+        SUM(CAST(h.row_count AS BIGINT)) AS row_count
+    FROM audit.etl_freshness_histogram AS h
+    INNER JOIN audit.etl_run_entity AS re
+        ON re.run_entity_id = h.run_entity_id
+    WHERE h.committed_at >= DATEADD(HOUR, -?, SYSUTCDATETIME())
+    GROUP BY re.entity_name, h.bucket_upper_seconds;
+    """
+    return _fetch_df(query, (int(hours),))
+
+
+# Faixa acima de 7 dias (ver 26_create_audit_etl_freshness_histogram.sql).
+_FRESHNESS_OVERFLOW_BUCKET = 2_147_483_647
+
+
+def _format_freshness_bucket(value: Any) -> str:
+    if value is None or pd.isna(value):
+        return "-"
+    seconds = int(value)
+    if seconds >= _FRESHNESS_OVERFLOW_BUCKET:
+        return "> 7d"
+    if seconds < 60:
+        return f"<= {seconds}s"
+    if seconds < 3600:
+        return f"<= {seconds // 60}min"
+    if seconds < 86400:
+        return f"<= {seconds // 3600}h"
+    return f"<= {seconds // 86400}d"
+
+
+_STAGE_COLUMNS = {
+    "extract_ms": "extracao",
+    "transform_ms": "transformacao",
+    "upsert_ms": "upsert",
+    "commit_ms": "commit",
+}
+
+
+def _compute_stage_latency_percentiles(
+    metrics_df: pd.DataFrame,
+    *,
+    period: str,
+    percentiles: tuple[float, ...] = (0.5, 0.95, 0.99),
+) -> pd.DataFrame:
+    """Percentis de latencia (ms) por entidade, periodo e etapa, em formato longo."""
+    columns = ["entity_name", "period_start", "stage", "percentile", "latency_ms", "batches"]
+    if metrics_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    df = metrics_df.copy()
+    df["period_start"] = pd.to_datetime(df["recorded_at"], errors="coerce").dt.floor(period)
+    df = df[df["period_start"].notna()]
+    long_df = df.melt(
+        id_vars=["entity_name", "period_start"],
+        value_vars=list(_STAGE_COLUMNS),
+        var_name="stage",
+        value_name="latency_ms",
+    )
+    long_df["stage"] = long_df["stage"].map(_STAGE_COLUMNS)
+    long_df["latency_ms"] = pd.to_numeric(long_df["latency_ms"], errors="coerce")
+    grouped = long_df.groupby(["entity_name", "period_start", "stage"])["latency_ms"]
+
+    frames = []
+    batches = grouped.count().rename("batches")
+    for value in percentiles:
+        frame = grouped.quantile(value).rename("latency_ms").to_frame().join(batches).reset_index()
+        frame["percentile"] = f"p{int(round(value * 100))}"
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)[columns]
+
+
 def _object_exists_table(connection: Any, table_name: str) -> bool:
     row = query_one(
         connection,
@@ -3076,6 +3216,21 @@ def _render_runs_control_section(runs_df: pd.DataFrame, control_df: pd.DataFrame
     st.dataframe(run_detail_df, use_container_width=True, hide_index=True)
 
 
+def _render_result_cache_section() -> None:
+    st.subheader("Cache de consultas do monitor")
+    stats = _result_cache().stats()
+    st.caption(
+        f"Em memoria deste processo, validade de {RESULT_CACHE_TTL_SECONDS}s. "
+        "Os dashboards usam o volume `dash_result_cache`, que o monitor nao monta."
+    )
+
+    metric_1, metric_2, metric_3, metric_4 = st.columns(4)
+    metric_1.metric("Taxa de acerto", _format_ratio(stats.hit_ratio * 100.0))
+    metric_2.metric("Acertos / faltas", f"{stats.hits} / {stats.misses}")
+    metric_3.metric("Ocupacao", f"{stats.bytes / 1048576:.1f} / {stats.max_bytes / 1048576:.0f} MB")
+    metric_4.metric("Entradas (despejos)", f"{stats.entries} ({stats.evictions})")
+
+
 def _render_charts_section() -> None:
     chart_col_1, chart_col_2 = st.columns(2)
 
@@ -3107,6 +3262,125 @@ def _render_charts_section() -> None:
             st.bar_chart(chart_df)
 
 
+def _render_stage_latency_section() -> None:
+    st.subheader("Latencia por etapa dos lotes (audit.etl_batch_metrics)")
+    try:
+        metrics_df = get_batch_stage_metrics(7)
+    except Exception as exc:  # noqa: BLE001
+        st.warning("Nao foi possivel consultar audit.etl_batch_metrics (script 21_create_audit_etl_batch_metrics.sql).")
+        st.code(str(exc))
+        return
+    if metrics_df.empty:
+        st.info("Sem metricas de lote nos ultimos 7 dias.")
+        return
+
+    entity_options = sorted(metrics_df["entity_name"].dropna().astype(str).unique().tolist())
+    col_entity, col_percentile, col_period = st.columns([2, 1, 1])
+    with col_entity:
+        selected_entity = st.selectbox("Entidade", options=entity_options, key="stage_latency_entity")
+    with col_percentile:
+        selected_percentile = st.radio(
+            "Percentil",
+            options=["p50", "p95", "p99"],
+            index=1,
+            horizontal=True,
+            key="stage_latency_percentile",
+        )
+    with col_period:
+        period_label = st.radio(
+            "Agrupar por",
+            options=["hora", "dia"],
+            horizontal=True,
+            key="stage_latency_period",
+        )
+
+    entity_df = metrics_df[metrics_df["entity_name"] == selected_entity]
+    percentiles_df = _compute_stage_latency_percentiles(
+        entity_df,
+        period="h" if period_label == "hora" else "D",
+    )
+    chart_df = percentiles_df[percentiles_df["percentile"] == selected_percentile]
+    if chart_df.empty:
+        st.info("Sem lotes para a entidade selecionada.")
+        return
+
+    rows_per_second = pd.to_numeric(entity_df["rows_per_second"], errors="coerce")
+    metric_1, metric_2, metric_3 = st.columns(3)
+    metric_1.metric("Lotes (7 dias)", int(len(entity_df)))
+    metric_2.metric("Linhas/s (mediana)", f"{rows_per_second.median():,.0f}" if rows_per_second.notna().any() else "-")
+    slowest = chart_df.groupby("stage")["latency_ms"].max().idxmax()
+    metric_3.metric(f"Etapa mais lenta ({selected_percentile})", slowest)
+
+    chart = (
+        alt.Chart(chart_df)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("period_start:T", title="Periodo"),
+            y=alt.Y("latency_ms:Q", title=f"Latencia {selected_percentile} (ms)"),
+            color=alt.Color("stage:N", title="Etapa", sort=list(_STAGE_COLUMNS.values())),
+            tooltip=[
+                alt.Tooltip("period_start:T", title="periodo"),
+                alt.Tooltip("stage:N", title="etapa"),
+                alt.Tooltip("latency_ms:Q", title="latencia (ms)", format=".0f"),
+                alt.Tooltip("batches:Q", title="lotes"),
+            ],
+        )
+        .properties(height=320)
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+
+def _render_freshness_section() -> None:
+    st.subheader("Frescor ponta a ponta (source_updated_at -> commit no DW, 24h)")
+    st.caption(
+        "Atraso entre a alteracao na origem e o commit do lote no DW, por linha carregada. "
+        "Percentis pelo limite superior da faixa do histograma."
+    )
+    try:
+        percentiles_df = get_freshness_percentiles()
+        histogram_df = get_freshness_histogram(24)
+    except Exception as exc:  # noqa: BLE001
+        st.warning(
+            "Nao foi possivel consultar audit.vw_etl_freshness_percentiles "
+            "(script 26_create_audit_etl_freshness_histogram.sql)."
+        )
+        st.code(str(exc))
+        return
+    if percentiles_df.empty:
+        st.info("Sem lotes com frescor registrado nas ultimas 24 horas.")
+        return
+
+    table_df = percentiles_df.copy()
+    for column in ("p50_seconds", "p95_seconds", "p99_seconds"):
+        table_df[column.replace("_seconds", "")] = table_df[column].apply(_format_freshness_bucket)
+    st.dataframe(
+        table_df[["entity_name", "sample_rows", "p50", "p95", "p99", "last_committed_at"]],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    entity_options = sorted(histogram_df["entity_name"].dropna().astype(str).unique().tolist())
+    if not entity_options:
+        return
+    selected_entity = st.selectbox("Entidade", options=entity_options, key="freshness_entity")
+    entity_df = histogram_df[histogram_df["entity_name"] == selected_entity].sort_values("bucket_upper_seconds")
+    entity_df = entity_df.assign(faixa=entity_df["bucket_upper_seconds"].apply(_format_freshness_bucket))
+    chart = (
+        alt.Chart(entity_df)
+        .mark_bar()
+        .encode(
+            x=alt.X("faixa:N", title="Atraso", sort=entity_df["faixa"].tolist()),
+            y=alt.Y("row_count:Q", title="Linhas"),
+            tooltip=[
+                alt.Tooltip("faixa:N", title="faixa"),
+                alt.Tooltip("row_count:Q", title="linhas", format=","),
+            ],
+        )
+        .properties(height=280)
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+
 def _render_failures_section(entity_runs_df: pd.DataFrame) -> None:
     st.subheader("Falhas recentes por entidade")
     if entity_runs_df.empty:
@@ -3489,11 +3763,14 @@ def render_dashboard() -> None:
         _render_execution_timeline_section()
         _render_running_section()
         _render_charts_section()
+        _render_stage_latency_section()
+        _render_freshness_section()
         _render_failures_section(entity_runs_df)
     elif page == "Saude por pipeline":
         _render_pipeline_health_section(control_df)
     elif page == "Runs e controle":
         _render_runs_control_section(runs_df, control_df)
+        _render_result_cache_section()
     else:
         _render_connection_audit_section()
 
@@ -0,0 +1,509 @@
+"""Cache de resultados de consulta compartilhado entre os dashboards Streamlit.
+
+`st.cache_data` vive dentro de cada processo: replicas e containers diferentes
+repetem as mesmas consultas no SQL Server. Este modulo guarda o resultado
+serializado sob uma chave derivada do SQL normalizado, dos parametros, do
+escopo da conexao (servidor/banco) e da versao de dados informada pelo app.
+
+Backends:
+- `DiskResultCache`: diretorio em volume compartilhado (`DASH_RESULT_CACHE_DIR`),
+  gravacao atomica por `os.replace`, LRU pelo mtime dos arquivos;
+- `MemoryResultCache`: substituto local, no processo, para desenvolvimento e testes.
+
+Os dois respeitam limite de bytes total e por entrada, com despejo LRU, e contam
+acertos/faltas. No backend em disco cada processo publica seus contadores em
+`_stats/`, somados por `shared_stats` para o painel do monitor.
+
+`load_data_version` monta a versao de dados usada na chave pelos tres apps.
+
+Os valores sao serializados com pickle (DataFrames, dicts e dataclasses dos
+apps). No disco cada entrada leva um HMAC-SHA256 da chave, do cabecalho e do
+conteudo, com o segredo de `DASH_RESULT_CACHE_SECRET`; a assinatura e
+conferida antes do unpickle, entao um arquivo escrito por quem nao tem o
+segredo vira falta, nunca codigo executado. Sem o segredo o cache fica em
+memoria, mesmo com diretorio configurado.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import os
+import pickle
+import re
+import socket
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+import pandas as pd
+
+
+CACHE_DIR_ENV = "DASH_RESULT_CACHE_DIR"
+CACHE_MAX_MB_ENV = "DASH_RESULT_CACHE_MAX_MB"
+CACHE_MAX_ENTRY_MB_ENV = "DASH_RESULT_CACHE_MAX_ENTRY_MB"
+CACHE_SECRET_ENV = "DASH_RESULT_CACHE_SECRET"
+
+DEFAULT_MAX_MB = 512
+DEFAULT_MAX_ENTRY_MB = 64
+# O substituto em memoria duplica o que o `st.cache_data` ja guarda: limite menor.
+DEFAULT_MEMORY_MAX_MB = 128
+
+ENTRY_SUFFIX = ".pkl"
+STATS_DIR_NAME = "_stats"
+STATS_FLUSH_SECONDS = 10.0
+
+DATA_VERSION_VIEW_NAME = "fact.VW_DASH_DATA_VERSION"
+# Sem a view (DW sem o script 29) a versao vira uma janela de tempo fixa.
+DATA_VERSION_FALLBACK_SECONDS = 180
+
+# Cabecalho de cada entrada: instante de criacao (epoch, float64).
+_HEADER = struct.Struct("<d")
+# Apos o cabecalho, no disco: HMAC-SHA256 de chave + cabecalho + conteudo.
+_SIGNATURE_SIZE = hashlib.sha256().digest_size
+_WHITESPACE = re.compile(r"\s+")
+_COUNTER_NAMES = ("hits", "misses", "stores", "evictions", "errors")
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    backend: str
+    entries: int
+    bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    stores: int
+    evictions: int
+    errors: int
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def normalize_sql(sql: str) -> str:
+    """Colapsa espacos e remove o `;` final: indentacao diferente nao muda a chave."""
+    return _WHITESPACE.sub(" ", sql).strip().rstrip(";").strip()
+
+
+def _normalize_param(value: Any) -> Any:
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_normalize_param(item) for item in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value if isinstance(value, (str, int, bool)) or value is None else str(value)
+
+
+def query_key(sql: str, params: Iterable[Any] = (), *, scope: str = "", version: str = "") -> str:
+    payload = json.dumps(
+        [scope, version, normalize_sql(sql), _normalize_param(list(params))],
+        ensure_ascii=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def connection_scope(conn_str: str) -> str:
+    """Servidor + banco da string de conexao (sem credenciais) para separar resultados por base."""
+    attrs = {}
+    for part in conn_str.split(";"):
+        name, _, value = part.partition("=")
+        attrs[name.strip().lower()] = value.strip()
+    server = attrs.get("server") or attrs.get("address") or ""
+    database = attrs.get("database") or attrs.get("initial catalog") or ""
+    return f"{server}/{database}".lower()
+
+
+class ResultCache(ABC):
+    """Base com serializacao, TTL, limites e contadores; backends guardam bytes."""
+
+    backend = "base"
+
+    def __init__(self, *, max_bytes: int, max_entry_bytes: int) -> None:
+        self.max_bytes = int(max_bytes)
+        self.max_entry_bytes = min(int(max_entry_bytes), self.max_bytes)
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(_COUNTER_NAMES, 0)
+
+    def get(self, key: str, *, ttl_seconds: float) -> tuple[bool, Any]:
+        try:
+            entry = self._read(key)
+            if entry is not None:
+                created_at, payload = entry
+                if time.time() - created_at <= ttl_seconds:
+                    value = pickle.loads(payload)
+                    self._count("hits")
+                    return True, value
+                self._delete(key)
+        except Exception:  # noqa: BLE001
+            # Entrada corrompida ou removida por outro processo: vira falta.
+            self._count("errors")
+            self._delete(key)
+        self._count("misses")
+        return False, None
+
+    def put(self, key: str, value: Any) -> bool:
+        try:
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:  # noqa: BLE001
+            self._count("errors")
+            return False
+        if len(payload) > self.max_entry_bytes:
+            return False
+        try:
+            self._write(key, time.time(), payload)
+            evicted = self._evict()
+        except OSError:
+            self._count("errors")
+            return False
+        self._count("stores")
+        if evicted:
+            self._count("evictions", evicted)
+        return True
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], *, ttl_seconds: float) -> Any:
+        hit, value = self.get(key, ttl_seconds=ttl_seconds)
+        if hit:
+            return value
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def stats(self) -> CacheStats:
+        entries, total_bytes = self._usage()
+        with self._lock:
+            counters = dict(self._counters)
+        return CacheStats(self.backend, entries, total_bytes, self.max_bytes, **counters)
+
+    def shared_stats(self) -> CacheStats:
+        return self.stats()
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove todas as entradas do backend."""
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    @abstractmethod
+    def _read(self, key: str) -> tuple[float, bytes] | None:
+        """(criado_em, bytes) da entrada ou None; marca a entrada como usada."""
+
+    @abstractmethod
+    def _write(self, key: str, created_at: float, payload: bytes) -> None:
+        """Grava ou substitui a entrada."""
+
+    @abstractmethod
+    def _delete(self, key: str) -> None:
+        """Remove a entrada, se existir."""
+
+    @abstractmethod
+    def _evict(self) -> int:
+        """Despeja as menos usadas ate caber em `max_bytes`; devolve quantas sairam."""
+
+    @abstractmethod
+    def _usage(self) -> tuple[int, int]:
+        """(entradas, bytes) ocupados no backend."""
+
+
+class MemoryResultCache(ResultCache):
+    backend = "memory"
+
+    def __init__(self, *, max_bytes: int, max_entry_bytes: int) -> None:
+        super().__init__(max_bytes=max_bytes, max_entry_bytes=max_entry_bytes)
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _read(self, key: str) -> tuple[float, bytes] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _write(self, key: str, created_at: float, payload: bytes) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+            self._entries[key] = (created_at, payload)
+            self._bytes += len(payload)
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= len(entry[1])
+
+    def _evict(self) -> int:
+        evicted = 0
+        with self._lock:
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, payload) = self._entries.popitem(last=False)
+                self._bytes -= len(payload)
+                evicted += 1
+        return evicted
+
+    def _usage(self) -> tuple[int, int]:
+        with self._lock:
+            return len(self._entries), self._bytes
+
+
+class DiskResultCache(ResultCache):
+    """Uma entrada assinada por arquivo `<sha256>.pkl`; o mtime marca o ultimo uso (LRU entre processos)."""
+
+    backend = "disk"
+
+    def __init__(
+        self,
+        root: str | Path,
+        *,
+        secret: str | bytes,
+        max_bytes: int,
+        max_entry_bytes: int,
+    ) -> None:
+        super().__init__(max_bytes=max_bytes, max_entry_bytes=max_entry_bytes)
+        self._secret = secret.encode("utf-8") if isinstance(secret, str) else bytes(secret)
+        if not self._secret:
+            raise ValueError(f"{CACHE_SECRET_ENV} vazio: entradas em disco precisam de assinatura.")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._stats_dir = self.root / STATS_DIR_NAME
+        self._stats_dir.mkdir(exist_ok=True)
+        self._stats_file = self._stats_dir / f"{socket.gethostname()}-{os.getpid()}.json"
+        self._stats_flushed_at = 0.0
+
+    def clear(self) -> None:
+        for path in self._entry_paths():
+            path.unlink(missing_ok=True)
+
+    def shared_stats(self) -> CacheStats:
+        """Contadores somados de todos os processos que publicaram em `_stats/`."""
+        self._flush_stats(force=True)
+        totals = dict.fromkeys(_COUNTER_NAMES, 0)
+        for path in self._stats_dir.glob("*.json"):
+            try:
+                counters = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            for name in _COUNTER_NAMES:
+                totals[name] += int(counters.get(name, 0))
+        entries, total_bytes = self._usage()
+        return CacheStats(self.backend, entries, total_bytes, self.max_bytes, **totals)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        super()._count(name, amount)
+        self._flush_stats()
+
+    def _flush_stats(self, *, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._stats_flushed_at < STATS_FLUSH_SECONDS:
+            return
+        self._stats_flushed_at = now
+        with self._lock:
+            counters = dict(self._counters)
+        try:
+            self._atomic_write(self._stats_file, json.dumps(counters).encode("utf-8"))
+        except OSError:
+            pass
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}{ENTRY_SUFFIX}"
+
+    def _entry_paths(self) -> list[Path]:
+        return list(self.root.glob(f"*{ENTRY_SUFFIX}"))
+
+    def _atomic_write(self, path: Path, data: bytes) -> None:
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _sign(self, key: str, header: bytes, payload: bytes) -> bytes:
+        return hmac.new(self._secret, key.encode("ascii") + header + payload, hashlib.sha256).digest()
+
+    def _read(self, key: str) -> tuple[float, bytes] | None:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        header = data[: _HEADER.size]
+        signature = data[_HEADER.size : _HEADER.size + _SIGNATURE_SIZE]
+        payload = data[_HEADER.size + _SIGNATURE_SIZE :]
+        if not hmac.compare_digest(signature, self._sign(key, header, payload)):
+            raise ValueError(f"assinatura invalida em {path.name}")
+        (created_at,) = _HEADER.unpack(header)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return created_at, payload
+
+    def _write(self, key: str, created_at: float, payload: bytes) -> None:
+        header = _HEADER.pack(created_at)
+        self._atomic_write(self._path(key), header + self._sign(key, header, payload) + payload)
+
+    def _delete(self, key: str) -> None:
+        try:
+            self._path(key).unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    def _scan(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self._entry_paths():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self) -> int:
+        entries = self._scan()
+        total_bytes = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total_bytes <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+            evicted += 1
+        return evicted
+
+    def _usage(self) -> tuple[int, int]:
+        entries = self._scan()
+        return len(entries), sum(size for _, size, _ in entries)
+
+
+class CachedReader:
+    """Le DataFrames pelo cache; a conexao so e aberta na primeira falta.
+
+    Substitui a conexao nas funcoes de consulta dos apps (`read_sql`), entao um
+    acerto nao abre sessao no SQL Server.
+    """
+
+    def __init__(
+        self,
+        cache: ResultCache,
+        connect: Callable[[], Any],
+        *,
+        scope: str,
+        version: str = "",
+        ttl_seconds: float,
+    ) -> None:
+        self.cache = cache
+        self._connect = connect
+        self.scope = scope
+        self.version = version
+        self.ttl_seconds = ttl_seconds
+        self._connection: Any = None
+
+    def read_sql(self, sql: str, params: Iterable[Any] | None = None) -> pd.DataFrame:
+        params_list = list(params or [])
+        key = query_key(sql, params_list, scope=self.scope, version=self.version)
+        return self.cache.get_or_compute(
+            key,
+            lambda: pd.read_sql(sql, self._open(), params=params_list or None),
+            ttl_seconds=self.ttl_seconds,
+        )
+
+    def _open(self) -> Any:
+        if self._connection is None:
+            self._connection = self._connect()
+        return self._connection
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> CachedReader:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def load_data_version(
+    connection: Any,
+    entities: Iterable[str],
+    *,
+    with_server_date: bool = False,
+    now: float | None = None,
+) -> str:
+    """Versao de dados para a chave do cache, lida de `fact.VW_DASH_DATA_VERSION`.
+
+    Token `entidade=run_entity_id;...` do ultimo run que gravou linhas em cada
+    entidade, em ordem de nome. `with_server_date` acrescenta `data=AAAA-MM-DD`
+    do servidor, para views cuja janela anda com GETDATE() mesmo sem carga
+    nova. Sem a view, `ttl=<janela>` de `DATA_VERSION_FALLBACK_SECONDS`.
+    """
+    exists = pd.read_sql(f"SELECT OBJECT_ID('{DATA_VERSION_VIEW_NAME}', 'V') AS object_id;", connection)
+    if exists.empty or pd.isna(exists.iloc[0]["object_id"]):
+        current = time.time() if now is None else now
+        return f"ttl={int(current) // DATA_VERSION_FALLBACK_SECONDS}"
+
+    names = tuple(entities)
+    placeholders = ", ".join("?" for _ in names)
+    versions = pd.read_sql(
+        f"""
+        SELECT entity_name, data_version
+        FROM {DATA_VERSION_VIEW_NAME}
+        WHERE entity_name IN ({placeholders})
+        ORDER BY entity_name;
+        """,
+        connection,
+        params=list(names),
+    )
+    parts = [f"{name}={int(version)}" for name, version in zip(versions["entity_name"], versions["data_version"])]
+    if with_server_date:
+        today = pd.read_sql("SELECT CONVERT(CHAR(10), GETDATE(), 23) AS data_servidor;", connection)
+        parts.append(f"data={today.iloc[0]['data_servidor']}")
+    return ";".join(parts)
+
+
+def _env_megabytes(name: str, default: int) -> int:
+    """Megabytes da variavel de ambiente; `0` desliga o armazenamento (toda consulta vira falta)."""
+    try:
+        return max(0, int(os.getenv(name, str(default)))) * 1024 * 1024
+    except ValueError:
+        return default * 1024 * 1024
+
+
+def from_env() -> ResultCache:
+    """Disco compartilhado com `DASH_RESULT_CACHE_DIR` e `DASH_RESULT_CACHE_SECRET`; senao, memoria do processo."""
+    max_entry_bytes = _env_megabytes(CACHE_MAX_ENTRY_MB_ENV, DEFAULT_MAX_ENTRY_MB)
+    root = os.getenv(CACHE_DIR_ENV, "").strip()
+    secret = os.getenv(CACHE_SECRET_ENV, "")
+    if root and secret:
+        return DiskResultCache(
+            root,
+            secret=secret,
+            max_bytes=_env_megabytes(CACHE_MAX_MB_ENV, DEFAULT_MAX_MB),
+            max_entry_bytes=max_entry_bytes,
+        )
+    return MemoryResultCache(
+        max_bytes=_env_megabytes(CACHE_MAX_MB_ENV, DEFAULT_MEMORY_MAX_MB),
+        max_entry_bytes=max_entry_bytes,
+    )
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import math
 import os
+import sys
+import time
+from dataclasses import replace
 from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 from zoneinfo import ZoneInfo
 
 import altair as alt
@@ -15,10 +19,28 @@ try:
 except ImportError:  # pragma: no cover
     pyodbc = None
 
+APP_DIR = Path(__file__).resolve().parent
+STREAMLIT_DIR = APP_DIR.parent
+for _path in (APP_DIR, STREAMLIT_DIR):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
 
-VIEW_NAME = "fact.VW_DASH_VENDAS_R1"
+import result_cache as rc  # noqa: E402
+import sales_queries as sq  # noqa: E402
+
+
+VIEW_NAME = sq.VIEW_NAME
 DEFAULT_SNAPSHOT_FILE = "vendas_r1.csv.gz"
 
+# O cache das consultas SQL e chaveado pela versao de dados do DW
+# (`fact.VW_DASH_DATA_VERSION`): o TTL longo so limita memoria, e a consulta
+# leve da versao roda no maximo a cada `DATA_VERSION_TTL_SECONDS`.
+DATA_VERSION_TTL_SECONDS = 30
+DATA_CACHE_TTL_SECONDS = 12 * 60 * 60
+# "Atualizar dados" grava um nonce na sessao que entra na versao de dados:
+# as entradas antigas do cache compartilhado deixam de casar para a sessao.
+REFRESH_NONCE_KEY = "refresh_nonce"
+
 NUMERIC_COLUMNS = [
     "quantidade_vendida",
     "valor_total_bruto",
@@ -357,26 +379,42 @@ def _suggest_connection_fix(error_text: str) -> list[str]:
     return suggestions
 
 
-def _build_in_filter(column_name: str, values: tuple[str, ...], params: list[Any]) -> str:
-    if not values:
-        return ""
-    placeholders = ", ".join("?" for _ in values)
-    params.extend(values)
-    return f" AND {column_name} IN ({placeholders})"
+@st.cache_resource(show_spinner=False)
+def _result_cache() -> rc.ResultCache:
+    return rc.from_env()
 
 
-@st.cache_data(ttl=600, show_spinner=False)
-def _load_metadata(conn_str: str) -> dict[str, Any]:
+def _cached_reader(conn_str: str, data_version: str) -> rc.CachedReader:
+    """Leitura pelo cache compartilhado entre replicas; a conexao so abre em falta."""
+    return rc.CachedReader(
+        _result_cache(),
+        lambda: _open_connection(conn_str),
+        scope=rc.connection_scope(conn_str),
+        version=data_version,
+        ttl_seconds=DATA_CACHE_TTL_SECONDS,
+    )
+
+
+@st.cache_data(ttl=DATA_VERSION_TTL_SECONDS, show_spinner=False)
+def _load_data_version(conn_str: str) -> str:
     connection = _open_connection(conn_str)
     try:
-        bounds = pd.read_sql(
+        return rc.load_data_version(connection, sq.DATA_VERSION_ENTITIES)
+    finally:
+        connection.close()
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL_SECONDS, show_spinner=False)
+def _load_metadata(conn_str: str, data_version: str = "") -> dict[str, Any]:
+    reader = _cached_reader(conn_str, data_version)
+    try:
+        bounds = reader.read_sql(
             f"""
             SELECT
                 CAST(MIN(data_completa) AS date) AS min_data,
                 CAST(MAX(data_completa) AS date) AS max_data
             FROM {VIEW_NAME};
             """,
-            connection,
         )
         if bounds.empty or bounds.loc[0, "min_data"] is None or bounds.loc[0, "max_data"] is None:
             raise ValueError("A view de vendas nao retornou datas validas.")
@@ -384,25 +422,20 @@ def _load_metadata(conn_str: str) -> dict[str, Any]:
         min_data = pd.to_datetime(bounds.loc[0, "min_data"]).date()
         max_data = pd.to_datetime(bounds.loc[0, "max_data"]).date()
 
-        states = pd.read_sql(
+        states = reader.read_sql(
             f"SELECT DISTINCT estado FROM {VIEW_NAME} WHERE estado IS NOT NULL ORDER BY estado;",
-            connection,
         )["estado"].astype(str).tolist()
-        regions = pd.read_sql(
+        regions = reader.read_sql(
             f"SELECT DISTINCT regiao_pais FROM {VIEW_NAME} WHERE regiao_pais IS NOT NULL ORDER BY regiao_pais;",
-            connection,
         )["regiao_pais"].astype(str).tolist()
-        categories = pd.read_sql(
+        categories = reader.read_sql(
             f"SELECT DISTINCT categoria FROM {VIEW_NAME} WHERE categoria IS NOT NULL ORDER BY categoria;",
-            connection,
         )["categoria"].astype(str).tolist()
-        sellers = pd.read_sql(
+        sellers = reader.read_sql(
             f"SELECT DISTINCT nome_vendedor FROM {VIEW_NAME} WHERE nome_vendedor IS NOT NULL ORDER BY nome_vendedor;",
-            connection,
         )["nome_vendedor"].astype(str).tolist()
-        teams = pd.read_sql(
+        teams = reader.read_sql(
             f"SELECT DISTINCT nome_equipe FROM {VIEW_NAME} WHERE nome_equipe IS NOT NULL ORDER BY nome_equipe;",
-            connection,
         )["nome_equipe"].astype(str).tolist()
 
         return {
@@ -415,7 +448,7 @@ def _load_metadata(conn_str: str) -> dict[str, Any]:
             "equipes": teams,
         }
     finally:
-        connection.close()
+        reader.close()
 
 
 @st.cache_data(ttl=600, show_spinner=False)
@@ -445,7 +478,7 @@ def _load_metadata_snapshot(snapshot_path: str) -> dict[str, Any]:
     }
 
 
-@st.cache_data(ttl=180, show_spinner=False)
+@st.cache_data(ttl=DATA_CACHE_TTL_SECONDS, show_spinner=False)
 def _load_sales_data(
     conn_str: str,
     start_date: date,
@@ -455,14 +488,10 @@ def _load_sales_data(
     categorias: tuple[str, ...],
     vendedores: tuple[str, ...],
     equipes: tuple[str, ...],
+    data_version: str = "",
 ) -> pd.DataFrame:
-    params: list[Any] = [start_date, end_date]
-    where = "WHERE CAST(data_completa AS date) BETWEEN ? AND ?"
-    where += _build_in_filter("estado", estados, params)
-    where += _build_in_filter("regiao_pais", regioes, params)
-    where += _build_in_filter("categoria", categorias, params)
-    where += _build_in_filter("nome_vendedor", vendedores, params)
-    where += _build_in_filter("nome_equipe", equipes, params)
+    filters = sq.SalesFilters(start_date, end_date, estados, regioes, categorias, vendedores, equipes)
+    where, params = filters.sql_where()
 
     query = f"""
     SELECT
@@ -495,11 +524,11 @@ def _load_sales_data(
     {where};
     """
 
-    connection = _open_connection(conn_str)
+    reader = _cached_reader(conn_str, data_version)
     try:
-        df = pd.read_sql(query, connection, params=params)
+        df = reader.read_sql(query, params)
     finally:
-        connection.close()
+        reader.close()
 
     return _normalize_sales_df(df)
 
@@ -519,21 +548,56 @@ def _load_sales_data_snapshot(
     if df.empty:
         return df.copy()
 
-    data_date = df["data_completa"].dt.date
-    mask = (data_date >= start_date) & (data_date <= end_date)
+    filters = sq.SalesFilters(start_date, end_date, estados, regioes, categorias, vendedores, equipes)
+    return df.loc[filters.frame_mask(df)].copy()
 
-    if estados:
-        mask &= df["estado"].isin(estados)
-    if regioes:
-        mask &= df["regiao_pais"].isin(regioes)
-    if categorias:
-        mask &= df["categoria"].isin(categorias)
-    if vendedores:
-        mask &= df["nome_vendedor"].isin(vendedores)
-    if equipes:
-        mask &= df["nome_equipe"].isin(equipes)
 
-    return df.loc[mask].copy()
+@st.cache_data(ttl=DATA_CACHE_TTL_SECONDS, show_spinner=False)
+def _load_sales_aggregates(conn_str: str, filters: sq.SalesFilters, data_version: str = "") -> sq.SalesAggregates:
+    reader = _cached_reader(conn_str, data_version)
+    try:
+        return sq.fetch_sales_aggregates(reader, filters)
+    finally:
+        reader.close()
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL_SECONDS, show_spinner=False)
+def _load_sales_totals(conn_str: str, filters: sq.SalesFilters, data_version: str = "") -> dict[str, float]:
+    reader = _cached_reader(conn_str, data_version)
+    try:
+        totals, _ = sq.fetch_sales_totals(reader, filters)
+    finally:
+        reader.close()
+    return totals
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL_SECONDS, show_spinner=False)
+def _load_sales_detail_page(
+    conn_str: str, filters: sq.SalesFilters, page: int, page_size: int, data_version: str = ""
+) -> pd.DataFrame:
+    reader = _cached_reader(conn_str, data_version)
+    try:
+        return sq.fetch_sales_detail_page(reader, filters, page=page, page_size=page_size)
+    finally:
+        reader.close()
+
+
+def _load_snapshot_filtered(snapshot_path: str, filters: sq.SalesFilters) -> pd.DataFrame:
+    return _load_sales_data_snapshot(
+        snapshot_path=snapshot_path,
+        start_date=filters.start_date,
+        end_date=filters.end_date,
+        estados=filters.estados,
+        regioes=filters.regioes,
+        categorias=filters.categorias,
+        vendedores=filters.vendedores,
+        equipes=filters.equipes,
+    )
+
+
+@st.cache_data(ttl=180, show_spinner=False)
+def _load_sales_aggregates_snapshot(snapshot_path: str, filters: sq.SalesFilters) -> sq.SalesAggregates:
+    return sq.aggregate_sales_frame(_load_snapshot_filtered(snapshot_path, filters))
 
 
 def _fmt_currency(value: float) -> str:
@@ -550,31 +614,6 @@ def _fmt_pct(value: float) -> str:
     return f"{value * 100:.1f}%".replace(".", ",")
 
 
-def _compute_kpis(df: pd.DataFrame) -> dict[str, float]:
-    receita = _safe_float(df["valor_total_liquido"].sum())
-    margem = _safe_float(df["margem_bruta"].sum())
-    itens = _safe_float(df["quantidade_vendida"].sum())
-    qtd_devolvida = _safe_float(df["quantidade_devolvida"].sum())
-    descontos = _safe_float(df["valor_total_descontos"].sum())
-    bruto = _safe_float(df["valor_total_bruto"].sum())
-    comissao = _safe_float(df["valor_comissao"].sum())
-
-    pedidos_col = "numero_pedido" if "numero_pedido" in df.columns else "venda_original_id"
-    pedidos = float(df[pedidos_col].nunique()) if pedidos_col in df.columns else 0.0
-
-    return {
-        "receita": receita,
-        "margem": margem,
-        "margem_pct": (margem / receita) if receita > 0 else 0.0,
-        "itens": itens,
-        "pedidos": pedidos,
-        "ticket_medio": (receita / pedidos) if pedidos > 0 else 0.0,
-        "taxa_devolucao": (qtd_devolvida / itens) if itens > 0 else 0.0,
-        "desconto_pct": (descontos / bruto) if bruto > 0 else 0.0,
-        "comissao": comissao,
-    }
-
-
 def _resolve_local_now() -> tuple[datetime, str]:
     timezone_name = os.getenv("DASH_TIMEZONE", "America/Sao_Paulo")
     try:
@@ -705,25 +744,30 @@ def _render_kpi_strip(
             delta = None
             if previous is not None and key in previous:
                 delta = _fmt_delta(current[key], previous[key])
+            help_text = None
+            if key == "ticket_medio" and current.get("pedidos_erro_relativo", 0.0) > 0:
+                help_text = (
+                    "Pedidos distintos estimados por HyperLogLog no agregado diario "
+                    f"(erro tipico de {_fmt_pct(current['pedidos_erro_relativo'])}). "
+                    f"Periodos de ate {sq.EXACT_ORDER_COUNT_MAX_DAYS} dias usam contagem exata."
+                )
             st.metric(
                 label=label,
                 value=formatter(current[key]),
                 delta=delta,
                 delta_color=delta_color,
+                help=help_text,
             )
 
 
-def _line_trend_chart(df: pd.DataFrame, granularity: str) -> alt.Chart:
+def _line_trend_chart(daily: pd.DataFrame, granularity: str) -> alt.Chart:
     freq = "MS" if granularity == "Mes" else "D"
 
+    # A grade diaria ja vem agregada; o mes e so um reagrupamento dela.
     grouped = (
-        df.set_index("data_completa")
+        daily.set_index("data_completa")
         .resample(freq)
-        .agg(
-            receita=("valor_total_liquido", "sum"),
-            margem=("margem_bruta", "sum"),
-            pedidos=("numero_pedido", "nunique"),
-        )
+        .agg(receita=("receita", "sum"), margem=("margem", "sum"))
         .reset_index()
     )
 
@@ -775,14 +819,10 @@ def _bar_chart(df: pd.DataFrame, category_col: str, value_col: str, color: str,
     )
 
 
-def _render_insights(df: pd.DataFrame) -> None:
-    receita_por_categoria = (
-        df.groupby("categoria", as_index=False)["valor_total_liquido"].sum().sort_values("valor_total_liquido", ascending=False)
-    )
-    receita_por_estado = (
-        df.groupby("estado", as_index=False)["valor_total_liquido"].sum().sort_values("valor_total_liquido", ascending=False)
-    )
-    diario = df.groupby(df["data_completa"].dt.date, as_index=False)["valor_total_liquido"].sum().sort_values("valor_total_liquido", ascending=False)
+def _render_insights(aggregates: sq.SalesAggregates) -> None:
+    receita_por_categoria = aggregates.category_mix
+    receita_por_estado = aggregates.by_state
+    diario = aggregates.daily.sort_values("receita", ascending=False)
 
     if receita_por_categoria.empty or receita_por_estado.empty or diario.empty:
         st.info("Sem dados suficientes para gerar insights.")
@@ -795,7 +835,7 @@ def _render_insights(df: pd.DataFrame) -> None:
     st.markdown(
         (
             f"<div class='insight'><b>Categoria lider:</b> {top_categoria['categoria']} "
-            f"com {_fmt_currency(_safe_float(top_categoria['valor_total_liquido']))} de receita.</div>"
+            f"com {_fmt_currency(_safe_float(top_categoria['receita']))} de receita.</div>"
         ),
         unsafe_allow_html=True,
     )
@@ -810,28 +850,28 @@ def _render_insights(df: pd.DataFrame) -> None:
         (
             f"<div class='insight warning'><b>Maior dia de faturamento:</b> "
             f"{pd.to_datetime(melhor_dia['data_completa']).strftime('%d/%m/%Y')} "
-            f"({_fmt_currency(_safe_float(melhor_dia['valor_total_liquido']))}).</div>"
+            f"({_fmt_currency(_safe_float(melhor_dia['receita']))}).</div>"
         ),
         unsafe_allow_html=True,
     )
 
 
-def _render_overview_tab(df: pd.DataFrame, granularity: str) -> None:
+def _render_overview_tab(aggregates: sq.SalesAggregates, granularity: str) -> None:
     c1, c2 = st.columns([2.3, 1.2])
     with c1:
         st.markdown("<div class='card'>", unsafe_allow_html=True)
         st.subheader(f"Tendencia de receita e margem ({granularity.lower()})")
-        st.altair_chart(_line_trend_chart(df, granularity), use_container_width=True)
+        st.altair_chart(_line_trend_chart(aggregates.daily, granularity), use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
     with c2:
         st.markdown("<div class='card'>", unsafe_allow_html=True)
         st.subheader("Leituras rapidas")
-        _render_insights(df)
+        _render_insights(aggregates)
         st.markdown("</div>", unsafe_allow_html=True)
 
     weekday_order = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-    weekday = df.copy()
+    weekday = aggregates.daily.rename(columns={"receita": "valor_total_liquido"})
     weekday["weekday"] = weekday["data_completa"].dt.strftime("%a")
     weekday = (
         weekday.groupby("weekday", as_index=False)["valor_total_liquido"]
@@ -852,30 +892,10 @@ def _render_overview_tab(df: pd.DataFrame, granularity: str) -> None:
     st.markdown("</div>", unsafe_allow_html=True)
 
 
-def _render_product_region_tab(df: pd.DataFrame) -> None:
-    top_produtos = (
-        df.groupby("nome_produto", as_index=False)["valor_total_liquido"]
-        .sum()
-        .sort_values("valor_total_liquido", ascending=False)
-        .head(12)
-    )
-    top_estados = (
-        df.groupby("estado", as_index=False)["valor_total_liquido"]
-        .sum()
-        .sort_values("valor_total_liquido", ascending=False)
-        .head(12)
-    )
-    mix_categoria = (
-        df.groupby("categoria", as_index=False)
-        .agg(
-            receita=("valor_total_liquido", "sum"),
-            bruto=("valor_total_bruto", "sum"),
-            margem=("margem_bruta", "sum"),
-            itens=("quantidade_vendida", "sum"),
-            descontos=("valor_total_descontos", "sum"),
-        )
-        .sort_values("receita", ascending=False)
-    )
+def _render_product_region_tab(aggregates: sq.SalesAggregates) -> None:
+    top_produtos = aggregates.top_products.head(12)
+    top_estados = aggregates.by_state.head(12)
+    mix_categoria = aggregates.category_mix.copy()
     mix_categoria["margem_pct"] = mix_categoria.apply(
         lambda row: (row["margem"] / row["receita"]) if row["receita"] else 0.0, axis=1
     )
@@ -924,23 +944,14 @@ def _render_product_region_tab(df: pd.DataFrame) -> None:
     st.markdown("</div>", unsafe_allow_html=True)
 
 
-def _render_sales_tab(df: pd.DataFrame) -> None:
-    ranking = (
-        df.groupby(["nome_vendedor", "nome_equipe"], as_index=False)
-        .agg(
-            receita=("valor_total_liquido", "sum"),
-            margem=("margem_bruta", "sum"),
-            pedidos=("numero_pedido", "nunique"),
-            itens=("quantidade_vendida", "sum"),
-        )
-        .sort_values("receita", ascending=False)
-    )
+def _render_sales_tab(aggregates: sq.SalesAggregates) -> None:
+    ranking = aggregates.seller_ranking.copy()
     ranking["margem_pct"] = ranking.apply(lambda row: row["margem"] / row["receita"] if row["receita"] else 0.0, axis=1)
 
     top_vendedores = ranking.head(12)
     top_equipes = (
-        df.groupby("nome_equipe", as_index=False)["valor_total_liquido"]
-        .sum()
+        ranking.groupby("nome_equipe", as_index=False)
+        .agg(valor_total_liquido=("receita", "sum"))
         .sort_values("valor_total_liquido", ascending=False)
         .head(10)
     )
@@ -987,41 +998,45 @@ def _render_sales_tab(df: pd.DataFrame) -> None:
     st.markdown("</div>", unsafe_allow_html=True)
 
 
-def _render_data_tab(df: pd.DataFrame) -> None:
+def _format_detail_frame(df: pd.DataFrame) -> pd.DataFrame:
+    export_cols = [col for col in sq.DETAIL_COLUMNS if col in df.columns]
+    show = df[export_cols].copy()
+    show["data_completa"] = pd.to_datetime(show["data_completa"]).dt.strftime("%Y-%m-%d")
+    return show
+
+
+def _render_data_tab(
+    total_rows: int,
+    load_page: Callable[[int], pd.DataFrame],
+    load_full: Callable[[], pd.DataFrame],
+) -> None:
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.subheader("Base consolidada")
-    st.caption(f"Registros retornados: {_fmt_int(float(len(df)))}")
-
-    export_cols = [
-        "data_completa",
-        "estado",
-        "regiao_pais",
-        "categoria",
-        "subcategoria",
-        "nome_produto",
-        "nome_vendedor",
-        "nome_equipe",
-        "numero_pedido",
-        "quantidade_vendida",
-        "valor_total_bruto",
-        "valor_total_descontos",
-        "valor_total_liquido",
-        "margem_bruta",
-        "valor_comissao",
-    ]
-    export_cols = [col for col in export_cols if col in df.columns]
-    show = df[export_cols].sort_values("data_completa", ascending=False).copy()
-    show["data_completa"] = show["data_completa"].dt.strftime("%Y-%m-%d")
-
-    csv_data = show.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        "Baixar CSV filtrado",
-        data=csv_data,
-        file_name=f"dash_vendas_filtrado_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-        mime="text/csv",
-        use_container_width=False,
+
+    page_size = sq.DETAIL_PAGE_SIZE
+    total_pages = max(1, math.ceil(total_rows / page_size))
+    page = int(st.number_input("Pagina", min_value=1, max_value=total_pages, value=1, step=1))
+    st.caption(
+        f"Registros retornados: {_fmt_int(float(total_rows))} | "
+        f"pagina {page} de {total_pages} ({page_size} linhas por pagina)"
     )
-    st.dataframe(show, use_container_width=True, hide_index=True)
+
+    # A exportacao completa le todas as linhas do filtro; so roda sob demanda.
+    if st.toggle("Preparar CSV completo do filtro", value=False):
+        csv_data = (
+            _format_detail_frame(load_full())
+            .sort_values("data_completa", ascending=False)
+            .to_csv(index=False)
+            .encode("utf-8")
+        )
+        st.download_button(
+            "Baixar CSV filtrado",
+            data=csv_data,
+            file_name=f"dash_vendas_filtrado_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            mime="text/csv",
+            use_container_width=False,
+        )
+    st.dataframe(_format_detail_frame(load_page(page)), use_container_width=True, hide_index=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
 
@@ -1043,10 +1058,15 @@ def main() -> None:
     try:
         if use_snapshot:
             conn_str = ""
+            data_version = ""
             metadata = _load_metadata_snapshot(snapshot_path)
         else:
             conn_str = _build_conn_str()
-            metadata = _load_metadata(conn_str)
+            data_version = _load_data_version(conn_str)
+            refresh_nonce = st.session_state.get(REFRESH_NONCE_KEY)
+            if refresh_nonce is not None:
+                data_version = f"{data_version};refresh={refresh_nonce}"
+            metadata = _load_metadata(conn_str, data_version)
     except Exception as exc:  # noqa: BLE001
         if use_snapshot:
             st.error("Nao foi possivel inicializar o dashboard em modo snapshot.")
@@ -1091,6 +1111,7 @@ def main() -> None:
         compare_previous = st.toggle("Comparar com periodo anterior", value=True)
 
         if st.button("Atualizar dados", use_container_width=True):
+            st.session_state[REFRESH_NONCE_KEY] = time.time_ns()
             st.cache_data.clear()
             st.rerun()
 
@@ -1106,31 +1127,23 @@ def main() -> None:
         else:
             st.info("Fonte de dados: SQL Server DW")
 
+    filters = sq.SalesFilters(
+        start_date=start_date,
+        end_date=end_date,
+        estados=selected_estados,
+        regioes=selected_regioes,
+        categorias=selected_categorias,
+        vendedores=selected_vendedores,
+        equipes=selected_equipes,
+    )
+
     spinner_text = "Carregando snapshot de vendas..." if use_snapshot else "Consultando vendas no DW..."
     with st.spinner(spinner_text):
         try:
             if use_snapshot:
-                df = _load_sales_data_snapshot(
-                    snapshot_path=snapshot_path,
-                    start_date=start_date,
-                    end_date=end_date,
-                    estados=selected_estados,
-                    regioes=selected_regioes,
-                    categorias=selected_categorias,
-                    vendedores=selected_vendedores,
-                    equipes=selected_equipes,
-                )
+                aggregates = _load_sales_aggregates_snapshot(snapshot_path, filters)
             else:
-                df = _load_sales_data(
-                    conn_str=conn_str,
-                    start_date=start_date,
-                    end_date=end_date,
-                    estados=selected_estados,
-                    regioes=selected_regioes,
-                    categorias=selected_categorias,
-                    vendedores=selected_vendedores,
-                    equipes=selected_equipes,
-                )
+                aggregates = _load_sales_aggregates(conn_str, filters, data_version)
         except Exception as exc:  # noqa: BLE001
             if use_snapshot:
                 st.error("Falha ao carregar os dados de snapshot de vendas.")
@@ -1144,7 +1157,7 @@ def main() -> None:
                 st.write(f"- {suggestion}")
             st.stop()
 
-    if df.empty:
+    if aggregates.is_empty:
         st.warning("Sem dados para os filtros atuais. Ajuste periodo e filtros laterais.")
         st.stop()
 
@@ -1153,44 +1166,26 @@ def main() -> None:
         days = (end_date - start_date).days + 1
         prev_end = start_date - timedelta(days=1)
         prev_start = prev_end - timedelta(days=days - 1)
+        prev_filters = replace(filters, start_date=prev_start, end_date=prev_end)
+        # Para a comparacao basta a linha de totais do periodo anterior.
         if use_snapshot:
-            prev_df = _load_sales_data_snapshot(
-                snapshot_path=snapshot_path,
-                start_date=prev_start,
-                end_date=prev_end,
-                estados=selected_estados,
-                regioes=selected_regioes,
-                categorias=selected_categorias,
-                vendedores=selected_vendedores,
-                equipes=selected_equipes,
-            )
+            prev_totals = _load_sales_aggregates_snapshot(snapshot_path, prev_filters).totals
         else:
-            prev_df = _load_sales_data(
-                conn_str=conn_str,
-                start_date=prev_start,
-                end_date=prev_end,
-                estados=selected_estados,
-                regioes=selected_regioes,
-                categorias=selected_categorias,
-                vendedores=selected_vendedores,
-                equipes=selected_equipes,
-            )
-        if not prev_df.empty:
-            previous_kpis = _compute_kpis(prev_df)
+            prev_totals = _load_sales_totals(conn_str, prev_filters, data_version)
+        if prev_totals.get("linhas", 0.0) > 0:
+            previous_kpis = sq.compute_kpis(prev_totals)
 
-    current_kpis = _compute_kpis(df)
+    current_kpis = sq.compute_kpis(aggregates.totals)
     freshness = _evaluate_freshness_status(max_data)
 
     period_label = f"Periodo ativo: {start_date.isoformat()} a {end_date.isoformat()}"
-    updated_at = None
-    if "data_atualizacao" in df.columns:
-        updated_at = df["data_atualizacao"].max()
+    updated_at = aggregates.updated_at
 
     c_period, c_update, c_sla = st.columns([2.1, 1.2, 1.7])
     with c_period:
         st.caption(period_label)
     with c_update:
-        if pd.notna(updated_at):
+        if updated_at is not None and pd.notna(updated_at):
             st.caption(f"Ultima atualizacao: {pd.to_datetime(updated_at).strftime('%Y-%m-%d %H:%M:%S')}")
     with c_sla:
         if freshness["status"] == "Dentro do SLA":
@@ -1208,19 +1203,44 @@ def main() -> None:
     )
 
     with tab_overview:
-        _render_overview_tab(df, trend_granularity)
+        _render_overview_tab(aggregates, trend_granularity)
 
     with tab_produtos:
-        _render_product_region_tab(df)
+        _render_product_region_tab(aggregates)
 
     with tab_comercial:
-        _render_sales_tab(df)
+        _render_sales_tab(aggregates)
 
     with tab_metricas:
         _render_metric_dictionary_tab(current_kpis, start_date, end_date)
 
     with tab_base:
-        _render_data_tab(df)
+        if use_snapshot:
+            _render_data_tab(
+                int(aggregates.totals["linhas"]),
+                load_page=lambda page: sq.frame_detail_page(
+                    _load_snapshot_filtered(snapshot_path, filters), page=page
+                ),
+                load_full=lambda: _load_snapshot_filtered(snapshot_path, filters),
+            )
+        else:
+            _render_data_tab(
+                int(aggregates.totals["linhas"]),
+                load_page=lambda page: _load_sales_detail_page(
+                    conn_str, filters, page, sq.DETAIL_PAGE_SIZE, data_version
+                ),
+                load_full=lambda: _load_sales_data(
+                    conn_str=conn_str,
+                    start_date=filters.start_date,
+                    end_date=filters.end_date,
+                    estados=filters.estados,
+                    regioes=filters.regioes,
+                    categorias=filters.categorias,
+                    vendedores=filters.vendedores,
+                    equipes=filters.equipes,
+                    data_version=data_version,
+                ),
+            )
 
 
 if __name__ == "__main__":
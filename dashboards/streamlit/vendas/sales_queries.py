@@ -0,0 +1,619 @@
+"""Camada de consulta do dashboard de vendas.
+
+Cada aba consome grades ja agregadas (`SalesAggregates`). No modo SQL as
+agregacoes rodam no SQL Server via GROUP BY e so a grade resultante trafega
+pelo ODBC; no modo snapshot as mesmas grades sao calculadas em pandas sobre o
+arquivo local. Linhas de detalhe so sao lidas paginadas, na aba de base.
+
+Grades aditivas (dia, estado, produto, categoria) saem de
+`fact.VW_AGG_VENDAS_DIARIA` quando a view existe: o agregado diario mantido
+pelo ETL tem ordens de grandeza menos linhas que a fato. O ranking de
+vendedores segue na view de detalhe porque pedidos distintos nao somam.
+
+Os totais tambem saem do agregado em periodos longos: pedidos distintos (e o
+ticket medio) sao estimados pela uniao dos sketches HyperLogLog de
+`fact.VW_AGG_VENDAS_DIARIA_HLL`, com erro relativo tipico de
+`HLL_RELATIVE_ERROR`. Ate `EXACT_ORDER_COUNT_MAX_DAYS` dias a contagem segue
+exata na view de detalhe.
+
+O cache do app e chaveado por `result_cache.load_data_version` sobre
+`DATA_VERSION_ENTITIES`: o token so muda quando um run do ETL grava linhas
+em alguma entidade que alimenta as views. As funcoes aceitam tambem um
+`result_cache.CachedReader` como conexao, para o resultado ser compartilhado
+entre processos.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Iterable, Mapping
+
+import pandas as pd
+
+
+VIEW_NAME = "fact.VW_DASH_VENDAS_R1"
+AGGREGATE_VIEW_NAME = "fact.VW_AGG_VENDAS_DIARIA"
+SKETCH_VIEW_NAME = "fact.VW_AGG_VENDAS_DIARIA_HLL"
+
+# Entidades do ETL lidas por `VIEW_NAME` e pelas views do agregado.
+DATA_VERSION_ENTITIES = ("dim_cliente", "dim_produto", "dim_regiao", "dim_vendedor", "fact_vendas")
+
+# Mesmos parametros de `fact.fn_hll_numero_pedido` (script 28).
+HLL_PRECISION = 10
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_RELATIVE_ERROR = 1.04 / math.sqrt(HLL_REGISTERS)
+
+ORDER_COUNT_AUTO = "auto"
+ORDER_COUNT_EXACT = "exact"
+ORDER_COUNT_SKETCH = "sketch"
+EXACT_ORDER_COUNT_MAX_DAYS = 31
+
+DEFAULT_TOP_N = 12
+DETAIL_PAGE_SIZE = 500
+
+TEXT_NOT_INFORMED = "Nao informado"
+SELLER_NOT_INFORMED = "Sem vendedor"
+TEAM_NOT_INFORMED = "Sem equipe"
+
+DETAIL_COLUMNS = [
+    "data_completa",
+    "estado",
+    "regiao_pais",
+    "categoria",
+    "subcategoria",
+    "nome_produto",
+    "nome_vendedor",
+    "nome_equipe",
+    "numero_pedido",
+    "quantidade_vendida",
+    "valor_total_bruto",
+    "valor_total_descontos",
+    "valor_total_liquido",
+    "margem_bruta",
+    "valor_comissao",
+]
+
+TOTALS_COLUMNS = [
+    "receita",
+    "margem",
+    "itens",
+    "qtd_devolvida",
+    "descontos",
+    "bruto",
+    "comissao",
+    "pedidos",
+    "linhas",
+]
+
+
+@dataclass(frozen=True)
+class SalesFilters:
+    start_date: date
+    end_date: date
+    estados: tuple[str, ...] = ()
+    regioes: tuple[str, ...] = ()
+    categorias: tuple[str, ...] = ()
+    vendedores: tuple[str, ...] = ()
+    equipes: tuple[str, ...] = ()
+
+    def _in_filters(self) -> tuple[tuple[str, tuple[str, ...]], ...]:
+        return (
+            ("estado", self.estados),
+            ("regiao_pais", self.regioes),
+            ("categoria", self.categorias),
+            ("nome_vendedor", self.vendedores),
+            ("nome_equipe", self.equipes),
+        )
+
+    def sql_where(self) -> tuple[str, list[Any]]:
+        params: list[Any] = [self.start_date, self.end_date]
+        where = "WHERE CAST(data_completa AS date) BETWEEN ? AND ?"
+        for column_name, values in self._in_filters():
+            if not values:
+                continue
+            placeholders = ", ".join("?" for _ in values)
+            params.extend(values)
+            where += f" AND {column_name} IN ({placeholders})"
+        return where, params
+
+    def frame_mask(self, df: pd.DataFrame) -> pd.Series:
+        data_date = df["data_completa"].dt.date
+        mask = (data_date >= self.start_date) & (data_date <= self.end_date)
+        for column_name, values in self._in_filters():
+            if values:
+                mask &= df[column_name].isin(values)
+        return mask
+
+
+@dataclass(frozen=True)
+class SalesAggregates:
+    """Grades agregadas consumidas pelas abas.
+
+    - `totals`: uma linha com somas, pedidos distintos e linhas de detalhe;
+    - `daily`: receita e margem por dia (tendencia, melhor dia, dia da semana);
+    - `by_state`: receita por estado, ordenada;
+    - `top_products`: top N produtos por receita;
+    - `category_mix`: somas por categoria, ordenadas por receita;
+    - `seller_ranking`: somas e pedidos distintos por vendedor/equipe.
+    """
+
+    totals: dict[str, float]
+    updated_at: Any
+    daily: pd.DataFrame
+    by_state: pd.DataFrame
+    top_products: pd.DataFrame
+    category_mix: pd.DataFrame
+    seller_ranking: pd.DataFrame
+
+    @property
+    def is_empty(self) -> bool:
+        return self.totals.get("linhas", 0.0) <= 0
+
+
+def compute_kpis(totals: dict[str, float]) -> dict[str, float]:
+    receita = totals.get("receita", 0.0)
+    margem = totals.get("margem", 0.0)
+    itens = totals.get("itens", 0.0)
+    pedidos = totals.get("pedidos", 0.0)
+    bruto = totals.get("bruto", 0.0)
+    return {
+        "receita": receita,
+        "margem": margem,
+        "margem_pct": (margem / receita) if receita > 0 else 0.0,
+        "itens": itens,
+        "pedidos": pedidos,
+        "ticket_medio": (receita / pedidos) if pedidos > 0 else 0.0,
+        "taxa_devolucao": (totals.get("qtd_devolvida", 0.0) / itens) if itens > 0 else 0.0,
+        "desconto_pct": (totals.get("descontos", 0.0) / bruto) if bruto > 0 else 0.0,
+        "comissao": totals.get("comissao", 0.0),
+        # > 0 quando pedidos (e o ticket medio) vem do sketch HLL.
+        "pedidos_erro_relativo": totals.get("pedidos_erro_relativo", 0.0),
+    }
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return 0.0 if pd.isna(value) else float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _coerce_numeric(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    # pyodbc devolve DECIMAL como objeto `Decimal`; as grades usam float.
+    for column in columns:
+        df[column] = pd.to_numeric(df[column], errors="coerce").fillna(0.0).astype(float)
+    return df
+
+
+def _read_sql(connection: Any, sql: str, params: list[Any]) -> pd.DataFrame:
+    # O app passa um `result_cache.CachedReader` no lugar da conexao pyodbc.
+    read_sql = getattr(connection, "read_sql", None)
+    if read_sql is not None:
+        return read_sql(sql, params)
+    return pd.read_sql(sql, connection, params=params)
+
+
+def _empty_aggregates() -> SalesAggregates:
+    return SalesAggregates(
+        totals={column: 0.0 for column in TOTALS_COLUMNS},
+        updated_at=None,
+        daily=pd.DataFrame(columns=["data_completa", "receita", "margem"]),
+        by_state=pd.DataFrame(columns=["estado", "valor_total_liquido"]),
+        top_products=pd.DataFrame(columns=["nome_produto", "valor_total_liquido"]),
+        category_mix=pd.DataFrame(columns=["categoria", "receita", "bruto", "margem", "itens", "descontos"]),
+        seller_ranking=pd.DataFrame(columns=["nome_vendedor", "nome_equipe", "receita", "margem", "pedidos", "itens"]),
+    )
+
+
+def order_sketch_register(numero_pedido: str) -> tuple[int, int]:
+    """(registro, rho) de um pedido, identico a `fact.fn_hll_numero_pedido`."""
+    digest = hashlib.md5(str(numero_pedido).encode("latin-1")).digest()
+    register = int.from_bytes(digest[0:2], "big") % HLL_REGISTERS
+    bits = int.from_bytes(digest[2:6], "big")
+    return register, 33 - bits.bit_length()
+
+
+def build_order_sketch(numeros_pedido: Iterable[str]) -> dict[int, int]:
+    sketch: dict[int, int] = {}
+    for numero_pedido in numeros_pedido:
+        register, rho = order_sketch_register(numero_pedido)
+        if rho > sketch.get(register, 0):
+            sketch[register] = rho
+    return sketch
+
+
+def merge_order_sketches(*sketches: Mapping[int, int]) -> dict[int, int]:
+    """Uniao de sketches: maior rho por registro (a ordem e o agrupamento nao importam)."""
+    merged: dict[int, int] = {}
+    for sketch in sketches:
+        for register, rho in sketch.items():
+            if rho > merged.get(register, 0):
+                merged[register] = int(rho)
+    return merged
+
+
+def estimate_distinct_orders(sketch: Mapping[int, int]) -> float:
+    """Estimativa HyperLogLog de pedidos distintos.
+
+    Erro relativo tipico (um desvio padrao) de `HLL_RELATIVE_ERROR` (~3,3%);
+    abaixo de 2,5 x `HLL_REGISTERS` usa contagem linear pelos registros
+    vazios, praticamente exata para poucos pedidos.
+    """
+    if not sketch:
+        return 0.0
+    m = HLL_REGISTERS
+    alpha = 0.7213 / (1.0 + 1.079 / m)
+    empty = m - len(sketch)
+    inverse_sum = empty + sum(2.0 ** -rho for rho in sketch.values())
+    estimate = alpha * m * m / inverse_sum
+    if estimate <= 2.5 * m and empty > 0:
+        return m * math.log(m / empty)
+    return estimate
+
+
+def fetch_order_sketch(connection: Any, filters: SalesFilters) -> dict[int, int]:
+    """Une no SQL Server os sketches das celulas do filtro: no maximo `HLL_REGISTERS` linhas."""
+    where, params = filters.sql_where()
+    df = _read_sql(
+        connection,
+        f"""
+        SELECT registro, MAX(rho) AS rho
+        FROM {SKETCH_VIEW_NAME}
+        {where}
+        GROUP BY registro;
+        """,
+        params,
+    )
+    return {int(register): int(rho) for register, rho in zip(df["registro"], df["rho"])}
+
+
+def fetch_sales_totals(
+    connection: Any,
+    filters: SalesFilters,
+    *,
+    order_count: str = ORDER_COUNT_AUTO,
+) -> tuple[dict[str, float], Any]:
+    """Linha de totais do filtro e a ultima atualizacao.
+
+    `order_count`: `exact` le a view de detalhe (COUNT DISTINCT); `sketch` le
+    somas do agregado diario e estima pedidos pelo HLL; `auto` usa o sketch
+    acima de `EXACT_ORDER_COUNT_MAX_DAYS` dias quando as views existem.
+    `totals["pedidos_erro_relativo"]` e 0 na contagem exata.
+    """
+    use_sketch = order_count == ORDER_COUNT_SKETCH or (
+        order_count == ORDER_COUNT_AUTO
+        and (filters.end_date - filters.start_date).days + 1 > EXACT_ORDER_COUNT_MAX_DAYS
+        and sketch_view_available(connection)
+    )
+    if use_sketch:
+        return _fetch_sales_totals_from_sketch(connection, filters)
+
+    where, params = filters.sql_where()
+    df = _read_sql(
+        connection,
+        f"""
+        SELECT
+            SUM(valor_total_liquido) AS receita,
+            SUM(margem_bruta) AS margem,
+            SUM(quantidade_vendida) AS itens,
+            SUM(quantidade_devolvida) AS qtd_devolvida,
+            SUM(valor_total_descontos) AS descontos,
+            SUM(valor_total_bruto) AS bruto,
+            SUM(valor_comissao) AS comissao,
+            COUNT(DISTINCT numero_pedido) AS pedidos,
+            COUNT_BIG(*) AS linhas,
+            MAX(data_atualizacao) AS data_atualizacao
+        FROM {VIEW_NAME}
+        {where};
+        """,
+        params,
+    )
+    if df.empty:
+        return {column: 0.0 for column in TOTALS_COLUMNS} | {"pedidos_erro_relativo": 0.0}, None
+    row = df.iloc[0]
+    totals = {column: _to_float(row[column]) for column in TOTALS_COLUMNS}
+    totals["pedidos_erro_relativo"] = 0.0
+    return totals, row["data_atualizacao"]
+
+
+def _fetch_sales_totals_from_sketch(connection: Any, filters: SalesFilters) -> tuple[dict[str, float], Any]:
+    where, params = filters.sql_where()
+    df = _read_sql(
+        connection,
+        f"""
+        SELECT
+            SUM(valor_total_liquido) AS receita,
+            SUM(margem_bruta) AS margem,
+            SUM(quantidade_vendida) AS itens,
+            SUM(quantidade_devolvida) AS qtd_devolvida,
+            SUM(valor_total_descontos) AS descontos,
+            SUM(valor_total_bruto) AS bruto,
+            SUM(valor_comissao) AS comissao,
+            SUM(linhas) AS linhas,
+            -- O agregado grava em UTC; a fato, no horario do servidor.
+            DATEADD(MINUTE, DATEDIFF(MINUTE, SYSUTCDATETIME(), SYSDATETIME()), MAX(data_atualizacao))
+                AS data_atualizacao
+        FROM {AGGREGATE_VIEW_NAME}
+        {where};
+        """,
+        params,
+    )
+    totals = {column: 0.0 for column in TOTALS_COLUMNS}
+    updated_at = None
+    if not df.empty:
+        row = df.iloc[0]
+        totals.update({column: _to_float(row[column]) for column in df.columns if column in totals})
+        updated_at = row["data_atualizacao"]
+    if totals["linhas"] > 0:
+        totals["pedidos"] = estimate_distinct_orders(fetch_order_sketch(connection, filters))
+    totals["pedidos_erro_relativo"] = HLL_RELATIVE_ERROR
+    return totals, updated_at
+
+
+def _view_exists(connection: Any, view_name: str) -> bool:
+    df = _read_sql(connection, f"SELECT OBJECT_ID('{view_name}', 'V') AS object_id;", [])
+    return not df.empty and pd.notna(df.iloc[0]["object_id"])
+
+
+def aggregate_view_available(connection: Any) -> bool:
+    return _view_exists(connection, AGGREGATE_VIEW_NAME)
+
+
+def sketch_view_available(connection: Any) -> bool:
+    return _view_exists(connection, SKETCH_VIEW_NAME)
+
+
+def _fetch_grouped(
+    connection: Any,
+    filters: SalesFilters,
+    *,
+    select_keys: str,
+    group_keys: str,
+    measures: str,
+    order_by: str,
+    top_n: int | None = None,
+    source: str = VIEW_NAME,
+) -> pd.DataFrame:
+    where, params = filters.sql_where()
+    top = ""
+    if top_n is not None:
+        top = "TOP (?)"
+        params = [top_n, *params]
+    return _read_sql(
+        connection,
+        f"""
+        SELECT {top}
+            {select_keys},
+            {measures}
+        FROM {source}
+        {where}
+        GROUP BY {group_keys}
+        ORDER BY {order_by};
+        """,
+        params,
+    )
+
+
+def fetch_daily_revenue(connection: Any, filters: SalesFilters, *, source: str = VIEW_NAME) -> pd.DataFrame:
+    daily = _fetch_grouped(
+        connection,
+        filters,
+        select_keys="CAST(data_completa AS date) AS data_completa",
+        group_keys="CAST(data_completa AS date)",
+        measures="SUM(valor_total_liquido) AS receita, SUM(margem_bruta) AS margem",
+        order_by="data_completa",
+        source=source,
+    )
+    daily["data_completa"] = pd.to_datetime(daily["data_completa"], errors="coerce")
+    return _coerce_numeric(daily, ["receita", "margem"])
+
+
+def fetch_revenue_by_state(connection: Any, filters: SalesFilters, *, source: str = VIEW_NAME) -> pd.DataFrame:
+    by_state = _fetch_grouped(
+        connection,
+        filters,
+        select_keys=f"COALESCE(estado, '{TEXT_NOT_INFORMED}') AS estado",
+        group_keys=f"COALESCE(estado, '{TEXT_NOT_INFORMED}')",
+        measures="SUM(valor_total_liquido) AS valor_total_liquido",
+        order_by="valor_total_liquido DESC",
+        source=source,
+    )
+    return _coerce_numeric(by_state, ["valor_total_liquido"])
+
+
+def fetch_top_products(
+    connection: Any,
+    filters: SalesFilters,
+    *,
+    top_n: int = DEFAULT_TOP_N,
+    source: str = VIEW_NAME,
+) -> pd.DataFrame:
+    top_products = _fetch_grouped(
+        connection,
+        filters,
+        select_keys=f"COALESCE(nome_produto, '{TEXT_NOT_INFORMED}') AS nome_produto",
+        group_keys=f"COALESCE(nome_produto, '{TEXT_NOT_INFORMED}')",
+        measures="SUM(valor_total_liquido) AS valor_total_liquido",
+        order_by="valor_total_liquido DESC",
+        top_n=top_n,
+        source=source,
+    )
+    return _coerce_numeric(top_products, ["valor_total_liquido"])
+
+
+def fetch_category_mix(connection: Any, filters: SalesFilters, *, source: str = VIEW_NAME) -> pd.DataFrame:
+    category_mix = _fetch_grouped(
+        connection,
+        filters,
+        select_keys=f"COALESCE(categoria, '{TEXT_NOT_INFORMED}') AS categoria",
+        group_keys=f"COALESCE(categoria, '{TEXT_NOT_INFORMED}')",
+        measures=(
+            "SUM(valor_total_liquido) AS receita, SUM(valor_total_bruto) AS bruto, "
+            "SUM(margem_bruta) AS margem, SUM(quantidade_vendida) AS itens, "
+            "SUM(valor_total_descontos) AS descontos"
+        ),
+        order_by="receita DESC",
+        source=source,
+    )
+    return _coerce_numeric(category_mix, ["receita", "bruto", "margem", "itens", "descontos"])
+
+
+def fetch_seller_ranking(connection: Any, filters: SalesFilters) -> pd.DataFrame:
+    seller_ranking = _fetch_grouped(
+        connection,
+        filters,
+        select_keys=(
+            f"COALESCE(nome_vendedor, '{SELLER_NOT_INFORMED}') AS nome_vendedor, "
+            f"COALESCE(nome_equipe, '{TEAM_NOT_INFORMED}') AS nome_equipe"
+        ),
+        group_keys=(
+            f"COALESCE(nome_vendedor, '{SELLER_NOT_INFORMED}'), "
+            f"COALESCE(nome_equipe, '{TEAM_NOT_INFORMED}')"
+        ),
+        measures=(
+            "SUM(valor_total_liquido) AS receita, SUM(margem_bruta) AS margem, "
+            "COUNT(DISTINCT numero_pedido) AS pedidos, SUM(quantidade_vendida) AS itens"
+        ),
+        order_by="receita DESC",
+    )
+    return _coerce_numeric(seller_ranking, ["receita", "margem", "pedidos", "itens"])
+
+
+def fetch_sales_aggregates(
+    connection: Any,
+    filters: SalesFilters,
+    *,
+    top_n: int = DEFAULT_TOP_N,
+) -> SalesAggregates:
+    totals, updated_at = fetch_sales_totals(connection, filters)
+    if totals["linhas"] <= 0:
+        return _empty_aggregates()
+    source = AGGREGATE_VIEW_NAME if aggregate_view_available(connection) else VIEW_NAME
+    return SalesAggregates(
+        totals=totals,
+        updated_at=updated_at,
+        daily=fetch_daily_revenue(connection, filters, source=source),
+        by_state=fetch_revenue_by_state(connection, filters, source=source),
+        top_products=fetch_top_products(connection, filters, top_n=top_n, source=source),
+        category_mix=fetch_category_mix(connection, filters, source=source),
+        seller_ranking=fetch_seller_ranking(connection, filters),
+    )
+
+
+def fetch_sales_detail_page(
+    connection: Any,
+    filters: SalesFilters,
+    *,
+    page: int,
+    page_size: int = DETAIL_PAGE_SIZE,
+) -> pd.DataFrame:
+    where, params = filters.sql_where()
+    offset = max(page - 1, 0) * page_size
+    df = _read_sql(
+        connection,
+        f"""
+        SELECT
+            CAST(data_completa AS date) AS data_completa,
+            estado,
+            regiao_pais,
+            categoria,
+            subcategoria,
+            nome_produto,
+            COALESCE(nome_vendedor, '{SELLER_NOT_INFORMED}') AS nome_vendedor,
+            COALESCE(nome_equipe, '{TEAM_NOT_INFORMED}') AS nome_equipe,
+            numero_pedido,
+            quantidade_vendida,
+            valor_total_bruto,
+            valor_total_descontos,
+            valor_total_liquido,
+            margem_bruta,
+            valor_comissao
+        FROM {VIEW_NAME}
+        {where}
+        ORDER BY data_completa DESC, venda_id DESC
+        OFFSET ? ROWS FETCH NEXT ? ROWS ONLY;
+        """,
+        [*params, offset, page_size],
+    )
+    df["data_completa"] = pd.to_datetime(df["data_completa"], errors="coerce")
+    return df
+
+
+def aggregate_sales_frame(df: pd.DataFrame, *, top_n: int = DEFAULT_TOP_N) -> SalesAggregates:
+    """Calcula em pandas as mesmas grades de `fetch_sales_aggregates`.
+
+    Espera o frame ja normalizado e filtrado (modo snapshot).
+    """
+
+    if df.empty:
+        return _empty_aggregates()
+
+    pedidos_col = "numero_pedido" if "numero_pedido" in df.columns else "venda_original_id"
+    totals = {
+        "receita": _to_float(df["valor_total_liquido"].sum()),
+        "margem": _to_float(df["margem_bruta"].sum()),
+        "itens": _to_float(df["quantidade_vendida"].sum()),
+        "qtd_devolvida": _to_float(df["quantidade_devolvida"].sum()),
+        "descontos": _to_float(df["valor_total_descontos"].sum()),
+        "bruto": _to_float(df["valor_total_bruto"].sum()),
+        "comissao": _to_float(df["valor_comissao"].sum()),
+        "pedidos": float(df[pedidos_col].nunique()) if pedidos_col in df.columns else 0.0,
+        "linhas": float(len(df)),
+    }
+    updated_at = df["data_atualizacao"].max() if "data_atualizacao" in df.columns else None
+
+    daily = (
+        df.groupby(df["data_completa"].dt.normalize())
+        .agg(receita=("valor_total_liquido", "sum"), margem=("margem_bruta", "sum"))
+        .reset_index()
+        .sort_values("data_completa")
+    )
+
+    def _revenue_by(column: str) -> pd.DataFrame:
+        return (
+            df.groupby(column, as_index=False)["valor_total_liquido"]
+            .sum()
+            .sort_values("valor_total_liquido", ascending=False)
+        )
+
+    category_mix = (
+        df.groupby("categoria", as_index=False)
+        .agg(
+            receita=("valor_total_liquido", "sum"),
+            bruto=("valor_total_bruto", "sum"),
+            margem=("margem_bruta", "sum"),
+            itens=("quantidade_vendida", "sum"),
+            descontos=("valor_total_descontos", "sum"),
+        )
+        .sort_values("receita", ascending=False)
+    )
+    seller_ranking = (
+        df.groupby(["nome_vendedor", "nome_equipe"], as_index=False)
+        .agg(
+            receita=("valor_total_liquido", "sum"),
+            margem=("margem_bruta", "sum"),
+            pedidos=(pedidos_col, "nunique"),
+            itens=("quantidade_vendida", "sum"),
+        )
+        .sort_values("receita", ascending=False)
+    )
+
+    return SalesAggregates(
+        totals=totals,
+        updated_at=updated_at,
+        daily=daily.reset_index(drop=True),
+        by_state=_revenue_by("estado").reset_index(drop=True),
+        top_products=_revenue_by("nome_produto").head(top_n).reset_index(drop=True),
+        category_mix=category_mix.reset_index(drop=True),
+        seller_ranking=seller_ranking.reset_index(drop=True),
+    )
+
+
+def frame_detail_page(df: pd.DataFrame, *, page: int, page_size: int = DETAIL_PAGE_SIZE) -> pd.DataFrame:
+    columns = [column for column in DETAIL_COLUMNS if column in df.columns]
+    ordered = df[columns].sort_values("data_completa", ascending=False, kind="stable")
+    offset = max(page - 1, 0) * page_size
+    return ordered.iloc[offset : offset + page_size].reset_index(drop=True)
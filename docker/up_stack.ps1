@@ -126,6 +126,12 @@ try {
     if (-not $envMap.ContainsKey("ALERT_SLA_NO_RUN_HOURS")) {
         $envMap["ALERT_SLA_NO_RUN_HOURS"] = "24"
     }
+    if (-not $envMap.ContainsKey("ALERT_SLA_FRESHNESS_P95_SECONDS")) {
+        $envMap["ALERT_SLA_FRESHNESS_P95_SECONDS"] = "3600"
+    }
+    if (-not $envMap.ContainsKey("ALERT_SLA_FRESHNESS_MIN_ROWS")) {
+        $envMap["ALERT_SLA_FRESHNESS_MIN_ROWS"] = "100"
+    }
     if (-not $envMap.ContainsKey("ALERT_FAIL_RATE_THRESHOLD")) {
         $envMap["ALERT_FAIL_RATE_THRESHOLD"] = "0.30"
     }
@@ -170,6 +176,8 @@ try {
         "ALERT_COOLDOWN_MINUTES=$($envMap["ALERT_COOLDOWN_MINUTES"])",
         "ALERT_SLA_WATERMARK_DELAY_MINUTES=$($envMap["ALERT_SLA_WATERMARK_DELAY_MINUTES"])",
         "ALERT_SLA_NO_RUN_HOURS=$($envMap["ALERT_SLA_NO_RUN_HOURS"])",
+        "ALERT_SLA_FRESHNESS_P95_SECONDS=$($envMap["ALERT_SLA_FRESHNESS_P95_SECONDS"])",
+        "ALERT_SLA_FRESHNESS_MIN_ROWS=$($envMap["ALERT_SLA_FRESHNESS_MIN_ROWS"])",
         "ALERT_FAIL_RATE_THRESHOLD=$($envMap["ALERT_FAIL_RATE_THRESHOLD"])",
         "ALERT_FAIL_RATE_MIN_RUNS=$($envMap["ALERT_FAIL_RATE_MIN_RUNS"])",
         "ALERT_TIMEZONE=$($envMap["ALERT_TIMEZONE"])"
@@ -0,0 +1,434 @@
+from __future__ import annotations
+
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, Callable, Iterable
+
+from columnar import TRANSFORM_MODE_ROW
+from db import execute, query_all, query_one
+from key_cache import KEY_CACHE
+from loader import LOAD_MODE_MERGE
+from pipeline import CountingIterator, select_transform
+from sales_aggregate import SalesAggregateTargets, upsert_with_sales_aggregate
+
+
+BACKFILL_STATUS_RUNNING = "running"
+BACKFILL_STATUS_FAILED = "failed"
+BACKFILL_STATUS_SUCCESS = "success"
+
+PARTITION_STATUS_PENDING = "pending"
+PARTITION_STATUS_RUNNING = "running"
+PARTITION_STATUS_FAILED = "failed"
+PARTITION_STATUS_SUCCESS = "success"
+
+
+@dataclass(frozen=True)
+class BackfillPartition:
+    """Faixa `(id_from, id_to]` de ids naturais carregada por um worker.
+
+    - `last_id`: ultimo id ja gravado no DW (ponto de retomada);
+    - `max_source_updated_at`/`max_source_id`: maior watermark visto na
+      particao, usado para o watermark global ao final do backfill;
+    - contadores acumulados entre execucoes (retomadas incluidas).
+    """
+
+    partition_number: int
+    id_from: int
+    id_to: int
+    last_id: int
+    status: str = PARTITION_STATUS_PENDING
+    max_source_updated_at: datetime | None = None
+    max_source_id: int | None = None
+    extracted_count: int = 0
+    upserted_count: int = 0
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status == PARTITION_STATUS_SUCCESS
+
+
+@dataclass(frozen=True)
+class BackfillPlan:
+    backfill_id: int
+    entity_name: str
+    cutoff_updated_at: datetime
+    partitions: tuple[BackfillPartition, ...]
+    resumed: bool
+
+
+@dataclass(frozen=True)
+class PartitionResult:
+    """Particao ao fim desta execucao.
+
+    `unchanged_count` conta so os lotes desta execucao (linhas com hash igual
+    ao gravado); os contadores da particao acumulam entre retomadas.
+    """
+
+    partition: BackfillPartition
+    error_message: str | None = None
+    unchanged_count: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error_message is None
+
+
+def supports_backfill(entity: Any) -> bool:
+    return callable(getattr(entity, "extract_backfill_batch", None)) and callable(
+        getattr(entity, "get_backfill_id_bounds", None)
+    )
+
+
+def split_id_range(id_min: int, id_max: int, partition_count: int) -> list[tuple[int, int]]:
+    """Divide `[id_min, id_max]` em faixas contiguas `(id_from, id_to]` de largura parecida."""
+    span = int(id_max) - int(id_min) + 1
+    if span <= 0:
+        raise ValueError(f"Faixa de ids invalida: {id_min}..{id_max}.")
+    count = max(1, min(int(partition_count), span))
+    ranges: list[tuple[int, int]] = []
+    start = int(id_min) - 1
+    for number in range(1, count + 1):
+        end = int(id_min) - 1 + (span * number) // count
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def global_watermark(partitions: Iterable[BackfillPartition]) -> tuple[datetime, int] | None:
+    """Maior `(source_updated_at, source_id)` entre as particoes (None se nada foi lido)."""
+    marks = [
+        (partition.max_source_updated_at, int(partition.max_source_id))
+        for partition in partitions
+        if partition.max_source_updated_at is not None and partition.max_source_id is not None
+    ]
+    return max(marks) if marks else None
+
+
+def advance_partition(
+    partition: BackfillPartition,
+    rows: list[dict[str, Any]],
+    *,
+    extracted_count: int,
+    upserted_count: int,
+) -> BackfillPartition:
+    """Aplica um lote gravado ao progresso da particao."""
+    batch_mark = max((row["source_updated_at"], int(row["source_id"])) for row in rows)
+    if partition.max_source_updated_at is not None and partition.max_source_id is not None:
+        batch_mark = max(batch_mark, (partition.max_source_updated_at, int(partition.max_source_id)))
+    return replace(
+        partition,
+        last_id=max(partition.last_id, max(int(row["source_id"]) for row in rows)),
+        max_source_updated_at=batch_mark[0],
+        max_source_id=batch_mark[1],
+        extracted_count=partition.extracted_count + int(extracted_count),
+        upserted_count=partition.upserted_count + int(upserted_count),
+    )
+
+
+def run_partition(
+    entity: Any,
+    oltp_connection: Any,
+    dw_connection: Any,
+    partition: BackfillPartition,
+    *,
+    backfill_id: int,
+    cutoff_updated_at: datetime,
+    batch_size: int,
+    load_mode: str = LOAD_MODE_MERGE,
+    transform_mode: str = TRANSFORM_MODE_ROW,
+    save_progress: Callable[..., None] | None = None,
+    sales_aggregate: SalesAggregateTargets | None = None,
+) -> PartitionResult:
+    """Carrega uma particao a partir de `last_id`, lote a lote.
+
+    Upsert e progresso da particao sao confirmados no mesmo commit: apos uma
+    queda, a retomada parte exatamente do ultimo lote gravado. Erros nao sao
+    relancados; a particao volta como `failed` para as demais seguirem.
+    Com `sales_aggregate`, o delta do lote entra em `fact.AGG_VENDAS_DIARIA`
+    (e no sketch de pedidos, se existir) no mesmo commit.
+    """
+    save = save_progress or save_partition_progress
+    entity_name = getattr(entity, "ENTITY_NAME", "entity")
+    transform = select_transform(entity, transform_mode)
+    safe_batch_size = max(1, int(batch_size))
+
+    current = replace(partition, status=PARTITION_STATUS_RUNNING)
+    unchanged_count = 0
+    try:
+        save(dw_connection, backfill_id=backfill_id, partition=current)
+        dw_connection.commit()
+
+        while current.last_id < current.id_to:
+            raw_rows = CountingIterator(
+                entity.extract_backfill_batch(
+                    oltp_connection,
+                    id_from=current.last_id,
+                    id_to=current.id_to,
+                    cutoff_updated_at=cutoff_updated_at,
+                    batch_size=safe_batch_size,
+                )
+            )
+            try:
+                rows, _ = transform(raw_rows)
+            finally:
+                raw_rows.close()
+
+            if raw_rows.count == 0:
+                break
+
+            if sales_aggregate is not None:
+                upserted_count = upsert_with_sales_aggregate(
+                    entity, dw_connection, rows, load_mode=load_mode, targets=sales_aggregate
+                )
+            else:
+                upserted_count = entity.upsert_rows(dw_connection, rows, load_mode=load_mode)
+            batch_unchanged = len(rows) - upserted_count
+            current = advance_partition(
+                current,
+                rows,
+                extracted_count=raw_rows.count,
+                upserted_count=upserted_count,
+            )
+            save(dw_connection, backfill_id=backfill_id, partition=current)
+            dw_connection.commit()
+            unchanged_count += batch_unchanged
+            KEY_CACHE.notify_loaded(entity_name)
+
+            if raw_rows.count < safe_batch_size:
+                break
+
+        current = replace(current, status=PARTITION_STATUS_SUCCESS)
+        save(dw_connection, backfill_id=backfill_id, partition=current)
+        dw_connection.commit()
+        return PartitionResult(partition=current, unchanged_count=unchanged_count)
+
+    except Exception as exc:  # noqa: BLE001
+        dw_connection.rollback()
+        error_text = f"{type(exc).__name__}: {exc}"
+        print(f"[{entity_name}] particao {partition.partition_number} falhou: {error_text}")
+        traceback.print_exc()
+
+        # `current` so contem lotes ja confirmados; o lote da falha foi revertido.
+        failed = replace(current, status=PARTITION_STATUS_FAILED)
+        try:
+            save(dw_connection, backfill_id=backfill_id, partition=failed, error_message=error_text[:4000])
+            dw_connection.commit()
+        except Exception:  # noqa: BLE001
+            dw_connection.rollback()
+        return PartitionResult(partition=failed, error_message=error_text, unchanged_count=unchanged_count)
+
+
+def run_partitions(
+    partitions: Iterable[BackfillPartition],
+    *,
+    workers: int,
+    run_one: Callable[[BackfillPartition], PartitionResult],
+) -> list[PartitionResult]:
+    """Executa as particoes nao concluidas em paralelo; as concluidas sao mantidas.
+
+    Retorna um resultado por particao, na ordem de `partition_number`.
+    """
+    all_partitions = sorted(partitions, key=lambda partition: partition.partition_number)
+    pending = [partition for partition in all_partitions if not partition.is_finished]
+    results = {
+        partition.partition_number: PartitionResult(partition=partition)
+        for partition in all_partitions
+        if partition.is_finished
+    }
+
+    if pending:
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(int(workers), len(pending))),
+            thread_name_prefix="etl-backfill",
+        ) as executor:
+            for result in executor.map(run_one, pending):
+                results[result.partition.partition_number] = result
+
+    return [results[partition.partition_number] for partition in all_partitions]
+
+
+def prepare_backfill(
+    dw_connection: Any,
+    oltp_connection: Any,
+    entity: Any,
+    *,
+    entity_name: str,
+    partition_count: int,
+    cutoff_updated_at: datetime,
+    run_id: int,
+) -> BackfillPlan | None:
+    """Retoma o backfill aberto da entidade ou cria um novo (None se a origem estiver vazia).
+
+    Na retomada valem o cutoff e as faixas originais: o watermark global so
+    e correto se todas as particoes usarem o mesmo corte.
+    """
+    open_backfill = find_open_backfill(dw_connection, entity_name)
+    if open_backfill is not None:
+        backfill_id = int(open_backfill["backfill_id"])
+        execute(
+            dw_connection,
+            """
+            UPDATE ctl.etl_backfill
+               SET status = 'running',
+                   last_run_id = ?,
+                   updated_at = SYSUTCDATETIME()
+             WHERE backfill_id = ?;
+            """,
+            (int(run_id), backfill_id),
+        )
+        return BackfillPlan(
+            backfill_id=backfill_id,
+            entity_name=entity_name,
+            cutoff_updated_at=open_backfill["cutoff_updated_at"],
+            partitions=tuple(load_partitions(dw_connection, backfill_id)),
+            resumed=True,
+        )
+
+    bounds = entity.get_backfill_id_bounds(oltp_connection)
+    if bounds is None:
+        return None
+    id_min, id_max = bounds
+    ranges = split_id_range(id_min, id_max, partition_count)
+
+    row = query_one(
+        dw_connection,
+        """
+        INSERT INTO ctl.etl_backfill
+        (
+            entity_name,
+            status,
+            cutoff_updated_at,
+            id_min,
+            id_max,
+            partition_count,
+            started_run_id,
+            last_run_id
+        )
+        OUTPUT INSERTED.backfill_id
+        VALUES (?, 'running', ?, ?, ?, ?, ?, ?);
+        """,
+        (entity_name, cutoff_updated_at, int(id_min), int(id_max), len(ranges), int(run_id), int(run_id)),
+    )
+    if row is None:
+        raise RuntimeError("Nao foi possivel iniciar ctl.etl_backfill.")
+    backfill_id = int(row["backfill_id"])
+
+    partitions = [
+        BackfillPartition(partition_number=number, id_from=id_from, id_to=id_to, last_id=id_from)
+        for number, (id_from, id_to) in enumerate(ranges, start=1)
+    ]
+    for partition in partitions:
+        execute(
+            dw_connection,
+            """
+            INSERT INTO ctl.etl_backfill_partition
+                (backfill_id, partition_number, id_from, id_to, status, last_id)
+            VALUES (?, ?, ?, ?, 'pending', ?);
+            """,
+            (backfill_id, partition.partition_number, partition.id_from, partition.id_to, partition.last_id),
+        )
+
+    return BackfillPlan(
+        backfill_id=backfill_id,
+        entity_name=entity_name,
+        cutoff_updated_at=cutoff_updated_at,
+        partitions=tuple(partitions),
+        resumed=False,
+    )
+
+
+def find_open_backfill(dw_connection: Any, entity_name: str) -> dict[str, Any] | None:
+    sql = """
+    SELECT TOP (1)
+        backfill_id,
+        cutoff_updated_at,
+        partition_count
+    FROM ctl.etl_backfill
+    WHERE entity_name = ?
+      AND status <> 'success'
+    ORDER BY backfill_id DESC;
+    """
+    return query_one(dw_connection, sql, (entity_name,))
+
+
+def load_partitions(dw_connection: Any, backfill_id: int) -> list[BackfillPartition]:
+    sql = """
+    SELECT
+        partition_number,
+        id_from,
+        id_to,
+        last_id,
+        status,
+        max_source_updated_at,
+        max_source_id,
+        extracted_count,
+        upserted_count
+    FROM ctl.etl_backfill_partition
+    WHERE backfill_id = ?
+    ORDER BY partition_number;
+    """
+    return [
+        BackfillPartition(
+            partition_number=int(row["partition_number"]),
+            id_from=int(row["id_from"]),
+            id_to=int(row["id_to"]),
+            last_id=int(row["last_id"]),
+            status=str(row["status"]),
+            max_source_updated_at=row["max_source_updated_at"],
+            max_source_id=None if row["max_source_id"] is None else int(row["max_source_id"]),
+            extracted_count=int(row["extracted_count"]),
+            upserted_count=int(row["upserted_count"]),
+        )
+        for row in query_all(dw_connection, sql, (int(backfill_id),))
+    ]
+
+
+def save_partition_progress(
+    dw_connection: Any,
+    *,
+    backfill_id: int,
+    partition: BackfillPartition,
+    error_message: str | None = None,
+) -> None:
+    sql = """
+    UPDATE ctl.etl_backfill_partition
+       SET status = ?,
+           last_id = ?,
+           max_source_updated_at = ?,
+           max_source_id = ?,
+           extracted_count = ?,
+           upserted_count = ?,
+           error_message = ?,
+           updated_at = SYSUTCDATETIME()
+     WHERE backfill_id = ?
+       AND partition_number = ?;
+    """
+    execute(
+        dw_connection,
+        sql,
+        (
+            partition.status,
+            int(partition.last_id),
+            partition.max_source_updated_at,
+            partition.max_source_id,
+            int(partition.extracted_count),
+            int(partition.upserted_count),
+            error_message,
+            int(backfill_id),
+            int(partition.partition_number),
+        ),
+    )
+
+
+def finish_backfill(dw_connection: Any, *, backfill_id: int, status: str) -> None:
+    sql = """
+    UPDATE ctl.etl_backfill
+       SET status = ?,
+           finished_at = CASE WHEN ? = 'success' THEN SYSUTCDATETIME() ELSE finished_at END,
+           updated_at = SYSUTCDATETIME()
+     WHERE backfill_id = ?;
+    """
+    execute(dw_connection, sql, (status, status, int(backfill_id)))
+
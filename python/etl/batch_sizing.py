@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+
+
+# Mesmos limites do CK_ctl_etl_control_batch_size.
+BATCH_SIZE_MIN = 1
+BATCH_SIZE_MAX = 100_000
+
+# Fracao do `command_timeout_seconds` a partir da qual um comando do lote
+# (extracao ou upsert) e considerado proximo demais do timeout.
+TIMEOUT_BACKOFF_FRACTION = 0.5
+
+# A projecao do tamanho mira abaixo do limite de risco: a latencia varia
+# entre lotes e cruzar o limite custa um recuo pela metade.
+_PROJECTION_HEADROOM = 0.8
+
+_MAX_GROWTH_FACTOR = 2.0
+_MAX_SHRINK_FACTOR = 0.5
+# Peso da medicao mais recente na media movel de segundos por linha.
+_SMOOTHING = 0.5
+
+
+@dataclass(frozen=True)
+class BatchTiming:
+    """Tempos de um lote, por etapa.
+
+    `batch_size` e o tamanho solicitado na extracao; `row_count` o que veio.
+    """
+
+    batch_size: int
+    row_count: int
+    extract_seconds: float
+    transform_seconds: float
+    upsert_seconds: float
+
+    @property
+    def total_seconds(self) -> float:
+        return self.extract_seconds + self.transform_seconds + self.upsert_seconds
+
+    @property
+    def slowest_command_seconds(self) -> float:
+        # O timeout vale por comando SQL: extracao (OLTP) e upsert (DW).
+        return max(self.extract_seconds, self.upsert_seconds)
+
+
+class AdaptiveBatchSizer:
+    """Ajusta o tamanho do proximo lote para aproximar `target_seconds` por lote.
+
+    - mede segundos por linha (media movel) apenas em lotes cheios; lotes
+      parciais do fim dos dados tem custo fixo de consulta desproporcional;
+    - cresce ou encolhe no maximo 2x por lote, dentro de `[min_size, max_size]`;
+    - limita o tamanho para que extracao/upsert fiquem abaixo de
+      `TIMEOUT_BACKOFF_FRACTION` do timeout; se um lote passar desse limite,
+      o proximo cai pela metade e o teto passa a ficar abaixo do tamanho
+      arriscado ate o fim do run.
+
+    Seguro para uso entre a thread produtora (`next_size`) e a consumidora
+    (`observe`) do modo pipelined.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_size: int,
+        min_size: int,
+        max_size: int,
+        target_seconds: float,
+        command_timeout_seconds: float,
+    ):
+        low = max(BATCH_SIZE_MIN, int(min_size))
+        high = min(BATCH_SIZE_MAX, int(max_size))
+        if low > high:
+            raise ValueError(f"Limites de batch invalidos: min={min_size}, max={max_size}.")
+        if target_seconds <= 0:
+            raise ValueError("target_seconds deve ser > 0.")
+
+        self._min_size = low
+        self._max_size = high
+        self._ceiling = high
+        self._target_seconds = float(target_seconds)
+        self._timeout_seconds = float(command_timeout_seconds)
+        self._size = self._clamp(int(initial_size))
+        self._seconds_per_row: float | None = None
+        self._observed_batches = 0
+        self._backoffs = 0
+        self._lock = threading.Lock()
+
+    @property
+    def min_size(self) -> int:
+        return self._min_size
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    @property
+    def current_size(self) -> int:
+        return self._size
+
+    @property
+    def observed_batches(self) -> int:
+        """Lotes cheios usados na media (o tamanho so e representativo se > 0)."""
+        return self._observed_batches
+
+    @property
+    def backoffs(self) -> int:
+        return self._backoffs
+
+    def next_size(self) -> int:
+        with self._lock:
+            return self._size
+
+    def observe(self, timing: BatchTiming) -> int:
+        """Registra os tempos de um lote e devolve o tamanho do proximo."""
+        with self._lock:
+            if timing.row_count <= 0:
+                return self._size
+
+            risk_limit = self._timeout_seconds * TIMEOUT_BACKOFF_FRACTION
+            if self._timeout_seconds > 0 and timing.slowest_command_seconds >= risk_limit:
+                self._backoffs += 1
+                self._ceiling = max(self._min_size, min(self._ceiling, timing.batch_size - 1))
+                self._size = self._clamp(timing.batch_size // 2)
+                return self._size
+
+            if timing.row_count < timing.batch_size:
+                return self._size
+
+            seconds_per_row = timing.total_seconds / timing.row_count
+            if self._seconds_per_row is None:
+                self._seconds_per_row = seconds_per_row
+            else:
+                self._seconds_per_row = (
+                    _SMOOTHING * seconds_per_row + (1.0 - _SMOOTHING) * self._seconds_per_row
+                )
+            self._observed_batches += 1
+
+            if self._seconds_per_row <= 0:
+                wanted = timing.batch_size * _MAX_GROWTH_FACTOR
+            else:
+                wanted = self._target_seconds / self._seconds_per_row
+
+            if self._timeout_seconds > 0 and timing.slowest_command_seconds > 0:
+                # Projecao linear do comando mais lento ate o limite de risco.
+                command_seconds_per_row = timing.slowest_command_seconds / timing.row_count
+                wanted = min(wanted, risk_limit * _PROJECTION_HEADROOM / command_seconds_per_row)
+
+            wanted = min(wanted, timing.batch_size * _MAX_GROWTH_FACTOR)
+            wanted = max(wanted, timing.batch_size * _MAX_SHRINK_FACTOR)
+            self._size = self._clamp(int(wanted))
+            return self._size
+
+    def _clamp(self, size: int) -> int:
+        return max(self._min_size, min(self._ceiling, size))
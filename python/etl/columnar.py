@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import operator
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import repeat
+from typing import Any, Callable, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from db import Row
+
+
+TRANSFORM_MODE_ROW = "row"
+TRANSFORM_MODE_COLUMNAR = "columnar"
+TRANSFORM_MODES = (TRANSFORM_MODE_ROW, TRANSFORM_MODE_COLUMNAR)
+
+# Acima disso `float * 100` pode errar mais que meio centavo; esses valores
+# seguem pelo caminho linha a linha (Decimal) para manter paridade exata.
+_MAX_FAST_ABS_VALUE = 1e13
+_INTEGER_DTYPES = {"integer", "empty"}
+
+# Maior numerador seguro para `cents * 10000` em int64.
+MAX_SAFE_RATIO_NUMERATOR = (2**63 - 1) // 10_000
+
+
+@dataclass(frozen=True)
+class MoneyColumn:
+    """Coluna monetaria em centavos int64.
+
+    - `cents`: valor arredondado ROUND_HALF_UP (ou o default) em centavos;
+    - `is_null`: posicoes cujo resultado e `None`;
+    - `needs_fallback`: posicoes que o caminho vetorizado nao garante exatas.
+    """
+
+    cents: np.ndarray
+    is_null: np.ndarray
+    needs_fallback: np.ndarray
+
+
+@dataclass(frozen=True)
+class IntColumn:
+    values: np.ndarray
+    is_null: np.ndarray
+    needs_fallback: np.ndarray
+
+
+def normalize_transform_mode(value: Any) -> str:
+    text = str(value or "").strip().lower()
+    if text in TRANSFORM_MODES:
+        return text
+    return TRANSFORM_MODE_ROW
+
+
+def rows_frame(raw_rows: Iterable[Any]) -> tuple[list[Any], pd.DataFrame]:
+    """Materializa o lote em DataFrame de objetos (sem inferencia de tipos).
+
+    `dtype=object` preserva `Decimal`, `date` e `datetime` exatamente como
+    vieram do driver; a conversao numerica fica a cargo de cada coluna.
+    """
+    rows = list(raw_rows)
+    if not rows:
+        return rows, pd.DataFrame()
+    first = rows[0]
+    if isinstance(first, Row):
+        columns = list(first.keys())
+        return rows, pd.DataFrame([row.values() for row in rows], columns=columns, dtype=object)
+    columns = list(first.keys())
+    return rows, pd.DataFrame([[row.get(col) for col in columns] for row in rows], columns=columns, dtype=object)
+
+
+def column_values(frame: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in frame.columns:
+        return np.full(len(frame), None, dtype=object)
+    return frame[column].to_numpy(dtype=object)
+
+
+def not_none_mask(frame: pd.DataFrame, column: str) -> np.ndarray:
+    return ~_none_mask(column_values(frame, column))
+
+
+def money_column(
+    frame: pd.DataFrame,
+    column: str,
+    *,
+    default: Decimal | None,
+    min_value: Decimal,
+    max_value: Decimal | None = None,
+) -> MoneyColumn:
+    """Equivalente vetorizado de `_to_decimal` das entidades de fato.
+
+    O caminho rapido aceita apenas valores cujo float e exatamente o double
+    mais proximo de um valor com duas casas (caso de DECIMAL(15,2) do OLTP);
+    nesses casos comparar e arredondar em centavos equivale ao `Decimal`.
+    Os demais (mais casas, texto invalido, infinito, magnitude alta) ficam
+    marcados em `needs_fallback`.
+    """
+    raw = column_values(frame, column)
+    is_none = _none_mask(raw)
+    numbers = _to_float_array(raw)
+
+    with np.errstate(invalid="ignore"):
+        rounded = np.rint(numbers * 100.0)
+        exact = (
+            np.isfinite(numbers)
+            & (np.abs(numbers) < _MAX_FAST_ABS_VALUE)
+            & (numbers == rounded / 100.0)
+        )
+    cents = np.where(exact, rounded, 0).astype(np.int64)
+    needs_fallback = ~is_none & ~exact
+
+    invalid = cents < _to_cents(min_value)
+    if max_value is not None:
+        invalid = invalid | (cents > _to_cents(max_value))
+
+    use_default = is_none | invalid
+    if default is None:
+        is_null = use_default
+        result = np.where(use_default, 0, cents)
+    else:
+        is_null = np.zeros(len(raw), dtype=bool)
+        result = np.where(use_default, _to_cents(default), cents)
+    return MoneyColumn(cents=result.astype(np.int64), is_null=is_null, needs_fallback=needs_fallback)
+
+
+def int_column(
+    frame: pd.DataFrame,
+    column: str,
+    *,
+    default: int | None,
+    min_value: int | None,
+    clamp_to_min: bool = False,
+) -> IntColumn:
+    """Equivalente vetorizado de `_to_int`.
+
+    `clamp_to_min=True` reproduz a variante da `fact_vendas`, que devolve o
+    minimo (e nao o default) quando o valor fica abaixo dele.
+    """
+    raw = column_values(frame, column)
+    is_none = _none_mask(raw)
+    series = pd.Series(raw, dtype=object)
+
+    if pd.api.types.infer_dtype(series, skipna=True) not in _INTEGER_DTYPES:
+        # Tipos mistos (str/float/Decimal): `int(value)` tem regras proprias.
+        values = np.zeros(len(raw), dtype=np.int64)
+        return IntColumn(values=values, is_null=is_none.copy(), needs_fallback=~is_none)
+
+    values = np.where(is_none, 0, raw).astype(np.int64)
+    is_null = is_none.copy()
+    if default is not None:
+        values = np.where(is_none, default, values)
+        is_null[:] = False
+
+    if min_value is not None:
+        below = ~is_none & (values < min_value)
+        if clamp_to_min and default is not None:
+            values = np.where(below, min_value, values)
+        elif default is None:
+            is_null = is_null | below
+        else:
+            values = np.where(below, default, values)
+
+    return IntColumn(values=values, is_null=is_null, needs_fallback=np.zeros(len(raw), dtype=bool))
+
+
+def bit_column(frame: pd.DataFrame, column: str) -> np.ndarray:
+    """Equivalente vetorizado de `_to_bit` (0/1 int64)."""
+    raw = pd.Series(column_values(frame, column), dtype=object)
+    return raw.isin([True, 1, "1", "true", "TRUE", "True"]).to_numpy().astype(np.int64)
+
+
+def div_round_half_up(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Divisao inteira com ROUND_HALF_UP para numerador >= 0 e denominador > 0."""
+    safe_denominator = np.where(denominator > 0, denominator, 1)
+    quotient, remainder = np.divmod(numerator, safe_denominator)
+    return quotient + (2 * remainder >= safe_denominator)
+
+
+def cents_to_decimals(cents: np.ndarray, is_null: np.ndarray | None = None) -> list[Decimal | None]:
+    """Converte centavos para `Decimal` com duas casas (mesmo expoente do quantize).
+
+    `Decimal` e imutavel: cada valor distinto do lote (zeros, precos de
+    tabela) e construido uma unica vez e reaproveitado.
+    """
+    unique_cents, positions = np.unique(cents, return_inverse=True)
+    decimals = [Decimal(value).scaleb(-2) for value in unique_cents.tolist()]
+    values: list[Decimal | None] = list(map(decimals.__getitem__, positions.ravel().tolist()))
+    if is_null is None:
+        return values
+    return [None if null else value for value, null in zip(values, is_null.tolist())]
+
+
+def ints_to_list(values: np.ndarray, is_null: np.ndarray | None = None) -> list[int | None]:
+    items = values.tolist()
+    if is_null is None:
+        return items
+    return [None if null else value for value, null in zip(items, is_null.tolist())]
+
+
+def build_records(columns: dict[str, Sequence[Any]]) -> list[dict[str, Any]]:
+    return list(map(dict, map(zip, repeat(list(columns)), zip(*columns.values()))))
+
+
+def merge_fallback_rows(
+    rows: list[Any],
+    records: list[dict[str, Any]],
+    needs_fallback: np.ndarray,
+    row_transform: Callable[[Iterable[Any]], tuple[list[dict[str, Any]], int]],
+) -> list[dict[str, Any]]:
+    """Recalcula pelo caminho linha a linha as posicoes marcadas em `needs_fallback`."""
+    positions = np.flatnonzero(needs_fallback).tolist()
+    if not positions:
+        return records
+    recomputed, _ = row_transform(rows[position] for position in positions)
+    for position, record in zip(positions, recomputed):
+        records[position] = record
+    return records
+
+
+def _to_cents(value: Decimal) -> int:
+    return int(value.scaleb(2))
+
+
+def _none_mask(raw: np.ndarray) -> np.ndarray:
+    # Comparacao por identidade: `Decimal == None` passa pelo ABC `numbers.Number`.
+    return np.fromiter(map(operator.is_, raw, repeat(None)), dtype=bool, count=len(raw))
+
+
+def _to_float_array(raw: np.ndarray) -> np.ndarray:
+    # `float()` direto e bem mais rapido que `pd.to_numeric` para `Decimal`.
+    # Booleanos viram NaN (caminho linha a linha): `Decimal(str(True))` falha.
+    try:
+        return np.fromiter(
+            (np.nan if value is None or value is True or value is False else float(value) for value in raw),
+            dtype=np.float64,
+            count=len(raw),
+        )
+    except (TypeError, ValueError):
+        numbers = pd.to_numeric(pd.Series(raw, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+        is_bool = np.fromiter((isinstance(value, bool) for value in raw), dtype=bool, count=len(raw))
+        numbers[is_bool] = np.nan
+        return numbers
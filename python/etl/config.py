@@ -7,6 +7,8 @@ from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent
 SQL_DIR = BASE_DIR / "sql"
+# Landing zone do modo `--staging`: data/staging/<entidade>/<run_id>/ na raiz do repositorio.
+STAGING_DIR = BASE_DIR.parents[1] / "data" / "staging"
 
 
 @dataclass(frozen=True)
@@ -16,6 +18,13 @@ class ETLConfig:
     default_batch_size: int = 1000
     default_cutoff_minutes: int = 2
     command_timeout_seconds: int = 120
+    key_cache_path: str | None = None
+    adaptive_batch_min: int = 100
+    adaptive_batch_max: int = 50_000
+    target_batch_seconds: int = 10
+    checkpoint_every_batches: int = 1
+    daemon_poll_seconds: int = 30
+    staging_dir: str = str(STAGING_DIR)
 
     @classmethod
     def from_env(cls) -> "ETLConfig":
@@ -34,6 +43,13 @@ class ETLConfig:
             default_batch_size=_safe_int(os.getenv("ETL_DEFAULT_BATCH_SIZE"), 1000),
             default_cutoff_minutes=_safe_int(os.getenv("ETL_DEFAULT_CUTOFF_MINUTES"), 2),
             command_timeout_seconds=_safe_int(os.getenv("ETL_SQL_TIMEOUT_SECONDS"), 120),
+            key_cache_path=os.getenv("ETL_KEY_CACHE_PATH") or None,
+            adaptive_batch_min=_safe_int(os.getenv("ETL_ADAPTIVE_BATCH_MIN"), 100),
+            adaptive_batch_max=_safe_int(os.getenv("ETL_ADAPTIVE_BATCH_MAX"), 50_000),
+            target_batch_seconds=_safe_int(os.getenv("ETL_TARGET_BATCH_SECONDS"), 10),
+            checkpoint_every_batches=_safe_int(os.getenv("ETL_CHECKPOINT_EVERY_BATCHES"), 1),
+            daemon_poll_seconds=_safe_int(os.getenv("ETL_DAEMON_POLL_SECONDS"), 30),
+            staging_dir=os.getenv("ETL_STAGING_DIR") or str(STAGING_DIR),
         )
 
 
@@ -4,7 +4,17 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
 
-from db import execute, query_one, read_sql_file
+from columnar import TRANSFORM_MODE_ROW, normalize_transform_mode
+from db import execute, query_one
+from loader import LOAD_MODE_MERGE, normalize_load_mode
+from metrics import BatchMetrics
+from statements import STATEMENTS
+from watermark import (
+    WATERMARK_TYPE_UPDATED_AT,
+    normalize_watermark_type,
+    resolve_watermark_type,
+    supported_watermark_types,
+)
 
 
 @dataclass(frozen=True)
@@ -14,6 +24,15 @@ class EntityControl:
     watermark_id: int
     batch_size: int
     cutoff_minutes: int
+    load_mode: str = LOAD_MODE_MERGE
+    transform_mode: str = TRANSFORM_MODE_ROW
+    adaptive_batch_size: bool = False
+    batch_size_min: int | None = None
+    batch_size_max: int | None = None
+    target_batch_seconds: int | None = None
+    watermark_type: str = WATERMARK_TYPE_UPDATED_AT
+    watermark_version: int | None = None
+    poll_interval_seconds: int | None = None
 
 
 def start_run(
@@ -58,6 +77,32 @@ def finish_run(
     )
 
 
+def tally_entity_results(
+    entity_names: list[str],
+    results: dict[str, tuple[bool, str | None]],
+) -> tuple[int, int, list[str]]:
+    entities_succeeded = 0
+    entities_failed = 0
+    errors: list[str] = []
+    for entity_name in entity_names:
+        ok, error_message = results[entity_name]
+        if ok:
+            entities_succeeded += 1
+        else:
+            entities_failed += 1
+            if error_message:
+                errors.append(f"{entity_name}: {error_message}")
+    return entities_succeeded, entities_failed, errors
+
+
+def resolve_run_status(*, entities_succeeded: int, entities_failed: int) -> str:
+    if entities_failed == 0:
+        return "success"
+    if entities_succeeded > 0:
+        return "partial"
+    return "failed"
+
+
 def get_entity_control(dw_connection: Any, entity_name: str) -> EntityControl:
     sql = """
     SELECT
@@ -65,7 +110,16 @@ def get_entity_control(dw_connection: Any, entity_name: str) -> EntityControl:
         watermark_updated_at,
         watermark_id,
         batch_size,
-        cutoff_minutes
+        cutoff_minutes,
+        load_mode,
+        transform_mode,
+        adaptive_batch_size,
+        batch_size_min,
+        batch_size_max,
+        target_batch_seconds,
+        watermark_type,
+        watermark_version,
+        poll_interval_seconds
     FROM ctl.etl_control
     WHERE entity_name = ?
       AND is_active = 1;
@@ -82,7 +136,39 @@ def get_entity_control(dw_connection: Any, entity_name: str) -> EntityControl:
         watermark_id=int(row["watermark_id"]),
         batch_size=max(1, int(row["batch_size"])),
         cutoff_minutes=max(0, int(row["cutoff_minutes"])),
+        load_mode=normalize_load_mode(row.get("load_mode")),
+        transform_mode=normalize_transform_mode(row.get("transform_mode")),
+        adaptive_batch_size=bool(row.get("adaptive_batch_size")),
+        batch_size_min=_optional_int(row.get("batch_size_min")),
+        batch_size_max=_optional_int(row.get("batch_size_max")),
+        target_batch_seconds=_optional_int(row.get("target_batch_seconds")),
+        watermark_type=normalize_watermark_type(row.get("watermark_type")),
+        watermark_version=_optional_int(row.get("watermark_version")),
+        poll_interval_seconds=_optional_int(row.get("poll_interval_seconds")),
+    )
+
+
+def resolve_cutoff_minutes(
+    control: EntityControl,
+    cutoff_minutes_override: int | None,
+    default_cutoff_minutes: int,
+) -> int:
+    cutoff_minutes = (
+        cutoff_minutes_override
+        if cutoff_minutes_override is not None
+        else (control.cutoff_minutes if control.cutoff_minutes is not None else default_cutoff_minutes)
+    )
+    return max(0, int(cutoff_minutes))
+
+
+def resolve_entity_watermark_type(entity: Any, control: EntityControl, watermark_type_override: str | None) -> str:
+    watermark_type = normalize_watermark_type(
+        watermark_type_override if watermark_type_override is not None else control.watermark_type
     )
+    if watermark_type_override is not None and watermark_type not in supported_watermark_types(entity):
+        # `--watermark-type` com `--entity all`: vale so para as entidades com suporte.
+        watermark_type = control.watermark_type
+    return resolve_watermark_type(entity, watermark_type)
 
 
 def start_entity_run(
@@ -126,6 +212,11 @@ def finish_entity_run(
     watermark_to_updated_at: datetime | None,
     watermark_to_id: int | None,
     error_message: str | None,
+    key_cache_hits: int = 0,
+    key_cache_misses: int = 0,
+    key_cache_refreshes: int = 0,
+    checkpoint_count: int = 0,
+    unchanged_count: int = 0,
 ) -> None:
     sql = """
     UPDATE audit.etl_run_entity
@@ -137,6 +228,11 @@ def finish_entity_run(
            watermark_to_updated_at = ?,
            watermark_to_id = ?,
            error_message = ?,
+           key_cache_hits = ?,
+           key_cache_misses = ?,
+           key_cache_refreshes = ?,
+           checkpoint_count = ?,
+           unchanged_count = ?,
            updated_at = SYSUTCDATETIME()
      WHERE run_entity_id = ?;
     """
@@ -151,11 +247,106 @@ def finish_entity_run(
             watermark_to_updated_at,
             watermark_to_id,
             error_message,
+            int(key_cache_hits),
+            int(key_cache_misses),
+            int(key_cache_refreshes),
+            int(checkpoint_count),
+            int(unchanged_count),
             int(run_entity_id),
         ),
     )
 
 
+def insert_batch_metrics(
+    dw_connection: Any,
+    *,
+    run_entity_id: int,
+    metrics: list[BatchMetrics],
+) -> None:
+    """Grava os tempos por etapa de cada lote em `audit.etl_batch_metrics`."""
+    sql = """
+    INSERT INTO audit.etl_batch_metrics
+    (
+        run_entity_id,
+        batch_number,
+        batch_size,
+        extracted_count,
+        upserted_count,
+        extract_ms,
+        transform_ms,
+        upsert_ms,
+        commit_ms,
+        rows_per_second,
+        fetched_bytes,
+        peak_rss_bytes
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+    """
+    for item in metrics:
+        rows_per_second = item.rows_per_second
+        execute(
+            dw_connection,
+            sql,
+            (
+                int(run_entity_id),
+                int(item.batch_number),
+                int(item.batch_size),
+                int(item.extracted_count),
+                int(item.upserted_count),
+                _to_ms(item.extract_seconds),
+                _to_ms(item.transform_seconds),
+                _to_ms(item.upsert_seconds),
+                _to_ms(item.commit_seconds),
+                round(rows_per_second, 2) if rows_per_second is not None else None,
+                int(item.fetched_bytes),
+                item.peak_rss_bytes,
+            ),
+        )
+        insert_freshness_histogram(
+            dw_connection,
+            run_entity_id=run_entity_id,
+            batch_number=item.batch_number,
+            committed_at=item.committed_at,
+            buckets=item.freshness_buckets,
+        )
+
+
+def insert_freshness_histogram(
+    dw_connection: Any,
+    *,
+    run_entity_id: int,
+    batch_number: int,
+    committed_at: datetime | None,
+    buckets: tuple[tuple[int, int], ...],
+) -> None:
+    """Grava as faixas nao vazias do frescor do lote em `audit.etl_freshness_histogram`."""
+    if committed_at is None or not buckets:
+        return
+    sql = """
+    INSERT INTO audit.etl_freshness_histogram
+    (
+        run_entity_id,
+        batch_number,
+        committed_at,
+        bucket_upper_seconds,
+        row_count
+    )
+    VALUES (?, ?, ?, ?, ?);
+    """
+    for bucket_upper_seconds, row_count in buckets:
+        execute(
+            dw_connection,
+            sql,
+            (
+                int(run_entity_id),
+                int(batch_number),
+                committed_at,
+                int(bucket_upper_seconds),
+                int(row_count),
+            ),
+        )
+
+
 def mark_control_success_with_watermark(
     dw_connection: Any,
     *,
@@ -163,14 +354,15 @@ def mark_control_success_with_watermark(
     watermark_updated_at: datetime,
     watermark_id: int,
     run_id: int,
+    watermark_version: int | None = None,
 ) -> None:
-    sql = read_sql_file("update_watermark.sql")
-    execute(
+    STATEMENTS.execute(
         dw_connection,
-        sql,
+        "update_watermark.sql",
         (
             watermark_updated_at,
             int(watermark_id),
+            _optional_int(watermark_version),
             int(run_id),
             "success",
             "success",
@@ -179,6 +371,44 @@ def mark_control_success_with_watermark(
     )
 
 
+def checkpoint_control_watermark(
+    dw_connection: Any,
+    *,
+    entity_name: str,
+    watermark_updated_at: datetime,
+    watermark_id: int,
+    run_id: int,
+    watermark_version: int | None = None,
+) -> None:
+    """Avanca o watermark no meio do run, na mesma transacao do upsert do lote.
+
+    Nao altera `last_status`/`last_success_at`: o status final continua sendo
+    gravado ao fim da entidade. Uma nova execucao apos falha parte deste ponto.
+    `watermark_version=None` (watermark `updated_at`) grava NULL: uma rowversion
+    antiga nao pode sobreviver a troca de tipo e ser retomada mais tarde.
+    """
+    sql = """
+    UPDATE ctl.etl_control
+       SET watermark_updated_at = ?,
+           watermark_id = ?,
+           watermark_version = ?,
+           last_run_id = ?,
+           updated_at = SYSUTCDATETIME()
+     WHERE entity_name = ?;
+    """
+    execute(
+        dw_connection,
+        sql,
+        (
+            watermark_updated_at,
+            int(watermark_id),
+            _optional_int(watermark_version),
+            int(run_id),
+            entity_name,
+        ),
+    )
+
+
 def mark_control_success_without_watermark(
     dw_connection: Any,
     *,
@@ -196,6 +426,22 @@ def mark_control_success_without_watermark(
     execute(dw_connection, sql, (int(run_id), entity_name))
 
 
+def update_control_batch_size(
+    dw_connection: Any,
+    *,
+    entity_name: str,
+    batch_size: int,
+) -> None:
+    """Grava o tamanho em que o batch adaptativo estabilizou (proximo run ja parte dele)."""
+    sql = """
+    UPDATE ctl.etl_control
+       SET batch_size = ?,
+           updated_at = SYSUTCDATETIME()
+     WHERE entity_name = ?;
+    """
+    execute(dw_connection, sql, (int(batch_size), entity_name))
+
+
 def mark_control_failed(
     dw_connection: Any,
     *,
@@ -210,3 +456,83 @@ def mark_control_failed(
      WHERE entity_name = ?;
     """
     execute(dw_connection, sql, (int(run_id), entity_name))
+
+
+def start_daemon_heartbeat(
+    dw_connection: Any,
+    *,
+    entities_requested: list[str],
+    started_by: str,
+    host_name: str,
+    process_id: int,
+) -> int:
+    sql = """
+    INSERT INTO audit.etl_daemon_heartbeat (entities_requested, started_by, host_name, process_id, status)
+    OUTPUT INSERTED.daemon_id
+    VALUES (?, ?, ?, ?, 'running');
+    """
+    row = query_one(
+        dw_connection,
+        sql,
+        (",".join(entities_requested), started_by, host_name[:128], int(process_id)),
+    )
+    if row is None:
+        raise RuntimeError("Nao foi possivel iniciar audit.etl_daemon_heartbeat.")
+    return int(row["daemon_id"])
+
+
+def update_daemon_heartbeat(
+    dw_connection: Any,
+    *,
+    daemon_id: int,
+    status: str,
+    cycles_count: int,
+    runs_count: int,
+    last_run_id: int | None,
+    loop_seconds: float | None,
+    lag_seconds: float | None,
+    error_message: str | None = None,
+) -> None:
+    """Atualiza o heartbeat do daemon; `status` diferente de `running` encerra a linha."""
+    last_loop_ms = _to_ms(loop_seconds) if loop_seconds is not None else None
+    sql = """
+    UPDATE audit.etl_daemon_heartbeat
+       SET last_heartbeat_at = SYSUTCDATETIME(),
+           finished_at = CASE WHEN ? = 'running' THEN NULL ELSE SYSUTCDATETIME() END,
+           status = ?,
+           cycles_count = ?,
+           runs_count = ?,
+           last_run_id = COALESCE(?, last_run_id),
+           last_loop_ms = COALESCE(?, last_loop_ms),
+           max_loop_ms = CASE WHEN max_loop_ms IS NULL OR ? > max_loop_ms THEN ? ELSE max_loop_ms END,
+           last_lag_ms = COALESCE(?, last_lag_ms),
+           error_message = ?
+     WHERE daemon_id = ?;
+    """
+    execute(
+        dw_connection,
+        sql,
+        (
+            status,
+            status,
+            int(cycles_count),
+            int(runs_count),
+            _optional_int(last_run_id),
+            last_loop_ms,
+            last_loop_ms,
+            last_loop_ms,
+            _to_ms(lag_seconds) if lag_seconds is not None else None,
+            error_message,
+            int(daemon_id),
+        ),
+    )
+
+
+def _optional_int(value: Any) -> int | None:
+    if value is None:
+        return None
+    return int(value)
+
+
+def _to_ms(seconds: float) -> int:
+    return max(0, int(round(seconds * 1000)))
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+
+DEFAULT_POLL_SECONDS = 30
+# Espera minima entre ciclos: evita laco ocupado quando um intervalo vence
+# enquanto o ciclo anterior ainda rodava.
+_MIN_IDLE_SECONDS = 0.05
+
+
+@dataclass(frozen=True)
+class CycleReport:
+    cycle_number: int
+    polled: tuple[str, ...]
+    ran: tuple[str, ...]
+    # Atraso entre o vencimento do intervalo mais antigo e o inicio do ciclo.
+    lag_seconds: float
+    # Consulta de backlog + execucao das entidades com backlog.
+    loop_seconds: float
+
+
+class PollSchedule:
+    """Proxima consulta de backlog de cada entidade, pelo intervalo proprio.
+
+    Todas vencem no inicio; apos cada consulta a entidade volta a vencer
+    `interval` segundos depois do fim do ciclo.
+    """
+
+    def __init__(self, intervals: dict[str, float], *, now: float):
+        self._intervals = {name: max(_MIN_IDLE_SECONDS, float(seconds)) for name, seconds in intervals.items()}
+        self._next_due = {name: now for name in intervals}
+
+    def due(self, now: float) -> list[str]:
+        """Entidades vencidas, na ordem em que os intervalos foram informados."""
+        return [name for name, due_at in self._next_due.items() if due_at <= now]
+
+    def lag_seconds(self, names: list[str], now: float) -> float:
+        if not names:
+            return 0.0
+        return max(0.0, now - min(self._next_due[name] for name in names))
+
+    def reschedule(self, names: list[str], now: float) -> None:
+        for name in names:
+            self._next_due[name] = now + self._intervals[name]
+
+    def seconds_until_next(self, now: float) -> float:
+        return max(_MIN_IDLE_SECONDS, min(self._next_due.values()) - now)
+
+
+def run_daemon(
+    intervals: dict[str, float],
+    *,
+    has_backlog: Callable[[str], bool],
+    run_entities: Callable[[list[str]], None],
+    stop_event: threading.Event,
+    on_cycle: Callable[[CycleReport], None] | None = None,
+    clock: Callable[[], float] = time.monotonic,
+    max_cycles: int | None = None,
+) -> int:
+    """Laco do modo daemon: consulta o backlog das entidades vencidas e executa as que tem linhas.
+
+    `intervals` define a ordem de execucao (dependencias primeiro) e o
+    intervalo de consulta de cada entidade. Um ciclo so chama
+    `run_entities` quando alguma entidade vencida tem backlog; `on_cycle`
+    recebe todo ciclo, inclusive os ociosos (heartbeat). A espera entre
+    ciclos usa `stop_event.wait`, entao um sinal de parada encerra o laco
+    sem aguardar o proximo intervalo. Retorna o numero de ciclos executados.
+    """
+    schedule = PollSchedule(intervals, now=clock())
+    cycles = 0
+    while not stop_event.is_set():
+        if max_cycles is not None and cycles >= max_cycles:
+            break
+        now = clock()
+        due = schedule.due(now)
+        if not due:
+            stop_event.wait(schedule.seconds_until_next(now))
+            continue
+
+        lag_seconds = schedule.lag_seconds(due, now)
+        pending = [name for name in due if not stop_event.is_set() and has_backlog(name)]
+        if pending and not stop_event.is_set():
+            run_entities(pending)
+        finished = clock()
+        schedule.reschedule(due, finished)
+        cycles += 1
+
+        if on_cycle is not None:
+            on_cycle(
+                CycleReport(
+                    cycle_number=cycles,
+                    polled=tuple(due),
+                    ran=tuple(pending),
+                    lag_seconds=lag_seconds,
+                    loop_seconds=finished - now,
+                )
+            )
+    return cycles
+
+
+def install_stop_signals(stop_event: threading.Event) -> None:
+    """SIGTERM/SIGINT sinalizam `stop_event`: o lote em andamento termina e o daemon para.
+
+    Deve ser chamado na thread principal (restricao de `signal.signal`).
+    """
+
+    def _handle(signum: int, _frame: object) -> None:
+        print(f"[daemon] sinal {signal.Signals(signum).name} recebido; encerrando apos o lote atual.")
+        stop_event.set()
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, _handle)
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import threading
+import traceback
+from typing import Any, Callable
+
+from config import ETLConfig
+from control import (
+    finish_run,
+    get_entity_control,
+    resolve_cutoff_minutes,
+    resolve_entity_watermark_type,
+    resolve_run_status,
+    start_run,
+    tally_entity_results,
+    update_daemon_heartbeat,
+)
+from daemon import CycleReport
+from db import close_quietly, connect_sqlserver
+from entities import get_entity
+from pipeline import has_pending_rows
+
+
+class WarmConnections:
+    """Par OLTP/DW do daemon: aberto uma vez, reutilizado entre ciclos e reaberto apos falha."""
+
+    def __init__(self, config: ETLConfig):
+        self._config = config
+        self._pair: tuple[Any, Any] | None = None
+
+    def get(self) -> tuple[Any, Any]:
+        if self._pair is None:
+            oltp = connect_sqlserver(
+                self._config.oltp_conn_str,
+                command_timeout_seconds=self._config.command_timeout_seconds,
+            )
+            try:
+                dw = connect_sqlserver(
+                    self._config.dw_conn_str,
+                    command_timeout_seconds=self._config.command_timeout_seconds,
+                )
+            except Exception:
+                close_quietly(oltp)
+                raise
+            self._pair = (oltp, dw)
+        return self._pair
+
+    def close(self) -> None:
+        if self._pair is not None:
+            for connection in self._pair:
+                close_quietly(connection)
+        self._pair = None
+
+
+class DaemonRunner:
+    """Estado e callbacks de `daemon.run_daemon` para o runner SQL Server.
+
+    `run_entity` e `entity_kwargs(run_id)` vem do runner: cada ciclo com
+    backlog executa as entidades pelo mesmo caminho do modo incremental.
+    """
+
+    def __init__(
+        self,
+        config: ETLConfig,
+        *,
+        started_by: str,
+        stop_event: threading.Event,
+        run_entity: Callable[..., tuple[bool, str | None]],
+        entity_kwargs: Callable[[int], dict[str, Any]],
+        poll_seconds_override: int | None = None,
+        cutoff_minutes_override: int | None = None,
+        watermark_type_override: str | None = None,
+    ):
+        self.config = config
+        self.started_by = started_by
+        self.stop_event = stop_event
+        self.run_entity = run_entity
+        self.entity_kwargs = entity_kwargs
+        self.poll_seconds_override = poll_seconds_override
+        self.cutoff_minutes_override = cutoff_minutes_override
+        self.watermark_type_override = watermark_type_override
+        self.connections = WarmConnections(config)
+        self.daemon_id: int | None = None
+        self.cycles = 0
+        self.runs = 0
+        self.last_run_id: int | None = None
+        self.max_loop_seconds = 0.0
+
+    def resolve_intervals(self, entity_names: list[str]) -> dict[str, int]:
+        """Intervalo de consulta por entidade ativa, na ordem de execucao."""
+        _, dw_connection = self.connections.get()
+        intervals: dict[str, int] = {}
+        for entity_name in entity_names:
+            try:
+                control = get_entity_control(dw_connection, entity_name)
+            except ValueError as exc:
+                print(f"[daemon] {entity_name} ignorada: {exc}")
+                continue
+            seconds = self.poll_seconds_override or control.poll_interval_seconds or self.config.daemon_poll_seconds
+            intervals[entity_name] = max(1, int(seconds))
+        dw_connection.rollback()
+        return intervals
+
+    def has_backlog(self, entity_name: str) -> bool:
+        try:
+            oltp_connection, dw_connection = self.connections.get()
+            entity = get_entity(entity_name)
+            control = get_entity_control(dw_connection, entity_name)
+            dw_connection.rollback()
+            pending = has_pending_rows(
+                entity,
+                oltp_connection,
+                watermark_updated_at=control.watermark_updated_at,
+                watermark_id=control.watermark_id,
+                cutoff_minutes=resolve_cutoff_minutes(
+                    control, self.cutoff_minutes_override, self.config.default_cutoff_minutes
+                ),
+                watermark_type=resolve_entity_watermark_type(entity, control, self.watermark_type_override),
+                watermark_version=control.watermark_version,
+            )
+            # Encerra a transacao implicita de leitura na origem (conexao fica aberta).
+            oltp_connection.rollback()
+            return pending
+        except Exception as exc:  # noqa: BLE001
+            print(f"[daemon] falha ao consultar backlog de {entity_name}: {type(exc).__name__}: {exc}")
+            # Conexao possivelmente invalida: o proximo ciclo reabre o par.
+            self.connections.close()
+            return False
+
+    def run_entities(self, entity_names: list[str]) -> None:
+        run_id: int | None = None
+        dw_connection = None
+        try:
+            oltp_connection, dw_connection = self.connections.get()
+            run_id = start_run(
+                dw_connection,
+                entities_requested=entity_names,
+                started_by=self.started_by,
+            )
+            dw_connection.commit()
+            entity_kwargs = self.entity_kwargs(run_id)
+
+            results: dict[str, tuple[bool, str | None]] = {}
+            for entity_name in entity_names:
+                if self.stop_event.is_set():
+                    break
+                results[entity_name] = self.run_entity(
+                    entity_name=entity_name,
+                    oltp_connection=oltp_connection,
+                    dw_connection=dw_connection,
+                    stop_event=self.stop_event,
+                    **entity_kwargs,
+                )
+            oltp_connection.rollback()
+
+            executed = list(results)
+            entities_succeeded, entities_failed, errors = tally_entity_results(executed, results)
+            finish_run(
+                dw_connection,
+                run_id=run_id,
+                status=resolve_run_status(
+                    entities_succeeded=entities_succeeded,
+                    entities_failed=entities_failed,
+                ),
+                entities_succeeded=entities_succeeded,
+                entities_failed=entities_failed,
+                error_message=" | ".join(errors)[:4000] if errors else None,
+            )
+            dw_connection.commit()
+
+        except Exception as exc:  # noqa: BLE001
+            error_text = f"{type(exc).__name__}: {exc}"
+            print(f"[daemon] falha no ciclo (run_id={run_id}): {error_text}")
+            traceback.print_exc()
+            if run_id is not None and dw_connection is not None:
+                try:
+                    dw_connection.rollback()
+                    finish_run(
+                        dw_connection,
+                        run_id=run_id,
+                        status="failed",
+                        entities_succeeded=0,
+                        entities_failed=len(entity_names),
+                        error_message=error_text[:4000],
+                    )
+                    dw_connection.commit()
+                except Exception:  # noqa: BLE001
+                    pass
+            self.connections.close()
+
+        finally:
+            if run_id is not None:
+                self.runs += 1
+                self.last_run_id = run_id
+
+    def on_cycle(self, report: CycleReport) -> None:
+        self.cycles = report.cycle_number
+        self.max_loop_seconds = max(self.max_loop_seconds, report.loop_seconds)
+        if report.ran:
+            print(
+                f"[daemon] ciclo {report.cycle_number}: executadas={','.join(report.ran)} "
+                f"consultadas={len(report.polled)} loop={report.loop_seconds:.2f}s "
+                f"atraso={report.lag_seconds:.2f}s"
+            )
+        self._write_heartbeat(
+            status="running",
+            loop_seconds=report.loop_seconds,
+            lag_seconds=report.lag_seconds,
+        )
+
+    def finish(self, *, status: str, error_message: str | None = None) -> None:
+        self._write_heartbeat(status=status, error_message=error_message)
+
+    def _write_heartbeat(
+        self,
+        *,
+        status: str,
+        loop_seconds: float | None = None,
+        lag_seconds: float | None = None,
+        error_message: str | None = None,
+    ) -> None:
+        if self.daemon_id is None:
+            return
+        try:
+            _, dw_connection = self.connections.get()
+            update_daemon_heartbeat(
+                dw_connection,
+                daemon_id=self.daemon_id,
+                status=status,
+                cycles_count=self.cycles,
+                runs_count=self.runs,
+                last_run_id=self.last_run_id,
+                loop_seconds=loop_seconds,
+                lag_seconds=lag_seconds,
+                error_message=error_message,
+            )
+            dw_connection.commit()
+        except Exception as exc:  # noqa: BLE001
+            print(f"[daemon] aviso: falha ao gravar heartbeat: {type(exc).__name__}: {exc}")
+            self.connections.close()
@@ -1,14 +1,58 @@
 from __future__ import annotations
 
+import threading
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator, Mapping, Sequence
 
 try:
     import pyodbc  # type: ignore
 except ModuleNotFoundError:  # pragma: no cover - depende do ambiente local
     pyodbc = None
 
-from config import SQL_DIR
+from config import SQL_DIR, ETLConfig
+
+
+DEFAULT_FETCH_SIZE = 1000
+
+
+class Row:
+    """Linha somente leitura com acesso por nome de coluna.
+
+    Guarda a tupla original do driver e um indice `coluna -> posicao`
+    compartilhado por todas as linhas do mesmo resultado, evitando criar um
+    dicionario por linha. Suporta `row["coluna"]` e `row.get("coluna")`,
+    o mesmo acesso usado pelos `transform_rows` das entidades.
+    """
+
+    __slots__ = ("_values", "_index")
+
+    def __init__(self, values: Sequence[Any], index: Mapping[str, int]):
+        self._values = values
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[self._index[key]]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def get(self, key: str, default: Any = None) -> Any:
+        position = self._index.get(key)
+        if position is None:
+            return default
+        return self._values[position]
+
+    def keys(self) -> Iterable[str]:
+        return self._index.keys()
+
+    def values(self) -> Sequence[Any]:
+        return self._values
+
+    def to_dict(self) -> dict[str, Any]:
+        return {key: self._values[position] for key, position in self._index.items()}
+
+    def __repr__(self) -> str:
+        return f"Row({self.to_dict()!r})"
 
 
 def connect_sqlserver(conn_str: str, *, command_timeout_seconds: int = 120):
@@ -27,6 +71,43 @@ def close_quietly(connection: Any | None) -> None:
         pass
 
 
+class WorkerConnections:
+    """Par OLTP/DW por thread, aberto no primeiro uso e reutilizado depois.
+
+    pyodbc nao permite compartilhar conexao entre threads. Com
+    `with_oltp=False` (carga da landing zone) o par e `(None, dw)`.
+    """
+
+    def __init__(self, config: ETLConfig, *, with_oltp: bool = True):
+        self._config = config
+        self._with_oltp = with_oltp
+        self._local = threading.local()
+        self._opened: list[Any] = []
+        self._lock = threading.Lock()
+
+    def get(self) -> tuple[Any, Any]:
+        pair = getattr(self._local, "connections", None)
+        if pair is None:
+            oltp = self._open(self._config.oltp_conn_str) if self._with_oltp else None
+            dw = self._open(self._config.dw_conn_str)
+            pair = (oltp, dw)
+            self._local.connections = pair
+        return pair
+
+    def close_all(self) -> None:
+        for connection in self._opened:
+            close_quietly(connection)
+
+    def _open(self, conn_str: str) -> Any:
+        connection = connect_sqlserver(
+            conn_str,
+            command_timeout_seconds=self._config.command_timeout_seconds,
+        )
+        with self._lock:
+            self._opened.append(connection)
+        return connection
+
+
 def read_sql_file(relative_path: str | Path) -> str:
     sql_path = SQL_DIR / relative_path
     return sql_path.read_text(encoding="utf-8").strip()
@@ -47,6 +128,34 @@ def query_all(
         cursor.close()
 
 
+def stream_query(
+    connection: Any,
+    sql: str,
+    params: Iterable[Any] = (),
+    *,
+    fetch_size: int = DEFAULT_FETCH_SIZE,
+) -> Iterator[Row]:
+    """Itera o resultado em blocos de `fetchmany(fetch_size)`.
+
+    O cursor e fechado ao esgotar o iterador ou quando o gerador e fechado
+    (`close()`/coleta), entao o consumidor deve percorrer ou fechar o retorno.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, tuple(params))
+        columns = [col[0] for col in cursor.description or []]
+        index = {name: position for position, name in enumerate(columns)}
+        safe_fetch_size = max(1, int(fetch_size))
+        while True:
+            chunk = cursor.fetchmany(safe_fetch_size)
+            if not chunk:
+                return
+            for values in chunk:
+                yield Row(values, index)
+    finally:
+        cursor.close()
+
+
 def query_one(
     connection: Any,
     sql: str,
@@ -35,6 +35,25 @@ _ENTITY_EXECUTION_ORDER = [
     fact_descontos.ENTITY_NAME,
 ]
 
+# Dependencias declaradas entre entidades: a entidade da chave so inicia apos
+# a conclusao das entidades listadas (quando tambem fazem parte da execucao).
+_ENTITY_DEPENDENCIES = {
+    dim_vendedor.ENTITY_NAME: (dim_equipe.ENTITY_NAME,),
+    fact_vendas.ENTITY_NAME: (
+        dim_cliente.ENTITY_NAME,
+        dim_produto.ENTITY_NAME,
+        dim_regiao.ENTITY_NAME,
+        dim_vendedor.ENTITY_NAME,
+    ),
+    fact_metas.ENTITY_NAME: (dim_vendedor.ENTITY_NAME,),
+    fact_descontos.ENTITY_NAME: (
+        fact_vendas.ENTITY_NAME,
+        dim_desconto.ENTITY_NAME,
+        dim_cliente.ENTITY_NAME,
+        dim_produto.ENTITY_NAME,
+    ),
+}
+
 
 def list_entities() -> list[str]:
     return sorted(ENTITY_REGISTRY.keys())
@@ -52,3 +71,8 @@ def get_entity(entity_name: str):
         valid = ", ".join(list_entities())
         raise ValueError(f"Entidade '{entity_name}' nao suportada. Opcoes: {valid}")
     return entity
+
+
+def get_entity_dependencies(entity_name: str) -> tuple[str, ...]:
+    get_entity(entity_name)
+    return _ENTITY_DEPENDENCIES.get(entity_name, ())
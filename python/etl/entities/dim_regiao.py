@@ -2,12 +2,21 @@ from __future__ import annotations
 
 import re
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable, Iterator
 
-from db import query_all, read_sql_file
+from db import Row
+from loader import LOAD_MODE_MERGE, write_upsert_params
+from row_hash import ROW_HASH_COLUMN, add_row_hashes
+from statements import STATEMENTS
+from watermark import WATERMARK_TYPE_ROWVERSION, WATERMARK_TYPE_UPDATED_AT
 
 
 ENTITY_NAME = "dim_regiao"
+# `rowversion`: pagina por core.regions.row_version (ver `watermark.py`).
+WATERMARK_TYPES = (WATERMARK_TYPE_UPDATED_AT, WATERMARK_TYPE_ROWVERSION)
+
+# Colunas fora do hash de conteudo: mudam a cada toque na origem sem alterar o registro.
+_HASH_EXCLUDED_COLUMNS = ("data_ultima_atualizacao",)
 
 
 def extract_batch(
@@ -17,13 +26,13 @@ def extract_batch(
     watermark_id: int,
     cutoff_updated_at: datetime,
     batch_size: int,
-) -> list[dict[str, Any]]:
+) -> Iterator[Row]:
     safe_batch_size = max(1, int(batch_size))
-    sql = read_sql_file("extract_dim_regiao.sql").format(batch_size=safe_batch_size)
-    return query_all(
+    return STATEMENTS.stream(
         oltp_connection,
-        sql,
+        "extract_dim_regiao.sql",
         (
+            safe_batch_size,
             cutoff_updated_at,
             watermark_updated_at,
             watermark_updated_at,
@@ -32,7 +41,26 @@ def extract_batch(
     )
 
 
-def transform_rows(raw_rows: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], int]:
+def extract_batch_by_version(
+    oltp_connection: Any,
+    *,
+    watermark_version: int,
+    version_ceiling: int,
+    batch_size: int,
+) -> Iterator[Row]:
+    safe_batch_size = max(1, int(batch_size))
+    return STATEMENTS.stream(
+        oltp_connection,
+        "extract_dim_regiao_by_version.sql",
+        (
+            safe_batch_size,
+            int(watermark_version),
+            int(version_ceiling),
+        ),
+    )
+
+
+def transform_rows(raw_rows: Iterable[Row]) -> tuple[list[dict[str, Any]], int]:
     transformed_rows: list[dict[str, Any]] = []
     soft_deleted_count = 0
 
@@ -81,25 +109,22 @@ def transform_rows(raw_rows: list[dict[str, Any]]) -> tuple[list[dict[str, Any]]
         }
         transformed_rows.append(transformed)
 
+    add_row_hashes(transformed_rows, exclude=_HASH_EXCLUDED_COLUMNS)
     return transformed_rows, soft_deleted_count
 
 
-def upsert_rows(dw_connection: Any, rows: list[dict[str, Any]]) -> int:
+def upsert_rows(
+    dw_connection: Any,
+    rows: list[dict[str, Any]],
+    *,
+    load_mode: str = LOAD_MODE_MERGE,
+) -> int:
     if not rows:
         return 0
 
-    sql = read_sql_file("upsert_dim_regiao.sql")
     params = [_to_upsert_params(row) for row in rows]
-    cursor = dw_connection.cursor()
-    try:
-        try:
-            cursor.fast_executemany = True
-        except Exception:  # noqa: BLE001
-            pass
-        cursor.executemany(sql, params)
-    finally:
-        cursor.close()
-    return len(rows)
+    written, _ = write_upsert_params(dw_connection, "upsert_dim_regiao.sql", params, load_mode=load_mode)
+    return written
 
 
 def get_batch_watermark(rows: list[dict[str, Any]]) -> tuple[datetime, int]:
@@ -134,6 +159,7 @@ def _to_upsert_params(row: dict[str, Any]) -> tuple[Any, ...]:
         row["data_cadastro"],
         row["data_ultima_atualizacao"],
         row["eh_ativo"],
+        row[ROW_HASH_COLUMN],
     )
 
 
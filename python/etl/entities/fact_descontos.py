@@ -2,19 +2,44 @@ from __future__ import annotations
 
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
-from typing import Any
-
-from db import query_all, read_sql_file
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+from columnar import (
+    MAX_SAFE_RATIO_NUMERATOR,
+    bit_column,
+    build_records,
+    cents_to_decimals,
+    column_values,
+    div_round_half_up,
+    int_column,
+    ints_to_list,
+    merge_fallback_rows,
+    money_column,
+    not_none_mask,
+    rows_frame,
+)
+from db import Row
+from key_cache import KEY_CACHE, KeyLookup
+from loader import LOAD_MODE_MERGE, write_upsert_params
+from row_hash import ROW_HASH_COLUMN, add_row_hashes, extend_row_hash
+from statements import STATEMENTS
+from watermark import WATERMARK_TYPE_UPDATED_AT
 
 
 ENTITY_NAME = "fact_descontos"
+# Somente `updated_at`: o watermark combina core.order_item_discounts,
+# core.order_items e core.orders, sem uma versao unica por linha.
+WATERMARK_TYPES = (WATERMARK_TYPE_UPDATED_AT,)
+
+# Colunas fora do hash de conteudo: mudam a cada toque na origem sem alterar o registro.
+_HASH_EXCLUDED_COLUMNS = ("data_inclusao", "data_atualizacao")
 
 _DECIMAL_0 = Decimal("0.00")
 _DECIMAL_100 = Decimal("100.00")
 _DECIMAL_CENT = Decimal("0.01")
 
-_DIM_LOOKUP_CACHE: dict[str, Any] | None = None
-
 
 def extract_batch(
     oltp_connection: Any,
@@ -23,13 +48,13 @@ def extract_batch(
     watermark_id: int,
     cutoff_updated_at: datetime,
     batch_size: int,
-) -> list[dict[str, Any]]:
+) -> Iterator[Row]:
     safe_batch_size = max(1, int(batch_size))
-    sql = read_sql_file("extract_fact_descontos.sql").format(batch_size=safe_batch_size)
-    return query_all(
+    return STATEMENTS.stream(
         oltp_connection,
-        sql,
+        "extract_fact_descontos.sql",
         (
+            safe_batch_size,
             cutoff_updated_at,
             watermark_updated_at,
             watermark_updated_at,
@@ -38,7 +63,7 @@ def extract_batch(
     )
 
 
-def transform_rows(raw_rows: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], int]:
+def transform_rows(raw_rows: Iterable[Row]) -> tuple[list[dict[str, Any]], int]:
     transformed_rows: list[dict[str, Any]] = []
     soft_deleted_count = 0
 
@@ -138,10 +163,129 @@ def transform_rows(raw_rows: list[dict[str, Any]]) -> tuple[list[dict[str, Any]]
             }
         )
 
+    add_row_hashes(transformed_rows, exclude=_HASH_EXCLUDED_COLUMNS)
     return transformed_rows, soft_deleted_count
 
 
-def upsert_rows(dw_connection: Any, rows: list[dict[str, Any]]) -> int:
+def transform_rows_columnar(raw_rows: Iterable[Row]) -> tuple[list[dict[str, Any]], int]:
+    """Mesmo resultado de `transform_rows`, com valores em centavos int64 por coluna.
+
+    Linhas invalidas ou fora do caminho vetorizado sao recalculadas por
+    `transform_rows`, que levanta os mesmos erros de validacao.
+    """
+    rows, frame = rows_frame(raw_rows)
+    if not rows:
+        return [], 0
+
+    soft_deleted = (
+        not_none_mask(frame, "order_item_discount_deleted_at")
+        | not_none_mask(frame, "order_item_deleted_at")
+        | not_none_mask(frame, "order_deleted_at")
+    )
+
+    source_id = int_column(frame, "order_item_discount_id", default=None, min_value=None)
+    desconto = int_column(frame, "discount_id", default=None, min_value=0)
+    venda = int_column(frame, "order_item_id", default=None, min_value=0)
+    cliente = int_column(frame, "customer_id", default=None, min_value=0)
+    produto = int_column(frame, "product_id", default=None, min_value=0)
+
+    aplicado = money_column(frame, "discount_amount", default=_DECIMAL_0, min_value=_DECIMAL_0)
+    sem_desconto = money_column(frame, "base_amount", default=_DECIMAL_0, min_value=_DECIMAL_0)
+    # O valor final informado so importa para validacao: o resultado e
+    # sempre `valor_sem_desconto - valor_desconto_aplicado`.
+    com_desconto = money_column(frame, "final_amount", default=None, min_value=_DECIMAL_0)
+
+    sem_desconto_cents = sem_desconto.cents
+    aplicado_cents = np.minimum(aplicado.cents, sem_desconto_cents)
+    percentual_cents = np.where(
+        sem_desconto_cents > 0,
+        np.minimum(
+            div_round_half_up(
+                np.minimum(aplicado_cents, MAX_SAFE_RATIO_NUMERATOR) * 10_000,
+                sem_desconto_cents,
+            ),
+            10_000,
+        ),
+        0,
+    )
+
+    needs_fallback = (
+        source_id.needs_fallback
+        | source_id.is_null
+        | desconto.needs_fallback
+        | desconto.is_null
+        | venda.needs_fallback
+        | venda.is_null
+        | cliente.needs_fallback
+        | cliente.is_null
+        | produto.needs_fallback
+        | aplicado.needs_fallback
+        | sem_desconto.needs_fallback
+        | com_desconto.needs_fallback
+        | (aplicado_cents > MAX_SAFE_RATIO_NUMERATOR)
+    )
+
+    created_at_values = column_values(frame, "order_item_discount_created_at")
+    data_aplicacao = [
+        _to_date(applied_at) or _to_date(created_at) or date(1900, 1, 1)
+        for applied_at, created_at in zip(column_values(frame, "applied_at"), created_at_values)
+    ]
+    source_updated_at = [
+        _to_datetime(updated_at, fallback=discount_updated_at)
+        for updated_at, discount_updated_at in zip(
+            column_values(frame, "source_updated_at"),
+            column_values(frame, "order_item_discount_updated_at"),
+        )
+    ]
+    data_inclusao = [
+        _to_datetime(created_at, fallback=updated_at)
+        for created_at, updated_at in zip(created_at_values, source_updated_at)
+    ]
+    source_ids = ints_to_list(source_id.values)
+
+    records = build_records(
+        {
+            "desconto_aplicado_original_id": source_ids,
+            "desconto_original_id": ints_to_list(desconto.values),
+            "venda_original_id": ints_to_list(venda.values),
+            "data_aplicacao": data_aplicacao,
+            "cliente_original_id": ints_to_list(cliente.values),
+            "produto_original_id": ints_to_list(produto.values, produto.is_null),
+            "nivel_aplicacao": [
+                _normalize_application_level(value) for value in column_values(frame, "application_level")
+            ],
+            "valor_desconto_aplicado": cents_to_decimals(aplicado_cents),
+            "valor_sem_desconto": cents_to_decimals(sem_desconto_cents),
+            "valor_com_desconto": cents_to_decimals(sem_desconto_cents - aplicado_cents),
+            "percentual_desconto_efetivo": cents_to_decimals(percentual_cents),
+            "desconto_aprovado": bit_column(frame, "approved").tolist(),
+            "motivo_rejeicao": [
+                _clean_text_nullable(value, max_len=200) for value in column_values(frame, "rejection_reason")
+            ],
+            "numero_pedido": [
+                _clean_text(order_number, default=f"ORD-{order_id}", max_len=20)
+                for order_number, order_id in zip(
+                    column_values(frame, "order_number"),
+                    column_values(frame, "order_id"),
+                )
+            ],
+            "data_inclusao": data_inclusao,
+            "data_atualizacao": source_updated_at,
+            "source_updated_at": source_updated_at,
+            "source_id": source_ids,
+        }
+    )
+    records = merge_fallback_rows(rows, records, needs_fallback, transform_rows)
+    add_row_hashes(records, exclude=_HASH_EXCLUDED_COLUMNS)
+    return records, int(soft_deleted.sum())
+
+
+def upsert_rows(
+    dw_connection: Any,
+    rows: list[dict[str, Any]],
+    *,
+    load_mode: str = LOAD_MODE_MERGE,
+) -> int:
     if not rows:
         return 0
 
@@ -154,35 +298,35 @@ def upsert_rows(dw_connection: Any, rows: list[dict[str, Any]]) -> int:
         "produto_original_id": set(),
     }
 
+    desconto_ids = dim_lookup["desconto"].get_many(row["desconto_original_id"] for row in rows)
+    vendas = dim_lookup["venda"].get_many(row["venda_original_id"] for row in rows)
+    data_aplicacao_ids = dim_lookup["data"].get_many(row["data_aplicacao"] for row in rows)
+    cliente_ids = dim_lookup["cliente"].get_many(row["cliente_original_id"] for row in rows)
+    produto_ids = dim_lookup["produto"].get_many(row.get("produto_original_id") for row in rows)
+
     params: list[tuple[Any, ...]] = []
-    for row in rows:
-        desconto_id = dim_lookup["desconto"].get(row["desconto_original_id"])
+    for row, desconto_id, venda_data, data_aplicacao_id, cliente_id, produto_id in zip(
+        rows, desconto_ids, vendas, data_aplicacao_ids, cliente_ids, produto_ids
+    ):
         if desconto_id is None:
             _remember_missing(missing_required["desconto_original_id"], row["desconto_original_id"])
 
-        venda_data = dim_lookup["venda"].get(row["venda_original_id"])
         if venda_data is None:
             _remember_missing(missing_required["venda_original_id"], row["venda_original_id"])
             venda_id = None
             custo_total = _DECIMAL_0
         else:
-            venda_id = venda_data["venda_id"]
-            custo_total = venda_data["custo_total"]
+            venda_id, custo_total = venda_data
 
-        data_aplicacao_id = dim_lookup["data"].get(row["data_aplicacao"])
         if data_aplicacao_id is None:
             _remember_missing(missing_required["data_aplicacao"], row["data_aplicacao"])
 
-        cliente_id = dim_lookup["cliente"].get(row["cliente_original_id"])
         if cliente_id is None:
             _remember_missing(missing_required["cliente_original_id"], row["cliente_original_id"])
 
-        produto_id = None
         produto_original_id = row.get("produto_original_id")
-        if produto_original_id is not None:
-            produto_id = dim_lookup["produto"].get(produto_original_id)
-            if produto_id is None:
-                _remember_missing(missing_required["produto_original_id"], produto_original_id)
+        if produto_original_id is not None and produto_id is None:
+            _remember_missing(missing_required["produto_original_id"], produto_original_id)
 
         margem_antes = _round_money(row["valor_sem_desconto"] - custo_total)
         margem_apos = _round_money(row["valor_com_desconto"] - custo_total)
@@ -211,22 +355,22 @@ def upsert_rows(dw_connection: Any, rows: list[dict[str, Any]]) -> int:
                 row["numero_pedido"],
                 row["data_inclusao"],
                 row["data_atualizacao"],
+                extend_row_hash(
+                    row[ROW_HASH_COLUMN],
+                    desconto_id,
+                    venda_id,
+                    data_aplicacao_id,
+                    cliente_id,
+                    produto_id,
+                    custo_total,
+                ),
             )
         )
 
     _raise_if_missing_dimensions(missing_required)
 
-    sql = read_sql_file("upsert_fact_descontos.sql")
-    cursor = dw_connection.cursor()
-    try:
-        try:
-            cursor.fast_executemany = True
-        except Exception:  # noqa: BLE001
-            pass
-        cursor.executemany(sql, params)
-    finally:
-        cursor.close()
-    return len(rows)
+    written, _ = write_upsert_params(dw_connection, "upsert_fact_descontos.sql", params, load_mode=load_mode)
+    return written
 
 
 def get_batch_watermark(rows: list[dict[str, Any]]) -> tuple[datetime, int]:
@@ -236,105 +380,12 @@ def get_batch_watermark(rows: list[dict[str, Any]]) -> tuple[datetime, int]:
     return last_row["source_updated_at"], int(last_row["source_id"])
 
 
-def _get_lookup_cache(dw_connection: Any) -> dict[str, Any]:
-    global _DIM_LOOKUP_CACHE
-
-    if _DIM_LOOKUP_CACHE is None:
-        _DIM_LOOKUP_CACHE = {
-            "data": _load_date_lookup(dw_connection),
-            "desconto": _load_numeric_lookup(
-                dw_connection,
-                table_name="dim.DIM_DESCONTO",
-                natural_key="desconto_original_id",
-                surrogate_key="desconto_id",
-            ),
-            "cliente": _load_numeric_lookup(
-                dw_connection,
-                table_name="dim.DIM_CLIENTE",
-                natural_key="cliente_original_id",
-                surrogate_key="cliente_id",
-            ),
-            "produto": _load_numeric_lookup(
-                dw_connection,
-                table_name="dim.DIM_PRODUTO",
-                natural_key="produto_original_id",
-                surrogate_key="produto_id",
-            ),
-            "venda": _load_sale_lookup(dw_connection),
-        }
-    return _DIM_LOOKUP_CACHE
-
-
-def _load_date_lookup(dw_connection: Any) -> dict[date, int]:
-    rows = query_all(
-        dw_connection,
-        """
-        SELECT data_completa, data_id
-        FROM dim.DIM_DATA;
-        """,
-    )
-    lookup: dict[date, int] = {}
-    for row in rows:
-        dt = _to_date(row.get("data_completa"))
-        if dt is None:
-            continue
-        lookup[dt] = int(row["data_id"])
-    return lookup
-
-
-def _load_numeric_lookup(
-    dw_connection: Any,
-    *,
-    table_name: str,
-    natural_key: str,
-    surrogate_key: str,
-) -> dict[int, int]:
-    rows = query_all(
-        dw_connection,
-        f"""
-        SELECT {natural_key}, {surrogate_key}
-        FROM {table_name};
-        """,
-    )
-    lookup: dict[int, int] = {}
-    for row in rows:
-        natural = row.get(natural_key)
-        surrogate = row.get(surrogate_key)
-        if natural is None or surrogate is None:
-            continue
-        try:
-            lookup[int(natural)] = int(surrogate)
-        except (TypeError, ValueError):
-            continue
-    return lookup
-
-
-def _load_sale_lookup(dw_connection: Any) -> dict[int, dict[str, Any]]:
-    rows = query_all(
+def _get_lookup_cache(dw_connection: Any) -> dict[str, KeyLookup]:
+    return KEY_CACHE.lookups(
         dw_connection,
-        """
-        SELECT venda_original_id, venda_id, custo_total
-        FROM fact.FACT_VENDAS;
-        """,
+        ("data", "desconto", "cliente", "produto", "venda"),
+        consumer=ENTITY_NAME,
     )
-    lookup: dict[int, dict[str, Any]] = {}
-    for row in rows:
-        venda_original_id = row.get("venda_original_id")
-        venda_id = row.get("venda_id")
-        if venda_original_id is None or venda_id is None:
-            continue
-        try:
-            lookup[int(venda_original_id)] = {
-                "venda_id": int(venda_id),
-                "custo_total": _to_decimal(
-                    row.get("custo_total"),
-                    default=_DECIMAL_0,
-                    min_value=_DECIMAL_0,
-                ),
-            }
-        except (TypeError, ValueError):
-            continue
-    return lookup
 
 
 def _remember_missing(bucket: set[Any], value: Any, limit: int = 5) -> None:
@@ -2,12 +2,38 @@ from __future__ import annotations
 
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
-from typing import Any
-
-from db import query_all, read_sql_file
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+from columnar import (
+    MAX_SAFE_RATIO_NUMERATOR,
+    bit_column,
+    build_records,
+    cents_to_decimals,
+    column_values,
+    div_round_half_up,
+    int_column,
+    ints_to_list,
+    merge_fallback_rows,
+    money_column,
+    not_none_mask,
+    rows_frame,
+)
+from db import Row
+from key_cache import KEY_CACHE, KeyLookup
+from loader import LOAD_MODE_MERGE, write_upsert_params
+from row_hash import ROW_HASH_COLUMN, add_row_hashes, extend_row_hash
+from statements import STATEMENTS
+from watermark import WATERMARK_TYPE_ROWVERSION, WATERMARK_TYPE_UPDATED_AT
 
 
 ENTITY_NAME = "fact_metas"
+# `rowversion`: pagina por core.seller_targets_monthly.row_version (ver `watermark.py`).
+WATERMARK_TYPES = (WATERMARK_TYPE_UPDATED_AT, WATERMARK_TYPE_ROWVERSION)
+
+# Colunas fora do hash de conteudo: mudam a cada toque na origem sem alterar o registro.
+_HASH_EXCLUDED_COLUMNS = ("data_inclusao", "data_ultima_atualizacao")
 
 _DECIMAL_0 = Decimal("0.00")
 _DECIMAL_001 = Decimal("0.01")
@@ -15,8 +41,6 @@ _DECIMAL_100 = Decimal("100.00")
 _DECIMAL_999_99 = Decimal("999.99")
 _DECIMAL_CENT = Decimal("0.01")
 
-_DIM_LOOKUP_CACHE: dict[str, dict[Any, int]] | None = None
-
 
 def extract_batch(
     oltp_connection: Any,
@@ -25,13 +49,13 @@ def extract_batch(
     watermark_id: int,
     cutoff_updated_at: datetime,
     batch_size: int,
-) -> list[dict[str, Any]]:
+) -> Iterator[Row]:
     safe_batch_size = max(1, int(batch_size))
-    sql = read_sql_file("extract_fact_metas.sql").format(batch_size=safe_batch_size)
-    return query_all(
+    return STATEMENTS.stream(
         oltp_connection,
-        sql,
+        "extract_fact_metas.sql",
         (
+            safe_batch_size,
             cutoff_updated_at,
             watermark_updated_at,
             watermark_updated_at,
@@ -40,7 +64,26 @@ def extract_batch(
     )
 
 
-def transform_rows(raw_rows: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], int]:
+def extract_batch_by_version(
+    oltp_connection: Any,
+    *,
+    watermark_version: int,
+    version_ceiling: int,
+    batch_size: int,
+) -> Iterator[Row]:
+    safe_batch_size = max(1, int(batch_size))
+    return STATEMENTS.stream(
+        oltp_connection,
+        "extract_fact_metas_by_version.sql",
+        (
+            safe_batch_size,
+            int(watermark_version),
+            int(version_ceiling),
+        ),
+    )
+
+
+def transform_rows(raw_rows: Iterable[Row]) -> tuple[list[dict[str, Any]], int]:
     transformed_rows: list[dict[str, Any]] = []
     soft_deleted_count = 0
 
@@ -113,10 +156,103 @@ def transform_rows(raw_rows: list[dict[str, Any]]) -> tuple[list[dict[str, Any]]
             }
         )
 
+    add_row_hashes(transformed_rows, exclude=_HASH_EXCLUDED_COLUMNS)
     return transformed_rows, soft_deleted_count
 
 
-def upsert_rows(dw_connection: Any, rows: list[dict[str, Any]]) -> int:
+def transform_rows_columnar(raw_rows: Iterable[Row]) -> tuple[list[dict[str, Any]], int]:
+    """Mesmo resultado de `transform_rows`, com valores em centavos int64 por coluna.
+
+    Linhas invalidas ou fora do caminho vetorizado sao recalculadas por
+    `transform_rows`, que levanta os mesmos erros de validacao.
+    """
+    rows, frame = rows_frame(raw_rows)
+    if not rows:
+        return [], 0
+
+    soft_deleted = not_none_mask(frame, "target_deleted_at")
+
+    source_id = int_column(frame, "seller_target_id", default=None, min_value=None)
+    vendedor = int_column(frame, "seller_id", default=None, min_value=1)
+    quantidade_meta = int_column(frame, "target_quantity", default=None, min_value=1)
+    quantidade_realizada = int_column(frame, "realized_quantity", default=0, min_value=0)
+    meta = money_column(frame, "target_amount", default=None, min_value=_DECIMAL_001)
+    realizado = money_column(frame, "realized_amount", default=_DECIMAL_0, min_value=_DECIMAL_0)
+
+    data_referencia = [_to_month_start_date(value) for value in column_values(frame, "target_month")]
+    data_referencia_invalida = np.fromiter(
+        (value is None for value in data_referencia),
+        dtype=bool,
+        count=len(data_referencia),
+    )
+
+    meta_cents = np.where(meta.is_null, 1, meta.cents)
+    realizado_cents = realizado.cents
+    percentual_cents = np.minimum(
+        div_round_half_up(np.minimum(realizado_cents, MAX_SAFE_RATIO_NUMERATOR) * 10_000, meta_cents),
+        _to_cents(_DECIMAL_999_99),
+    )
+    qtd_realizada = quantidade_realizada.values
+    ticket_cents = div_round_half_up(realizado_cents, qtd_realizada)
+
+    needs_fallback = (
+        source_id.needs_fallback
+        | source_id.is_null
+        | vendedor.needs_fallback
+        | vendedor.is_null
+        | data_referencia_invalida
+        | meta.needs_fallback
+        | meta.is_null
+        | realizado.needs_fallback
+        | quantidade_meta.needs_fallback
+        | quantidade_realizada.needs_fallback
+        | (realizado_cents > MAX_SAFE_RATIO_NUMERATOR)
+    )
+
+    source_updated_at = [
+        _to_datetime(updated_at, fallback=created_at)
+        for updated_at, created_at in zip(
+            column_values(frame, "target_updated_at"),
+            column_values(frame, "target_created_at"),
+        )
+    ]
+    data_inclusao = [
+        _to_datetime(created_at, fallback=updated_at)
+        for created_at, updated_at in zip(column_values(frame, "target_created_at"), source_updated_at)
+    ]
+
+    records = build_records(
+        {
+            "vendedor_original_id": ints_to_list(vendedor.values),
+            "data_referencia": data_referencia,
+            "tipo_periodo": [_normalize_period_type(value) for value in column_values(frame, "period_type")],
+            "valor_meta": cents_to_decimals(meta_cents),
+            "quantidade_meta": ints_to_list(quantidade_meta.values, quantidade_meta.is_null),
+            "valor_realizado": cents_to_decimals(realizado_cents),
+            "quantidade_realizada": ints_to_list(qtd_realizada),
+            "percentual_atingido": cents_to_decimals(percentual_cents),
+            "gap_meta": cents_to_decimals(realizado_cents - meta_cents),
+            "ticket_medio_realizado": cents_to_decimals(ticket_cents, qtd_realizada <= 0),
+            "meta_batida": (realizado_cents >= meta_cents).astype(np.int64).tolist(),
+            "meta_superada": (realizado_cents > meta_cents).astype(np.int64).tolist(),
+            "eh_periodo_fechado": bit_column(frame, "period_closed").tolist(),
+            "data_inclusao": data_inclusao,
+            "data_ultima_atualizacao": source_updated_at,
+            "source_updated_at": source_updated_at,
+            "source_id": ints_to_list(source_id.values),
+        }
+    )
+    records = merge_fallback_rows(rows, records, needs_fallback, transform_rows)
+    add_row_hashes(records, exclude=_HASH_EXCLUDED_COLUMNS)
+    return records, int(soft_deleted.sum())
+
+
+def upsert_rows(
+    dw_connection: Any,
+    rows: list[dict[str, Any]],
+    *,
+    load_mode: str = LOAD_MODE_MERGE,
+) -> int:
     if not rows:
         return 0
 
@@ -126,13 +262,14 @@ def upsert_rows(dw_connection: Any, rows: list[dict[str, Any]]) -> int:
         "vendedor_original_id": set(),
     }
 
+    data_ids = dim_lookup["data"].get_many(row["data_referencia"] for row in rows)
+    vendedor_ids = dim_lookup["vendedor"].get_many(row["vendedor_original_id"] for row in rows)
+
     params: list[tuple[Any, ...]] = []
-    for row in rows:
-        data_id = dim_lookup["data"].get(row["data_referencia"])
+    for row, data_id, vendedor_id in zip(rows, data_ids, vendedor_ids):
         if data_id is None:
             _remember_missing(missing_required["data_referencia"], row["data_referencia"])
 
-        vendedor_id = dim_lookup["vendedor"].get(row["vendedor_original_id"])
         if vendedor_id is None:
             _remember_missing(
                 missing_required["vendedor_original_id"],
@@ -156,22 +293,14 @@ def upsert_rows(dw_connection: Any, rows: list[dict[str, Any]]) -> int:
                 row["eh_periodo_fechado"],
                 row["data_inclusao"],
                 row["data_ultima_atualizacao"],
+                extend_row_hash(row[ROW_HASH_COLUMN], vendedor_id, data_id),
             )
         )
 
     _raise_if_missing_dimensions(missing_required)
 
-    sql = read_sql_file("upsert_fact_metas.sql")
-    cursor = dw_connection.cursor()
-    try:
-        try:
-            cursor.fast_executemany = True
-        except Exception:  # noqa: BLE001
-            pass
-        cursor.executemany(sql, params)
-    finally:
-        cursor.close()
-    return len(rows)
+    written, _ = write_upsert_params(dw_connection, "upsert_fact_metas.sql", params, load_mode=load_mode)
+    return written
 
 
 def get_batch_watermark(rows: list[dict[str, Any]]) -> tuple[datetime, int]:
@@ -181,65 +310,8 @@ def get_batch_watermark(rows: list[dict[str, Any]]) -> tuple[datetime, int]:
     return last_row["source_updated_at"], int(last_row["source_id"])
 
 
-def _get_dim_lookup_cache(dw_connection: Any) -> dict[str, dict[Any, int]]:
-    global _DIM_LOOKUP_CACHE
-
-    if _DIM_LOOKUP_CACHE is None:
-        _DIM_LOOKUP_CACHE = {
-            "data": _load_date_lookup(dw_connection),
-            "vendedor": _load_numeric_lookup(
-                dw_connection,
-                table_name="dim.DIM_VENDEDOR",
-                natural_key="vendedor_original_id",
-                surrogate_key="vendedor_id",
-            ),
-        }
-
-    return _DIM_LOOKUP_CACHE
-
-
-def _load_date_lookup(dw_connection: Any) -> dict[date, int]:
-    rows = query_all(
-        dw_connection,
-        """
-        SELECT data_completa, data_id
-        FROM dim.DIM_DATA;
-        """,
-    )
-    lookup: dict[date, int] = {}
-    for row in rows:
-        dt = _to_date(row.get("data_completa"))
-        if dt is None:
-            continue
-        lookup[dt] = int(row["data_id"])
-    return lookup
-
-
-def _load_numeric_lookup(
-    dw_connection: Any,
-    *,
-    table_name: str,
-    natural_key: str,
-    surrogate_key: str,
-) -> dict[int, int]:
-    rows = query_all(
-        dw_connection,
-        f"""
-        SELECT {natural_key}, {surrogate_key}
-        FROM {table_name};
-        """,
-    )
-    lookup: dict[int, int] = {}
-    for row in rows:
-        natural = row.get(natural_key)
-        surrogate = row.get(surrogate_key)
-        if natural is None or surrogate is None:
-            continue
-        try:
-            lookup[int(natural)] = int(surrogate)
-        except (TypeError, ValueError):
-            continue
-    return lookup
+def _get_dim_lookup_cache(dw_connection: Any) -> dict[str, KeyLookup]:
+    return KEY_CACHE.lookups(dw_connection, ("data", "vendedor"), consumer=ENTITY_NAME)
 
 
 def _remember_missing(bucket: set[Any], value: Any, limit: int = 5) -> None:
@@ -291,6 +363,10 @@ def _to_decimal(
     return _round_money(number)
 
 
+def _to_cents(value: Decimal) -> int:
+    return int(value.scaleb(2))
+
+
 def _round_money(value: Decimal) -> Decimal:
     return value.quantize(_DECIMAL_CENT, rounding=ROUND_HALF_UP)
 
@@ -2,20 +2,42 @@ from __future__ import annotations
 
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
-from typing import Any
-
-from db import query_all, read_sql_file
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+from columnar import (
+    bit_column,
+    build_records,
+    cents_to_decimals,
+    column_values,
+    int_column,
+    ints_to_list,
+    merge_fallback_rows,
+    money_column,
+    not_none_mask,
+    rows_frame,
+)
+from db import Row, query_one
+from key_cache import KEY_CACHE, KeyLookup
+from loader import LOAD_MODE_MERGE, write_upsert_params
+from row_hash import ROW_HASH_COLUMN, add_row_hashes, extend_row_hash
+from statements import STATEMENTS
+from watermark import WATERMARK_TYPE_UPDATED_AT
 
 
 ENTITY_NAME = "fact_vendas"
+# Somente `updated_at`: o watermark e o maior updated_at entre core.orders e
+# core.order_items, sem uma versao unica por linha.
+WATERMARK_TYPES = (WATERMARK_TYPE_UPDATED_AT,)
+
+# Todas as colunas de negocio entram no hash de conteudo.
+_HASH_EXCLUDED_COLUMNS: tuple[str, ...] = ()
 
 _DECIMAL_0 = Decimal("0.00")
 _DECIMAL_100 = Decimal("100.00")
 _DECIMAL_CENT = Decimal("0.01")
 
-_DIM_LOOKUP_CACHE: dict[str, dict[Any, int]] | None = None
-_DEFAULT_REGIAO_ID: int | None = None
-
 
 def extract_batch(
     oltp_connection: Any,
@@ -24,22 +46,69 @@ def extract_batch(
     watermark_id: int,
     cutoff_updated_at: datetime,
     batch_size: int,
-) -> list[dict[str, Any]]:
+) -> Iterator[Row]:
     safe_batch_size = max(1, int(batch_size))
-    sql = read_sql_file("extract_fact_vendas.sql").format(batch_size=safe_batch_size)
-    return query_all(
+    watermark_id = int(watermark_id)
+    # Parametros na ordem do texto: cada fluxo abre com o proprio TOP.
+    return STATEMENTS.stream(
         oltp_connection,
-        sql,
+        "extract_fact_vendas.sql",
         (
+            # Pagina de pedidos alterados e teste de pagina cheia.
+            safe_batch_size,
             cutoff_updated_at,
             watermark_updated_at,
             watermark_updated_at,
-            int(watermark_id),
+            watermark_id,
+            safe_batch_size,
+            # Fluxo de itens alterados.
+            safe_batch_size,
+            cutoff_updated_at,
+            watermark_updated_at,
+            watermark_updated_at,
+            watermark_id,
+            # Itens dos pedidos antes da borda.
+            watermark_updated_at,
+            watermark_id,
+            # Itens dos pedidos da borda.
+            safe_batch_size,
+            watermark_updated_at,
+            watermark_id,
+            # TOP final sobre a uniao dos fluxos.
+            safe_batch_size,
         ),
     )
 
 
-def transform_rows(raw_rows: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], int]:
+def get_backfill_id_bounds(oltp_connection: Any) -> tuple[int, int] | None:
+    """Faixa de `order_item_id` para particionar o backfill (None se vazio)."""
+    row = query_one(
+        oltp_connection,
+        "SELECT MIN(order_item_id) AS id_min, MAX(order_item_id) AS id_max FROM core.order_items;",
+    )
+    if row is None or row["id_min"] is None:
+        return None
+    return int(row["id_min"]), int(row["id_max"])
+
+
+def extract_backfill_batch(
+    oltp_connection: Any,
+    *,
+    id_from: int,
+    id_to: int,
+    cutoff_updated_at: datetime,
+    batch_size: int,
+) -> Iterator[Row]:
+    """Pagina por `order_item_id` em `(id_from, id_to]` (seek na PK), ate o cutoff."""
+    safe_batch_size = max(1, int(batch_size))
+    return STATEMENTS.stream(
+        oltp_connection,
+        "extract_fact_vendas_backfill.sql",
+        (safe_batch_size, int(id_from), int(id_to), cutoff_updated_at),
+    )
+
+
+def transform_rows(raw_rows: Iterable[Row]) -> tuple[list[dict[str, Any]], int]:
     transformed_rows: list[dict[str, Any]] = []
     soft_deleted_count = 0
 
@@ -113,10 +182,132 @@ def transform_rows(raw_rows: list[dict[str, Any]]) -> tuple[list[dict[str, Any]]
             }
         )
 
+    add_row_hashes(transformed_rows, exclude=_HASH_EXCLUDED_COLUMNS)
     return transformed_rows, soft_deleted_count
 
 
-def upsert_rows(dw_connection: Any, rows: list[dict[str, Any]]) -> int:
+def transform_rows_columnar(raw_rows: Iterable[Row]) -> tuple[list[dict[str, Any]], int]:
+    """Mesmo resultado de `transform_rows`, com valores em centavos int64 por coluna.
+
+    Linhas que o caminho vetorizado nao garante exatas (valor com mais de
+    duas casas, tipo inesperado, chave obrigatoria nula) sao recalculadas
+    por `transform_rows`, que tambem levanta os mesmos erros.
+    """
+    rows, frame = rows_frame(raw_rows)
+    if not rows:
+        return [], 0
+
+    soft_deleted = not_none_mask(frame, "order_item_deleted_at") | not_none_mask(frame, "order_deleted_at")
+
+    source_id = int_column(frame, "order_item_id", default=None, min_value=None)
+    cliente = int_column(frame, "customer_id", default=None, min_value=None)
+    produto = int_column(frame, "product_id", default=None, min_value=None)
+    regiao = int_column(frame, "resolved_region_id", default=None, min_value=1)
+    vendedor = int_column(frame, "seller_id", default=None, min_value=1)
+    quantidade = int_column(frame, "quantity", default=1, min_value=1, clamp_to_min=True)
+    devolvida = int_column(frame, "return_quantity", default=0, min_value=0, clamp_to_min=True)
+
+    preco = money_column(frame, "unit_price", default=_DECIMAL_0, min_value=_DECIMAL_0)
+    bruto = money_column(frame, "gross_amount", default=None, min_value=_DECIMAL_0)
+    descontos = money_column(frame, "discount_amount", default=_DECIMAL_0, min_value=_DECIMAL_0)
+    custo = money_column(frame, "cost_amount", default=_DECIMAL_0, min_value=_DECIMAL_0)
+    devolvido = money_column(frame, "returned_amount", default=_DECIMAL_0, min_value=_DECIMAL_0)
+    comissao_pct = money_column(
+        frame,
+        "commission_percent",
+        default=None,
+        min_value=_DECIMAL_0,
+        max_value=_DECIMAL_100,
+    )
+    comissao = money_column(frame, "commission_amount", default=None, min_value=_DECIMAL_0)
+
+    quantidade_vendida = quantidade.values
+    max_preco_seguro = np.iinfo(np.int64).max // np.maximum(quantidade_vendida, 1)
+    bruto_cents = np.where(bruto.is_null, preco.cents * quantidade_vendida, bruto.cents)
+    descontos_cents = np.minimum(descontos.cents, bruto_cents)
+    liquido_cents = np.maximum(bruto_cents - descontos_cents, 0)
+    quantidade_devolvida = np.minimum(devolvida.values, quantidade_vendida)
+    teve_desconto = (bit_column(frame, "had_discount") == 1) | (descontos_cents > 0)
+
+    needs_fallback = (
+        source_id.needs_fallback
+        | source_id.is_null
+        | cliente.needs_fallback
+        | cliente.is_null
+        | produto.needs_fallback
+        | produto.is_null
+        | regiao.needs_fallback
+        | vendedor.needs_fallback
+        | quantidade.needs_fallback
+        | devolvida.needs_fallback
+        | preco.needs_fallback
+        | bruto.needs_fallback
+        | descontos.needs_fallback
+        | custo.needs_fallback
+        | devolvido.needs_fallback
+        | comissao_pct.needs_fallback
+        | comissao.needs_fallback
+        | (bruto.is_null & (preco.cents > max_preco_seguro))
+    )
+
+    data_referencia = [
+        _to_date(order_date) or _to_date(created_at) or date(1900, 1, 1)
+        for order_date, created_at in zip(
+            column_values(frame, "order_date"),
+            column_values(frame, "order_item_created_at"),
+        )
+    ]
+    source_updated_at = [
+        _to_datetime(updated_at, fallback=item_updated_at)
+        for updated_at, item_updated_at in zip(
+            column_values(frame, "source_updated_at"),
+            column_values(frame, "order_item_updated_at"),
+        )
+    ]
+    numero_pedido = [
+        _clean_text(order_number, default=f"ORD-{order_id}", max_len=20)
+        for order_number, order_id in zip(
+            column_values(frame, "order_number"),
+            column_values(frame, "order_id"),
+        )
+    ]
+    source_ids = ints_to_list(source_id.values)
+
+    records = build_records(
+        {
+            "venda_original_id": source_ids,
+            "data_referencia": data_referencia,
+            "cliente_original_id": ints_to_list(cliente.values),
+            "produto_original_id": ints_to_list(produto.values),
+            "regiao_original_id": ints_to_list(regiao.values, regiao.is_null),
+            "vendedor_original_id": ints_to_list(vendedor.values, vendedor.is_null),
+            "quantidade_vendida": ints_to_list(quantidade_vendida),
+            "preco_unitario_tabela": cents_to_decimals(preco.cents),
+            "valor_total_bruto": cents_to_decimals(bruto_cents),
+            "valor_total_descontos": cents_to_decimals(descontos_cents),
+            "valor_total_liquido": cents_to_decimals(liquido_cents),
+            "custo_total": cents_to_decimals(custo.cents),
+            "quantidade_devolvida": ints_to_list(quantidade_devolvida),
+            "valor_devolvido": cents_to_decimals(devolvido.cents),
+            "percentual_comissao": cents_to_decimals(comissao_pct.cents, comissao_pct.is_null),
+            "valor_comissao": cents_to_decimals(comissao.cents, comissao.is_null),
+            "numero_pedido": numero_pedido,
+            "teve_desconto": teve_desconto.astype(np.int64).tolist(),
+            "source_updated_at": source_updated_at,
+            "source_id": source_ids,
+        }
+    )
+    records = merge_fallback_rows(rows, records, needs_fallback, transform_rows)
+    add_row_hashes(records, exclude=_HASH_EXCLUDED_COLUMNS)
+    return records, int(soft_deleted.sum())
+
+
+def upsert_rows(
+    dw_connection: Any,
+    rows: list[dict[str, Any]],
+    *,
+    load_mode: str = LOAD_MODE_MERGE,
+) -> int:
     if not rows:
         return 0
 
@@ -129,33 +320,33 @@ def upsert_rows(dw_connection: Any, rows: list[dict[str, Any]]) -> int:
     }
     vendedores_sem_lookup = 0
 
+    # Lookups em lote (busca vetorizada no IntKeyMap) antes do loop por linha.
+    data_ids = dim_lookup["data"].get_many(row["data_referencia"] for row in rows)
+    cliente_ids = dim_lookup["cliente"].get_many(row["cliente_original_id"] for row in rows)
+    produto_ids = dim_lookup["produto"].get_many(row["produto_original_id"] for row in rows)
+    regiao_ids = dim_lookup["regiao"].get_many(row.get("regiao_original_id") for row in rows)
+    vendedor_ids = dim_lookup["vendedor"].get_many(row.get("vendedor_original_id") for row in rows)
+
     params: list[tuple[Any, ...]] = []
-    for row in rows:
-        data_id = dim_lookup["data"].get(row["data_referencia"])
+    for row, data_id, cliente_id, produto_id, regiao_id, vendedor_id in zip(
+        rows, data_ids, cliente_ids, produto_ids, regiao_ids, vendedor_ids
+    ):
         if data_id is None:
             _remember_missing(missing_required["data_referencia"], row["data_referencia"])
 
-        cliente_id = dim_lookup["cliente"].get(row["cliente_original_id"])
         if cliente_id is None:
             _remember_missing(missing_required["cliente_original_id"], row["cliente_original_id"])
 
-        produto_id = dim_lookup["produto"].get(row["produto_original_id"])
         if produto_id is None:
             _remember_missing(missing_required["produto_original_id"], row["produto_original_id"])
 
         regiao_original_id = row.get("regiao_original_id")
-        regiao_id = dim_lookup["regiao"].get(regiao_original_id) if regiao_original_id is not None else None
         if regiao_id is None:
             if regiao_original_id is not None:
                 _remember_missing(missing_required["regiao_original_id"], regiao_original_id)
             regiao_id = default_regiao_id
 
         vendedor_original_id = row.get("vendedor_original_id")
-        vendedor_id = (
-            dim_lookup["vendedor"].get(vendedor_original_id)
-            if vendedor_original_id is not None
-            else None
-        )
         if vendedor_original_id is not None and vendedor_id is None:
             vendedores_sem_lookup += 1
 
@@ -179,6 +370,7 @@ def upsert_rows(dw_connection: Any, rows: list[dict[str, Any]]) -> int:
                 row["valor_comissao"],
                 row["numero_pedido"],
                 row["teve_desconto"],
+                extend_row_hash(row[ROW_HASH_COLUMN], data_id, cliente_id, produto_id, regiao_id, vendedor_id),
             )
         )
 
@@ -191,17 +383,8 @@ def upsert_rows(dw_connection: Any, rows: list[dict[str, Any]]) -> int:
             "vendedor_id gravado como NULL."
         )
 
-    sql = read_sql_file("upsert_fact_vendas.sql")
-    cursor = dw_connection.cursor()
-    try:
-        try:
-            cursor.fast_executemany = True
-        except Exception:  # noqa: BLE001
-            pass
-        cursor.executemany(sql, params)
-    finally:
-        cursor.close()
-    return len(rows)
+    written, _ = write_upsert_params(dw_connection, "upsert_fact_vendas.sql", params, load_mode=load_mode)
+    return written
 
 
 def get_batch_watermark(rows: list[dict[str, Any]]) -> tuple[datetime, int]:
@@ -211,92 +394,18 @@ def get_batch_watermark(rows: list[dict[str, Any]]) -> tuple[datetime, int]:
     return last_row["source_updated_at"], int(last_row["source_id"])
 
 
-def _get_dim_lookup_cache(dw_connection: Any) -> tuple[dict[str, dict[Any, int]], int]:
-    global _DIM_LOOKUP_CACHE
-    global _DEFAULT_REGIAO_ID
-
-    if _DIM_LOOKUP_CACHE is None:
-        _DIM_LOOKUP_CACHE = {
-            "data": _load_date_lookup(dw_connection),
-            "cliente": _load_numeric_lookup(
-                dw_connection,
-                table_name="dim.DIM_CLIENTE",
-                natural_key="cliente_original_id",
-                surrogate_key="cliente_id",
-            ),
-            "produto": _load_numeric_lookup(
-                dw_connection,
-                table_name="dim.DIM_PRODUTO",
-                natural_key="produto_original_id",
-                surrogate_key="produto_id",
-            ),
-            "regiao": _load_numeric_lookup(
-                dw_connection,
-                table_name="dim.DIM_REGIAO",
-                natural_key="regiao_original_id",
-                surrogate_key="regiao_id",
-            ),
-            "vendedor": _load_numeric_lookup(
-                dw_connection,
-                table_name="dim.DIM_VENDEDOR",
-                natural_key="vendedor_original_id",
-                surrogate_key="vendedor_id",
-            ),
-        }
-
-        regiao_values = list(_DIM_LOOKUP_CACHE["regiao"].values())
-        if not regiao_values:
-            raise RuntimeError("DIM_REGIAO sem registros. Nao e possivel carregar FACT_VENDAS.")
-        _DEFAULT_REGIAO_ID = min(regiao_values)
-
-    if _DEFAULT_REGIAO_ID is None:
-        raise RuntimeError("Nao foi possivel resolver regiao padrao para FACT_VENDAS.")
-
-    return _DIM_LOOKUP_CACHE, _DEFAULT_REGIAO_ID
-
-
-def _load_date_lookup(dw_connection: Any) -> dict[date, int]:
-    rows = query_all(
+def _get_dim_lookup_cache(dw_connection: Any) -> tuple[dict[str, KeyLookup], int]:
+    dim_lookup = KEY_CACHE.lookups(
         dw_connection,
-        """
-        SELECT data_completa, data_id
-        FROM dim.DIM_DATA;
-        """,
+        ("data", "cliente", "produto", "regiao", "vendedor"),
+        consumer=ENTITY_NAME,
     )
-    lookup: dict[date, int] = {}
-    for row in rows:
-        dt = _to_date(row.get("data_completa"))
-        if dt is None:
-            continue
-        lookup[dt] = int(row["data_id"])
-    return lookup
 
+    regiao_values = list(dim_lookup["regiao"].values())
+    if not regiao_values:
+        raise RuntimeError("DIM_REGIAO sem registros. Nao e possivel carregar FACT_VENDAS.")
 
-def _load_numeric_lookup(
-    dw_connection: Any,
-    *,
-    table_name: str,
-    natural_key: str,
-    surrogate_key: str,
-) -> dict[int, int]:
-    rows = query_all(
-        dw_connection,
-        f"""
-        SELECT {natural_key}, {surrogate_key}
-        FROM {table_name};
-        """,
-    )
-    lookup: dict[int, int] = {}
-    for row in rows:
-        natural = row.get(natural_key)
-        surrogate = row.get(surrogate_key)
-        if natural is None or surrogate is None:
-            continue
-        try:
-            lookup[int(natural)] = int(surrogate)
-        except (TypeError, ValueError):
-            continue
-    return lookup
+    return dim_lookup, min(regiao_values)
 
 
 def _remember_missing(bucket: set[Any], value: Any, limit: int = 5) -> None:
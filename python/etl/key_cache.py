@@ -0,0 +1,481 @@
+from __future__ import annotations
+
+import gzip
+import json
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+from db import query_one, stream_query
+from key_maps import MISSING, IntKeyMap
+
+
+CACHE_FORMAT_VERSION = 2
+
+# Linhas acumuladas em listas Python antes de virarem arrays NumPy durante a
+# carga de um lookup (limita o pico de memoria da carga inicial).
+_LOAD_CHUNK_ROWS = 100_000
+
+_DECIMAL_0 = Decimal("0.00")
+_DECIMAL_CENT = Decimal("0.01")
+_MIN_DATETIME = datetime(1900, 1, 1)
+_MIN_SURROGATE = -(2**63)
+
+# Margem para releitura por data_atualizacao: cobre transacoes que gravaram
+# GETDATE() antes do ultimo refresh mas so comitaram depois dele.
+_UPDATED_AT_SAFETY_WINDOW = timedelta(minutes=2)
+
+_REFRESH_BY_SURROGATE = "surrogate"
+_REFRESH_BY_UPDATED_AT = "updated_at"
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+@dataclass(frozen=True)
+class LookupSpec:
+    """Definicao de um lookup.
+
+    `parse_row` devolve `(chave_int, valor_int_ou_tupla, marcador)` ja no
+    formato do `IntKeyMap`; `encode_key` converte a chave natural usada
+    pelos loaders (ex.: `date`) para o inteiro armazenado e `decode_value`
+    faz o caminho inverso do valor.
+    """
+
+    name: str
+    source_entity: str | None
+    sql: str
+    refresh_by: str
+    parse_row: Callable[[Any], tuple[int, Any, Any] | None]
+    count_sql: str
+    encode_key: Callable[[Any], int] = int
+    decode_value: Callable[[Any], Any] = _identity
+    value_width: int = 1
+
+
+@dataclass
+class _LookupState:
+    values: IntKeyMap
+    marker: Any = None
+    stale: bool = True
+    validated: bool = True
+
+
+@dataclass
+class KeyCacheStats:
+    hits: int = 0
+    misses: int = 0
+    refreshes: int = 0
+
+
+class KeyLookup:
+    """Visao de um lookup do cache que contabiliza hits/misses por consumidor.
+
+    Chaves `None` retornam `None` sem contar como miss (FK opcional). Os
+    contadores sao compartilhados pelas threads do mesmo consumidor (workers
+    da carga em paralelo) e so mudam sob o lock do cache.
+    """
+
+    __slots__ = ("_values", "_spec", "_stats", "_lock")
+
+    def __init__(self, values: IntKeyMap, spec: LookupSpec, stats: KeyCacheStats, lock: Any):
+        self._values = values
+        self._spec = spec
+        self._stats = stats
+        self._lock = lock
+
+    def get(self, natural_key: Any) -> Any:
+        if natural_key is None:
+            return None
+        try:
+            encoded = self._spec.encode_key(natural_key)
+        except (TypeError, ValueError, AttributeError, OverflowError):
+            encoded = None
+        value = self._values.get(encoded) if encoded is not None else None
+        with self._lock:
+            if value is None:
+                self._stats.misses += 1
+            else:
+                self._stats.hits += 1
+        if value is None:
+            return None
+        return self._spec.decode_value(value)
+
+    def get_many(self, natural_keys: Iterable[Any]) -> list[Any]:
+        """Busca em lote (vetorizada no `IntKeyMap`), na ordem de entrada."""
+        naturals = list(natural_keys)
+        encoded = np.full(len(naturals), MISSING, dtype=np.int64)
+        asked = np.zeros(len(naturals), dtype=bool)
+        for index, natural in enumerate(naturals):
+            if natural is None:
+                continue
+            asked[index] = True
+            try:
+                encoded[index] = self._spec.encode_key(natural)
+            except (TypeError, ValueError, AttributeError, OverflowError):
+                continue
+
+        rows = self._values.get_many(encoded)
+        found = asked & (rows[:, 0] != MISSING)
+        hits = int(found.sum())
+        with self._lock:
+            self._stats.hits += hits
+            self._stats.misses += int(asked.sum()) - hits
+
+        decode = self._spec.decode_value
+        if self._values.width == 1:
+            raw_values = rows[:, 0].tolist()
+        else:
+            raw_values = [tuple(row) for row in rows.tolist()]
+        return [
+            decode(value) if is_found else None
+            for value, is_found in zip(raw_values, found.tolist())
+        ]
+
+    def values(self) -> list[Any]:
+        rows = self._values.values()
+        if self._values.width == 1:
+            return [self._spec.decode_value(value) for value in rows[:, 0].tolist()]
+        return [self._spec.decode_value(tuple(row)) for row in rows.tolist()]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class SurrogateKeyCache:
+    """Cache de chaves surrogate compartilhado pelos loaders de fato.
+
+    - Cada lookup e carregado uma unica vez por processo e reutilizado por
+      todas as entidades (inclusive entre workers do `--parallelism`).
+    - `notify_loaded(entity)` marca como desatualizados os lookups alimentados
+      pela entidade; o proximo acesso faz refresh incremental: pela maior
+      surrogate ja vista (dimensoes com IDENTITY, mapeamento imutavel) ou por
+      `data_atualizacao` (FACT_VENDAS, cujo `custo_total` muda em updates).
+    - `save`/`load` persistem o cache em disco entre execucoes; um cache lido
+      do disco e validado contra a contagem do DW no primeiro acesso e
+      recarregado por completo se divergir.
+    """
+
+    def __init__(self, specs: Iterable[LookupSpec]):
+        self._specs = {spec.name: spec for spec in specs}
+        self._states: dict[str, _LookupState] = {}
+        self._stats: dict[str, KeyCacheStats] = {}
+        self._lock = threading.RLock()
+
+    def lookups(
+        self,
+        dw_connection: Any,
+        names: Iterable[str],
+        *,
+        consumer: str,
+    ) -> dict[str, KeyLookup]:
+        with self._lock:
+            stats = self._stats.setdefault(consumer, KeyCacheStats())
+            result: dict[str, KeyLookup] = {}
+            for name in names:
+                state = self._ensure_fresh(dw_connection, name, stats)
+                result[name] = KeyLookup(state.values, self._specs[name], stats, self._lock)
+            return result
+
+    def notify_loaded(self, entity_name: str) -> None:
+        with self._lock:
+            for spec in self._specs.values():
+                if spec.source_entity == entity_name and spec.name in self._states:
+                    self._states[spec.name].stale = True
+
+    def pop_stats(self, consumer: str) -> KeyCacheStats:
+        with self._lock:
+            return self._stats.pop(consumer, KeyCacheStats())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+            self._stats.clear()
+
+    def save(self, path: str | Path) -> None:
+        with self._lock:
+            lookups: dict[str, Any] = {}
+            for name, state in self._states.items():
+                entries = list(state.values.items())
+                lookups[name] = {
+                    "marker": _encode_scalar(state.marker),
+                    "keys": [key for key, _ in entries],
+                    "values": [list(value) for _, value in entries],
+                }
+        payload = {"version": CACHE_FORMAT_VERSION, "lookups": lookups}
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_suffix(target.suffix + ".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as handle:
+            json.dump(payload, handle, separators=(",", ":"))
+        tmp_path.replace(target)
+
+    def load(self, path: str | Path, *, trusted: bool = False) -> bool:
+        """Le o cache salvo por `save`; devolve False se o arquivo nao existir ou for invalido.
+
+        Com `trusted=True` os lookups lidos sao usados como estao, sem refresh
+        nem validacao contra o DW (replay de lotes gravados, sem conexao).
+        """
+        source = Path(path)
+        if not source.exists():
+            return False
+        try:
+            with gzip.open(source, "rt", encoding="utf-8") as handle:
+                payload = json.load(handle)
+        except (OSError, ValueError):
+            return False
+        if payload.get("version") != CACHE_FORMAT_VERSION:
+            return False
+
+        with self._lock:
+            for name, data in payload.get("lookups", {}).items():
+                spec = self._specs.get(name)
+                if spec is None:
+                    continue
+                values = IntKeyMap(width=spec.value_width)
+                values.update(data.get("keys", []), data.get("values", []))
+                self._states[name] = _LookupState(
+                    values=values,
+                    marker=_decode_scalar(data.get("marker")),
+                    stale=not trusted,
+                    validated=trusted,
+                )
+        return True
+
+    def _ensure_fresh(self, dw_connection: Any, name: str, stats: KeyCacheStats) -> _LookupState:
+        spec = self._specs.get(name)
+        if spec is None:
+            raise ValueError(f"Lookup '{name}' nao registrado no cache de chaves.")
+
+        state = self._states.get(name)
+        if state is None:
+            state = _LookupState(values=IntKeyMap(width=spec.value_width), marker=_initial_marker(spec))
+            self._load_rows(dw_connection, spec, state)
+            self._states[name] = state
+            stats.refreshes += 1
+            return state
+
+        if state.stale:
+            self._load_rows(dw_connection, spec, state)
+            stats.refreshes += 1
+            if not state.validated:
+                if not self._matches_dw_count(dw_connection, spec, state):
+                    state.values.clear()
+                    state.marker = _initial_marker(spec)
+                    self._load_rows(dw_connection, spec, state)
+                state.validated = True
+        return state
+
+    def _load_rows(self, dw_connection: Any, spec: LookupSpec, state: _LookupState) -> None:
+        marker = state.marker
+        param = marker
+        if spec.refresh_by == _REFRESH_BY_UPDATED_AT and marker > _MIN_DATETIME:
+            param = marker - _UPDATED_AT_SAFETY_WINDOW
+
+        key_chunks: list[np.ndarray] = []
+        value_chunks: list[np.ndarray] = []
+        keys: list[int] = []
+        values: list[Any] = []
+
+        def _flush() -> None:
+            if keys:
+                key_chunks.append(np.asarray(keys, dtype=np.int64))
+                value_chunks.append(np.asarray(values, dtype=np.int64).reshape(len(keys), spec.value_width))
+                keys.clear()
+                values.clear()
+
+        for row in stream_query(dw_connection, spec.sql, (param,), fetch_size=10000):
+            parsed = spec.parse_row(row)
+            if parsed is None:
+                continue
+            key, value, row_marker = parsed
+            keys.append(key)
+            values.append(value)
+            if row_marker is not None and row_marker > marker:
+                marker = row_marker
+            if len(keys) >= _LOAD_CHUNK_ROWS:
+                _flush()
+        _flush()
+
+        if key_chunks:
+            state.values.update(np.concatenate(key_chunks), np.concatenate(value_chunks))
+        state.marker = marker
+        state.stale = False
+
+    @staticmethod
+    def _matches_dw_count(dw_connection: Any, spec: LookupSpec, state: _LookupState) -> bool:
+        row = query_one(dw_connection, spec.count_sql)
+        if row is None:
+            return False
+        return int(row["total"] or 0) == len(state.values)
+
+
+def _initial_marker(spec: LookupSpec) -> Any:
+    return _MIN_DATETIME if spec.refresh_by == _REFRESH_BY_UPDATED_AT else _MIN_SURROGATE
+
+
+def _numeric_spec(
+    name: str,
+    *,
+    source_entity: str,
+    table_name: str,
+    natural_key: str,
+    surrogate_key: str,
+) -> LookupSpec:
+    def _parse(row: Any) -> tuple[int, int, int] | None:
+        natural = row.get(natural_key)
+        surrogate = row.get(surrogate_key)
+        if natural is None or surrogate is None:
+            return None
+        try:
+            surrogate_int = int(surrogate)
+            return int(natural), surrogate_int, surrogate_int
+        except (TypeError, ValueError):
+            return None
+
+    return LookupSpec(
+        name=name,
+        source_entity=source_entity,
+        sql=f"""
+        SELECT {natural_key}, {surrogate_key}
+        FROM {table_name}
+        WHERE {surrogate_key} > ?;
+        """,
+        refresh_by=_REFRESH_BY_SURROGATE,
+        parse_row=_parse,
+        count_sql=f"SELECT COUNT(*) AS total FROM {table_name} WHERE {natural_key} IS NOT NULL;",
+    )
+
+
+def _date_key(value: Any) -> int:
+    if isinstance(value, datetime):
+        value = value.date()
+    if not isinstance(value, date):
+        raise TypeError("Chave de DIM_DATA deve ser date.")
+    return value.toordinal()
+
+
+def _parse_date_row(row: Any) -> tuple[int, int, int] | None:
+    value = row.get("data_completa")
+    if not isinstance(value, date) or row.get("data_id") is None:
+        return None
+    data_id = int(row["data_id"])
+    return _date_key(value), data_id, data_id
+
+
+def _parse_sale_row(row: Any) -> tuple[int, tuple[int, int], datetime | None] | None:
+    venda_original_id = row.get("venda_original_id")
+    venda_id = row.get("venda_id")
+    if venda_original_id is None or venda_id is None:
+        return None
+    try:
+        key = int(venda_original_id)
+        value = (int(venda_id), _to_cents(row.get("custo_total")))
+    except (TypeError, ValueError):
+        return None
+    updated_at = row.get("data_atualizacao")
+    return key, value, updated_at if isinstance(updated_at, datetime) else None
+
+
+def _decode_sale_value(value: tuple[int, int]) -> tuple[int, Decimal]:
+    venda_id, custo_total_cents = value
+    return venda_id, Decimal(custo_total_cents).scaleb(-2)
+
+
+def _to_cents(value: Any) -> int:
+    # custo_total fica em centavos inteiros para caber no IntKeyMap.
+    if value is None:
+        return 0
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, ValueError, TypeError):
+        return 0
+    if number < _DECIMAL_0:
+        return 0
+    return int(number.quantize(_DECIMAL_CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def _encode_scalar(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_scalar(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+LOOKUP_SPECS = (
+    LookupSpec(
+        name="data",
+        source_entity=None,
+        sql="""
+        SELECT data_completa, data_id
+        FROM dim.DIM_DATA
+        WHERE data_id > ?;
+        """,
+        refresh_by=_REFRESH_BY_SURROGATE,
+        parse_row=_parse_date_row,
+        count_sql="SELECT COUNT(*) AS total FROM dim.DIM_DATA WHERE data_completa IS NOT NULL;",
+        encode_key=_date_key,
+    ),
+    _numeric_spec(
+        "cliente",
+        source_entity="dim_cliente",
+        table_name="dim.DIM_CLIENTE",
+        natural_key="cliente_original_id",
+        surrogate_key="cliente_id",
+    ),
+    _numeric_spec(
+        "produto",
+        source_entity="dim_produto",
+        table_name="dim.DIM_PRODUTO",
+        natural_key="produto_original_id",
+        surrogate_key="produto_id",
+    ),
+    _numeric_spec(
+        "regiao",
+        source_entity="dim_regiao",
+        table_name="dim.DIM_REGIAO",
+        natural_key="regiao_original_id",
+        surrogate_key="regiao_id",
+    ),
+    _numeric_spec(
+        "vendedor",
+        source_entity="dim_vendedor",
+        table_name="dim.DIM_VENDEDOR",
+        natural_key="vendedor_original_id",
+        surrogate_key="vendedor_id",
+    ),
+    _numeric_spec(
+        "desconto",
+        source_entity="dim_desconto",
+        table_name="dim.DIM_DESCONTO",
+        natural_key="desconto_original_id",
+        surrogate_key="desconto_id",
+    ),
+    LookupSpec(
+        name="venda",
+        source_entity="fact_vendas",
+        sql="""
+        SELECT venda_original_id, venda_id, custo_total, data_atualizacao
+        FROM fact.FACT_VENDAS
+        WHERE data_atualizacao >= ?;
+        """,
+        refresh_by=_REFRESH_BY_UPDATED_AT,
+        parse_row=_parse_sale_row,
+        count_sql="SELECT COUNT(*) AS total FROM fact.FACT_VENDAS;",
+        decode_value=_decode_sale_value,
+        value_width=2,
+    ),
+)
+
+KEY_CACHE = SurrogateKeyCache(LOOKUP_SPECS)
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+
+MISSING = np.iinfo(np.int64).min
+
+# Acima desta razao (amplitude das chaves / quantidade) o vetor denso
+# desperdicaria mais memoria do que os arrays ordenados.
+DENSE_MAX_SPAN_RATIO = 1.5
+
+
+class IntKeyMap:
+    """Mapa compacto de chave inteira para uma ou mais colunas inteiras.
+
+    Substitui `dict[int, int]` nos lookups de chave surrogate:
+    - modo ordenado: `keys` (int64 ordenado) + `values` (n x largura), busca
+      por `np.searchsorted` (16 bytes por entrada com largura 1);
+    - modo denso: quando as chaves naturais sao quase contiguas, `values`
+      vira um vetor indexado por `chave - base` (8 bytes por posicao).
+
+    `MISSING` marca posicoes vazias no modo denso e ausencias em
+    `get_many`; por isso a primeira coluna de valor nunca pode assumir esse
+    valor (surrogates IDENTITY sao sempre positivas).
+    """
+
+    __slots__ = ("_width", "_state")
+
+    def __init__(self, *, width: int = 1):
+        if width < 1:
+            raise ValueError("width deve ser >= 1.")
+        self._width = width
+        # (base densa ou None, keys, values, tamanho): trocado numa unica
+        # atribuicao para leitores em outras threads nunca verem estado misto.
+        self._state: tuple[int | None, np.ndarray, np.ndarray, int] = (
+            None,
+            np.empty(0, dtype=np.int64),
+            np.empty((0, width), dtype=np.int64),
+            0,
+        )
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def is_dense(self) -> bool:
+        return self._state[0] is not None
+
+    @property
+    def nbytes(self) -> int:
+        _, keys, values, _ = self._state
+        return int(keys.nbytes + values.nbytes)
+
+    def __len__(self) -> int:
+        return self._state[3]
+
+    def update(self, keys: Iterable[int], values: Iterable[Any]) -> None:
+        """Insere ou substitui entradas em lote (a ultima ocorrencia vence).
+
+        So o lote novo e ordenado; o mapa ja ordenado recebe o lote por
+        `np.searchsorted` (substituicao e insercao em O(n + k)). Chaves todas
+        acima da maior atual, o caso comum de surrogates crescentes, apenas
+        sao acrescentadas ao final.
+        """
+        new_keys = _as_int64(keys)
+        new_values = _as_int64(values).reshape(len(new_keys), self._width)
+        if len(new_keys) == 0:
+            return
+
+        # Ordenacao estavel + ultima ocorrencia de cada chave do lote.
+        order = np.argsort(new_keys, kind="stable")
+        delta_keys = new_keys[order]
+        last_of_run = np.append(delta_keys[1:] != delta_keys[:-1], True)
+        delta_keys = delta_keys[last_of_run]
+        delta_values = new_values[order][last_of_run]
+
+        old_keys, old_values = _sorted_arrays(self._state)
+        if len(old_keys) == 0 or delta_keys[0] > old_keys[-1]:
+            self._store(np.concatenate([old_keys, delta_keys]), np.concatenate([old_values, delta_values]))
+            return
+
+        positions = np.searchsorted(old_keys, delta_keys)
+        existing = positions < len(old_keys)
+        existing[existing] = old_keys[positions[existing]] == delta_keys[existing]
+        merged_values = old_values.copy()
+        merged_values[positions[existing]] = delta_values[existing]
+        inserted = ~existing
+        self._store(
+            np.insert(old_keys, positions[inserted], delta_keys[inserted]),
+            np.insert(merged_values, positions[inserted], delta_values[inserted], axis=0),
+        )
+
+    def get(self, key: int) -> int | tuple[int, ...] | None:
+        dense_base, keys, values, size = self._state
+        if size == 0:
+            return None
+        if dense_base is not None:
+            offset = key - dense_base
+            if not 0 <= offset < len(values):
+                return None
+        else:
+            offset = int(np.searchsorted(keys, key))
+            if offset >= size or keys[offset] != key:
+                return None
+
+        row = values[offset]
+        if row[0] == MISSING:
+            return None
+        if self._width == 1:
+            return int(row[0])
+        return tuple(int(item) for item in row)
+
+    def get_many(self, keys: Iterable[int]) -> np.ndarray:
+        """Busca vetorizada; retorna matriz (n x largura) com `MISSING` nas ausencias."""
+        dense_base, map_keys, values, size = self._state
+        lookup_keys = _as_int64(keys)
+        result = np.full((len(lookup_keys), self._width), MISSING, dtype=np.int64)
+        if size == 0 or len(lookup_keys) == 0:
+            return result
+
+        if dense_base is not None:
+            offsets = lookup_keys - dense_base
+            inside = (offsets >= 0) & (offsets < len(values))
+            result[inside] = values[offsets[inside]]
+            return result
+
+        positions = np.minimum(np.searchsorted(map_keys, lookup_keys), size - 1)
+        found = map_keys[positions] == lookup_keys
+        result[found] = values[positions[found]]
+        return result
+
+    def items(self) -> Iterator[tuple[int, tuple[int, ...]]]:
+        keys, values = _sorted_arrays(self._state)
+        for key, row in zip(keys.tolist(), values.tolist()):
+            yield key, tuple(row)
+
+    def values(self) -> np.ndarray:
+        return _sorted_arrays(self._state)[1]
+
+    def clear(self) -> None:
+        self._store(np.empty(0, dtype=np.int64), np.empty((0, self._width), dtype=np.int64))
+
+    def _store(self, keys: np.ndarray, values: np.ndarray) -> None:
+        size = len(keys)
+        span = int(keys[-1]) - int(keys[0]) + 1 if size else 0
+        if size and span <= size * DENSE_MAX_SPAN_RATIO:
+            dense = np.full((span, self._width), MISSING, dtype=np.int64)
+            dense[keys - keys[0]] = values
+            self._state = (int(keys[0]), np.empty(0, dtype=np.int64), dense, size)
+            return
+        self._state = (None, np.ascontiguousarray(keys), np.ascontiguousarray(values), size)
+
+
+def _as_int64(values: Iterable[Any]) -> np.ndarray:
+    if isinstance(values, np.ndarray):
+        return values.astype(np.int64, copy=False)
+    return np.asarray(list(values), dtype=np.int64)
+
+
+def _sorted_arrays(state: tuple[int | None, np.ndarray, np.ndarray, int]) -> tuple[np.ndarray, np.ndarray]:
+    dense_base, keys, values, _ = state
+    if dense_base is None:
+        return keys, values
+    present = values[:, 0] != MISSING
+    return np.flatnonzero(present).astype(np.int64) + dense_base, values[present]
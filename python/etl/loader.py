@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Sequence
+
+from row_hash import ROW_HASH_COLUMN
+from statements import STATEMENTS
+
+
+LOAD_MODE_MERGE = "merge"
+LOAD_MODE_BULK = "bulk"
+LOAD_MODES = (LOAD_MODE_MERGE, LOAD_MODE_BULK)
+
+_STAGING_SEQ_COLUMN = "_stg_seq"
+# Limite de 2100 parametros por comando no SQL Server.
+_HASH_LOOKUP_CHUNK = 1000
+
+_MERGE_TARGET_RE = re.compile(r"MERGE\s+(?P<table>[\w.\[\]]+)\s+AS\s+target", re.IGNORECASE)
+_USING_SELECT_RE = re.compile(
+    r"USING\s*\(\s*SELECT\s+(?P<select>.*?)\)\s*AS\s+source",
+    re.IGNORECASE | re.DOTALL,
+)
+_PARAM_ALIAS_RE = re.compile(r"\?\s+AS\s+(\w+)", re.IGNORECASE)
+_MERGE_ON_RE = re.compile(r"AS\s+source\s+ON\s+(?P<on>.*?)\s+WHEN\s", re.IGNORECASE | re.DOTALL)
+_KEY_PAIR_RE = re.compile(r"target\.(\w+)\s*=\s*source\.(\w+)", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class StagedMerge:
+    target_table: str
+    staging_table: str
+    columns: tuple[str, ...]
+    key_columns: tuple[str, ...]
+    create_staging_sql: str
+    insert_staging_sql: str
+    merge_sql: str
+    drop_staging_sql: str
+    target_key_columns: tuple[str, ...] = ()
+    # Preenchidos quando o MERGE recebe `? AS row_hash` (deteccao de mudanca).
+    hash_position: int | None = None
+    count_unchanged_sql: str | None = None
+
+
+def normalize_load_mode(value: Any) -> str:
+    text = str(value or "").strip().lower()
+    if text in LOAD_MODES:
+        return text
+    return LOAD_MODE_MERGE
+
+
+def write_upsert_params(
+    dw_connection: Any,
+    upsert_sql_file: str,
+    params: Sequence[tuple[Any, ...]],
+    *,
+    load_mode: str = LOAD_MODE_MERGE,
+) -> tuple[int, int]:
+    """Grava os parametros de upsert no DW pelo modo de carga escolhido.
+
+    - `merge`: executa o MERGE de linha unica do arquivo via `executemany`
+      (um MERGE por linha no SQL Server);
+    - `bulk`: insere o lote em tabela temporaria de sessao com
+      `fast_executemany` e executa um unico MERGE set-based derivado do
+      mesmo arquivo.
+
+    Se o MERGE recebe `row_hash`, linhas com hash igual ao gravado nao sao
+    reescritas: no modo `merge` nem sao enviadas (os hashes do alvo sao lidos
+    antes, em lote); no `bulk` o proprio MERGE as ignora.
+
+    Retorna `(gravadas, inalteradas)`; as duas somam `len(params)`.
+    """
+    if not params:
+        return 0, 0
+
+    staged = _staged_merge_for(upsert_sql_file)
+    if normalize_load_mode(load_mode) == LOAD_MODE_BULK:
+        started = time.perf_counter()
+        unchanged_count = _write_bulk(dw_connection, upsert_sql_file, params)
+        STATEMENTS.record(upsert_sql_file, time.perf_counter() - started)
+        return len(params) - unchanged_count, unchanged_count
+
+    sql = STATEMENTS.get(upsert_sql_file).sql
+    unchanged_count = 0
+    cursor = dw_connection.cursor()
+    try:
+        if staged.hash_position is not None:
+            changed, unchanged_count = _drop_unchanged(cursor, staged, params)
+            if not changed:
+                return len(params) - unchanged_count, unchanged_count
+        else:
+            changed = list(params)
+        # Reduz roundtrips no SQL Server para lotes grandes.
+        try:
+            cursor.fast_executemany = True
+        except Exception:  # noqa: BLE001
+            pass
+        started = time.perf_counter()
+        cursor.executemany(sql, changed)
+        # Um MERGE por linha: conta uma execucao por linha enviada.
+        STATEMENTS.record(upsert_sql_file, time.perf_counter() - started, executions=len(changed))
+    finally:
+        cursor.close()
+    return len(params) - unchanged_count, unchanged_count
+
+
+def build_staged_merge(upsert_sql: str, *, staging_table: str) -> StagedMerge:
+    """Deriva o caminho set-based a partir de um MERGE de linha unica.
+
+    O MERGE original precisa seguir o padrao dos arquivos `upsert_*.sql`:
+    `USING (SELECT ? AS coluna, ...) AS source ON target.x = source.x ...`.
+    Os aliases viram colunas da tabela de staging (tipadas a partir da tabela
+    alvo) e o bloco `USING` passa a ler a staging deduplicada pela chave do
+    `ON`, mantendo a ultima linha do lote, como no modo linha a linha.
+    """
+    target_match = _MERGE_TARGET_RE.search(upsert_sql)
+    using_match = _USING_SELECT_RE.search(upsert_sql)
+    on_match = _MERGE_ON_RE.search(upsert_sql)
+    if target_match is None or using_match is None or on_match is None:
+        raise ValueError("MERGE fora do padrao USING (SELECT ? AS ...) AS source ON ...")
+
+    select_block = using_match.group("select")
+    columns = tuple(_PARAM_ALIAS_RE.findall(select_block))
+    if not columns or select_block.count("?") != len(columns):
+        raise ValueError("Bloco USING deve conter apenas parametros no formato `? AS coluna`.")
+
+    key_pairs = _KEY_PAIR_RE.findall(on_match.group("on"))
+    key_columns = tuple(source_col for _, source_col in key_pairs)
+    if not key_columns:
+        raise ValueError("Clausula ON do MERGE sem pares target.x = source.x.")
+    target_key_columns = tuple(target_col for target_col, _ in key_pairs)
+
+    target_table = target_match.group("table")
+    column_list = ", ".join(columns)
+
+    # LEFT JOIN com ON 1 = 0 herda os tipos da tabela alvo, mas deixa todas as
+    # colunas anulaveis e sem IDENTITY, evitando falhas antes do MERGE.
+    create_staging_sql = (
+        f"IF OBJECT_ID('tempdb..{staging_table}') IS NOT NULL DROP TABLE {staging_table};\n"
+        f"SELECT TOP (0) CAST(0 AS BIGINT) AS {_STAGING_SEQ_COLUMN}, "
+        + ", ".join(f"t.{col}" for col in columns)
+        + f"\nINTO {staging_table}\n"
+        "FROM (SELECT 1 AS anchor) AS a\n"
+        f"LEFT JOIN {target_table} AS t\n    ON 1 = 0;"
+    )
+    insert_staging_sql = (
+        f"INSERT INTO {staging_table} ({_STAGING_SEQ_COLUMN}, {column_list})\n"
+        f"VALUES ({', '.join('?' for _ in range(len(columns) + 1))});"
+    )
+    ranked_staging = (
+        "    (\n"
+        "        SELECT\n"
+        "            stg.*,\n"
+        f"            ROW_NUMBER() OVER (PARTITION BY {', '.join(key_columns)} "
+        f"ORDER BY {_STAGING_SEQ_COLUMN} DESC) AS _stg_rn\n"
+        f"        FROM {staging_table} AS stg\n"
+        "    ) AS ranked\n"
+    )
+    using_set_based = (
+        "USING\n(\n"
+        f"    SELECT {column_list}\n"
+        "    FROM\n"
+        f"{ranked_staging}"
+        "    WHERE _stg_rn = 1\n"
+        ") AS source"
+    )
+    merge_sql = upsert_sql[: using_match.start()] + using_set_based + upsert_sql[using_match.end():]
+
+    hash_position = columns.index(ROW_HASH_COLUMN) if ROW_HASH_COLUMN in columns else None
+    count_unchanged_sql = None
+    if hash_position is not None:
+        join_on = " AND ".join(f"t.{target_col} = ranked.{source_col}" for target_col, source_col in key_pairs)
+        count_unchanged_sql = (
+            "SELECT COUNT(*) AS unchanged_count\n"
+            "FROM\n"
+            f"{ranked_staging}"
+            f"INNER JOIN {target_table} AS t\n"
+            f"    ON {join_on}\n"
+            f"WHERE ranked._stg_rn = 1\n"
+            f"  AND t.{ROW_HASH_COLUMN} = ranked.{ROW_HASH_COLUMN};"
+        )
+
+    return StagedMerge(
+        target_table=target_table,
+        staging_table=staging_table,
+        columns=columns,
+        key_columns=key_columns,
+        create_staging_sql=create_staging_sql,
+        insert_staging_sql=insert_staging_sql,
+        merge_sql=merge_sql,
+        drop_staging_sql=f"DROP TABLE {staging_table};",
+        target_key_columns=target_key_columns,
+        hash_position=hash_position,
+        count_unchanged_sql=count_unchanged_sql,
+    )
+
+
+def _entity_name_for(upsert_sql_file: str) -> str:
+    return upsert_sql_file.rsplit("/", 1)[-1].removeprefix("upsert_").removesuffix(".sql")
+
+
+@lru_cache(maxsize=None)
+def _staged_merge_for(upsert_sql_file: str) -> StagedMerge:
+    return build_staged_merge(
+        STATEMENTS.get(upsert_sql_file).sql,
+        staging_table=f"#stg_{_entity_name_for(upsert_sql_file)}",
+    )
+
+
+def _drop_unchanged(
+    cursor: Any,
+    staged: StagedMerge,
+    params: Sequence[tuple[Any, ...]],
+) -> tuple[list[tuple[Any, ...]], int]:
+    """Remove do lote as linhas cujo hash ja esta gravado no alvo.
+
+    Le `(chave, row_hash)` do alvo filtrando pela primeira coluna da chave
+    (`IN` em blocos). Com chave repetida no lote vale a ultima linha, como no
+    MERGE linha a linha; as anteriores seriam sobrescritas e nao sao enviadas.
+    """
+    hash_position = staged.hash_position
+    key_positions = [staged.columns.index(column) for column in staged.key_columns]
+
+    latest: dict[tuple[Any, ...], tuple[Any, ...]] = {}
+    for row in params:
+        key = tuple(row[position] for position in key_positions)
+        latest.pop(key, None)
+        latest[key] = row
+
+    first_values = list(dict.fromkeys(key[0] for key in latest if key[0] is not None))
+    select_columns = ", ".join((*staged.target_key_columns, ROW_HASH_COLUMN))
+    stored: dict[tuple[Any, ...], Any] = {}
+    for start in range(0, len(first_values), _HASH_LOOKUP_CHUNK):
+        chunk = first_values[start : start + _HASH_LOOKUP_CHUNK]
+        cursor.execute(
+            f"SELECT {select_columns} FROM {staged.target_table} "
+            f"WHERE {staged.target_key_columns[0]} IN ({', '.join('?' for _ in chunk)});",
+            chunk,
+        )
+        for record in cursor.fetchall():
+            stored_hash = record[-1]
+            stored[tuple(record[:-1])] = bytes(stored_hash) if stored_hash is not None else None
+
+    changed = [row for key, row in latest.items() if stored.get(key) != row[hash_position]]
+    return changed, len(latest) - len(changed)
+
+
+def _write_bulk(dw_connection: Any, upsert_sql_file: str, params: Sequence[tuple[Any, ...]]) -> int:
+    """Carrega o lote na staging e executa o MERGE; retorna as linhas inalteradas."""
+    staged = _staged_merge_for(upsert_sql_file)
+    cursor = dw_connection.cursor()
+    try:
+        # Sem parametros o pyodbc usa SQLExecDirect; a tabela temporaria fica
+        # no escopo da sessao e nao de uma chamada sp_executesql.
+        cursor.execute(staged.create_staging_sql)
+        try:
+            cursor.fast_executemany = True
+        except Exception:  # noqa: BLE001
+            pass
+        cursor.executemany(
+            staged.insert_staging_sql,
+            [(seq, *row) for seq, row in enumerate(params)],
+        )
+        unchanged_count = 0
+        if staged.count_unchanged_sql is not None:
+            cursor.execute(staged.count_unchanged_sql)
+            counted = cursor.fetchone()
+            unchanged_count = int(counted[0]) if counted else 0
+        cursor.execute(staged.merge_sql)
+        cursor.execute(staged.drop_staging_sql)
+    finally:
+        cursor.close()
+    return unchanged_count
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import sys
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+try:
+    import resource  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - indisponivel no Windows
+    resource = None
+
+
+_PROC_STATUS = Path("/proc/self/status")
+_PROC_CLEAR_REFS = Path("/proc/self/clear_refs")
+
+# VmHWM e do processo inteiro: com mais de uma entidade medindo ao mesmo tempo
+# (`--parallelism`), uma zeraria o pico da outra e o pico lido nao seria do lote.
+_MEASUREMENT_LOCK = threading.Lock()
+_active_measurements = 0
+_overlapped_since_reset = False
+
+
+def begin_peak_rss_measurement() -> None:
+    """Registra uma entidade medindo pico de RSS por lote (par de `end_peak_rss_measurement`)."""
+    global _active_measurements, _overlapped_since_reset
+    with _MEASUREMENT_LOCK:
+        _active_measurements += 1
+        if _active_measurements > 1:
+            _overlapped_since_reset = True
+
+
+def end_peak_rss_measurement() -> None:
+    global _active_measurements
+    with _MEASUREMENT_LOCK:
+        _active_measurements = max(0, _active_measurements - 1)
+
+
+def reset_peak_rss() -> bool:
+    """Zera o pico de RSS do processo (VmHWM) quando o kernel permite.
+
+    Em Linux, escrever `5` em `/proc/self/clear_refs` reinicia o high-water
+    mark, permitindo medir o pico de cada lote isoladamente. Nos demais
+    sistemas retorna `False` e o pico passa a ser o acumulado do processo.
+    Com outra entidade medindo em paralelo nao zera nada e retorna `False`.
+    """
+    global _overlapped_since_reset
+    with _MEASUREMENT_LOCK:
+        if _active_measurements > 1:
+            return False
+        _overlapped_since_reset = False
+    try:
+        _PROC_CLEAR_REFS.write_text("5", encoding="ascii")
+        return True
+    except OSError:
+        return False
+
+
+def read_peak_rss_bytes() -> int | None:
+    """Retorna o pico de RSS desde o ultimo `reset_peak_rss` (ou desde o inicio).
+
+    Retorna `None` se outra entidade mediu ao mesmo tempo desde o ultimo reset:
+    o pico do processo misturaria a memoria das duas.
+    """
+    with _MEASUREMENT_LOCK:
+        if _overlapped_since_reset or _active_measurements > 1:
+            return None
+    try:
+        for line in _PROC_STATUS.read_text(encoding="ascii").splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS.
+    return int(peak) if sys.platform == "darwin" else int(peak) * 1024
+
+
+def format_bytes(value: int | None) -> str:
+    if value is None:
+        return "n/d"
+    return f"{value / (1024 * 1024):.1f}MB"
+
+
+# Tamanho aproximado, em bytes, de cada tipo como trafega do SQL Server
+# (TDS): inteiros/float 8, DECIMAL ate 17, DATETIME2 8, DATE 3, BIT 1.
+_FIXED_VALUE_BYTES: dict[type, int] = {
+    int: 8,
+    float: 8,
+    bool: 1,
+    Decimal: 17,
+    datetime: 8,
+    date: 3,
+    type(None): 0,
+}
+
+
+def _sized_value_bytes(value: Any) -> int:
+    if isinstance(value, str):
+        # NVARCHAR: 2 bytes por caractere.
+        return 2 * len(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    return _FIXED_VALUE_BYTES.get(type(value), 8)
+
+
+def estimate_row_bytes(row: Any) -> int:
+    """Estimativa dos bytes buscados na origem para uma linha extraida.
+
+    O driver nao expoe o volume recebido por linha; a estimativa usa o
+    tamanho de cada valor no protocolo do SQL Server, suficiente para
+    comparar lotes e entidades entre si.
+    """
+    values = row.values() if hasattr(row, "values") else row
+    fixed = _FIXED_VALUE_BYTES
+    total = 0
+    for value in values:
+        size = fixed.get(type(value))
+        total += size if size is not None else _sized_value_bytes(value)
+    return total
+
+
+@dataclass(frozen=True)
+class BatchMetrics:
+    """Medicoes de um lote por etapa, gravadas em `audit.etl_batch_metrics`."""
+
+    batch_number: int
+    batch_size: int
+    extracted_count: int
+    upserted_count: int
+    extract_seconds: float
+    transform_seconds: float
+    upsert_seconds: float
+    commit_seconds: float
+    fetched_bytes: int
+    peak_rss_bytes: int | None
+    # Momento do commit do lote no DW e histograma de frescor das linhas gravadas.
+    committed_at: datetime | None = None
+    freshness_buckets: tuple[tuple[int, int], ...] = ()
+
+    @property
+    def total_seconds(self) -> float:
+        return self.extract_seconds + self.transform_seconds + self.upsert_seconds + self.commit_seconds
+
+    @property
+    def rows_per_second(self) -> float | None:
+        if self.total_seconds <= 0:
+            return None
+        return self.extracted_count / self.total_seconds
+
+
+# Limites superiores (segundos, inclusivos) das faixas do histograma de
+# frescor. A ultima faixa recebe tudo acima de 7 dias (inclui cargas iniciais).
+FRESHNESS_BUCKET_BOUNDS_SECONDS = (
+    1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400, 43200, 86400, 604800,
+)
+FRESHNESS_OVERFLOW_BUCKET = 2_147_483_647
+
+
+def freshness_histogram(
+    rows: Any,
+    *,
+    committed_at: datetime,
+    column: str = "source_updated_at",
+) -> tuple[tuple[int, int], ...]:
+    """Linhas por faixa de atraso `committed_at - source_updated_at`, so faixas nao vazias.
+
+    Retorna `(limite_superior_segundos, linhas)` em ordem crescente. Atraso
+    negativo (relogios fora de sincronia) cai na primeira faixa; linhas sem
+    `source_updated_at` sao ignoradas.
+    """
+    bounds = FRESHNESS_BUCKET_BOUNDS_SECONDS
+    counts = [0] * (len(bounds) + 1)
+    for row in rows:
+        source_updated_at = row.get(column)
+        if source_updated_at is None:
+            continue
+        counts[bisect_left(bounds, (committed_at - source_updated_at).total_seconds())] += 1
+    upper_bounds = (*bounds, FRESHNESS_OVERFLOW_BUCKET)
+    return tuple((upper_bounds[index], count) for index, count in enumerate(counts) if count)
@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, Iterator
+
+from columnar import TRANSFORM_MODE_COLUMNAR, TRANSFORM_MODE_ROW
+from metrics import estimate_row_bytes
+from watermark import (
+    WATERMARK_TYPE_ROWVERSION,
+    WATERMARK_TYPE_UPDATED_AT,
+    max_batch_watermark,
+    read_version_ceiling,
+)
+
+
+_QUEUE_POLL_SECONDS = 0.5
+
+
+@dataclass(frozen=True)
+class ExtractedBatch:
+    batch_number: int
+    extracted_count: int
+    rows: list[dict[str, Any]]
+    soft_deleted_count: int
+    watermark_updated_at: datetime
+    watermark_id: int
+    batch_size: int = 0
+    # Medicoes de tempo nao entram na comparacao entre lotes.
+    extract_seconds: float = field(default=0.0, compare=False)
+    transform_seconds: float = field(default=0.0, compare=False)
+    fetched_bytes: int = field(default=0, compare=False)
+    # Preenchido somente com watermark `rowversion`.
+    watermark_version: int | None = None
+
+
+class CountingIterator:
+    """Conta as linhas consumidas e o tempo gasto buscando-as na origem.
+
+    Com extracao em streaming, busca (`fetchmany`) e transformacao se
+    intercalam; `fetch_seconds` isola a parte da origem. `fetched_bytes`
+    acumula a estimativa de `estimate_row_bytes`. `max_version` guarda o
+    maior `source_version` lido (extracao por `rowversion`).
+    """
+
+    def __init__(self, rows: Iterable[Any]):
+        self._source = rows
+        self._iterator = iter(rows)
+        self.count = 0
+        self.fetch_seconds = 0.0
+        self.fetched_bytes = 0
+        self.max_version: int | None = None
+
+    def __iter__(self) -> "CountingIterator":
+        return self
+
+    def __next__(self) -> Any:
+        started = time.perf_counter()
+        try:
+            row = next(self._iterator)
+        finally:
+            self.fetch_seconds += time.perf_counter() - started
+        self.count += 1
+        self.fetched_bytes += estimate_row_bytes(row)
+        version = row.get("source_version")
+        if version is not None and (self.max_version is None or version > self.max_version):
+            self.max_version = int(version)
+        return row
+
+    def close(self) -> None:
+        close = getattr(self._source, "close", None)
+        if callable(close):
+            close()
+
+
+class _EndOfStream:
+    pass
+
+
+_END_OF_STREAM = _EndOfStream()
+
+
+def iter_batches(
+    entity: Any,
+    oltp_connection: Any,
+    *,
+    watermark_updated_at: datetime,
+    watermark_id: int,
+    cutoff_minutes: int,
+    batch_size: int,
+    max_batches: int | None,
+    stop_event: threading.Event | None = None,
+    transform_mode: str = TRANSFORM_MODE_ROW,
+    next_batch_size: Callable[[], int] | None = None,
+    watermark_type: str = WATERMARK_TYPE_UPDATED_AT,
+    watermark_version: int | None = None,
+) -> Iterator[ExtractedBatch]:
+    """Extrai e transforma lotes em sequencia, seguindo a paginacao por watermark.
+
+    `extract_batch` pode devolver lista ou iterador (streaming via `fetchmany`);
+    as linhas sao contadas enquanto `transform_rows` as consome, sem
+    materializar o lote bruto.
+
+    O watermark usado para buscar o proximo lote vem do lote recem-transformado,
+    e nao do que ja foi gravado no DW. Quem consome e responsavel por avancar o
+    watermark persistido somente apos o upsert do lote.
+
+    Com `transform_mode="columnar"` usa `transform_rows_columnar` quando a
+    entidade oferece essa variante (mesmo contrato de saida).
+
+    `next_batch_size`, quando informado, define o tamanho de cada extracao
+    (batch adaptativo); `batch_size` fica como tamanho inicial.
+
+    Com `watermark_type="rowversion"` pagina por `extract_batch_by_version`
+    a partir de `watermark_version`, limitado a `MIN_ACTIVE_ROWVERSION()` lido
+    a cada lote, sem `cutoff_minutes`. O par `(updated_at, id)` do lote passa
+    a ser o maior observado, apenas para monitoramento.
+    """
+    transform = select_transform(entity, transform_mode)
+    by_version = watermark_type == WATERMARK_TYPE_ROWVERSION
+    batches_produced = 0
+    current_updated_at = watermark_updated_at
+    current_id = watermark_id
+    current_version = int(watermark_version or 0)
+
+    while stop_event is None or not stop_event.is_set():
+        current_batch_size = max(1, int(next_batch_size())) if next_batch_size is not None else batch_size
+        started = time.perf_counter()
+        extracted = _extract(
+            entity,
+            oltp_connection,
+            by_version=by_version,
+            watermark_updated_at=current_updated_at,
+            watermark_id=current_id,
+            watermark_version=current_version,
+            cutoff_minutes=cutoff_minutes,
+            batch_size=current_batch_size,
+        )
+        raw_rows = CountingIterator(extracted)
+        try:
+            transformed_rows, soft_deleted_count = transform(raw_rows)
+        finally:
+            raw_rows.close()
+        elapsed_seconds = time.perf_counter() - started
+
+        extracted_count = raw_rows.count
+        if extracted_count == 0:
+            return
+
+        if by_version:
+            if raw_rows.max_version is None:
+                entity_name = getattr(entity, "ENTITY_NAME", "entidade")
+                raise ValueError(f"Extracao por rowversion de '{entity_name}' sem coluna source_version.")
+            current_version = raw_rows.max_version
+            current_updated_at, current_id = max_batch_watermark(
+                entity,
+                transformed_rows,
+                floor=(current_updated_at, current_id),
+            )
+        else:
+            current_updated_at, current_id = entity.get_batch_watermark(transformed_rows)
+        batches_produced += 1
+
+        yield ExtractedBatch(
+            batch_number=batches_produced,
+            extracted_count=extracted_count,
+            rows=transformed_rows,
+            soft_deleted_count=soft_deleted_count,
+            watermark_updated_at=current_updated_at,
+            watermark_id=current_id,
+            batch_size=current_batch_size,
+            extract_seconds=raw_rows.fetch_seconds,
+            transform_seconds=max(0.0, elapsed_seconds - raw_rows.fetch_seconds),
+            fetched_bytes=raw_rows.fetched_bytes,
+            watermark_version=current_version if by_version else None,
+        )
+
+        if max_batches is not None and batches_produced >= max_batches:
+            return
+        if extracted_count < current_batch_size:
+            return
+
+
+def iter_batches_pipelined(
+    entity: Any,
+    oltp_connection: Any,
+    *,
+    watermark_updated_at: datetime,
+    watermark_id: int,
+    cutoff_minutes: int,
+    batch_size: int,
+    max_batches: int | None,
+    queue_depth: int,
+    transform_mode: str = TRANSFORM_MODE_ROW,
+    next_batch_size: Callable[[], int] | None = None,
+    watermark_type: str = WATERMARK_TYPE_UPDATED_AT,
+    watermark_version: int | None = None,
+) -> Iterator[ExtractedBatch]:
+    """Mesmo contrato de `iter_batches`, com extracao/transformacao em thread produtora.
+
+    A thread produtora usa exclusivamente a conexao OLTP e mantem no maximo
+    `queue_depth` lotes prontos aguardando o consumidor. Os lotes sao entregues
+    na ordem de extracao; erros da produtora sao relancados no consumidor.
+    Se o consumidor interromper a iteracao (erro no upsert, por exemplo), a
+    produtora e sinalizada e aguardada antes de retornar, para que a conexao
+    OLTP nao continue em uso por outra thread.
+    """
+    batch_queue: queue.Queue[Any] = queue.Queue(maxsize=max(1, int(queue_depth)))
+    stop_event = threading.Event()
+
+    def _offer(item: Any) -> bool:
+        while not stop_event.is_set():
+            try:
+                batch_queue.put(item, timeout=_QUEUE_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce() -> None:
+        try:
+            for batch in iter_batches(
+                entity,
+                oltp_connection,
+                watermark_updated_at=watermark_updated_at,
+                watermark_id=watermark_id,
+                cutoff_minutes=cutoff_minutes,
+                batch_size=batch_size,
+                max_batches=max_batches,
+                stop_event=stop_event,
+                transform_mode=transform_mode,
+                next_batch_size=next_batch_size,
+                watermark_type=watermark_type,
+                watermark_version=watermark_version,
+            ):
+                if not _offer(batch):
+                    return
+        except BaseException as exc:  # noqa: BLE001
+            _offer(exc)
+            return
+        _offer(_END_OF_STREAM)
+
+    producer = threading.Thread(
+        target=_produce,
+        name=f"etl-extract-{getattr(entity, 'ENTITY_NAME', 'entity')}",
+        daemon=True,
+    )
+    producer.start()
+
+    try:
+        while True:
+            item = batch_queue.get()
+            if item is _END_OF_STREAM:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop_event.set()
+        _drain(batch_queue)
+        producer.join()
+
+
+def has_pending_rows(
+    entity: Any,
+    oltp_connection: Any,
+    *,
+    watermark_updated_at: datetime,
+    watermark_id: int,
+    cutoff_minutes: int,
+    watermark_type: str = WATERMARK_TYPE_UPDATED_AT,
+    watermark_version: int | None = None,
+) -> bool:
+    """Indica se ha ao menos uma linha apos o watermark (ja liberada pelo cutoff).
+
+    Usa a mesma extracao de `iter_batches` com lote de uma linha, sem
+    transformar: e a consulta de backlog do modo daemon.
+    """
+    extracted = _extract(
+        entity,
+        oltp_connection,
+        by_version=watermark_type == WATERMARK_TYPE_ROWVERSION,
+        watermark_updated_at=watermark_updated_at,
+        watermark_id=watermark_id,
+        watermark_version=int(watermark_version or 0),
+        cutoff_minutes=cutoff_minutes,
+        batch_size=1,
+    )
+    rows = iter(extracted)
+    try:
+        return next(rows, None) is not None
+    finally:
+        close = getattr(extracted, "close", None)
+        if callable(close):
+            close()
+
+
+def _extract(
+    entity: Any,
+    oltp_connection: Any,
+    *,
+    by_version: bool,
+    watermark_updated_at: datetime,
+    watermark_id: int,
+    watermark_version: int,
+    cutoff_minutes: int,
+    batch_size: int,
+) -> Iterable[Any]:
+    if by_version:
+        return entity.extract_batch_by_version(
+            oltp_connection,
+            watermark_version=watermark_version,
+            version_ceiling=read_version_ceiling(oltp_connection),
+            batch_size=batch_size,
+        )
+    return entity.extract_batch(
+        oltp_connection,
+        watermark_updated_at=watermark_updated_at,
+        watermark_id=watermark_id,
+        cutoff_updated_at=utcnow_naive() - timedelta(minutes=cutoff_minutes),
+        batch_size=batch_size,
+    )
+
+
+def select_transform(entity: Any, transform_mode: str) -> Callable[[Iterable[Any]], tuple[list[dict[str, Any]], int]]:
+    if transform_mode == TRANSFORM_MODE_COLUMNAR:
+        columnar_transform = getattr(entity, "transform_rows_columnar", None)
+        if callable(columnar_transform):
+            return columnar_transform
+    return entity.transform_rows
+
+
+def _drain(batch_queue: queue.Queue[Any]) -> None:
+    while True:
+        try:
+            batch_queue.get_nowait()
+        except queue.Empty:
+            return
+
+
+def utcnow_naive() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from columnar import TRANSFORM_MODE_ROW
+from db import Row
+from loader import LOAD_MODE_MERGE
+from pipeline import select_transform
+from row_hash import ROW_HASH_COLUMN
+
+
+FIXTURE_VERSION = 1
+FIXTURE_SUFFIX = ".jsonl.gz"
+KEY_CACHE_FILE = "key_cache.json.gz"
+BASELINE_VERSION = 1
+DEFAULT_REGRESSION_THRESHOLD = 0.20
+
+
+@dataclass(frozen=True)
+class ReplayFixture:
+    """Lotes brutos de `extract_batch` gravados de uma base real (colunas + tuplas)."""
+
+    entity_name: str
+    columns: tuple[str, ...]
+    batches: tuple[tuple[Row, ...], ...]
+
+    @property
+    def row_count(self) -> int:
+        return sum(len(batch) for batch in self.batches)
+
+
+@dataclass(frozen=True)
+class ReplayResult:
+    entity_name: str
+    rows: int
+    batches: int
+    transform_rows_per_second: float
+    upsert_params_rows_per_second: float
+    # Pico de memoria alocada (tracemalloc) durante transformacao + parametros do lote.
+    peak_alloc_bytes: int
+    # Digest dos `row_hash` transformados: muda quando a saida da transformacao muda.
+    output_digest: str
+
+
+def write_fixture(path: str | Path, entity_name: str, batches: Iterable[Iterable[Any]]) -> int:
+    """Grava lotes brutos (linhas com `keys()`/`values()`, ex.: `db.Row`) em JSON Lines gzip.
+
+    A primeira linha e o cabecalho com as colunas; cada linha seguinte e um
+    lote com os valores na ordem das colunas. Retorna o total de linhas.
+    """
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = target.with_suffix(target.suffix + ".tmp")
+    columns: list[str] | None = None
+    total = 0
+    with gzip.open(temp_path, "wt", encoding="utf-8") as handle:
+        for batch in batches:
+            encoded_rows = []
+            for row in batch:
+                if columns is None:
+                    columns = list(row.keys())
+                    handle.write(json.dumps({"version": FIXTURE_VERSION, "entity": entity_name, "columns": columns}))
+                    handle.write("\n")
+                encoded_rows.append([_encode_value(row.get(column)) for column in columns])
+            if encoded_rows:
+                handle.write(json.dumps(encoded_rows, separators=(",", ":")))
+                handle.write("\n")
+                total += len(encoded_rows)
+        if columns is None:
+            handle.write(json.dumps({"version": FIXTURE_VERSION, "entity": entity_name, "columns": []}))
+            handle.write("\n")
+    temp_path.replace(target)
+    return total
+
+
+def read_fixture(path: str | Path) -> ReplayFixture:
+    with gzip.open(Path(path), "rt", encoding="utf-8") as handle:
+        header = json.loads(handle.readline())
+        if header.get("version") != FIXTURE_VERSION:
+            raise ValueError(f"Versao de fixture nao suportada em {path}: {header.get('version')!r}")
+        columns = tuple(header["columns"])
+        # Indice compartilhado por todas as linhas, como em `db.stream_query`.
+        index = {column: position for position, column in enumerate(columns)}
+        batches = tuple(
+            tuple(Row(tuple(_decode_value(value) for value in values), index) for values in json.loads(line))
+            for line in handle
+            if line.strip()
+        )
+    return ReplayFixture(entity_name=header["entity"], columns=columns, batches=batches)
+
+
+def fixture_path(fixture_dir: str | Path, entity_name: str) -> Path:
+    return Path(fixture_dir) / f"{entity_name}{FIXTURE_SUFFIX}"
+
+
+def list_fixtures(fixture_dir: str | Path) -> list[str]:
+    directory = Path(fixture_dir)
+    if not directory.is_dir():
+        return []
+    return sorted(path.name[: -len(FIXTURE_SUFFIX)] for path in directory.glob(f"*{FIXTURE_SUFFIX}"))
+
+
+@contextmanager
+def capture_upsert_params(entity: Any) -> Iterator[list[int]]:
+    """Troca `write_upsert_params` da entidade por um coletor sem banco.
+
+    `upsert_rows` monta os parametros (lookups de chave inclusos) como na
+    carga real; o coletor so conta as linhas que seriam enviadas e as
+    devolve como gravadas.
+    """
+    captured: list[int] = []
+    original = entity.write_upsert_params
+
+    def _capture(_dw_connection: Any, _upsert_sql_file: str, params: list[tuple[Any, ...]], **_kwargs: Any) -> tuple[int, int]:
+        captured.append(len(params))
+        return len(params), 0
+
+    entity.write_upsert_params = _capture
+    try:
+        yield captured
+    finally:
+        entity.write_upsert_params = original
+
+
+def measure_entity(
+    entity: Any,
+    fixture: ReplayFixture,
+    *,
+    repeat: int = 3,
+    transform_mode: str = TRANSFORM_MODE_ROW,
+) -> ReplayResult:
+    """Reexecuta os lotes gravados por `transform_rows` e pela montagem de parametros do upsert.
+
+    Tempos sao a melhor de `repeat` passadas (menos ruido entre execucoes);
+    a medicao de alocacao roda em passada separada, para que o custo do
+    `tracemalloc` nao entre nas taxas.
+    """
+    transform = select_transform(entity, transform_mode)
+    best_transform = float("inf")
+    best_upsert = float("inf")
+    transformed: list[list[dict[str, Any]]] = []
+
+    with capture_upsert_params(entity):
+        for _ in range(max(1, int(repeat))):
+            started = time.perf_counter()
+            transformed = [transform(iter(batch))[0] for batch in fixture.batches]
+            best_transform = min(best_transform, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for rows in transformed:
+                entity.upsert_rows(None, rows, load_mode=LOAD_MODE_MERGE)
+            best_upsert = min(best_upsert, time.perf_counter() - started)
+
+        tracemalloc.start()
+        try:
+            for batch in fixture.batches:
+                rows, _ = transform(iter(batch))
+                entity.upsert_rows(None, rows, load_mode=LOAD_MODE_MERGE)
+            _, peak_alloc_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    row_count = fixture.row_count
+    return ReplayResult(
+        entity_name=fixture.entity_name,
+        rows=row_count,
+        batches=len(fixture.batches),
+        transform_rows_per_second=_rate(row_count, best_transform),
+        upsert_params_rows_per_second=_rate(sum(len(rows) for rows in transformed), best_upsert),
+        peak_alloc_bytes=int(peak_alloc_bytes),
+        output_digest=_output_digest(transformed),
+    )
+
+
+def compare_to_baseline(
+    results: Iterable[ReplayResult],
+    baseline: dict[str, Any],
+    *,
+    threshold: float = DEFAULT_REGRESSION_THRESHOLD,
+) -> list[str]:
+    """Regressoes acima de `threshold` (fracao) em relacao ao baseline, uma mensagem por metrica.
+
+    Taxas (linhas/s) regridem quando caem; alocacao regride quando cresce.
+    Entidades sem baseline sao ignoradas.
+    """
+    regressions: list[str] = []
+    entries = baseline.get("entities", {})
+    for result in results:
+        expected = entries.get(result.entity_name)
+        if not expected:
+            continue
+        for metric in ("transform_rows_per_second", "upsert_params_rows_per_second"):
+            reference = float(expected.get(metric) or 0.0)
+            current = getattr(result, metric)
+            if reference > 0 and current < reference * (1.0 - threshold):
+                regressions.append(
+                    f"{result.entity_name}.{metric}: {current:,.0f} < {reference:,.0f} "
+                    f"(-{(1.0 - current / reference) * 100:.1f}%)"
+                )
+        reference_alloc = int(expected.get("peak_alloc_bytes") or 0)
+        if reference_alloc > 0 and result.peak_alloc_bytes > reference_alloc * (1.0 + threshold):
+            regressions.append(
+                f"{result.entity_name}.peak_alloc_bytes: {result.peak_alloc_bytes:,} > {reference_alloc:,} "
+                f"(+{(result.peak_alloc_bytes / reference_alloc - 1.0) * 100:.1f}%)"
+            )
+    return regressions
+
+
+def changed_outputs(results: Iterable[ReplayResult], baseline: dict[str, Any]) -> list[str]:
+    """Entidades cuja saida transformada difere da registrada no baseline."""
+    entries = baseline.get("entities", {})
+    return [
+        result.entity_name
+        for result in results
+        if entries.get(result.entity_name, {}).get("output_digest") not in (None, result.output_digest)
+    ]
+
+
+def load_baseline(path: str | Path) -> dict[str, Any]:
+    source = Path(path)
+    if not source.exists():
+        return {}
+    payload = json.loads(source.read_text(encoding="utf-8"))
+    if payload.get("version") != BASELINE_VERSION:
+        raise ValueError(f"Versao de baseline nao suportada em {source}: {payload.get('version')!r}")
+    return payload
+
+
+def save_baseline(path: str | Path, results: Iterable[ReplayResult]) -> None:
+    payload = {
+        "version": BASELINE_VERSION,
+        "entities": {result.entity_name: asdict(result) for result in results},
+    }
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def _rate(rows: int, seconds: float) -> float:
+    return rows / seconds if seconds > 0 else 0.0
+
+
+def _output_digest(batches: list[list[dict[str, Any]]]) -> str:
+    digest = hashlib.sha256()
+    for rows in batches:
+        for row in rows:
+            digest.update(bytes(row.get(ROW_HASH_COLUMN) or b""))
+    return digest.hexdigest()
+
+
+def _encode_value(value: Any) -> Any:
+    # `datetime` antes de `date` (subclasse).
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {"b": bytes(value).hex()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if not isinstance(value, dict):
+        return value
+    if "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    if "d" in value:
+        return date.fromisoformat(value["d"])
+    if "dec" in value:
+        return Decimal(value["dec"])
+    if "b" in value:
+        return bytes.fromhex(value["b"])
+    return value
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Collection
+
+
+ROW_HASH_COLUMN = "row_hash"
+# BINARY(16) nas tabelas alvo.
+ROW_HASH_BYTES = 16
+
+# Colunas tecnicas que nunca entram no hash: o watermark muda a cada toque na
+# origem mesmo sem alteracao de conteudo.
+_ALWAYS_EXCLUDED = frozenset({ROW_HASH_COLUMN, "source_updated_at", "source_id"})
+
+_SEPARATOR = "\x1f"
+
+
+def compute_row_hash(values: Collection[Any]) -> bytes:
+    """Hash estavel (blake2b de 16 bytes) de uma sequencia de valores.
+
+    Cada valor e serializado com o tipo, para que `1`, `"1"` e `Decimal("1")`
+    nao colidam; `Decimal` e normalizado (`1.50` == `1.5`), como o SQL
+    Server compara valores DECIMAL.
+    """
+    text = _SEPARATOR.join(map(_canonical, values))
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=ROW_HASH_BYTES).digest()
+
+
+def extend_row_hash(row_hash: bytes, *values: Any) -> bytes:
+    """Combina o hash de conteudo com valores resolvidos no upsert (chaves surrogate)."""
+    return compute_row_hash((row_hash.hex(), *values))
+
+
+def hash_columns(row: dict[str, Any], *, exclude: Collection[str] = ()) -> tuple[str, ...]:
+    """Colunas de negocio de uma linha transformada, em ordem estavel (alfabetica)."""
+    excluded = _ALWAYS_EXCLUDED.union(exclude)
+    return tuple(sorted(column for column in row if column not in excluded))
+
+
+def add_row_hashes(rows: list[dict[str, Any]], *, exclude: Collection[str] = ()) -> list[dict[str, Any]]:
+    """Grava `row_hash` em cada linha transformada (mesmo esquema para todo o lote)."""
+    if not rows:
+        return rows
+    columns = hash_columns(rows[0], exclude=exclude)
+    for row in rows:
+        row[ROW_HASH_COLUMN] = compute_row_hash([row.get(column) for column in columns])
+    return rows
+
+
+def _canonical(value: Any) -> str:
+    if value is None:
+        return "N"
+    value_type = type(value)
+    if value_type is str:
+        return "s" + value
+    if value_type is bool:
+        return "i1" if value else "i0"
+    if value_type is int:
+        return "i" + str(value)
+    if value_type is Decimal:
+        # 1.50 e 1.5 gravam o mesmo valor em colunas DECIMAL.
+        return "d" + format(value.normalize(), "f") if value else "d0"
+    if value_type is datetime:
+        return "t" + value.isoformat()
+    if value_type is date:
+        return "D" + value.isoformat()
+    if value_type is float:
+        return "f" + repr(value)
+    if isinstance(value, (bytes, bytearray)):
+        return "b" + bytes(value).hex()
+    return "r" + repr(value)
@@ -2,22 +2,80 @@ from __future__ import annotations
 
 import argparse
 import getpass
+import os
+import socket
+import threading
+import time
 import traceback
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
+from typing import Any
 
+from backfill import (
+    BACKFILL_STATUS_FAILED,
+    BACKFILL_STATUS_SUCCESS,
+    BackfillPartition,
+    BackfillPlan,
+    PartitionResult,
+    finish_backfill,
+    global_watermark,
+    prepare_backfill,
+    run_partition,
+    run_partitions,
+    supports_backfill,
+)
+from batch_sizing import AdaptiveBatchSizer, BatchTiming
+from columnar import TRANSFORM_MODES, normalize_transform_mode
 from config import ETLConfig
 from control import (
+    checkpoint_control_watermark,
     finish_entity_run,
     finish_run,
     get_entity_control,
+    insert_batch_metrics,
     mark_control_failed,
     mark_control_success_with_watermark,
     mark_control_success_without_watermark,
+    resolve_cutoff_minutes,
+    resolve_entity_watermark_type,
+    resolve_run_status,
+    start_daemon_heartbeat,
     start_entity_run,
     start_run,
+    tally_entity_results,
+    update_control_batch_size,
 )
-from db import close_quietly, connect_sqlserver
+from daemon import install_stop_signals, run_daemon
+from daemon_runner import DaemonRunner
+from db import WorkerConnections, close_quietly, connect_sqlserver
 from entities import get_entity, list_entities, list_entities_execution_order
+from key_cache import KEY_CACHE
+from loader import LOAD_MODES, normalize_load_mode
+from metrics import (
+    BatchMetrics,
+    begin_peak_rss_measurement,
+    end_peak_rss_measurement,
+    format_bytes,
+    freshness_histogram,
+    read_peak_rss_bytes,
+    reset_peak_rss,
+)
+from pipeline import iter_batches, iter_batches_pipelined, utcnow_naive
+from sales_aggregate import (
+    AGGREGATE_TABLE,
+    SALES_AGGREGATE_ACTIONS,
+    SALES_AGGREGATE_REBUILD,
+    SalesAggregateTargets,
+    detect_entity_sales_aggregate,
+    detect_sales_aggregate,
+    reconcile_sales_aggregate,
+    rebuild_sales_aggregate,
+    upsert_with_sales_aggregate,
+)
+from scheduler import run_with_dependencies
+from staging import STAGING_MODE_LOAD, STAGING_MODES, supports_staging
+from staging_runner import run_staged_entity
+from statements import STATEMENTS
+from watermark import WATERMARK_TYPE_ROWVERSION, WATERMARK_TYPES, supported_watermark_types
 
 
 def parse_args() -> argparse.Namespace:
@@ -35,6 +93,20 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Sobrescreve batch_size configurado no ctl.etl_control.",
     )
+    parser.add_argument(
+        "--adaptive-batch",
+        action="store_true",
+        help=(
+            "Ajusta o tamanho de cada lote pela duracao medida (alvo em --target-batch-seconds), "
+            "mesmo sem adaptive_batch_size no ctl.etl_control."
+        ),
+    )
+    parser.add_argument(
+        "--target-batch-seconds",
+        type=int,
+        default=None,
+        help="Duracao alvo por lote no batch adaptativo (sobrescreve ctl.etl_control/ETL_TARGET_BATCH_SECONDS).",
+    )
     parser.add_argument(
         "--cutoff-minutes",
         type=int,
@@ -47,16 +119,222 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Limite de lotes por entidade (util para teste).",
     )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=None,
+        help=(
+            "Grava o watermark em ctl.etl_control junto com o upsert a cada N lotes "
+            "(sobrescreve ETL_CHECKPOINT_EVERY_BATCHES; 0 avanca somente ao fim da entidade)."
+        ),
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="Executa extracao/transformacao sem gravar upsert e sem avancar watermark.",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--load-mode",
+        default=None,
+        choices=list(LOAD_MODES),
+        help="Sobrescreve load_mode configurado no ctl.etl_control (merge linha a linha ou bulk set-based).",
+    )
+    parser.add_argument(
+        "--transform-mode",
+        default=None,
+        choices=list(TRANSFORM_MODES),
+        help=(
+            "Sobrescreve transform_mode configurado no ctl.etl_control "
+            "(row linha a linha ou columnar vetorizado nas entidades de fato)."
+        ),
+    )
+    parser.add_argument(
+        "--watermark-type",
+        default=None,
+        choices=list(WATERMARK_TYPES),
+        help=(
+            "Sobrescreve watermark_type configurado no ctl.etl_control (updated_at com cutoff, "
+            "ou rowversion sem cutoff; com --entity all vale so para as entidades com suporte)."
+        ),
+    )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="Sobrepoe extracao/transformacao do proximo lote (OLTP) com o upsert do lote atual (DW).",
+    )
+    parser.add_argument(
+        "--pipeline-depth",
+        type=int,
+        default=2,
+        help="Maximo de lotes extraidos aguardando upsert no modo --pipelined.",
+    )
+    parser.add_argument(
+        "--parallelism",
+        type=int,
+        default=1,
+        help="Entidades independentes executadas em paralelo (uma conexao OLTP/DW por worker).",
+    )
+    parser.add_argument(
+        "--backfill",
+        action="store_true",
+        help=(
+            "Carga inicial particionada por faixa de id natural, com workers paralelos e "
+            "retomada das particoes nao concluidas (uma entidade com suporte, ex.: fact_vendas)."
+        ),
+    )
+    parser.add_argument(
+        "--backfill-partitions",
+        type=int,
+        default=8,
+        help="Quantidade de particoes de um novo backfill (na retomada valem as particoes originais).",
+    )
+    parser.add_argument(
+        "--backfill-workers",
+        type=int,
+        default=4,
+        help="Particoes carregadas em paralelo no modo --backfill (uma conexao OLTP/DW por worker).",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help=(
+            "Modo continuo: mantem o par OLTP/DW aberto, consulta o backlog de cada entidade no "
+            "seu intervalo (ctl.etl_control.poll_interval_seconds) e executa micro-lotes; "
+            "SIGTERM encerra apos o lote atual."
+        ),
+    )
+    parser.add_argument(
+        "--poll-seconds",
+        type=int,
+        default=None,
+        help=(
+            "Intervalo de consulta de backlog no modo --daemon para todas as entidades "
+            "(sobrescreve ctl.etl_control/ETL_DAEMON_POLL_SECONDS)."
+        ),
+    )
+    parser.add_argument(
+        "--staging",
+        default=None,
+        choices=list(STAGING_MODES),
+        help=(
+            "Landing zone em Parquet (data/staging/<entidade>/<run_id>/): extract grava os lotes sem "
+            "tocar o DW, load carrega os arquivos pendentes sem abrir o OLTP, full faz os dois."
+        ),
+    )
+    parser.add_argument(
+        "--staging-dir",
+        default=None,
+        help="Diretorio da landing zone (sobrescreve ETL_STAGING_DIR).",
+    )
+    parser.add_argument(
+        "--staging-replay",
+        type=int,
+        default=None,
+        metavar="RUN_ID",
+        help="Com --staging load: recarrega os arquivos do run informado sem consultar o OLTP nem mover o watermark.",
+    )
+    parser.add_argument(
+        "--load-workers",
+        type=int,
+        default=4,
+        help="Arquivos da landing zone carregados em paralelo (uma conexao DW por worker).",
+    )
+    parser.add_argument(
+        "--sales-aggregate",
+        choices=SALES_AGGREGATE_ACTIONS,
+        default=None,
+        help=(
+            f"Manutencao de {AGGREGATE_TABLE} sem rodar o ETL: rebuild recalcula a partir da fato; "
+            "reconcile compara com a fato e sai com codigo 1 se houver divergencia."
+        ),
+    )
+    parser.add_argument(
+        "--key-cache-path",
+        default=None,
+        help="Arquivo para persistir o cache de chaves surrogate entre execucoes (sobrescreve ETL_KEY_CACHE_PATH).",
+    )
+    args = parser.parse_args()
+    if args.checkpoint_every is not None and args.checkpoint_every < 0:
+        parser.error("--checkpoint-every deve ser >= 0.")
+    if args.watermark_type is not None and args.entity != "all":
+        if args.watermark_type not in supported_watermark_types(get_entity(args.entity)):
+            parser.error(f"Entidade '{args.entity}' nao suporta --watermark-type {args.watermark_type}.")
+    if args.poll_seconds is not None and args.poll_seconds < 1:
+        parser.error("--poll-seconds deve ser >= 1.")
+    if args.daemon:
+        if args.backfill:
+            parser.error("--daemon nao combina com --backfill.")
+        if args.dry_run:
+            parser.error("--daemon nao suporta --dry-run (o watermark nunca avancaria).")
+        if args.parallelism > 1:
+            parser.error("--daemon executa as entidades em sequencia em um unico par de conexoes; remova --parallelism.")
+    if args.staging is not None:
+        if args.backfill or args.daemon:
+            parser.error("--staging nao combina com --backfill nem com --daemon.")
+        if args.dry_run:
+            parser.error("--staging nao suporta --dry-run (a landing zone ja separa extracao de carga).")
+        if not supports_staging():
+            parser.error("--staging exige pyarrow instalado (pip install pyarrow).")
+    if args.sales_aggregate is not None and (args.daemon or args.backfill or args.staging is not None):
+        parser.error("--sales-aggregate e uma acao isolada; nao combina com --daemon, --backfill nem --staging.")
+    if args.staging_replay is not None and args.staging != STAGING_MODE_LOAD:
+        parser.error("--staging-replay exige --staging load.")
+    if args.backfill:
+        if args.entity == "all":
+            parser.error("--backfill exige uma entidade especifica em --entity.")
+        if args.dry_run:
+            parser.error("--backfill nao suporta --dry-run (o progresso das particoes e gravado no DW).")
+        if not supports_backfill(get_entity(args.entity)):
+            parser.error(f"Entidade '{args.entity}' nao suporta --backfill.")
+    return args
 
 
-def utcnow_naive() -> datetime:
-    return datetime.now(timezone.utc).replace(tzinfo=None)
+def run_sales_aggregate_action(action: str, config: ETLConfig) -> int:
+    """`--sales-aggregate`: rebuild completo ou reconciliacao do agregado diario de vendas."""
+    dw_connection = None
+    try:
+        dw_connection = connect_sqlserver(
+            config.dw_conn_str,
+            command_timeout_seconds=config.command_timeout_seconds,
+        )
+        targets = detect_sales_aggregate(dw_connection)
+        if targets is None:
+            print(f"{AGGREGATE_TABLE} nao existe; aplique sql/dw/03_etl_control/27_create_fact_agg_vendas_diaria.sql.")
+            return 1
+
+        if action == SALES_AGGREGATE_REBUILD:
+            started = time.perf_counter()
+            groups = rebuild_sales_aggregate(dw_connection, targets)
+            dw_connection.commit()
+            print(
+                f"{AGGREGATE_TABLE} reconstruido{' (com sketch de pedidos)' if targets.order_sketch else ''}: "
+                f"grupos={groups} em {time.perf_counter() - started:.2f}s"
+            )
+            return 0
+
+        result = reconcile_sales_aggregate(dw_connection, targets)
+        print(
+            f"Reconciliacao {AGGREGATE_TABLE}: grupos na fato={result.base_groups}, "
+            f"grupos no agregado={result.aggregate_groups}, divergentes={result.mismatched_groups}"
+            + (
+                f", registros de sketch divergentes={result.mismatched_sketch_registers}"
+                if result.mismatched_sketch_registers is not None
+                else ""
+            )
+        )
+        for sample in result.samples:
+            print(f"- {sample}")
+        if not result.ok:
+            print("Divergencia encontrada; rode --sales-aggregate rebuild para recalcular.")
+        return 0 if result.ok else 1
+    except Exception as exc:  # noqa: BLE001
+        if dw_connection is not None:
+            dw_connection.rollback()
+        print(f"Falha em --sales-aggregate {action}: {type(exc).__name__}: {exc}")
+        traceback.print_exc()
+        return 1
+    finally:
+        close_quietly(dw_connection)
 
 
 def capture_connection_snapshot_safe(
@@ -97,12 +375,50 @@ def main() -> int:
 
     print(f"Entidades selecionadas: {', '.join(entity_names)}")
     print(f"Modo dry-run: {'sim' if args.dry_run else 'nao'}")
+    print(
+        f"Modo pipelined: {'sim (depth=' + str(args.pipeline_depth) + ')' if args.pipelined else 'nao'}"
+    )
+    print(f"Paralelismo: {max(1, args.parallelism)}")
+    if args.daemon:
+        print(f"Modo daemon: sim (poll={args.poll_seconds or 'ctl.etl_control'}s)")
+    staging_dir = args.staging_dir or config.staging_dir
+    if args.staging is not None:
+        replay_text = f", replay do run {args.staging_replay}" if args.staging_replay is not None else ""
+        print(
+            f"Modo staging: {args.staging} (dir={staging_dir}, "
+            f"load_workers={max(1, args.load_workers)}{replay_text})"
+        )
+    if args.backfill:
+        print(
+            f"Modo backfill: sim (particoes={max(1, args.backfill_partitions)}, "
+            f"workers={max(1, args.backfill_workers)})"
+        )
 
-    try:
-        oltp_connection = connect_sqlserver(
-            config.oltp_conn_str,
-            command_timeout_seconds=config.command_timeout_seconds,
+    key_cache_path = args.key_cache_path or config.key_cache_path
+    if key_cache_path:
+        loaded = KEY_CACHE.load(key_cache_path)
+        print(f"Cache de chaves: {key_cache_path} ({'carregado' if loaded else 'vazio'})")
+    print(f"Comandos SQL carregados: {STATEMENTS.load()}")
+
+    if args.sales_aggregate is not None:
+        return run_sales_aggregate_action(args.sales_aggregate, config)
+
+    if args.daemon:
+        return run_daemon_mode(
+            args,
+            config,
+            entity_names=entity_names,
+            started_by=started_by,
+            key_cache_path=key_cache_path,
         )
+
+    try:
+        # A etapa de carga da landing zone le somente os arquivos: nao abre o OLTP.
+        if args.staging != STAGING_MODE_LOAD:
+            oltp_connection = connect_sqlserver(
+                config.oltp_conn_str,
+                command_timeout_seconds=config.command_timeout_seconds,
+            )
         dw_connection = connect_sqlserver(
             config.dw_conn_str,
             command_timeout_seconds=config.command_timeout_seconds,
@@ -117,32 +433,71 @@ def main() -> int:
         dw_connection.commit()
         print(f"Run iniciado: run_id={run_id}")
 
-        entities_succeeded = 0
-        entities_failed = 0
-        errors: list[str] = []
+        entity_kwargs = _build_entity_kwargs(args, config, run_id=run_id)
 
-        for entity_name in entity_names:
-            ok, error_message = run_entity(
-                entity_name=entity_name,
-                oltp_connection=oltp_connection,
-                dw_connection=dw_connection,
-                run_id=run_id,
-                default_batch_size=config.default_batch_size,
-                default_cutoff_minutes=config.default_cutoff_minutes,
-                batch_size_override=args.batch_size,
-                cutoff_minutes_override=args.cutoff_minutes,
-                dry_run=args.dry_run,
-                max_batches=args.max_batches,
+        if args.backfill:
+            results = {
+                entity_name: run_backfill_entity(
+                    entity_name=entity_name,
+                    oltp_connection=oltp_connection,
+                    dw_connection=dw_connection,
+                    config=config,
+                    run_id=run_id,
+                    default_batch_size=config.default_batch_size,
+                    default_cutoff_minutes=config.default_cutoff_minutes,
+                    batch_size_override=args.batch_size,
+                    cutoff_minutes_override=args.cutoff_minutes,
+                    load_mode_override=args.load_mode,
+                    transform_mode_override=args.transform_mode,
+                    partition_count=args.backfill_partitions,
+                    workers=args.backfill_workers,
+                )
+                for entity_name in entity_names
+            }
+        elif args.staging is not None:
+            results = {
+                entity_name: run_staged_entity(
+                    entity_name=entity_name,
+                    oltp_connection=oltp_connection,
+                    dw_connection=dw_connection,
+                    config=config,
+                    run_id=run_id,
+                    staging_mode=args.staging,
+                    staging_dir=staging_dir,
+                    replay_run_id=args.staging_replay,
+                    load_workers=args.load_workers,
+                    default_batch_size=config.default_batch_size,
+                    default_cutoff_minutes=config.default_cutoff_minutes,
+                    batch_size_override=args.batch_size,
+                    cutoff_minutes_override=args.cutoff_minutes,
+                    load_mode_override=args.load_mode,
+                    transform_mode_override=args.transform_mode,
+                    watermark_type_override=args.watermark_type,
+                    max_batches=args.max_batches,
+                )
+                for entity_name in entity_names
+            }
+        elif args.parallelism > 1 and len(entity_names) > 1:
+            results = _run_entities_parallel(
+                entity_names,
+                config=config,
+                parallelism=args.parallelism,
+                entity_kwargs=entity_kwargs,
             )
+        else:
+            results = {
+                entity_name: run_entity(
+                    entity_name=entity_name,
+                    oltp_connection=oltp_connection,
+                    dw_connection=dw_connection,
+                    **entity_kwargs,
+                )
+                for entity_name in entity_names
+            }
 
-            if ok:
-                entities_succeeded += 1
-            else:
-                entities_failed += 1
-                if error_message:
-                    errors.append(f"{entity_name}: {error_message}")
+        entities_succeeded, entities_failed, errors = tally_entity_results(entity_names, results)
 
-        final_status = _resolve_run_status(
+        final_status = resolve_run_status(
             entities_succeeded=entities_succeeded,
             entities_failed=entities_failed,
         )
@@ -158,6 +513,8 @@ def main() -> int:
         )
         dw_connection.commit()
         capture_connection_snapshot_safe(dw_connection, stage="fim_run", run_id=run_id)
+        if key_cache_path:
+            _save_key_cache_safe(key_cache_path)
 
         print("")
         print("Resumo final")
@@ -165,6 +522,7 @@ def main() -> int:
         print(f"- status: {final_status}")
         print(f"- entidades com sucesso: {entities_succeeded}")
         print(f"- entidades com falha: {entities_failed}")
+        _print_statement_stats()
 
         return 0 if entities_failed == 0 else 1
 
@@ -198,6 +556,137 @@ def main() -> int:
         close_quietly(dw_connection)
 
 
+def _build_entity_kwargs(args: argparse.Namespace, config: ETLConfig, *, run_id: int) -> dict[str, Any]:
+    return {
+        "run_id": run_id,
+        "default_batch_size": config.default_batch_size,
+        "default_cutoff_minutes": config.default_cutoff_minutes,
+        "batch_size_override": args.batch_size,
+        "cutoff_minutes_override": args.cutoff_minutes,
+        "load_mode_override": args.load_mode,
+        "transform_mode_override": args.transform_mode,
+        "watermark_type_override": args.watermark_type,
+        "adaptive_batch_override": True if args.adaptive_batch else None,
+        "target_batch_seconds_override": args.target_batch_seconds,
+        "command_timeout_seconds": config.command_timeout_seconds,
+        "default_batch_size_min": config.adaptive_batch_min,
+        "default_batch_size_max": config.adaptive_batch_max,
+        "default_target_batch_seconds": config.target_batch_seconds,
+        "dry_run": args.dry_run,
+        "max_batches": args.max_batches,
+        "checkpoint_every_batches": (
+            args.checkpoint_every if args.checkpoint_every is not None else config.checkpoint_every_batches
+        ),
+        "pipelined": args.pipelined,
+        "pipeline_depth": args.pipeline_depth,
+    }
+
+
+def run_daemon_mode(
+    args: argparse.Namespace,
+    config: ETLConfig,
+    *,
+    entity_names: list[str],
+    started_by: str,
+    key_cache_path: str | None,
+) -> int:
+    """Modo continuo: ciclos de consulta de backlog + micro-lotes no mesmo par de conexoes.
+
+    Cada ciclo com backlog abre um `audit.etl_run` somente com as entidades
+    que tinham linhas; todo ciclo (inclusive ocioso) atualiza
+    `audit.etl_daemon_heartbeat`. SIGTERM/SIGINT encerram apos o lote atual.
+    """
+    stop_event = threading.Event()
+    install_stop_signals(stop_event)
+    runner = DaemonRunner(
+        config,
+        started_by=started_by,
+        stop_event=stop_event,
+        run_entity=run_entity,
+        entity_kwargs=lambda run_id: _build_entity_kwargs(args, config, run_id=run_id),
+        poll_seconds_override=args.poll_seconds,
+        cutoff_minutes_override=args.cutoff_minutes,
+        watermark_type_override=args.watermark_type,
+    )
+
+    try:
+        _, dw_connection = runner.connections.get()
+        capture_connection_snapshot_safe(dw_connection, stage="inicio_daemon")
+        intervals = runner.resolve_intervals(entity_names)
+        if not intervals:
+            print("[daemon] nenhuma entidade ativa em ctl.etl_control; encerrando.")
+            return 1
+        runner.daemon_id = start_daemon_heartbeat(
+            dw_connection,
+            entities_requested=list(intervals),
+            started_by=started_by,
+            host_name=socket.gethostname(),
+            process_id=os.getpid(),
+        )
+        dw_connection.commit()
+        print(
+            f"[daemon] iniciado: daemon_id={runner.daemon_id}, intervalos="
+            + ", ".join(f"{name}={seconds}s" for name, seconds in intervals.items())
+        )
+
+        run_daemon(
+            intervals,
+            has_backlog=runner.has_backlog,
+            run_entities=runner.run_entities,
+            stop_event=stop_event,
+            on_cycle=runner.on_cycle,
+        )
+        runner.finish(status="stopped")
+        return 0
+
+    except Exception as exc:  # noqa: BLE001
+        error_text = f"{type(exc).__name__}: {exc}"
+        print(f"Falha fatal no daemon: {error_text}")
+        traceback.print_exc()
+        runner.finish(status="failed", error_message=error_text[:4000])
+        return 1
+
+    finally:
+        if key_cache_path:
+            _save_key_cache_safe(key_cache_path)
+        runner.connections.close()
+        print(
+            f"[daemon] encerrado: ciclos={runner.cycles}, runs={runner.runs}, "
+            f"loop_max={runner.max_loop_seconds:.2f}s"
+        )
+        _print_statement_stats()
+
+
+def _run_entities_parallel(
+    entity_names: list[str],
+    *,
+    config: ETLConfig,
+    parallelism: int,
+    entity_kwargs: dict[str, Any],
+) -> dict[str, tuple[bool, str | None]]:
+    # Cada worker abre seu proprio par OLTP/DW na primeira entidade e o
+    # reutiliza nas seguintes.
+    connections = WorkerConnections(config)
+
+    def _run_one(entity_name: str) -> tuple[bool, str | None]:
+        oltp_connection, dw_connection = connections.get()
+        return run_entity(
+            entity_name=entity_name,
+            oltp_connection=oltp_connection,
+            dw_connection=dw_connection,
+            **entity_kwargs,
+        )
+
+    try:
+        return run_with_dependencies(
+            entity_names,
+            parallelism=parallelism,
+            run_one=_run_one,
+        )
+    finally:
+        connections.close_all()
+
+
 def run_entity(
     *,
     entity_name: str,
@@ -210,6 +699,19 @@ def run_entity(
     cutoff_minutes_override: int | None,
     dry_run: bool,
     max_batches: int | None,
+    load_mode_override: str | None = None,
+    transform_mode_override: str | None = None,
+    watermark_type_override: str | None = None,
+    checkpoint_every_batches: int = 1,
+    pipelined: bool = False,
+    pipeline_depth: int = 2,
+    adaptive_batch_override: bool | None = None,
+    target_batch_seconds_override: int | None = None,
+    command_timeout_seconds: int = 120,
+    default_batch_size_min: int = 100,
+    default_batch_size_max: int = 50_000,
+    default_target_batch_seconds: int = 10,
+    stop_event: threading.Event | None = None,
 ) -> tuple[bool, str | None]:
     entity = get_entity(entity_name)
     control = get_entity_control(dw_connection, entity_name)
@@ -219,23 +721,61 @@ def run_entity(
         if batch_size_override is not None
         else (control.batch_size if control.batch_size is not None else default_batch_size)
     )
-    cutoff_minutes = (
-        cutoff_minutes_override
-        if cutoff_minutes_override is not None
-        else (control.cutoff_minutes if control.cutoff_minutes is not None else default_cutoff_minutes)
-    )
+    cutoff_minutes = resolve_cutoff_minutes(control, cutoff_minutes_override, default_cutoff_minutes)
     batch_size = max(1, int(batch_size))
-    cutoff_minutes = max(0, int(cutoff_minutes))
+    load_mode = normalize_load_mode(
+        load_mode_override if load_mode_override is not None else control.load_mode
+    )
+    transform_mode = normalize_transform_mode(
+        transform_mode_override if transform_mode_override is not None else control.transform_mode
+    )
+    watermark_type = resolve_entity_watermark_type(entity, control, watermark_type_override)
+    by_version = watermark_type == WATERMARK_TYPE_ROWVERSION
+    # `--batch-size` explicito fixa o lote, salvo se `--adaptive-batch` tambem vier.
+    adaptive_batch = (
+        adaptive_batch_override
+        if adaptive_batch_override is not None
+        else (control.adaptive_batch_size and batch_size_override is None)
+    )
+    batch_sizer = None
+    if adaptive_batch:
+        batch_sizer = AdaptiveBatchSizer(
+            initial_size=batch_size,
+            min_size=control.batch_size_min if control.batch_size_min is not None else default_batch_size_min,
+            max_size=control.batch_size_max if control.batch_size_max is not None else default_batch_size_max,
+            target_seconds=(
+                target_batch_seconds_override
+                if target_batch_seconds_override is not None
+                else (
+                    control.target_batch_seconds
+                    if control.target_batch_seconds is not None
+                    else default_target_batch_seconds
+                )
+            ),
+            command_timeout_seconds=command_timeout_seconds,
+        )
+        batch_size = batch_sizer.current_size
 
     print("")
     print(f"[{entity_name}] inicio")
     print(
         f"[{entity_name}] watermark atual: "
         f"{control.watermark_updated_at} / {control.watermark_id}"
+        + (f" (row_version={control.watermark_version or 0})" if by_version else "")
     )
     print(
-        f"[{entity_name}] parametros: batch_size={batch_size}, cutoff_minutes={cutoff_minutes}"
+        f"[{entity_name}] parametros: batch_size={batch_size}, "
+        f"cutoff_minutes={'n/a' if by_version else cutoff_minutes}, watermark_type={watermark_type}, "
+        f"load_mode={load_mode}, transform_mode={transform_mode}, "
+        f"checkpoint_every={checkpoint_every_batches if checkpoint_every_batches > 0 else 'fim'}"
     )
+    if batch_sizer is not None:
+        print(
+            f"[{entity_name}] batch adaptativo: limites={batch_sizer.min_size}..{batch_sizer.max_size}, "
+            f"timeout={command_timeout_seconds}s"
+        )
+
+    aggregate_targets = None if dry_run else detect_entity_sales_aggregate(entity, dw_connection, entity_name)
 
     run_entity_id = start_entity_run(
         dw_connection,
@@ -249,55 +789,155 @@ def run_entity(
     total_extracted = 0
     total_upserted = 0
     total_soft_deleted = 0
+    total_unchanged = 0
 
     watermark_to_updated_at = control.watermark_updated_at
     watermark_to_id = control.watermark_id
+    watermark_to_version = control.watermark_version
 
     batches_executed = 0
+    pending_metrics: list[BatchMetrics] = []
+    checkpoint_count = 0
+    checkpointed_batch = 0
 
-    try:
-        while True:
-            cutoff_updated_at = utcnow_naive() - timedelta(minutes=cutoff_minutes)
-            raw_rows = entity.extract_batch(
-                oltp_connection,
-                watermark_updated_at=watermark_to_updated_at,
-                watermark_id=watermark_to_id,
-                cutoff_updated_at=cutoff_updated_at,
-                batch_size=batch_size,
-            )
-
-            if not raw_rows:
-                print(f"[{entity_name}] sem novos registros.")
-                break
-
-            transformed_rows, soft_deleted_count = entity.transform_rows(raw_rows)
+    batch_source_kwargs = {
+        "watermark_updated_at": control.watermark_updated_at,
+        "watermark_id": control.watermark_id,
+        "cutoff_minutes": cutoff_minutes,
+        "batch_size": batch_size,
+        "max_batches": max_batches,
+        "transform_mode": transform_mode,
+        "next_batch_size": batch_sizer.next_size if batch_sizer is not None else None,
+        "watermark_type": watermark_type,
+        "watermark_version": control.watermark_version,
+    }
+    if pipelined:
+        batches = iter_batches_pipelined(
+            entity,
+            oltp_connection,
+            queue_depth=pipeline_depth,
+            **batch_source_kwargs,
+        )
+    else:
+        batches = iter_batches(entity, oltp_connection, **batch_source_kwargs)
 
+    begin_peak_rss_measurement()
+    try:
+        # Pico de RSS por lote: zerado ao fim de cada lote, cobre extracao,
+        # transformacao e upsert do lote seguinte (no modo pipelined inclui
+        # tambem o que estiver em voo na thread produtora).
+        reset_peak_rss()
+        # O watermark so avanca com lotes ja gravados no DW; no modo pipelined
+        # lotes extraidos e ainda na fila nunca entram no watermark final.
+        for batch in batches:
+            commit_seconds = 0.0
+            committed_at = None
+            freshness_buckets: tuple[tuple[int, int], ...] = ()
+            upsert_started = time.perf_counter()
+            checkpoint_text = ""
             if not dry_run:
-                upserted_count = entity.upsert_rows(dw_connection, transformed_rows)
+                if aggregate_targets is not None:
+                    upserted_count = upsert_with_sales_aggregate(
+                        entity, dw_connection, batch.rows, load_mode=load_mode, targets=aggregate_targets
+                    )
+                else:
+                    upserted_count = entity.upsert_rows(dw_connection, batch.rows, load_mode=load_mode)
+                upsert_seconds = time.perf_counter() - upsert_started
+                # `upsert_rows` devolve as linhas gravadas; o resto do lote tinha hash igual.
+                unchanged_count = len(batch.rows) - upserted_count
+                # Checkpoint: watermark do lote confirmado no mesmo commit do upsert.
+                if checkpoint_every_batches > 0 and batch.batch_number % checkpoint_every_batches == 0:
+                    checkpoint_control_watermark(
+                        dw_connection,
+                        entity_name=entity_name,
+                        watermark_updated_at=batch.watermark_updated_at,
+                        watermark_id=batch.watermark_id,
+                        run_id=run_id,
+                        watermark_version=batch.watermark_version,
+                    )
+                    checkpoint_text = " checkpoint"
+                # Metricas dos lotes anteriores vao no mesmo commit do lote atual.
+                _flush_batch_metrics(dw_connection, run_entity_id, pending_metrics)
+                commit_started = time.perf_counter()
                 dw_connection.commit()
+                commit_seconds = time.perf_counter() - commit_started
+                # Linhas visiveis no DW a partir daqui: atraso = commit - source_updated_at.
+                committed_at = utcnow_naive()
+                freshness_buckets = freshness_histogram(batch.rows, committed_at=committed_at)
+                pending_metrics.clear()
+                if checkpoint_text:
+                    checkpoint_count += 1
+                    checkpointed_batch = batch.batch_number
+                KEY_CACHE.notify_loaded(entity_name)
             else:
-                upserted_count = len(transformed_rows)
+                upserted_count = len(batch.rows)
+                upsert_seconds = time.perf_counter() - upsert_started
+                unchanged_count = 0
+
+            timing = BatchTiming(
+                batch_size=batch.batch_size,
+                row_count=batch.extracted_count,
+                extract_seconds=batch.extract_seconds,
+                transform_seconds=batch.transform_seconds,
+                upsert_seconds=upsert_seconds + commit_seconds,
+            )
+            timing_text = (
+                f"tempos(extracao={batch.extract_seconds:.2f}s, "
+                f"transformacao={batch.transform_seconds:.2f}s, upsert={upsert_seconds:.2f}s, "
+                f"commit={commit_seconds:.2f}s)"
+            )
+            if batch_sizer is not None:
+                next_size = batch_sizer.observe(timing)
+                timing_text += f" proximo_lote={next_size}"
 
-            total_extracted += len(raw_rows)
+            total_extracted += batch.extracted_count
             total_upserted += upserted_count
-            total_soft_deleted += soft_deleted_count
+            total_soft_deleted += batch.soft_deleted_count
+            total_unchanged += unchanged_count
 
-            watermark_to_updated_at, watermark_to_id = entity.get_batch_watermark(transformed_rows)
-            batches_executed += 1
+            watermark_to_updated_at = batch.watermark_updated_at
+            watermark_to_id = batch.watermark_id
+            if batch.watermark_version is not None:
+                watermark_to_version = batch.watermark_version
+            batches_executed = batch.batch_number
+            peak_rss_bytes = read_peak_rss_bytes()
+            reset_peak_rss()
+            pending_metrics.append(
+                BatchMetrics(
+                    batch_number=batch.batch_number,
+                    batch_size=batch.batch_size,
+                    extracted_count=batch.extracted_count,
+                    upserted_count=upserted_count,
+                    extract_seconds=batch.extract_seconds,
+                    transform_seconds=batch.transform_seconds,
+                    upsert_seconds=upsert_seconds,
+                    commit_seconds=commit_seconds,
+                    fetched_bytes=batch.fetched_bytes,
+                    peak_rss_bytes=peak_rss_bytes,
+                    committed_at=committed_at,
+                    freshness_buckets=freshness_buckets,
+                )
+            )
 
             print(
                 f"[{entity_name}] lote {batches_executed}: "
-                f"extraidos={len(raw_rows)} upsertados={upserted_count} "
-                f"soft_deleted={soft_deleted_count} "
+                f"extraidos={batch.extracted_count} upsertados={upserted_count} "
+                f"inalterados={unchanged_count} soft_deleted={batch.soft_deleted_count} "
                 f"watermark={watermark_to_updated_at}/{watermark_to_id}"
+                f"{f' row_version={watermark_to_version}' if by_version else ''} "
+                f"pico_rss={format_bytes(peak_rss_bytes)} {timing_text}{checkpoint_text}"
             )
 
-            if max_batches is not None and batches_executed >= max_batches:
-                print(f"[{entity_name}] limite max_batches atingido ({max_batches}).")
+            if stop_event is not None and stop_event.is_set():
+                # Parada solicitada (daemon): o lote atual ja foi gravado; nenhum outro e extraido.
+                batches.close()
+                print(f"[{entity_name}] parada solicitada; encerrando apos o lote {batches_executed}.")
                 break
 
-            if len(raw_rows) < batch_size:
-                break
+        if batches_executed == 0:
+            print(f"[{entity_name}] sem novos registros.")
+        elif max_batches is not None and batches_executed >= max_batches:
+            print(f"[{entity_name}] limite max_batches atingido ({max_batches}).")
 
         if not dry_run:
             if total_extracted > 0:
@@ -307,6 +947,7 @@ def run_entity(
                     watermark_updated_at=watermark_to_updated_at,
                     watermark_id=watermark_to_id,
                     run_id=run_id,
+                    watermark_version=watermark_to_version if by_version else None,
                 )
             else:
                 mark_control_success_without_watermark(
@@ -314,8 +955,20 @@ def run_entity(
                     entity_name=entity_name,
                     run_id=run_id,
                 )
+            if batch_sizer is not None and batch_sizer.observed_batches > 0:
+                update_control_batch_size(
+                    dw_connection,
+                    entity_name=entity_name,
+                    batch_size=batch_sizer.current_size,
+                )
+                print(
+                    f"[{entity_name}] batch adaptativo estabilizado em {batch_sizer.current_size} "
+                    f"(recuos por timeout={batch_sizer.backoffs}); gravado em ctl.etl_control."
+                )
             dw_connection.commit()
 
+        key_cache_stats = KEY_CACHE.pop_stats(entity_name)
+        _flush_batch_metrics(dw_connection, run_entity_id, pending_metrics)
         finish_entity_run(
             dw_connection,
             run_entity_id=run_entity_id,
@@ -326,22 +979,44 @@ def run_entity(
             watermark_to_updated_at=watermark_to_updated_at,
             watermark_to_id=watermark_to_id,
             error_message=None,
+            key_cache_hits=key_cache_stats.hits,
+            key_cache_misses=key_cache_stats.misses,
+            key_cache_refreshes=key_cache_stats.refreshes,
+            checkpoint_count=checkpoint_count,
+            unchanged_count=total_unchanged,
         )
         dw_connection.commit()
 
         print(
             f"[{entity_name}] concluido com sucesso. "
-            f"extraidos={total_extracted}, upsertados={total_upserted}."
+            f"extraidos={total_extracted}, upsertados={total_upserted}, "
+            f"inalterados={total_unchanged}, cache_chaves(hits={key_cache_stats.hits}, misses={key_cache_stats.misses}, "
+            f"refreshes={key_cache_stats.refreshes})."
         )
         return True, None
 
     except Exception as exc:  # noqa: BLE001
+        batches.close()
         dw_connection.rollback()
         error_text = f"{type(exc).__name__}: {exc}"
         print(f"[{entity_name}] falha: {error_text}")
         traceback.print_exc()
 
+        key_cache_stats = KEY_CACHE.pop_stats(entity_name)
         try:
+            # O rollback descartou as metricas ainda nao confirmadas dos lotes gravados.
+            _flush_batch_metrics(dw_connection, run_entity_id, pending_metrics)
+            # Lotes confirmados apos o ultimo checkpoint: o proximo run parte do ultimo deles.
+            if not dry_run and checkpoint_every_batches > 0 and batches_executed > checkpointed_batch:
+                checkpoint_control_watermark(
+                    dw_connection,
+                    entity_name=entity_name,
+                    watermark_updated_at=watermark_to_updated_at,
+                    watermark_id=watermark_to_id,
+                    run_id=run_id,
+                    watermark_version=watermark_to_version if by_version else None,
+                )
+                checkpoint_count += 1
             finish_entity_run(
                 dw_connection,
                 run_entity_id=run_entity_id,
@@ -352,6 +1027,11 @@ def run_entity(
                 watermark_to_updated_at=watermark_to_updated_at,
                 watermark_to_id=watermark_to_id,
                 error_message=error_text[:4000],
+                key_cache_hits=key_cache_stats.hits,
+                key_cache_misses=key_cache_stats.misses,
+                key_cache_refreshes=key_cache_stats.refreshes,
+                checkpoint_count=checkpoint_count,
+                unchanged_count=total_unchanged,
             )
             mark_control_failed(
                 dw_connection,
@@ -363,14 +1043,269 @@ def run_entity(
             dw_connection.rollback()
 
         return False, error_text
+    finally:
+        end_peak_rss_measurement()
+
+
+def _flush_batch_metrics(dw_connection, run_entity_id: int, pending_metrics: list[BatchMetrics]) -> None:
+    if pending_metrics:
+        insert_batch_metrics(dw_connection, run_entity_id=run_entity_id, metrics=pending_metrics)
 
 
-def _resolve_run_status(*, entities_succeeded: int, entities_failed: int) -> str:
-    if entities_failed == 0:
-        return "success"
-    if entities_succeeded > 0:
-        return "partial"
-    return "failed"
+def run_backfill_entity(
+    *,
+    entity_name: str,
+    oltp_connection,
+    dw_connection,
+    config: ETLConfig,
+    run_id: int,
+    default_batch_size: int,
+    default_cutoff_minutes: int,
+    batch_size_override: int | None,
+    cutoff_minutes_override: int | None,
+    load_mode_override: str | None = None,
+    transform_mode_override: str | None = None,
+    partition_count: int = 8,
+    workers: int = 4,
+) -> tuple[bool, str | None]:
+    """Carga inicial particionada por faixa de id, com retomada por particao.
+
+    O watermark da entidade so avanca (para o maior watermark entre todas as
+    particoes) quando todas concluem; ate la as cargas incrementais seguem
+    a partir do watermark anterior.
+    """
+    entity = get_entity(entity_name)
+    control = get_entity_control(dw_connection, entity_name)
+
+    batch_size = max(
+        1,
+        int(
+            batch_size_override
+            if batch_size_override is not None
+            else (control.batch_size if control.batch_size is not None else default_batch_size)
+        ),
+    )
+    cutoff_minutes = resolve_cutoff_minutes(control, cutoff_minutes_override, default_cutoff_minutes)
+    load_mode = normalize_load_mode(
+        load_mode_override if load_mode_override is not None else control.load_mode
+    )
+    transform_mode = normalize_transform_mode(
+        transform_mode_override if transform_mode_override is not None else control.transform_mode
+    )
+
+    print("")
+    print(f"[{entity_name}] inicio (backfill)")
+    print(
+        f"[{entity_name}] parametros: batch_size={batch_size}, cutoff_minutes={cutoff_minutes}, "
+        f"load_mode={load_mode}, transform_mode={transform_mode}, workers={max(1, workers)}"
+    )
+
+    run_entity_id = start_entity_run(
+        dw_connection,
+        run_id=run_id,
+        entity_name=entity_name,
+        watermark_from_updated_at=control.watermark_updated_at,
+        watermark_from_id=control.watermark_id,
+    )
+    dw_connection.commit()
+
+    total_extracted = 0
+    total_upserted = 0
+    total_unchanged = 0
+    watermark_to_updated_at = control.watermark_updated_at
+    watermark_to_id = control.watermark_id
+
+    try:
+        plan = prepare_backfill(
+            dw_connection,
+            oltp_connection,
+            entity,
+            entity_name=entity_name,
+            partition_count=partition_count,
+            cutoff_updated_at=utcnow_naive() - timedelta(minutes=cutoff_minutes),
+            run_id=run_id,
+        )
+        dw_connection.commit()
+
+        results = []
+        if plan is None:
+            print(f"[{entity_name}] origem vazia, nada a carregar.")
+        else:
+            pending_count = sum(1 for partition in plan.partitions if not partition.is_finished)
+            print(
+                f"[{entity_name}] backfill_id={plan.backfill_id} "
+                f"{'retomado' if plan.resumed else 'novo'}: cutoff={plan.cutoff_updated_at}, "
+                f"particoes pendentes={pending_count}/{len(plan.partitions)}"
+            )
+            results = _run_backfill_partitions(
+                entity,
+                plan,
+                config=config,
+                workers=workers,
+                batch_size=batch_size,
+                load_mode=load_mode,
+                transform_mode=transform_mode,
+                sales_aggregate=detect_entity_sales_aggregate(entity, dw_connection, entity_name),
+            )
+
+            before = {partition.partition_number: partition for partition in plan.partitions}
+            for result in results:
+                previous = before[result.partition.partition_number]
+                total_extracted += result.partition.extracted_count - previous.extracted_count
+                total_upserted += result.partition.upserted_count - previous.upserted_count
+                total_unchanged += result.unchanged_count
+
+            failures = [result for result in results if not result.ok]
+            if failures:
+                finish_backfill(dw_connection, backfill_id=plan.backfill_id, status=BACKFILL_STATUS_FAILED)
+                dw_connection.commit()
+                first = failures[0]
+                raise RuntimeError(
+                    f"backfill_id={plan.backfill_id}: {len(failures)} de {len(results)} particoes falharam "
+                    f"(execute novamente com --backfill para retomar). Primeira falha: particao "
+                    f"{first.partition.partition_number}: {first.error_message}"
+                )
+
+        backfill_watermark = global_watermark(result.partition for result in results)
+        if backfill_watermark is not None and backfill_watermark > (
+            control.watermark_updated_at,
+            control.watermark_id,
+        ):
+            watermark_to_updated_at, watermark_to_id = backfill_watermark
+            mark_control_success_with_watermark(
+                dw_connection,
+                entity_name=entity_name,
+                watermark_updated_at=watermark_to_updated_at,
+                watermark_id=watermark_to_id,
+                run_id=run_id,
+            )
+        else:
+            mark_control_success_without_watermark(
+                dw_connection,
+                entity_name=entity_name,
+                run_id=run_id,
+            )
+        if plan is not None:
+            finish_backfill(dw_connection, backfill_id=plan.backfill_id, status=BACKFILL_STATUS_SUCCESS)
+        dw_connection.commit()
+
+        key_cache_stats = KEY_CACHE.pop_stats(entity_name)
+        finish_entity_run(
+            dw_connection,
+            run_entity_id=run_entity_id,
+            status="success",
+            extracted_count=total_extracted,
+            upserted_count=total_upserted,
+            # O backfill nao contabiliza soft-delete por particao.
+            soft_deleted_count=0,
+            watermark_to_updated_at=watermark_to_updated_at,
+            watermark_to_id=watermark_to_id,
+            error_message=None,
+            key_cache_hits=key_cache_stats.hits,
+            key_cache_misses=key_cache_stats.misses,
+            key_cache_refreshes=key_cache_stats.refreshes,
+            unchanged_count=total_unchanged,
+        )
+        dw_connection.commit()
+
+        print(
+            f"[{entity_name}] backfill concluido com sucesso. "
+            f"extraidos={total_extracted}, upsertados={total_upserted}, "
+            f"inalterados={total_unchanged}, watermark={watermark_to_updated_at}/{watermark_to_id}."
+        )
+        return True, None
+
+    except Exception as exc:  # noqa: BLE001
+        dw_connection.rollback()
+        error_text = f"{type(exc).__name__}: {exc}"
+        print(f"[{entity_name}] falha: {error_text}")
+        traceback.print_exc()
+
+        key_cache_stats = KEY_CACHE.pop_stats(entity_name)
+        try:
+            finish_entity_run(
+                dw_connection,
+                run_entity_id=run_entity_id,
+                status="failed",
+                extracted_count=total_extracted,
+                upserted_count=total_upserted,
+                soft_deleted_count=0,
+                watermark_to_updated_at=control.watermark_updated_at,
+                watermark_to_id=control.watermark_id,
+                error_message=error_text[:4000],
+                key_cache_hits=key_cache_stats.hits,
+                key_cache_misses=key_cache_stats.misses,
+                key_cache_refreshes=key_cache_stats.refreshes,
+                unchanged_count=total_unchanged,
+            )
+            mark_control_failed(
+                dw_connection,
+                entity_name=entity_name,
+                run_id=run_id,
+            )
+            dw_connection.commit()
+        except Exception:  # noqa: BLE001
+            dw_connection.rollback()
+
+        return False, error_text
+
+
+def _run_backfill_partitions(
+    entity: Any,
+    plan: BackfillPlan,
+    *,
+    config: ETLConfig,
+    workers: int,
+    batch_size: int,
+    load_mode: str,
+    transform_mode: str,
+    sales_aggregate: SalesAggregateTargets | None = None,
+) -> list[PartitionResult]:
+    connections = WorkerConnections(config)
+
+    def _run_one(partition: BackfillPartition) -> PartitionResult:
+        oltp_connection, dw_connection = connections.get()
+        result = run_partition(
+            entity,
+            oltp_connection,
+            dw_connection,
+            partition,
+            backfill_id=plan.backfill_id,
+            cutoff_updated_at=plan.cutoff_updated_at,
+            batch_size=batch_size,
+            load_mode=load_mode,
+            transform_mode=transform_mode,
+            sales_aggregate=sales_aggregate,
+        )
+        done = result.partition
+        print(
+            f"[{plan.entity_name}] particao {done.partition_number} ({done.id_from}, {done.id_to}]: "
+            f"status={done.status} extraidos={done.extracted_count} "
+            f"upsertados={done.upserted_count} ultimo_id={done.last_id}"
+        )
+        return result
+
+    try:
+        return run_partitions(plan.partitions, workers=workers, run_one=_run_one)
+    finally:
+        connections.close_all()
+
+
+def _print_statement_stats() -> None:
+    stats = STATEMENTS.stats()
+    if not stats:
+        return
+    print("- comandos SQL (execucoes, tempo acumulado, media):")
+    for item in stats:
+        print(f"  {item.name}: {item.executions}x, {item.total_seconds:.2f}s, {item.avg_ms:.1f}ms")
+
+
+def _save_key_cache_safe(path: str) -> None:
+    try:
+        KEY_CACHE.save(path)
+        print(f"[key_cache] cache de chaves salvo em {path}.")
+    except OSError as exc:
+        print(f"[key_cache] aviso: falha ao salvar cache de chaves em {path}: {type(exc).__name__}: {exc}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Sequence
+
+from db import query_all, query_one
+
+
+SOURCE_ENTITY = "fact_vendas"
+AGGREGATE_TABLE = "fact.AGG_VENDAS_DIARIA"
+# Sketch HLL de numero_pedido por celula do agregado (script 28); registro e
+# rho vem de `fact.fn_hll_numero_pedido`.
+SKETCH_TABLE = "fact.AGG_VENDAS_DIARIA_HLL"
+SKETCH_FUNCTION = "fact.fn_hll_numero_pedido"
+SOURCE_TABLE = "fact.FACT_VENDAS"
+
+SALES_AGGREGATE_REBUILD = "rebuild"
+SALES_AGGREGATE_RECONCILE = "reconcile"
+SALES_AGGREGATE_ACTIONS = (SALES_AGGREGATE_REBUILD, SALES_AGGREGATE_RECONCILE)
+
+# Grao: dia x produto x regiao x vendedor. Venda sem vendedor vai para o
+# vendedor_id 0 (a chave primaria nao aceita NULL).
+GRAIN_COLUMNS = ("data_id", "produto_id", "regiao_id", "vendedor_id")
+_GRAIN_SELECT = (
+    "fv.data_id",
+    "fv.produto_id",
+    "fv.regiao_id",
+    "ISNULL(fv.vendedor_id, 0)",
+)
+
+# (coluna do agregado, expressao sobre fact.FACT_VENDAS AS fv). Todas aditivas:
+# a soma das contribuicoes de cada linha da fato.
+MEASURES: tuple[tuple[str, str], ...] = (
+    ("linhas", "COUNT_BIG(*)"),
+    ("quantidade_vendida", "SUM(CAST(fv.quantidade_vendida AS BIGINT))"),
+    ("valor_total_bruto", "SUM(fv.valor_total_bruto)"),
+    ("valor_total_descontos", "SUM(fv.valor_total_descontos)"),
+    ("valor_total_liquido", "SUM(fv.valor_total_liquido)"),
+    ("custo_total", "SUM(fv.custo_total)"),
+    ("margem_bruta", "SUM(fv.valor_total_liquido - fv.custo_total)"),
+    ("quantidade_devolvida", "SUM(CAST(fv.quantidade_devolvida AS BIGINT))"),
+    ("valor_devolvido", "SUM(fv.valor_devolvido)"),
+    ("valor_comissao", "SUM(ISNULL(fv.valor_comissao, 0))"),
+)
+MEASURE_COLUMNS = tuple(column for column, _ in MEASURES)
+
+_IDS_TABLE = "#agg_vendas_ids"
+_DELTA_TABLE = "#agg_vendas_delta"
+# Serializa os MERGEs no agregado entre workers paralelos (backfill/staging):
+# o lock vale ate o commit da transacao do lote.
+_APPLOCK_SQL = (
+    f"EXEC sp_getapplock @Resource = N'{AGGREGATE_TABLE}', "
+    "@LockMode = N'Exclusive', @LockOwner = N'Transaction', @LockTimeout = -1;"
+)
+
+
+@dataclass(frozen=True)
+class SalesAggregateTargets:
+    """Tabelas de agregado presentes no DW (o agregado diario sempre; o sketch, opcional)."""
+
+    order_sketch: bool = False
+
+
+@dataclass(frozen=True)
+class ReconcileResult:
+    base_groups: int
+    aggregate_groups: int
+    mismatched_groups: int
+    samples: tuple[dict[str, Any], ...] = ()
+    # None quando o sketch nao existe no DW.
+    mismatched_sketch_registers: int | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.mismatched_groups == 0 and not self.mismatched_sketch_registers
+
+
+def supports_sales_aggregate(entity: Any) -> bool:
+    return getattr(entity, "ENTITY_NAME", None) == SOURCE_ENTITY
+
+
+def detect_sales_aggregate(dw_connection: Any) -> SalesAggregateTargets | None:
+    """None sem `fact.AGG_VENDAS_DIARIA` (script 27 nao aplicado)."""
+    row = query_one(
+        dw_connection,
+        f"SELECT OBJECT_ID('{AGGREGATE_TABLE}', 'U') AS aggregate_id, OBJECT_ID('{SKETCH_TABLE}', 'U') AS sketch_id;",
+    )
+    if row is None or row["aggregate_id"] is None:
+        return None
+    return SalesAggregateTargets(order_sketch=row["sketch_id"] is not None)
+
+
+def detect_entity_sales_aggregate(entity: Any, dw_connection: Any, entity_name: str) -> SalesAggregateTargets | None:
+    """Manutencao incremental de `fact.AGG_VENDAS_DIARIA`: so fact_vendas e so com a tabela criada."""
+    if not supports_sales_aggregate(entity):
+        return None
+    targets = detect_sales_aggregate(dw_connection)
+    if targets is None:
+        print(f"[{entity_name}] agregado diario {AGGREGATE_TABLE}: ausente (script 27 nao aplicado), ignorado")
+    else:
+        print(
+            f"[{entity_name}] agregado diario {AGGREGATE_TABLE}: incremental por lote"
+            + (", com sketch de pedidos" if targets.order_sketch else "")
+        )
+    return targets
+
+
+def contribution_sql(*, sign: int, lock_source: bool) -> str:
+    """INSERT na tabela de delta com a contribuicao das linhas do lote.
+
+    `sign=-1` grava a imagem anterior (antes do upsert), `sign=1` a nova.
+    `lock_source` le a fato com UPDLOCK: um worker concorrente que tocar as
+    mesmas vendas espera o commit e le a imagem ja atualizada.
+    """
+    if sign not in (-1, 1):
+        raise ValueError("sign deve ser -1 ou 1.")
+    prefix = "-" if sign < 0 else ""
+    hint = " WITH (UPDLOCK, ROWLOCK)" if lock_source else ""
+    grain = ", ".join(_GRAIN_SELECT)
+    return (
+        f"INSERT INTO {_DELTA_TABLE} ({', '.join(GRAIN_COLUMNS + MEASURE_COLUMNS)})\n"
+        f"SELECT {grain}, "
+        + ", ".join(f"{prefix}{expression}" for _, expression in MEASURES)
+        + f"\nFROM {SOURCE_TABLE} AS fv{hint}\n"
+        f"INNER JOIN {_IDS_TABLE} AS ids\n"
+        "    ON ids.venda_original_id = fv.venda_original_id\n"
+        f"GROUP BY {grain};"
+    )
+
+
+def merge_delta_sql() -> str:
+    """Soma o delta agrupado ao agregado; grupos que ficam sem linhas saem da tabela."""
+    keys = ", ".join(GRAIN_COLUMNS)
+    sums = ", ".join(f"SUM({column}) AS {column}" for column in MEASURE_COLUMNS)
+    non_zero = " OR ".join(f"SUM({column}) <> 0" for column in MEASURE_COLUMNS)
+    on = " AND ".join(f"target.{column} = source.{column}" for column in GRAIN_COLUMNS)
+    updates = ",\n        ".join(
+        f"target.{column} = target.{column} + source.{column}" for column in MEASURE_COLUMNS
+    )
+    insert_columns = ", ".join(GRAIN_COLUMNS + MEASURE_COLUMNS)
+    insert_values = ", ".join(f"source.{column}" for column in GRAIN_COLUMNS + MEASURE_COLUMNS)
+    return (
+        f"MERGE {AGGREGATE_TABLE} WITH (HOLDLOCK) AS target\n"
+        "USING\n(\n"
+        f"    SELECT {keys}, {sums}\n"
+        f"    FROM {_DELTA_TABLE}\n"
+        f"    GROUP BY {keys}\n"
+        f"    HAVING {non_zero}\n"
+        ") AS source\n"
+        f"    ON {on}\n"
+        "WHEN MATCHED AND target.linhas + source.linhas = 0 THEN\n"
+        "    DELETE\n"
+        "WHEN MATCHED THEN\n"
+        "    UPDATE SET\n"
+        f"        {updates},\n"
+        "        target.data_atualizacao = SYSUTCDATETIME()\n"
+        "WHEN NOT MATCHED BY TARGET THEN\n"
+        f"    INSERT ({insert_columns}, data_atualizacao)\n"
+        f"    VALUES ({insert_values}, SYSUTCDATETIME());"
+    )
+
+
+def rebuild_sql() -> str:
+    grain = ", ".join(_GRAIN_SELECT)
+    return (
+        f"DELETE FROM {AGGREGATE_TABLE};\n"
+        f"INSERT INTO {AGGREGATE_TABLE} ({', '.join(GRAIN_COLUMNS + MEASURE_COLUMNS)}, data_atualizacao)\n"
+        f"SELECT {grain}, "
+        + ", ".join(expression for _, expression in MEASURES)
+        + ", SYSUTCDATETIME()\n"
+        f"FROM {SOURCE_TABLE} AS fv\n"
+        f"GROUP BY {grain};"
+    )
+
+
+def refresh_sketch_sql() -> str:
+    """Recalcula o sketch das celulas tocadas pelo lote a partir da fato.
+
+    HLL nao suporta remocao, entao as celulas do delta sao refeitas por
+    inteiro (vendas que mudaram de celula ou de pedido saem do sketch antigo).
+    """
+    touched = f"(SELECT DISTINCT {', '.join(GRAIN_COLUMNS)} FROM {_DELTA_TABLE})"
+    on_sketch = " AND ".join(f"s.{column} = t.{column}" for column in GRAIN_COLUMNS)
+    on_fact = " AND ".join(
+        f"{expression} = t.{column}" for column, expression in zip(GRAIN_COLUMNS, _GRAIN_SELECT)
+    )
+    return (
+        f"DELETE s\nFROM {SKETCH_TABLE} AS s\n"
+        f"INNER JOIN {touched} AS t\n"
+        f"    ON {on_sketch};\n"
+        + _sketch_insert_sql(f"INNER JOIN {touched} AS t\n    ON {on_fact}\n")
+    )
+
+
+def rebuild_sketch_sql() -> str:
+    return f"DELETE FROM {SKETCH_TABLE};\n" + _sketch_insert_sql("")
+
+
+def reconcile_sketch_sql() -> str:
+    """Conta os registros do sketch que diferem do recalculado a partir da fato."""
+    grain = ", ".join(_GRAIN_SELECT)
+    keys = GRAIN_COLUMNS + ("registro",)
+    on = " AND ".join(f"s.{column} = b.{column}" for column in keys)
+    base_columns = ", ".join(
+        f"{expression} AS {column}" for column, expression in zip(GRAIN_COLUMNS, _GRAIN_SELECT)
+    )
+    return (
+        "WITH base AS\n(\n"
+        f"    SELECT {base_columns}, hll.registro, MAX(hll.rho) AS rho\n"
+        f"    FROM {SOURCE_TABLE} AS fv\n"
+        f"    CROSS APPLY {SKETCH_FUNCTION}(fv.numero_pedido) AS hll\n"
+        f"    GROUP BY {grain}, hll.registro\n"
+        ")\n"
+        "SELECT COUNT_BIG(*) AS mismatched_registers\n"
+        "FROM base AS b\n"
+        f"FULL OUTER JOIN {SKETCH_TABLE} AS s\n"
+        f"    ON {on}\n"
+        "WHERE b.rho IS NULL OR s.rho IS NULL OR b.rho <> s.rho;"
+    )
+
+
+def reconcile_sql() -> str:
+    """Compara o agregado com a fato recalculada; cada linha e um grupo divergente."""
+    grain = ", ".join(_GRAIN_SELECT)
+    base_columns = ", ".join(
+        [f"{expression} AS {column}" for column, expression in zip(GRAIN_COLUMNS, _GRAIN_SELECT)]
+        + [f"{expression} AS {column}" for column, expression in MEASURES]
+    )
+    on = " AND ".join(f"a.{column} = b.{column}" for column in GRAIN_COLUMNS)
+    keys = ", ".join(f"COALESCE(b.{column}, a.{column}) AS {column}" for column in GRAIN_COLUMNS)
+    diffs = " OR ".join(f"ISNULL(b.{column}, 0) <> ISNULL(a.{column}, 0)" for column in MEASURE_COLUMNS)
+    compared = ", ".join(
+        f"b.{column} AS base_{column}, a.{column} AS agregado_{column}" for column in MEASURE_COLUMNS
+    )
+    return (
+        "WITH base AS\n(\n"
+        f"    SELECT {base_columns}\n"
+        f"    FROM {SOURCE_TABLE} AS fv\n"
+        f"    GROUP BY {grain}\n"
+        ")\n"
+        f"SELECT TOP (?) COUNT_BIG(*) OVER () AS mismatched_groups, {keys}, {compared}\n"
+        "FROM base AS b\n"
+        f"FULL OUTER JOIN {AGGREGATE_TABLE} AS a\n"
+        f"    ON {on}\n"
+        f"WHERE b.data_id IS NULL OR a.data_id IS NULL OR {diffs}\n"
+        f"ORDER BY {', '.join(GRAIN_COLUMNS)};"
+    )
+
+
+def capture_previous(dw_connection: Any, source_ids: Sequence[int]) -> None:
+    """Antes do upsert: registra os ids do lote e subtrai a contribuicao atual deles."""
+    cursor = dw_connection.cursor()
+    try:
+        # Sem parametros o pyodbc usa SQLExecDirect: as temporarias ficam na sessao.
+        cursor.execute(_create_temp_tables_sql())
+        ids = list(dict.fromkeys(int(source_id) for source_id in source_ids))
+        if ids:
+            try:
+                cursor.fast_executemany = True
+            except Exception:  # noqa: BLE001
+                pass
+            cursor.executemany(
+                f"INSERT INTO {_IDS_TABLE} (venda_original_id) VALUES (?);",
+                [(source_id,) for source_id in ids],
+            )
+            cursor.execute(contribution_sql(sign=-1, lock_source=True))
+    finally:
+        cursor.close()
+
+
+def apply_delta(dw_connection: Any, *, order_sketch: bool = False) -> int:
+    """Depois do upsert: soma a contribuicao nova e aplica o delta no agregado.
+
+    Roda na transacao do lote (o commit e do chamador). Com `order_sketch`,
+    refaz tambem o sketch de pedidos das celulas tocadas. Devolve os grupos
+    do agregado alterados.
+    """
+    cursor = dw_connection.cursor()
+    try:
+        cursor.execute(contribution_sql(sign=1, lock_source=False))
+        cursor.execute(_APPLOCK_SQL)
+        cursor.execute(merge_delta_sql())
+        changed_groups = max(int(cursor.rowcount or 0), 0)
+        if order_sketch:
+            cursor.execute(refresh_sketch_sql())
+        cursor.execute(f"DROP TABLE {_IDS_TABLE}; DROP TABLE {_DELTA_TABLE};")
+        return changed_groups
+    finally:
+        cursor.close()
+
+
+def upsert_with_sales_aggregate(
+    entity: Any,
+    dw_connection: Any,
+    rows: list[dict[str, Any]],
+    *,
+    load_mode: str,
+    targets: SalesAggregateTargets = SalesAggregateTargets(),
+) -> int:
+    """`entity.upsert_rows` com manutencao incremental de `fact.AGG_VENDAS_DIARIA`.
+
+    Imagem anterior subtraida, upsert, imagem nova somada: tudo na mesma
+    transacao do lote, entao agregado e fato sao confirmados juntos.
+    """
+    if not rows:
+        return entity.upsert_rows(dw_connection, rows, load_mode=load_mode)
+    capture_previous(dw_connection, [row["venda_original_id"] for row in rows])
+    upserted = entity.upsert_rows(dw_connection, rows, load_mode=load_mode)
+    apply_delta(dw_connection, order_sketch=targets.order_sketch)
+    return upserted
+
+
+def rebuild_sales_aggregate(
+    dw_connection: Any,
+    targets: SalesAggregateTargets = SalesAggregateTargets(),
+) -> int:
+    """Recalcula o agregado (e o sketch, se existir) a partir da fato (commit do chamador)."""
+    cursor = dw_connection.cursor()
+    try:
+        cursor.execute(_APPLOCK_SQL)
+        cursor.execute(rebuild_sql())
+        if targets.order_sketch:
+            cursor.execute(rebuild_sketch_sql())
+    finally:
+        cursor.close()
+    row = query_one(dw_connection, f"SELECT COUNT_BIG(*) AS groups FROM {AGGREGATE_TABLE};")
+    return int(row["groups"]) if row else 0
+
+
+def reconcile_sales_aggregate(
+    dw_connection: Any,
+    targets: SalesAggregateTargets = SalesAggregateTargets(),
+    *,
+    sample_limit: int = 20,
+) -> ReconcileResult:
+    mismatches = query_all(dw_connection, reconcile_sql(), (max(1, int(sample_limit)),))
+    sketch_mismatches = None
+    if targets.order_sketch:
+        row = query_one(dw_connection, reconcile_sketch_sql())
+        sketch_mismatches = int(row["mismatched_registers"]) if row else 0
+    counts = query_one(
+        dw_connection,
+        f"""
+        SELECT
+            (SELECT COUNT_BIG(*) FROM {AGGREGATE_TABLE}) AS aggregate_groups,
+            (
+                SELECT COUNT_BIG(*)
+                FROM (SELECT DISTINCT {', '.join(_GRAIN_SELECT)} FROM {SOURCE_TABLE} AS fv) AS grupos
+            ) AS base_groups;
+        """,
+    )
+    return ReconcileResult(
+        base_groups=int(counts["base_groups"]) if counts else 0,
+        aggregate_groups=int(counts["aggregate_groups"]) if counts else 0,
+        mismatched_groups=int(mismatches[0]["mismatched_groups"]) if mismatches else 0,
+        samples=tuple(
+            {key: value for key, value in row.items() if key != "mismatched_groups"} for row in mismatches
+        ),
+        mismatched_sketch_registers=sketch_mismatches,
+    )
+
+
+def _sketch_insert_sql(join_sql: str) -> str:
+    grain = ", ".join(_GRAIN_SELECT)
+    return (
+        f"INSERT INTO {SKETCH_TABLE} ({', '.join(GRAIN_COLUMNS)}, registro, rho)\n"
+        f"SELECT {grain}, hll.registro, MAX(hll.rho)\n"
+        f"FROM {SOURCE_TABLE} AS fv\n"
+        f"{join_sql}"
+        f"CROSS APPLY {SKETCH_FUNCTION}(fv.numero_pedido) AS hll\n"
+        f"GROUP BY {grain}, hll.registro;"
+    )
+
+
+def _create_temp_tables_sql() -> str:
+    grain = ", ".join(f"{column} INT NOT NULL" for column in GRAIN_COLUMNS)
+    measures = ", ".join(
+        f"{column} {'BIGINT' if column in ('linhas', 'quantidade_vendida', 'quantidade_devolvida') else 'DECIMAL(19,2)'} NOT NULL"
+        for column in MEASURE_COLUMNS
+    )
+    return (
+        f"IF OBJECT_ID('tempdb..{_IDS_TABLE}') IS NOT NULL DROP TABLE {_IDS_TABLE};\n"
+        f"IF OBJECT_ID('tempdb..{_DELTA_TABLE}') IS NOT NULL DROP TABLE {_DELTA_TABLE};\n"
+        f"CREATE TABLE {_IDS_TABLE} (venda_original_id BIGINT NOT NULL PRIMARY KEY);\n"
+        f"CREATE TABLE {_DELTA_TABLE} ({grain}, {measures});"
+    )
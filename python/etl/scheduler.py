@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, TypeVar
+
+from entities import get_entity_dependencies
+
+
+T = TypeVar("T")
+
+
+def resolve_dependencies(entity_names: list[str]) -> dict[str, set[str]]:
+    """Restringe as dependencias declaradas ao conjunto de entidades selecionadas."""
+    selected = set(entity_names)
+    return {
+        name: {dep for dep in get_entity_dependencies(name) if dep in selected}
+        for name in entity_names
+    }
+
+
+def run_with_dependencies(
+    entity_names: list[str],
+    *,
+    parallelism: int,
+    run_one: Callable[[str], T],
+    dependencies: dict[str, set[str]] | None = None,
+) -> dict[str, T]:
+    """Executa `run_one` para cada entidade respeitando as dependencias declaradas.
+
+    Entidades prontas (todas as dependencias concluidas) sao submetidas ao pool
+    na ordem de `entity_names`. Uma dependencia conta como concluida quando
+    `run_one` retorna, com sucesso ou falha de entidade, mantendo o mesmo
+    comportamento do modo sequencial. Excecoes lancadas por `run_one` sao
+    tratadas como fatais: nada novo e submetido e a excecao e relancada apos
+    as execucoes em andamento terminarem.
+
+    `dependencies` substitui as dependencias declaradas pelas entidades
+    (ex.: arquivos da landing zone em `staging.load_manifest`).
+    """
+    pending_deps = (
+        {name: set(dependencies.get(name, ())) for name in entity_names}
+        if dependencies is not None
+        else resolve_dependencies(entity_names)
+    )
+    _raise_if_cycle(entity_names, pending_deps)
+
+    results: dict[str, T] = {}
+    waiting = list(entity_names)
+    running: dict[Future[T], str] = {}
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, int(parallelism)),
+        thread_name_prefix="etl-worker",
+    ) as executor:
+        while waiting or running:
+            for name in [n for n in waiting if not pending_deps[n]]:
+                waiting.remove(name)
+                running[executor.submit(run_one, name)] = name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    wait(running)
+                    raise error
+                results[name] = future.result()
+                for deps in pending_deps.values():
+                    deps.discard(name)
+
+    return results
+
+
+def _raise_if_cycle(entity_names: list[str], dependencies: dict[str, set[str]]) -> None:
+    resolved: set[str] = set()
+    remaining = list(entity_names)
+    while remaining:
+        ready = [name for name in remaining if dependencies[name] <= resolved]
+        if not ready:
+            raise ValueError(
+                "Dependencias ciclicas entre entidades: " + ", ".join(sorted(remaining))
+            )
+        resolved.update(ready)
+        remaining = [name for name in remaining if name not in resolved]
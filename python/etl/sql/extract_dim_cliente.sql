@@ -1,4 +1,4 @@
-SELECT TOP ({batch_size})
+SELECT TOP (?)
     c.customer_id,
     c.full_name,
     c.email,
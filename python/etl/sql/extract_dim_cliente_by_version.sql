@@ -0,0 +1,33 @@
+SELECT TOP (?)
+    c.customer_id,
+    c.full_name,
+    c.email,
+    c.phone,
+    c.document_number,
+    c.birth_date,
+    c.gender,
+    c.customer_type,
+    c.segment,
+    c.credit_score,
+    c.value_category,
+    c.address_line,
+    c.district,
+    c.city,
+    c.state,
+    c.country,
+    c.zip_code,
+    c.first_signup_date,
+    c.last_purchase_date,
+    c.is_active,
+    c.accepts_email_marketing,
+    c.is_vip,
+    c.created_at,
+    c.updated_at,
+    c.deleted_at,
+    CAST(c.row_version AS BIGINT) AS source_version
+FROM core.customers AS c
+WHERE
+    c.row_version > CONVERT(BINARY(8), ?)
+    AND c.row_version < CONVERT(BINARY(8), ?)
+ORDER BY
+    c.row_version ASC;
@@ -1,4 +1,4 @@
-SELECT TOP ({batch_size})
+SELECT TOP (?)
     d.discount_id,
     d.discount_code,
     d.campaign_name,
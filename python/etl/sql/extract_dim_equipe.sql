@@ -1,4 +1,4 @@
-SELECT TOP ({batch_size})
+SELECT TOP (?)
     t.team_id,
     t.team_code,
     t.team_name,
@@ -1,4 +1,4 @@
-SELECT TOP ({batch_size})
+SELECT TOP (?)
     p.product_id,
     p.product_code,
     p.sku,
@@ -1,4 +1,4 @@
-SELECT TOP ({batch_size})
+SELECT TOP (?)
     r.region_id,
     r.region_code,
     r.country,
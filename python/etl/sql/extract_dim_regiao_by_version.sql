@@ -0,0 +1,20 @@
+SELECT TOP (?)
+    r.region_id,
+    r.region_code,
+    r.country,
+    r.region_name,
+    r.state,
+    r.state_name,
+    r.city,
+    r.ibge_code,
+    r.is_active,
+    r.created_at,
+    r.updated_at,
+    r.deleted_at,
+    CAST(r.row_version AS BIGINT) AS source_version
+FROM core.regions AS r
+WHERE
+    r.row_version > CONVERT(BINARY(8), ?)
+    AND r.row_version < CONVERT(BINARY(8), ?)
+ORDER BY
+    r.row_version ASC;
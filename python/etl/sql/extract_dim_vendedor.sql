@@ -1,4 +1,4 @@
-SELECT TOP ({batch_size})
+SELECT TOP (?)
     s.seller_id,
     s.seller_code,
     s.seller_name,
@@ -1,4 +1,4 @@
-SELECT TOP ({batch_size})
+SELECT TOP (?)
     oid.order_item_discount_id,
     oid.order_item_id,
     oid.order_id,
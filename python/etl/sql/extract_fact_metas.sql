@@ -1,4 +1,4 @@
-SELECT TOP ({batch_size})
+SELECT TOP (?)
     stm.seller_target_id,
     stm.seller_id,
     stm.target_month,
@@ -0,0 +1,22 @@
+SELECT TOP (?)
+    stm.seller_target_id,
+    stm.seller_id,
+    stm.target_month,
+    stm.target_amount,
+    stm.target_quantity,
+    stm.realized_amount,
+    stm.realized_quantity,
+    stm.period_type,
+    stm.period_closed,
+    stm.created_at AS target_created_at,
+    stm.updated_at AS target_updated_at,
+    stm.deleted_at AS target_deleted_at,
+    CAST(stm.row_version AS BIGINT) AS source_version
+FROM core.seller_targets_monthly AS stm
+WHERE
+    stm.seller_id IS NOT NULL
+    AND stm.seller_id > 0
+    AND stm.row_version > CONVERT(BINARY(8), ?)
+    AND stm.row_version < CONVERT(BINARY(8), ?)
+ORDER BY
+    stm.row_version ASC;
@@ -1,4 +1,114 @@
-SELECT TOP ({batch_size})
+-- source_updated_at = maior entre orders.updated_at e order_items.updated_at.
+-- Em vez de filtrar/ordenar pela expressao (varredura completa a cada lote),
+-- o lote e a uniao de dois fluxos keyset disjuntos, cada um com seek em indice:
+--   1. itens alterados (item mais recente que o pedido):
+--      IX_core_order_items_updated_id (updated_at, order_item_id);
+--   2. pedidos alterados (pedido mais recente que o item):
+--      IX_core_orders_updated_id (updated_at, order_id) + IX_core_order_items_order.
+-- Cada fluxo limita o proprio TOP; a ordem final (source_updated_at, order_item_id)
+-- e o watermark sao os mesmos da consulta original.
+--
+-- O fluxo de pedidos pagina por (updated_at, order_id), mas o watermark segue
+-- order_item_id. Os pedidos do ultimo updated_at da pagina (a borda) podem
+-- continuar fora dela com itens de id menor; por isso a borda e relida inteira
+-- e limitada pelo TOP na ordem de order_item_id, e, com a pagina cheia, nada
+-- depois da borda entra no lote. Empates em updated_at (DATETIME2(0)) nao
+-- passam de `batch_size` linhas em nenhum fluxo.
+WITH order_page AS
+(
+    SELECT TOP (?)
+        o.order_id,
+        o.updated_at
+    FROM core.orders AS o
+    WHERE
+        o.updated_at <= ?
+        AND o.updated_at >= ?
+        AND EXISTS
+        (
+            SELECT 1
+            FROM core.order_items AS oi_pending
+            WHERE oi_pending.order_id = o.order_id
+              AND oi_pending.updated_at < o.updated_at
+              AND (o.updated_at > ? OR oi_pending.order_item_id > ?)
+        )
+    ORDER BY
+        o.updated_at ASC,
+        o.order_id ASC
+),
+order_edge AS
+(
+    -- Pagina cheia: pode haver pedidos depois da borda ainda nao lidos.
+    SELECT
+        MAX(order_page.updated_at) AS edge_updated_at,
+        CASE WHEN COUNT(*) < ? THEN 0 ELSE 1 END AS is_page_full
+    FROM order_page
+),
+changed_items AS
+(
+    SELECT
+        item_stream.order_item_id,
+        item_stream.source_updated_at
+    FROM
+    (
+        SELECT TOP (?)
+            oi.order_item_id,
+            oi.updated_at AS source_updated_at
+        FROM core.order_items AS oi
+        INNER JOIN core.orders AS o
+            ON o.order_id = oi.order_id
+        WHERE
+            oi.updated_at <= ?
+            AND
+            (
+                oi.updated_at > ?
+                OR (oi.updated_at = ? AND oi.order_item_id > ?)
+            )
+            AND o.updated_at <= oi.updated_at
+        ORDER BY
+            oi.updated_at ASC,
+            oi.order_item_id ASC
+    ) AS item_stream
+
+    UNION ALL
+
+    -- Pedidos da pagina antes da borda: todos os itens pendentes.
+    SELECT
+        oi.order_item_id,
+        order_page.updated_at AS source_updated_at
+    FROM order_page
+    CROSS JOIN order_edge
+    INNER JOIN core.order_items AS oi
+        ON oi.order_id = order_page.order_id
+       AND oi.updated_at < order_page.updated_at
+    WHERE
+        order_page.updated_at < order_edge.edge_updated_at
+        AND (order_page.updated_at > ? OR oi.order_item_id > ?)
+
+    UNION ALL
+
+    -- Borda: todos os pedidos do updated_at, limitados na ordem do watermark.
+    SELECT
+        edge_stream.order_item_id,
+        edge_stream.source_updated_at
+    FROM
+    (
+        SELECT TOP (?)
+            oi.order_item_id,
+            o.updated_at AS source_updated_at
+        FROM order_edge
+        INNER JOIN core.orders AS o
+            ON o.updated_at = order_edge.edge_updated_at
+        INNER JOIN core.order_items AS oi
+            ON oi.order_id = o.order_id
+           AND oi.updated_at < o.updated_at
+        WHERE
+            o.updated_at > ?
+            OR oi.order_item_id > ?
+        ORDER BY
+            oi.order_item_id ASC
+    ) AS edge_stream
+)
+SELECT TOP (?)
     oi.order_item_id,
     oi.order_id,
     oi.item_number,
@@ -24,8 +134,11 @@ SELECT TOP ({batch_size})
     COALESCE(o.region_id, rc.region_id) AS resolved_region_id,
     o.updated_at AS order_updated_at,
     o.deleted_at AS order_deleted_at,
-    src.source_updated_at
-FROM core.order_items AS oi
+    ci.source_updated_at
+FROM changed_items AS ci
+CROSS JOIN order_edge
+INNER JOIN core.order_items AS oi
+    ON oi.order_item_id = ci.order_item_id
 INNER JOIN core.orders AS o
     ON o.order_id = oi.order_id
 LEFT JOIN core.customers AS c
@@ -34,21 +147,9 @@ LEFT JOIN core.regions AS rc
     ON rc.state = c.state
    AND rc.city = c.city
    AND rc.deleted_at IS NULL
-CROSS APPLY
-(
-    SELECT
-        CASE
-            WHEN o.updated_at > oi.updated_at THEN o.updated_at
-            ELSE oi.updated_at
-        END AS source_updated_at
-) AS src
 WHERE
-    src.source_updated_at <= ?
-    AND
-    (
-        src.source_updated_at > ?
-        OR (src.source_updated_at = ? AND oi.order_item_id > ?)
-    )
+    order_edge.is_page_full = 0
+    OR ci.source_updated_at <= order_edge.edge_updated_at
 ORDER BY
-    src.source_updated_at ASC,
-    oi.order_item_id ASC;
+    ci.source_updated_at ASC,
+    ci.order_item_id ASC;
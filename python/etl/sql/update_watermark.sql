@@ -1,6 +1,7 @@
 UPDATE ctl.etl_control
    SET watermark_updated_at = ?,
        watermark_id = ?,
+       watermark_version = ?,
        last_run_id = ?,
        last_status = ?,
        last_success_at = CASE WHEN ? = 'success' THEN SYSUTCDATETIME() ELSE last_success_at END,
@@ -24,10 +24,11 @@ USING
         ? AS data_ultima_atualizacao,
         ? AS eh_ativo,
         ? AS aceita_email_marketing,
-        ? AS eh_cliente_vip
+        ? AS eh_cliente_vip,
+        ? AS row_hash
 ) AS source
     ON target.cliente_original_id = source.cliente_original_id
-WHEN MATCHED THEN
+WHEN MATCHED AND (target.row_hash IS NULL OR target.row_hash <> source.row_hash) THEN
     UPDATE SET
         target.nome_cliente = source.nome_cliente,
         target.email = source.email,
@@ -50,7 +51,8 @@ WHEN MATCHED THEN
         target.data_ultima_atualizacao = source.data_ultima_atualizacao,
         target.eh_ativo = source.eh_ativo,
         target.aceita_email_marketing = source.aceita_email_marketing,
-        target.eh_cliente_vip = source.eh_cliente_vip
+        target.eh_cliente_vip = source.eh_cliente_vip,
+        target.row_hash = source.row_hash
 WHEN NOT MATCHED BY TARGET THEN
     INSERT
     (
@@ -76,7 +78,8 @@ WHEN NOT MATCHED BY TARGET THEN
         data_ultima_atualizacao,
         eh_ativo,
         aceita_email_marketing,
-        eh_cliente_vip
+        eh_cliente_vip,
+        row_hash
     )
     VALUES
     (
@@ -102,5 +105,6 @@ WHEN NOT MATCHED BY TARGET THEN
         source.data_ultima_atualizacao,
         source.eh_ativo,
         source.aceita_email_marketing,
-        source.eh_cliente_vip
+        source.eh_cliente_vip,
+        source.row_hash
     );
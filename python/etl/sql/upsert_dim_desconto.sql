@@ -30,10 +30,11 @@ USING
         ? AS data_criacao,
         ? AS data_ultima_atualizacao,
         ? AS usuario_criador,
-        ? AS observacoes
+        ? AS observacoes,
+        ? AS row_hash
 ) AS source
     ON target.desconto_original_id = source.desconto_original_id
-WHEN MATCHED THEN
+WHEN MATCHED AND (target.row_hash IS NULL OR target.row_hash <> source.row_hash) THEN
     UPDATE SET
         target.codigo_desconto = source.codigo_desconto,
         target.nome_campanha = source.nome_campanha,
@@ -62,7 +63,8 @@ WHEN MATCHED THEN
         target.data_criacao = source.data_criacao,
         target.data_ultima_atualizacao = source.data_ultima_atualizacao,
         target.usuario_criador = source.usuario_criador,
-        target.observacoes = source.observacoes
+        target.observacoes = source.observacoes,
+        target.row_hash = source.row_hash
 WHEN NOT MATCHED BY TARGET THEN
     INSERT
     (
@@ -94,7 +96,8 @@ WHEN NOT MATCHED BY TARGET THEN
         data_criacao,
         data_ultima_atualizacao,
         usuario_criador,
-        observacoes
+        observacoes,
+        row_hash
     )
     VALUES
     (
@@ -126,5 +129,6 @@ WHEN NOT MATCHED BY TARGET THEN
         source.data_criacao,
         source.data_ultima_atualizacao,
         source.usuario_criador,
-        source.observacoes
+        source.observacoes,
+        source.row_hash
     );
@@ -27,10 +27,11 @@ USING
         ? AS data_inativacao,
         ? AS situacao,
         ? AS eh_ativa,
-        ? AS observacoes
+        ? AS observacoes,
+        ? AS row_hash
 ) AS source
     ON target.equipe_original_id = source.equipe_original_id
-WHEN MATCHED THEN
+WHEN MATCHED AND (target.row_hash IS NULL OR target.row_hash <> source.row_hash) THEN
     UPDATE SET
         target.nome_equipe = source.nome_equipe,
         target.codigo_equipe = source.codigo_equipe,
@@ -56,7 +57,8 @@ WHEN MATCHED THEN
         target.data_inativacao = source.data_inativacao,
         target.situacao = source.situacao,
         target.eh_ativa = source.eh_ativa,
-        target.observacoes = source.observacoes
+        target.observacoes = source.observacoes,
+        target.row_hash = source.row_hash
 WHEN NOT MATCHED BY TARGET THEN
     INSERT
     (
@@ -85,7 +87,8 @@ WHEN NOT MATCHED BY TARGET THEN
         data_inativacao,
         situacao,
         eh_ativa,
-        observacoes
+        observacoes,
+        row_hash
     )
     VALUES
     (
@@ -114,5 +117,6 @@ WHEN NOT MATCHED BY TARGET THEN
         source.data_inativacao,
         source.situacao,
         source.eh_ativa,
-        source.observacoes
+        source.observacoes,
+        source.row_hash
     );
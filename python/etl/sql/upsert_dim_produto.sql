@@ -39,10 +39,11 @@ USING
         ? AS data_ultima_atualizacao,
         ? AS palavras_chave,
         ? AS avaliacao_media,
-        ? AS total_avaliacoes
+        ? AS total_avaliacoes,
+        ? AS row_hash
 ) AS source
     ON target.produto_original_id = source.produto_original_id
-WHEN MATCHED THEN
+WHEN MATCHED AND (target.row_hash IS NULL OR target.row_hash <> source.row_hash) THEN
     UPDATE SET
         target.codigo_sku = source.codigo_sku,
         target.codigo_barras = source.codigo_barras,
@@ -80,7 +81,8 @@ WHEN MATCHED THEN
         target.data_ultima_atualizacao = source.data_ultima_atualizacao,
         target.palavras_chave = source.palavras_chave,
         target.avaliacao_media = source.avaliacao_media,
-        target.total_avaliacoes = source.total_avaliacoes
+        target.total_avaliacoes = source.total_avaliacoes,
+        target.row_hash = source.row_hash
 WHEN NOT MATCHED BY TARGET THEN
     INSERT
     (
@@ -121,7 +123,8 @@ WHEN NOT MATCHED BY TARGET THEN
         data_ultima_atualizacao,
         palavras_chave,
         avaliacao_media,
-        total_avaliacoes
+        total_avaliacoes,
+        row_hash
     )
     VALUES
     (
@@ -162,5 +165,6 @@ WHEN NOT MATCHED BY TARGET THEN
         source.data_ultima_atualizacao,
         source.palavras_chave,
         source.avaliacao_media,
-        source.total_avaliacoes
+        source.total_avaliacoes,
+        source.row_hash
     );
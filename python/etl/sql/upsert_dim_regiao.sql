@@ -24,10 +24,11 @@ USING
         ? AS fuso_horario,
         ? AS data_cadastro,
         ? AS data_ultima_atualizacao,
-        ? AS eh_ativo
+        ? AS eh_ativo,
+        ? AS row_hash
 ) AS source
     ON target.regiao_original_id = source.regiao_original_id
-WHEN MATCHED THEN
+WHEN MATCHED AND (target.row_hash IS NULL OR target.row_hash <> source.row_hash) THEN
     UPDATE SET
         target.pais = source.pais,
         target.regiao_pais = source.regiao_pais,
@@ -50,7 +51,8 @@ WHEN MATCHED THEN
         target.fuso_horario = source.fuso_horario,
         target.data_cadastro = source.data_cadastro,
         target.data_ultima_atualizacao = source.data_ultima_atualizacao,
-        target.eh_ativo = source.eh_ativo
+        target.eh_ativo = source.eh_ativo,
+        target.row_hash = source.row_hash
 WHEN NOT MATCHED BY TARGET THEN
     INSERT
     (
@@ -76,7 +78,8 @@ WHEN NOT MATCHED BY TARGET THEN
         fuso_horario,
         data_cadastro,
         data_ultima_atualizacao,
-        eh_ativo
+        eh_ativo,
+        row_hash
     )
     VALUES
     (
@@ -102,5 +105,6 @@ WHEN NOT MATCHED BY TARGET THEN
         source.fuso_horario,
         source.data_cadastro,
         source.data_ultima_atualizacao,
-        source.eh_ativo
+        source.eh_ativo,
+        source.row_hash
     );
@@ -42,10 +42,11 @@ USING
         ? AS eh_lider,
         ? AS aceita_novos_clientes,
         ? AS observacoes,
-        ? AS motivo_desligamento
+        ? AS motivo_desligamento,
+        ? AS row_hash
 ) AS source
     ON target.vendedor_original_id = source.vendedor_original_id
-WHEN MATCHED THEN
+WHEN MATCHED AND (target.row_hash IS NULL OR target.row_hash <> source.row_hash) THEN
     UPDATE SET
         target.nome_vendedor = source.nome_vendedor,
         target.nome_exibicao = source.nome_exibicao,
@@ -86,7 +87,8 @@ WHEN MATCHED THEN
         target.eh_lider = source.eh_lider,
         target.aceita_novos_clientes = source.aceita_novos_clientes,
         target.observacoes = source.observacoes,
-        target.motivo_desligamento = source.motivo_desligamento
+        target.motivo_desligamento = source.motivo_desligamento,
+        target.row_hash = source.row_hash
 WHEN NOT MATCHED BY TARGET THEN
     INSERT
     (
@@ -130,7 +132,8 @@ WHEN NOT MATCHED BY TARGET THEN
         eh_lider,
         aceita_novos_clientes,
         observacoes,
-        motivo_desligamento
+        motivo_desligamento,
+        row_hash
     )
     VALUES
     (
@@ -174,5 +177,6 @@ WHEN NOT MATCHED BY TARGET THEN
         source.eh_lider,
         source.aceita_novos_clientes,
         source.observacoes,
-        source.motivo_desligamento
+        source.motivo_desligamento,
+        source.row_hash
     );
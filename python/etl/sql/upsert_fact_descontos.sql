@@ -20,10 +20,11 @@ USING
         ? AS motivo_rejeicao,
         ? AS numero_pedido,
         ? AS data_inclusao,
-        ? AS data_atualizacao
+        ? AS data_atualizacao,
+        ? AS row_hash
 ) AS source
     ON target.desconto_aplicado_original_id = source.desconto_aplicado_original_id
-WHEN MATCHED THEN
+WHEN MATCHED AND (target.row_hash IS NULL OR target.row_hash <> source.row_hash) THEN
     UPDATE SET
         target.desconto_id = source.desconto_id,
         target.venda_id = source.venda_id,
@@ -41,7 +42,8 @@ WHEN MATCHED THEN
         target.desconto_aprovado = source.desconto_aprovado,
         target.motivo_rejeicao = source.motivo_rejeicao,
         target.numero_pedido = source.numero_pedido,
-        target.data_atualizacao = source.data_atualizacao
+        target.data_atualizacao = source.data_atualizacao,
+        target.row_hash = source.row_hash
 WHEN NOT MATCHED BY TARGET THEN
     INSERT
     (
@@ -63,7 +65,8 @@ WHEN NOT MATCHED BY TARGET THEN
         motivo_rejeicao,
         numero_pedido,
         data_inclusao,
-        data_atualizacao
+        data_atualizacao,
+        row_hash
     )
     VALUES
     (
@@ -85,5 +88,6 @@ WHEN NOT MATCHED BY TARGET THEN
         source.motivo_rejeicao,
         source.numero_pedido,
         source.data_inclusao,
-        source.data_atualizacao
+        source.data_atualizacao,
+        source.row_hash
     );
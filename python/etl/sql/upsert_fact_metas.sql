@@ -16,12 +16,13 @@ USING
         ? AS meta_superada,
         ? AS eh_periodo_fechado,
         ? AS data_inclusao,
-        ? AS data_ultima_atualizacao
+        ? AS data_ultima_atualizacao,
+        ? AS row_hash
 ) AS source
     ON target.vendedor_id = source.vendedor_id
    AND target.data_id = source.data_id
    AND target.tipo_periodo = source.tipo_periodo
-WHEN MATCHED THEN
+WHEN MATCHED AND (target.row_hash IS NULL OR target.row_hash <> source.row_hash) THEN
     UPDATE SET
         target.valor_meta = source.valor_meta,
         target.quantidade_meta = source.quantidade_meta,
@@ -33,7 +34,8 @@ WHEN MATCHED THEN
         target.meta_batida = source.meta_batida,
         target.meta_superada = source.meta_superada,
         target.eh_periodo_fechado = source.eh_periodo_fechado,
-        target.data_ultima_atualizacao = source.data_ultima_atualizacao
+        target.data_ultima_atualizacao = source.data_ultima_atualizacao,
+        target.row_hash = source.row_hash
 WHEN NOT MATCHED BY TARGET THEN
     INSERT
     (
@@ -51,7 +53,8 @@ WHEN NOT MATCHED BY TARGET THEN
         eh_periodo_fechado,
         tipo_periodo,
         data_inclusao,
-        data_ultima_atualizacao
+        data_ultima_atualizacao,
+        row_hash
     )
     VALUES
     (
@@ -69,5 +72,6 @@ WHEN NOT MATCHED BY TARGET THEN
         source.eh_periodo_fechado,
         source.tipo_periodo,
         source.data_inclusao,
-        source.data_ultima_atualizacao
+        source.data_ultima_atualizacao,
+        source.row_hash
     );
@@ -19,10 +19,11 @@ USING
         ? AS percentual_comissao,
         ? AS valor_comissao,
         ? AS numero_pedido,
-        ? AS teve_desconto
+        ? AS teve_desconto,
+        ? AS row_hash
 ) AS source
     ON target.venda_original_id = source.venda_original_id
-WHEN MATCHED THEN
+WHEN MATCHED AND (target.row_hash IS NULL OR target.row_hash <> source.row_hash) THEN
     UPDATE SET
         target.data_id = source.data_id,
         target.cliente_id = source.cliente_id,
@@ -41,7 +42,8 @@ WHEN MATCHED THEN
         target.valor_comissao = source.valor_comissao,
         target.numero_pedido = source.numero_pedido,
         target.teve_desconto = source.teve_desconto,
-        target.data_atualizacao = GETDATE()
+        target.data_atualizacao = GETDATE(),
+        target.row_hash = source.row_hash
 WHEN NOT MATCHED BY TARGET THEN
     INSERT
     (
@@ -64,7 +66,8 @@ WHEN NOT MATCHED BY TARGET THEN
         numero_pedido,
         teve_desconto,
         data_inclusao,
-        data_atualizacao
+        data_atualizacao,
+        row_hash
     )
     VALUES
     (
@@ -87,5 +90,6 @@ WHEN NOT MATCHED BY TARGET THEN
         source.numero_pedido,
         source.teve_desconto,
         GETDATE(),
-        GETDATE()
+        GETDATE(),
+        source.row_hash
     );
@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - depende do ambiente local
+    pa = None
+    pq = None
+
+from scheduler import run_with_dependencies
+from watermark import WATERMARK_TYPE_UPDATED_AT
+
+
+STAGING_MODE_EXTRACT = "extract"
+STAGING_MODE_LOAD = "load"
+STAGING_MODE_FULL = "full"
+STAGING_MODES = (STAGING_MODE_EXTRACT, STAGING_MODE_LOAD, STAGING_MODE_FULL)
+
+MANIFEST_FILE = "manifest.json"
+_MANIFEST_VERSION = 1
+# Coluna usada para detectar arquivos com linhas da mesma chave natural.
+_KEY_COLUMN = "source_id"
+
+
+@dataclass(frozen=True)
+class StagedFile:
+    """Um lote extraido gravado em Parquet (`part-NNNNN.parquet`)."""
+
+    file_name: str
+    batch_number: int
+    row_count: int
+    extracted_count: int
+    soft_deleted_count: int
+    watermark_updated_at: datetime
+    watermark_id: int
+    watermark_version: int | None = None
+    loaded: bool = False
+
+
+@dataclass(frozen=True)
+class StagingManifest:
+    """Lotes de uma entidade extraidos em um run, na ordem de extracao.
+
+    `extraction_complete` so fica verdadeiro quando a extracao terminou sem
+    erro; ate la nenhum arquivo e carregado (o watermark de extracao do
+    proximo run parte do ultimo arquivo gravado).
+    """
+
+    entity_name: str
+    run_id: int
+    watermark_type: str
+    files: tuple[StagedFile, ...] = ()
+    extraction_complete: bool = False
+
+    @property
+    def pending_files(self) -> tuple[StagedFile, ...]:
+        return tuple(item for item in self.files if not item.loaded)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.extraction_complete and not self.pending_files
+
+    @property
+    def last_file(self) -> StagedFile | None:
+        return self.files[-1] if self.files else None
+
+    def loaded_prefix(self) -> StagedFile | None:
+        """Ultimo arquivo do maior prefixo ja carregado: ate ele o watermark do DW pode avancar."""
+        last: StagedFile | None = None
+        for item in self.files:
+            if not item.loaded:
+                break
+            last = item
+        return last
+
+
+def supports_staging() -> bool:
+    return pq is not None
+
+
+def run_directory(staging_dir: str | Path, entity_name: str, run_id: int) -> Path:
+    return Path(staging_dir) / entity_name / str(int(run_id))
+
+
+def new_manifest(entity_name: str, run_id: int, *, watermark_type: str = WATERMARK_TYPE_UPDATED_AT) -> StagingManifest:
+    return StagingManifest(entity_name=entity_name, run_id=int(run_id), watermark_type=watermark_type)
+
+
+def stage_rows(
+    directory: Path,
+    manifest: StagingManifest,
+    rows: list[dict[str, Any]],
+    *,
+    batch_number: int,
+    extracted_count: int,
+    soft_deleted_count: int,
+    watermark_updated_at: datetime,
+    watermark_id: int,
+    watermark_version: int | None = None,
+) -> StagingManifest:
+    """Grava o lote transformado em Parquet e devolve o manifesto atualizado (ja salvo)."""
+    file_name = f"part-{int(batch_number):05d}.parquet"
+    _write_parquet(directory / file_name, rows)
+    staged = StagedFile(
+        file_name=file_name,
+        batch_number=int(batch_number),
+        row_count=len(rows),
+        extracted_count=int(extracted_count),
+        soft_deleted_count=int(soft_deleted_count),
+        watermark_updated_at=watermark_updated_at,
+        watermark_id=int(watermark_id),
+        watermark_version=watermark_version,
+    )
+    updated = replace(manifest, files=manifest.files + (staged,))
+    write_manifest(directory, updated)
+    return updated
+
+
+def close_manifest(directory: Path, manifest: StagingManifest) -> StagingManifest:
+    """Marca a extracao do run como concluida: a partir dai os arquivos podem ser carregados."""
+    closed = replace(manifest, extraction_complete=True)
+    write_manifest(directory, closed)
+    return closed
+
+
+def read_staged_rows(directory: Path, staged: StagedFile) -> list[dict[str, Any]]:
+    # Lote sem linhas transformadas (ex.: so soft-delete filtrado) grava tabela sem colunas.
+    if staged.row_count == 0:
+        return []
+    return _require_pyarrow_parquet().read_table(directory / staged.file_name).to_pylist()
+
+
+def read_staged_keys(directory: Path, staged: StagedFile) -> set[Any]:
+    """Chaves naturais do arquivo, lendo somente a coluna `source_id`."""
+    if staged.row_count == 0:
+        return set()
+    table = _require_pyarrow_parquet().read_table(directory / staged.file_name, columns=[_KEY_COLUMN])
+    return set(table.column(_KEY_COLUMN).to_pylist())
+
+
+def plan_load_dependencies(file_keys: dict[str, set[Any]]) -> dict[str, set[str]]:
+    """Dependencias entre arquivos para carga paralela sem inverter a ordem por chave.
+
+    `file_keys` segue a ordem de extracao. Um arquivo so espera os arquivos
+    anteriores com alguma chave em comum: a versao mais nova da linha continua
+    sendo gravada por ultimo, como na carga sequencial.
+    """
+    dependencies: dict[str, set[str]] = {}
+    earlier: list[tuple[str, set[Any]]] = []
+    for name, keys in file_keys.items():
+        dependencies[name] = {other for other, other_keys in earlier if not keys.isdisjoint(other_keys)}
+        earlier.append((name, keys))
+    return dependencies
+
+
+def mark_loaded(manifest: StagingManifest, file_names: Iterable[str]) -> StagingManifest:
+    names = set(file_names)
+    return replace(
+        manifest,
+        files=tuple(replace(item, loaded=True) if item.file_name in names else item for item in manifest.files),
+    )
+
+
+def write_manifest(directory: Path, manifest: StagingManifest) -> None:
+    """Grava o manifesto de forma atomica (arquivo temporario + `os.replace`)."""
+    directory.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "version": _MANIFEST_VERSION,
+        "entity_name": manifest.entity_name,
+        "run_id": manifest.run_id,
+        "watermark_type": manifest.watermark_type,
+        "extraction_complete": manifest.extraction_complete,
+        "files": [
+            {
+                "file_name": item.file_name,
+                "batch_number": item.batch_number,
+                "row_count": item.row_count,
+                "extracted_count": item.extracted_count,
+                "soft_deleted_count": item.soft_deleted_count,
+                "watermark_updated_at": item.watermark_updated_at.isoformat(),
+                "watermark_id": item.watermark_id,
+                "watermark_version": item.watermark_version,
+                "loaded": item.loaded,
+            }
+            for item in manifest.files
+        ],
+    }
+    target = directory / MANIFEST_FILE
+    temp_path = target.with_suffix(".json.tmp")
+    temp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    os.replace(temp_path, target)
+
+
+def read_manifest(directory: Path) -> StagingManifest:
+    payload = json.loads((directory / MANIFEST_FILE).read_text(encoding="utf-8"))
+    if payload.get("version") != _MANIFEST_VERSION:
+        raise ValueError(f"Versao de manifesto nao suportada em {directory}: {payload.get('version')!r}")
+    return StagingManifest(
+        entity_name=payload["entity_name"],
+        run_id=int(payload["run_id"]),
+        watermark_type=payload.get("watermark_type") or WATERMARK_TYPE_UPDATED_AT,
+        extraction_complete=bool(payload.get("extraction_complete")),
+        files=tuple(
+            StagedFile(
+                file_name=item["file_name"],
+                batch_number=int(item["batch_number"]),
+                row_count=int(item["row_count"]),
+                extracted_count=int(item["extracted_count"]),
+                soft_deleted_count=int(item["soft_deleted_count"]),
+                watermark_updated_at=datetime.fromisoformat(item["watermark_updated_at"]),
+                watermark_id=int(item["watermark_id"]),
+                watermark_version=item.get("watermark_version"),
+                loaded=bool(item.get("loaded")),
+            )
+            for item in payload.get("files", [])
+        ),
+    )
+
+
+def list_manifests(staging_dir: str | Path, entity_name: str) -> list[StagingManifest]:
+    """Manifestos da entidade, do run mais antigo para o mais novo."""
+    entity_dir = Path(staging_dir) / entity_name
+    if not entity_dir.is_dir():
+        return []
+    run_dirs = [
+        path for path in entity_dir.iterdir() if path.name.isdigit() and (path / MANIFEST_FILE).is_file()
+    ]
+    return [read_manifest(path) for path in sorted(run_dirs, key=lambda path: int(path.name))]
+
+
+def loadable_manifests(manifests: Iterable[StagingManifest]) -> list[StagingManifest]:
+    """Manifestos a carregar, em ordem de run, ate o primeiro com extracao em aberto.
+
+    Um run mais novo pode trazer versoes mais recentes das mesmas linhas;
+    por isso a carga nunca pula um manifesto ainda aberto.
+    """
+    ready: list[StagingManifest] = []
+    for manifest in manifests:
+        if manifest.is_loaded:
+            continue
+        if not manifest.extraction_complete:
+            break
+        ready.append(manifest)
+    return ready
+
+
+def close_open_manifests(staging_dir: str | Path, entity_name: str) -> int:
+    """Fecha manifestos deixados abertos por uma extracao interrompida.
+
+    Os arquivos ja gravados sao lotes completos e continuam validos para carga.
+    Assume um unico extrator por entidade, como o runner incremental.
+    """
+    closed = 0
+    for manifest in list_manifests(staging_dir, entity_name):
+        if not manifest.extraction_complete:
+            close_manifest(run_directory(staging_dir, entity_name, manifest.run_id), manifest)
+            closed += 1
+    return closed
+
+
+def extraction_start(
+    manifests: Iterable[StagingManifest],
+    *,
+    watermark_updated_at: datetime,
+    watermark_id: int,
+    watermark_version: int | None,
+) -> tuple[datetime, int, int | None]:
+    """Watermark de partida da extracao: o do DW ou o do ultimo lote ainda nao carregado.
+
+    Partir do que ja esta na landing zone evita reextrair linhas que so
+    aguardam a etapa de carga.
+    """
+    start = (watermark_updated_at, int(watermark_id), watermark_version)
+    for manifest in manifests:
+        last = manifest.last_file
+        if manifest.is_loaded or last is None:
+            continue
+        if watermark_key(last.watermark_updated_at, last.watermark_id, last.watermark_version) > watermark_key(*start):
+            start = (last.watermark_updated_at, last.watermark_id, last.watermark_version)
+    return start
+
+
+def watermark_key(updated_at: datetime, watermark_id: int, version: int | None) -> tuple[int, datetime, int]:
+    return (int(version or 0), updated_at, int(watermark_id))
+
+
+def load_manifest(
+    directory: Path,
+    manifest: StagingManifest,
+    *,
+    workers: int,
+    load_file: Callable[[StagedFile], int],
+    replay: bool = False,
+) -> tuple[StagingManifest, int]:
+    """Carrega os arquivos pendentes do manifesto, em paralelo quando as chaves permitem.
+
+    Cada arquivo concluido e marcado no manifesto em disco, entao uma carga
+    interrompida retoma somente os que faltam. Com `replay=True` recarrega
+    todos os arquivos de um manifesto ja carregado sem altera-lo. Retorna o
+    manifesto atualizado e o total devolvido por `load_file`.
+    """
+    if replay and not manifest.is_loaded:
+        raise ValueError(
+            f"Run {manifest.run_id} de '{manifest.entity_name}' ainda nao foi carregado; "
+            "use --staging load sem --staging-replay."
+        )
+    files = manifest.files if replay else manifest.pending_files
+    by_name = {item.file_name: item for item in files}
+    dependencies = plan_load_dependencies({item.file_name: read_staged_keys(directory, item) for item in files})
+    writer = ManifestWriter(directory, manifest)
+
+    def _run_one(file_name: str) -> int:
+        upserted = load_file(by_name[file_name])
+        if not replay:
+            writer.mark_loaded(file_name)
+        return upserted
+
+    results = run_with_dependencies(
+        list(by_name),
+        parallelism=workers,
+        run_one=_run_one,
+        dependencies=dependencies,
+    )
+    return writer.manifest, sum(results.values())
+
+
+class ManifestWriter:
+    """Atualiza o manifesto a partir de varias threads de carga (uma escrita por arquivo)."""
+
+    def __init__(self, directory: Path, manifest: StagingManifest):
+        self._directory = directory
+        self._manifest = manifest
+        self._lock = threading.Lock()
+
+    @property
+    def manifest(self) -> StagingManifest:
+        with self._lock:
+            return self._manifest
+
+    def mark_loaded(self, file_name: str) -> StagingManifest:
+        with self._lock:
+            self._manifest = mark_loaded(self._manifest, [file_name])
+            write_manifest(self._directory, self._manifest)
+            return self._manifest
+
+
+def _write_parquet(path: Path, rows: list[dict[str, Any]]) -> None:
+    parquet = _require_pyarrow_parquet()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(".parquet.tmp")
+    parquet.write_table(pa.Table.from_pylist(rows), temp_path, compression="zstd")
+    os.replace(temp_path, path)
+
+
+def _require_pyarrow_parquet():
+    if pq is None:
+        raise RuntimeError(
+            "pyarrow nao esta instalado. Instale com: pip install pyarrow (necessario para --staging)."
+        )
+    return pq
@@ -0,0 +1,422 @@
+from __future__ import annotations
+
+import traceback
+from typing import Any
+
+from columnar import normalize_transform_mode
+from config import ETLConfig
+from control import (
+    EntityControl,
+    checkpoint_control_watermark,
+    finish_entity_run,
+    get_entity_control,
+    mark_control_failed,
+    mark_control_success_with_watermark,
+    mark_control_success_without_watermark,
+    resolve_cutoff_minutes,
+    resolve_entity_watermark_type,
+    start_entity_run,
+)
+from db import WorkerConnections
+from entities import get_entity
+from key_cache import KEY_CACHE
+from loader import normalize_load_mode
+from pipeline import iter_batches
+from sales_aggregate import detect_entity_sales_aggregate, upsert_with_sales_aggregate
+from staging import (
+    STAGING_MODE_EXTRACT,
+    STAGING_MODE_FULL,
+    STAGING_MODE_LOAD,
+    StagedFile,
+    StagingManifest,
+    close_manifest,
+    close_open_manifests,
+    extraction_start,
+    list_manifests,
+    load_manifest,
+    loadable_manifests,
+    new_manifest,
+    read_manifest,
+    read_staged_rows,
+    run_directory,
+    stage_rows,
+    watermark_key,
+)
+from watermark import WATERMARK_TYPE_ROWVERSION
+
+
+def run_staged_entity(
+    *,
+    entity_name: str,
+    oltp_connection,
+    dw_connection,
+    config: ETLConfig,
+    run_id: int,
+    staging_mode: str,
+    staging_dir: str,
+    default_batch_size: int,
+    default_cutoff_minutes: int,
+    batch_size_override: int | None,
+    cutoff_minutes_override: int | None,
+    load_mode_override: str | None = None,
+    transform_mode_override: str | None = None,
+    watermark_type_override: str | None = None,
+    max_batches: int | None = None,
+    replay_run_id: int | None = None,
+    load_workers: int = 4,
+) -> tuple[bool, str | None]:
+    """Modo `--staging`: extracao para a landing zone em Parquet e/ou carga a partir dela.
+
+    `extract` grava os lotes transformados em `<staging_dir>/<entidade>/<run_id>/`
+    com um manifesto e nao altera o watermark do DW; `load` carrega os
+    manifestos pendentes em ordem de run, sem conexao OLTP, e avanca o
+    watermark ao fim de cada manifesto; `full` faz as duas etapas. Com
+    `replay_run_id` a carga repete um run ja carregado sem tocar em
+    `ctl.etl_control`.
+    """
+    entity = get_entity(entity_name)
+    control = get_entity_control(dw_connection, entity_name)
+
+    batch_size = max(
+        1,
+        int(
+            batch_size_override
+            if batch_size_override is not None
+            else (control.batch_size if control.batch_size is not None else default_batch_size)
+        ),
+    )
+    cutoff_minutes = resolve_cutoff_minutes(control, cutoff_minutes_override, default_cutoff_minutes)
+    load_mode = normalize_load_mode(
+        load_mode_override if load_mode_override is not None else control.load_mode
+    )
+    transform_mode = normalize_transform_mode(
+        transform_mode_override if transform_mode_override is not None else control.transform_mode
+    )
+    watermark_type = resolve_entity_watermark_type(entity, control, watermark_type_override)
+
+    print("")
+    print(f"[{entity_name}] inicio (staging {staging_mode})")
+    print(
+        f"[{entity_name}] parametros: batch_size={batch_size}, cutoff_minutes={cutoff_minutes}, "
+        f"watermark_type={watermark_type}, load_mode={load_mode}, transform_mode={transform_mode}, "
+        f"load_workers={max(1, load_workers)}"
+    )
+
+    run_entity_id = start_entity_run(
+        dw_connection,
+        run_id=run_id,
+        entity_name=entity_name,
+        watermark_from_updated_at=control.watermark_updated_at,
+        watermark_from_id=control.watermark_id,
+    )
+    dw_connection.commit()
+
+    extracted_count = 0
+    upserted_count = 0
+    unchanged_count = 0
+    soft_deleted_count = 0
+    watermark_to = (control.watermark_updated_at, control.watermark_id, control.watermark_version)
+
+    try:
+        if staging_mode in (STAGING_MODE_EXTRACT, STAGING_MODE_FULL):
+            manifest = _extract_to_staging(
+                entity,
+                oltp_connection,
+                control,
+                staging_dir=staging_dir,
+                run_id=run_id,
+                batch_size=batch_size,
+                cutoff_minutes=cutoff_minutes,
+                transform_mode=transform_mode,
+                watermark_type=watermark_type,
+                max_batches=max_batches,
+            )
+            extracted_count = sum(item.extracted_count for item in manifest.files)
+            soft_deleted_count = sum(item.soft_deleted_count for item in manifest.files)
+
+        if staging_mode in (STAGING_MODE_LOAD, STAGING_MODE_FULL):
+            loaded_files, upserted_count, unchanged_count, watermark_to = _load_from_staging(
+                entity,
+                dw_connection,
+                control,
+                config=config,
+                staging_dir=staging_dir,
+                run_id=run_id,
+                load_mode=load_mode,
+                workers=load_workers,
+                replay_run_id=replay_run_id,
+            )
+            if staging_mode == STAGING_MODE_LOAD:
+                extracted_count = sum(item.extracted_count for item in loaded_files)
+                soft_deleted_count = sum(item.soft_deleted_count for item in loaded_files)
+            if replay_run_id is None and watermark_to[:2] == (control.watermark_updated_at, control.watermark_id):
+                mark_control_success_without_watermark(dw_connection, entity_name=entity_name, run_id=run_id)
+                dw_connection.commit()
+
+        key_cache_stats = KEY_CACHE.pop_stats(entity_name)
+        finish_entity_run(
+            dw_connection,
+            run_entity_id=run_entity_id,
+            status="success",
+            extracted_count=extracted_count,
+            upserted_count=upserted_count,
+            soft_deleted_count=soft_deleted_count,
+            watermark_to_updated_at=watermark_to[0],
+            watermark_to_id=watermark_to[1],
+            error_message=None,
+            key_cache_hits=key_cache_stats.hits,
+            key_cache_misses=key_cache_stats.misses,
+            key_cache_refreshes=key_cache_stats.refreshes,
+            unchanged_count=unchanged_count,
+        )
+        dw_connection.commit()
+
+        print(
+            f"[{entity_name}] staging {staging_mode} concluido com sucesso. "
+            f"extraidos={extracted_count}, upsertados={upserted_count}, inalterados={unchanged_count}, "
+            f"watermark={watermark_to[0]}/{watermark_to[1]}."
+        )
+        return True, None
+
+    except Exception as exc:  # noqa: BLE001
+        dw_connection.rollback()
+        error_text = f"{type(exc).__name__}: {exc}"
+        print(f"[{entity_name}] falha: {error_text}")
+        traceback.print_exc()
+
+        key_cache_stats = KEY_CACHE.pop_stats(entity_name)
+        try:
+            finish_entity_run(
+                dw_connection,
+                run_entity_id=run_entity_id,
+                status="failed",
+                extracted_count=extracted_count,
+                upserted_count=upserted_count,
+                soft_deleted_count=soft_deleted_count,
+                watermark_to_updated_at=control.watermark_updated_at,
+                watermark_to_id=control.watermark_id,
+                error_message=error_text[:4000],
+                key_cache_hits=key_cache_stats.hits,
+                key_cache_misses=key_cache_stats.misses,
+                key_cache_refreshes=key_cache_stats.refreshes,
+                unchanged_count=unchanged_count,
+            )
+            if replay_run_id is None:
+                mark_control_failed(
+                    dw_connection,
+                    entity_name=entity_name,
+                    run_id=run_id,
+                )
+            dw_connection.commit()
+        except Exception:  # noqa: BLE001
+            dw_connection.rollback()
+
+        return False, error_text
+
+
+def _extract_to_staging(
+    entity: Any,
+    oltp_connection,
+    control: EntityControl,
+    *,
+    staging_dir: str,
+    run_id: int,
+    batch_size: int,
+    cutoff_minutes: int,
+    transform_mode: str,
+    watermark_type: str,
+    max_batches: int | None,
+) -> StagingManifest:
+    entity_name = control.entity_name
+    closed = close_open_manifests(staging_dir, entity_name)
+    if closed:
+        print(f"[{entity_name}] {closed} manifesto(s) de extracao interrompida fechado(s) para carga.")
+
+    start_updated_at, start_id, start_version = extraction_start(
+        list_manifests(staging_dir, entity_name),
+        watermark_updated_at=control.watermark_updated_at,
+        watermark_id=control.watermark_id,
+        watermark_version=control.watermark_version,
+    )
+    directory = run_directory(staging_dir, entity_name, run_id)
+    manifest = new_manifest(entity_name, run_id, watermark_type=watermark_type)
+    print(
+        f"[{entity_name}] extraindo para {directory} a partir de {start_updated_at} / {start_id}"
+        + (f" (row_version={start_version or 0})" if watermark_type == WATERMARK_TYPE_ROWVERSION else "")
+    )
+
+    try:
+        for batch in iter_batches(
+            entity,
+            oltp_connection,
+            watermark_updated_at=start_updated_at,
+            watermark_id=start_id,
+            cutoff_minutes=cutoff_minutes,
+            batch_size=batch_size,
+            max_batches=max_batches,
+            transform_mode=transform_mode,
+            watermark_type=watermark_type,
+            watermark_version=start_version,
+        ):
+            manifest = stage_rows(
+                directory,
+                manifest,
+                batch.rows,
+                batch_number=batch.batch_number,
+                extracted_count=batch.extracted_count,
+                soft_deleted_count=batch.soft_deleted_count,
+                watermark_updated_at=batch.watermark_updated_at,
+                watermark_id=batch.watermark_id,
+                watermark_version=batch.watermark_version,
+            )
+            print(
+                f"[{entity_name}] lote {batch.batch_number} gravado em {manifest.files[-1].file_name}: "
+                f"extraidos={batch.extracted_count} linhas={len(batch.rows)} "
+                f"watermark={batch.watermark_updated_at}/{batch.watermark_id} "
+                f"tempos(extracao={batch.extract_seconds:.2f}s, transformacao={batch.transform_seconds:.2f}s)"
+            )
+    finally:
+        # Os lotes ja gravados sao completos: o manifesto fecha mesmo apos falha.
+        if manifest.files:
+            manifest = close_manifest(directory, manifest)
+
+    if not manifest.files:
+        print(f"[{entity_name}] sem novos registros.")
+    return manifest
+
+
+def _load_from_staging(
+    entity: Any,
+    dw_connection,
+    control: EntityControl,
+    *,
+    config: ETLConfig,
+    staging_dir: str,
+    run_id: int,
+    load_mode: str,
+    workers: int,
+    replay_run_id: int | None,
+) -> tuple[list[StagedFile], int, int, tuple[Any, int, int | None]]:
+    """Carrega manifestos da landing zone.
+
+    Devolve arquivos carregados, linhas gravadas, linhas inalteradas e o
+    watermark final.
+    """
+    entity_name = control.entity_name
+    current = (control.watermark_updated_at, control.watermark_id, control.watermark_version)
+    manifests = list_manifests(staging_dir, entity_name)
+    if replay_run_id is not None:
+        manifests = [manifest for manifest in manifests if manifest.run_id == replay_run_id]
+    else:
+        manifests = loadable_manifests(manifests)
+    if not manifests:
+        print(f"[{entity_name}] nenhum arquivo pendente na landing zone.")
+        return [], 0, 0, current
+
+    aggregate_targets = detect_entity_sales_aggregate(entity, dw_connection, entity_name)
+    # Cada worker abre sua propria conexao DW; a conexao principal grava controle e auditoria.
+    connections = WorkerConnections(config, with_oltp=False)
+
+    def _load_file(directory, staged: StagedFile) -> int:
+        _, worker_dw = connections.get()
+        rows = read_staged_rows(directory, staged)
+        try:
+            if aggregate_targets is not None:
+                upserted = upsert_with_sales_aggregate(
+                    entity, worker_dw, rows, load_mode=load_mode, targets=aggregate_targets
+                )
+            else:
+                upserted = entity.upsert_rows(worker_dw, rows, load_mode=load_mode)
+            worker_dw.commit()
+        except Exception:
+            worker_dw.rollback()
+            raise
+        KEY_CACHE.notify_loaded(entity_name)
+        print(
+            f"[{entity_name}] {directory.name}/{staged.file_name} carregado: "
+            f"linhas={len(rows)} upsertados={upserted}"
+        )
+        return upserted
+
+    loaded_files: list[StagedFile] = []
+    upserted_total = 0
+    unchanged_total = 0
+    try:
+        for manifest in manifests:
+            directory = run_directory(staging_dir, entity_name, manifest.run_id)
+            files = manifest.files if replay_run_id is not None else manifest.pending_files
+            try:
+                manifest, upserted = load_manifest(
+                    directory,
+                    manifest,
+                    workers=workers,
+                    load_file=lambda staged, directory=directory: _load_file(directory, staged),
+                    replay=replay_run_id is not None,
+                )
+            except Exception:
+                if replay_run_id is None:
+                    _checkpoint_loaded_prefix(
+                        dw_connection,
+                        directory,
+                        entity_name=entity_name,
+                        run_id=run_id,
+                        current=current,
+                    )
+                raise
+            loaded_files.extend(files)
+            upserted_total += upserted
+            # `_load_file` devolve as linhas gravadas; o resto dos arquivos tinha hash igual.
+            unchanged_total += sum(item.row_count for item in files) - upserted
+
+            last = manifest.last_file
+            if replay_run_id is None and last is not None and watermark_key(
+                last.watermark_updated_at, last.watermark_id, last.watermark_version
+            ) > watermark_key(*current):
+                mark_control_success_with_watermark(
+                    dw_connection,
+                    entity_name=entity_name,
+                    watermark_updated_at=last.watermark_updated_at,
+                    watermark_id=last.watermark_id,
+                    run_id=run_id,
+                    watermark_version=last.watermark_version,
+                )
+                dw_connection.commit()
+                current = (last.watermark_updated_at, last.watermark_id, last.watermark_version)
+            print(
+                f"[{entity_name}] run {manifest.run_id} {'recarregado' if replay_run_id is not None else 'carregado'}: "
+                f"arquivos={len(files)} upsertados={upserted} watermark={current[0]}/{current[1]}"
+            )
+    finally:
+        connections.close_all()
+
+    return loaded_files, upserted_total, unchanged_total, current
+
+
+def _checkpoint_loaded_prefix(
+    dw_connection,
+    directory,
+    *,
+    entity_name: str,
+    run_id: int,
+    current: tuple[Any, int, int | None],
+) -> None:
+    """Apos falha na carga, avanca o watermark ate o ultimo arquivo do prefixo ja carregado."""
+    try:
+        prefix = read_manifest(directory).loaded_prefix()
+        if prefix is None or watermark_key(
+            prefix.watermark_updated_at, prefix.watermark_id, prefix.watermark_version
+        ) <= watermark_key(*current):
+            return
+        checkpoint_control_watermark(
+            dw_connection,
+            entity_name=entity_name,
+            watermark_updated_at=prefix.watermark_updated_at,
+            watermark_id=prefix.watermark_id,
+            run_id=run_id,
+            watermark_version=prefix.watermark_version,
+        )
+        dw_connection.commit()
+        print(f"[{entity_name}] watermark avancado ate {prefix.file_name} (ultimo arquivo do prefixo carregado).")
+    except Exception as exc:  # noqa: BLE001
+        dw_connection.rollback()
+        print(f"[{entity_name}] aviso: falha ao gravar checkpoint da carga: {type(exc).__name__}: {exc}")
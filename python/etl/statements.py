@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from config import SQL_DIR
+from db import DEFAULT_FETCH_SIZE, Row, execute, stream_query
+
+
+# Placeholder de `str.format` (ex.: `{batch_size}`): o valor entraria no texto
+# do comando e cada valor distinto viraria um plano ad-hoc no SQL Server.
+_FORMAT_PLACEHOLDER_RE = re.compile(r"\{\w+\}")
+_LINE_COMMENT_RE = re.compile(r"--[^\n]*")
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+
+
+@dataclass(frozen=True)
+class Statement:
+    name: str
+    sql: str
+    param_count: int
+
+
+@dataclass(frozen=True)
+class StatementStats:
+    name: str
+    executions: int
+    total_seconds: float
+
+    @property
+    def avg_ms(self) -> float:
+        return (self.total_seconds * 1000.0 / self.executions) if self.executions else 0.0
+
+
+class StatementRegistry:
+    """Comandos de `python/etl/sql/*.sql` carregados uma vez e reutilizados.
+
+    Todo valor variavel, inclusive o `TOP` dos lotes, chega como parametro
+    `?`: o texto enviado ao SQL Server e sempre o mesmo por arquivo e o
+    plano parametrizado e reaproveitado entre lotes e execucoes, qualquer
+    que seja o tamanho do lote. A quantidade de parametros e validada a cada
+    execucao. Acumula, por comando, execucoes e tempo gasto no banco
+    (execucao + leitura do resultado), para o resumo do runner.
+    """
+
+    def __init__(self, sql_dir: Path):
+        self._sql_dir = sql_dir
+        self._statements: dict[str, Statement] = {}
+        self._executions: dict[str, int] = {}
+        self._seconds: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def load(self) -> int:
+        """Le e valida todos os arquivos `.sql`; retorna a quantidade carregada."""
+        statements: dict[str, Statement] = {}
+        for path in sorted(self._sql_dir.glob("*.sql")):
+            sql = path.read_text(encoding="utf-8").strip()
+            if _FORMAT_PLACEHOLDER_RE.search(_strip_comments(sql)):
+                raise ValueError(
+                    f"{path.name} usa placeholder de formatacao de texto; use parametro '?'."
+                )
+            statements[path.name] = Statement(name=path.name, sql=sql, param_count=count_parameters(sql))
+        with self._lock:
+            self._statements = statements
+            self._loaded = True
+        return len(statements)
+
+    def get(self, name: str) -> Statement:
+        if not self._loaded:
+            self.load()
+        try:
+            return self._statements[name]
+        except KeyError:
+            raise KeyError(f"Comando SQL '{name}' nao encontrado em {self._sql_dir}.") from None
+
+    def stream(
+        self,
+        connection: Any,
+        name: str,
+        params: Iterable[Any] = (),
+        *,
+        fetch_size: int = DEFAULT_FETCH_SIZE,
+    ) -> Iterator[Row]:
+        """`db.stream_query` do comando registrado, medindo so o tempo dentro do driver."""
+        statement = self.get(name)
+        values = self._check_params(statement, params)
+        return self._timed(name, stream_query(connection, statement.sql, values, fetch_size=fetch_size))
+
+    def _timed(self, name: str, rows: Iterator[Row]) -> Iterator[Row]:
+        elapsed = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    row = next(rows)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - started
+                yield row
+        finally:
+            rows.close()
+            self.record(name, elapsed)
+
+    def execute(self, connection: Any, name: str, params: Iterable[Any] = ()) -> None:
+        statement = self.get(name)
+        values = self._check_params(statement, params)
+        started = time.perf_counter()
+        try:
+            execute(connection, statement.sql, values)
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float, *, executions: int = 1) -> None:
+        with self._lock:
+            self._executions[name] = self._executions.get(name, 0) + int(executions)
+            self._seconds[name] = self._seconds.get(name, 0.0) + max(0.0, float(seconds))
+
+    def stats(self) -> list[StatementStats]:
+        """Comandos executados, do maior para o menor tempo acumulado."""
+        with self._lock:
+            items = [
+                StatementStats(name=name, executions=count, total_seconds=self._seconds.get(name, 0.0))
+                for name, count in self._executions.items()
+            ]
+        return sorted(items, key=lambda item: item.total_seconds, reverse=True)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._executions.clear()
+            self._seconds.clear()
+
+    @staticmethod
+    def _check_params(statement: Statement, params: Iterable[Any]) -> tuple[Any, ...]:
+        values = tuple(params)
+        if len(values) != statement.param_count:
+            raise ValueError(
+                f"{statement.name} espera {statement.param_count} parametros; recebeu {len(values)}."
+            )
+        return values
+
+
+def count_parameters(sql: str) -> int:
+    """Quantidade de marcadores `?` fora de comentarios de linha e literais."""
+    return _STRING_LITERAL_RE.sub("''", _strip_comments(sql)).count("?")
+
+
+def _strip_comments(sql: str) -> str:
+    return _LINE_COMMENT_RE.sub("", sql)
+
+
+STATEMENTS = StatementRegistry(SQL_DIR)
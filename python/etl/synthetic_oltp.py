@@ -0,0 +1,925 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - depende do ambiente local
+    pa = None
+    pq = None
+
+
+# Volumes do seed base (`sql/oltp/02_seed/01_seed_base.sql`) = fator 1.
+# Com 1 a 4 itens por pedido (media 2,5), o fator 45 passa de 10M itens.
+SCALE_BASE_COUNTS = {
+    "suppliers": 80,
+    "customers": 20_000,
+    "products": 5_000,
+    "sellers": 300,
+    "discount_campaigns": 40,
+    "orders": 90_000,
+}
+TEAMS_COUNT = 12
+MANAGERS_COUNT = 20
+MAX_ITEMS_PER_ORDER = 4
+DEFAULT_HISTORY_DAYS = 3 * 365
+DEFAULT_CHUNK_SIZE = 50_000
+
+# (region_code, region_name, state, state_name, city, ibge_code), como no seed base.
+REFERENCE_REGIONS = (
+    ("RG-SP-SAO", "Sudeste", "SP", "Sao Paulo", "Sao Paulo", "3550308"),
+    ("RG-SP-CAM", "Sudeste", "SP", "Sao Paulo", "Campinas", "3509502"),
+    ("RG-RJ-RIO", "Sudeste", "RJ", "Rio de Janeiro", "Rio de Janeiro", "3304557"),
+    ("RG-MG-BHZ", "Sudeste", "MG", "Minas Gerais", "Belo Horizonte", "3106200"),
+    ("RG-PR-CTB", "Sul", "PR", "Parana", "Curitiba", "4106902"),
+    ("RG-RS-POA", "Sul", "RS", "Rio Grande do Sul", "Porto Alegre", "4314902"),
+    ("RG-SC-FLN", "Sul", "SC", "Santa Catarina", "Florianopolis", "4205407"),
+    ("RG-BA-SSA", "Nordeste", "BA", "Bahia", "Salvador", "2927408"),
+    ("RG-PE-REC", "Nordeste", "PE", "Pernambuco", "Recife", "2611606"),
+    ("RG-CE-FOR", "Nordeste", "CE", "Ceara", "Fortaleza", "2304400"),
+    ("RG-DF-BSB", "Centro-Oeste", "DF", "Distrito Federal", "Brasilia", "5300108"),
+    ("RG-GO-GYN", "Centro-Oeste", "GO", "Goias", "Goiania", "5208707"),
+    ("RG-AM-MAO", "Norte", "AM", "Amazonas", "Manaus", "1302603"),
+    ("RG-PA-BEL", "Norte", "PA", "Para", "Belem", "1501402"),
+    ("RG-ES-VIX", "Sudeste", "ES", "Espirito Santo", "Vitoria", "3205309"),
+)
+
+_CATEGORIES = ("Eletronicos", "Casa", "Moda", "Esporte", "Beleza", "Livros", "Informatica", "Brinquedos")
+_COLORS = ("Preto", "Branco", "Azul", "Vermelho", "Verde", "Cinza")
+_MATERIALS = ("Plastico", "Metal", "Tecido")
+_ORIGINS = ("Brasil", "China", "Estados Unidos", "Mexico")
+_SALES_CHANNELS = ("Site", "App", "Marketplace", "Televendas")
+_DISCOUNT_TYPES = ("Cupom", "Promocao Automatica", "Desconto Progressivo", "Fidelidade", "Primeira Compra", "Cashback")
+_DISCOUNT_METHODS = ("Percentual", "Valor Fixo", "Frete Gratis", "Brinde", "Combo")
+_DISCOUNT_SCOPES = ("Pedido Total", "Produto Especifico", "Categoria", "Frete", "Item Individual")
+# Distribuicao de status do seed base (percentual por status).
+_ORDER_STATUSES = ("Cancelado", "Devolvido", "Enviado", "Entregue", "Faturado", "Pago", "Pendente")
+_ORDER_STATUS_WEIGHTS = (3, 4, 8, 42, 19, 15, 9)
+_ITEM_DISCOUNT_RATE = 0.20
+
+# Colunas por tabela, na ordem das tuplas geradas. Tipos: int64, int32, str,
+# bool, date, ts (DATETIME2(0)) e decimal(p,s). `row_version` e preenchida
+# pelo SQL Server e nunca entra no INSERT.
+TABLE_COLUMNS: dict[str, tuple[tuple[str, str], ...]] = {
+    "regions": (
+        ("region_id", "int64"), ("region_code", "str"), ("country", "str"), ("region_name", "str"),
+        ("state", "str"), ("state_name", "str"), ("city", "str"), ("ibge_code", "str"),
+        ("is_active", "bool"), ("created_at", "ts"), ("updated_at", "ts"), ("deleted_at", "ts"),
+    ),
+    "teams": (
+        ("team_id", "int64"), ("team_code", "str"), ("team_name", "str"), ("team_type", "str"),
+        ("team_category", "str"), ("region_id", "int64"), ("is_active", "bool"),
+        ("created_at", "ts"), ("updated_at", "ts"), ("deleted_at", "ts"),
+    ),
+    "suppliers": (
+        ("supplier_id", "int64"), ("supplier_code", "str"), ("supplier_name", "str"), ("country", "str"),
+        ("is_active", "bool"), ("created_at", "ts"), ("updated_at", "ts"), ("deleted_at", "ts"),
+    ),
+    "customers": (
+        ("customer_id", "int64"), ("customer_code", "str"), ("full_name", "str"), ("email", "str"),
+        ("phone", "str"), ("document_number", "str"), ("birth_date", "date"), ("gender", "str"),
+        ("customer_type", "str"), ("segment", "str"), ("credit_score", "int32"), ("value_category", "str"),
+        ("address_line", "str"), ("district", "str"), ("city", "str"), ("state", "str"), ("country", "str"),
+        ("zip_code", "str"), ("first_signup_date", "date"), ("last_purchase_date", "date"),
+        ("is_active", "bool"), ("accepts_email_marketing", "bool"), ("is_vip", "bool"),
+        ("created_at", "ts"), ("updated_at", "ts"), ("deleted_at", "ts"),
+    ),
+    "products": (
+        ("product_id", "int64"), ("product_code", "str"), ("sku", "str"), ("barcode", "str"),
+        ("product_name", "str"), ("short_description", "str"), ("category_name", "str"),
+        ("subcategory_name", "str"), ("product_line", "str"), ("brand", "str"), ("manufacturer", "str"),
+        ("supplier_id", "int64"), ("country_origin", "str"), ("weight_kg", "decimal(8,3)"),
+        ("height_cm", "decimal(6,2)"), ("width_cm", "decimal(6,2)"), ("depth_cm", "decimal(6,2)"),
+        ("color", "str"), ("material", "str"), ("cost_price", "decimal(10,2)"), ("list_price", "decimal(10,2)"),
+        ("suggested_margin_percent", "decimal(5,2)"), ("is_perishable", "bool"), ("is_fragile", "bool"),
+        ("requires_refrigeration", "bool"), ("minimum_age", "int32"), ("min_stock", "int32"),
+        ("max_stock", "int32"), ("reorder_days", "int32"), ("product_status", "str"), ("launch_date", "date"),
+        ("discontinued_date", "date"), ("rating_avg", "decimal(2,1)"), ("rating_count", "int32"),
+        ("keywords", "str"), ("created_at", "ts"), ("updated_at", "ts"), ("deleted_at", "ts"),
+    ),
+    "sellers": (
+        ("seller_id", "int64"), ("seller_code", "str"), ("seller_name", "str"), ("team_id", "int64"),
+        ("manager_seller_id", "int64"), ("home_state", "str"), ("home_city", "str"),
+        ("monthly_goal_amount", "decimal(15,2)"), ("hire_date", "date"), ("seller_status", "str"),
+        ("created_at", "ts"), ("updated_at", "ts"), ("deleted_at", "ts"),
+    ),
+    "discount_campaigns": (
+        ("discount_id", "int64"), ("discount_code", "str"), ("campaign_name", "str"), ("description", "str"),
+        ("discount_type", "str"), ("discount_method", "str"), ("discount_value", "decimal(10,2)"),
+        ("min_order_value", "decimal(15,2)"), ("max_discount_value", "decimal(15,2)"),
+        ("max_uses_per_customer", "int32"), ("max_uses_total", "int32"), ("apply_scope", "str"),
+        ("product_restriction", "str"), ("start_at", "ts"), ("end_at", "ts"), ("is_active", "bool"),
+        ("is_stackable", "bool"), ("approval_required", "bool"), ("current_usage_count", "int32"),
+        ("total_revenue_generated", "decimal(15,2)"), ("total_discount_given", "decimal(15,2)"),
+        ("created_at", "ts"), ("updated_at", "ts"), ("deleted_at", "ts"),
+    ),
+    "orders": (
+        ("order_id", "int64"), ("order_number", "str"), ("customer_id", "int64"), ("seller_id", "int64"),
+        ("region_id", "int64"), ("order_status", "str"), ("payment_status", "str"), ("order_date", "ts"),
+        ("approved_at", "ts"), ("shipped_at", "ts"), ("delivered_at", "ts"), ("canceled_at", "ts"),
+        ("sales_channel", "str"), ("currency_code", "str"), ("notes", "str"),
+        ("created_at", "ts"), ("updated_at", "ts"), ("deleted_at", "ts"),
+    ),
+    "order_items": (
+        ("order_item_id", "int64"), ("order_id", "int64"), ("item_number", "int32"), ("product_id", "int64"),
+        ("quantity", "int32"), ("unit_price", "decimal(15,2)"), ("gross_amount", "decimal(15,2)"),
+        ("discount_amount", "decimal(15,2)"), ("net_amount", "decimal(15,2)"), ("cost_amount", "decimal(15,2)"),
+        ("return_quantity", "int32"), ("returned_amount", "decimal(15,2)"),
+        ("commission_percent", "decimal(5,2)"), ("commission_amount", "decimal(15,2)"),
+        ("had_discount", "bool"), ("created_at", "ts"), ("updated_at", "ts"), ("deleted_at", "ts"),
+    ),
+    "order_item_discounts": (
+        ("order_item_discount_id", "int64"), ("order_item_id", "int64"), ("order_id", "int64"),
+        ("discount_id", "int64"), ("application_level", "str"), ("discount_amount", "decimal(15,2)"),
+        ("base_amount", "decimal(15,2)"), ("final_amount", "decimal(15,2)"), ("applied_at", "ts"),
+        ("approved", "bool"), ("rejection_reason", "str"), ("created_at", "ts"), ("updated_at", "ts"),
+        ("deleted_at", "ts"),
+    ),
+    "seller_targets_monthly": (
+        ("seller_target_id", "int64"), ("seller_id", "int64"), ("target_month", "date"),
+        ("target_amount", "decimal(15,2)"), ("target_quantity", "int32"), ("realized_amount", "decimal(15,2)"),
+        ("realized_quantity", "int32"), ("period_type", "str"), ("period_closed", "bool"),
+        ("created_at", "ts"), ("updated_at", "ts"), ("deleted_at", "ts"),
+    ),
+}
+# Ordem de insercao (chaves estrangeiras); a limpeza usa a ordem inversa.
+TABLE_ORDER = tuple(TABLE_COLUMNS)
+
+# Tipos de alteracao simulados pelo trafego continuo e o peso de cada um.
+TRAFFIC_ORDER_PROGRESS = "order_progress"
+TRAFFIC_ITEM_RETURN = "item_return"
+TRAFFIC_PRODUCT_PRICE = "product_price"
+TRAFFIC_CUSTOMER_UPDATE = "customer_update"
+TRAFFIC_CUSTOMER_SOFT_DELETE = "customer_soft_delete"
+TRAFFIC_NEW_ORDER = "new_order"
+DEFAULT_TRAFFIC_MIX = {
+    TRAFFIC_ORDER_PROGRESS: 0.40,
+    TRAFFIC_ITEM_RETURN: 0.05,
+    TRAFFIC_PRODUCT_PRICE: 0.10,
+    TRAFFIC_CUSTOMER_UPDATE: 0.15,
+    TRAFFIC_CUSTOMER_SOFT_DELETE: 0.01,
+    TRAFFIC_NEW_ORDER: 0.29,
+}
+# Tabela cujo intervalo de ids cada alteracao sorteia.
+_TRAFFIC_TARGETS = {
+    TRAFFIC_ORDER_PROGRESS: "orders",
+    TRAFFIC_ITEM_RETURN: "order_items",
+    TRAFFIC_PRODUCT_PRICE: "products",
+    TRAFFIC_CUSTOMER_UPDATE: "customers",
+    TRAFFIC_CUSTOMER_SOFT_DELETE: "customers",
+}
+_TRAFFIC_SQL = {
+    TRAFFIC_ORDER_PROGRESS: """
+UPDATE core.orders
+SET
+    order_status = CASE order_status
+                       WHEN 'Pendente' THEN 'Pago'
+                       WHEN 'Pago' THEN 'Faturado'
+                       WHEN 'Faturado' THEN 'Enviado'
+                       WHEN 'Enviado' THEN 'Entregue'
+                       ELSE order_status
+                   END,
+    payment_status = CASE WHEN order_status = 'Pendente' THEN 'Pago' ELSE payment_status END,
+    approved_at = CASE WHEN order_status = 'Pendente' THEN ? ELSE approved_at END,
+    shipped_at = CASE WHEN order_status = 'Faturado' THEN ? ELSE shipped_at END,
+    delivered_at = CASE WHEN order_status = 'Enviado' THEN ? ELSE delivered_at END,
+    updated_at = ?
+WHERE order_id = ?
+  AND deleted_at IS NULL
+  AND order_status IN ('Pendente', 'Pago', 'Faturado', 'Enviado');
+""",
+    TRAFFIC_ITEM_RETURN: """
+UPDATE core.order_items
+SET
+    return_quantity = return_quantity + 1,
+    returned_amount = returned_amount + unit_price,
+    updated_at = ?
+WHERE order_item_id = ?
+  AND deleted_at IS NULL
+  AND return_quantity < quantity;
+""",
+    TRAFFIC_PRODUCT_PRICE: """
+UPDATE core.products
+SET
+    list_price = CAST(ROUND(list_price * 1.03, 2) AS DECIMAL(10,2)),
+    updated_at = ?
+WHERE product_id = ?
+  AND deleted_at IS NULL;
+""",
+    TRAFFIC_CUSTOMER_UPDATE: """
+UPDATE core.customers
+SET
+    customer_type = CASE WHEN customer_type = 'Novo' THEN 'Recorrente' ELSE customer_type END,
+    accepts_email_marketing = 1 - accepts_email_marketing,
+    last_purchase_date = CAST(? AS DATE),
+    updated_at = ?
+WHERE customer_id = ?
+  AND deleted_at IS NULL;
+""",
+    TRAFFIC_CUSTOMER_SOFT_DELETE: """
+UPDATE core.customers
+SET
+    is_active = 0,
+    customer_type = 'Inativo',
+    deleted_at = ?,
+    updated_at = ?
+WHERE customer_id = ?
+  AND deleted_at IS NULL;
+""",
+}
+# Quantos parametros `now` cada UPDATE recebe antes do id.
+_TRAFFIC_NOW_PARAMS = {
+    TRAFFIC_ORDER_PROGRESS: 4,
+    TRAFFIC_ITEM_RETURN: 1,
+    TRAFFIC_PRODUCT_PRICE: 1,
+    TRAFFIC_CUSTOMER_UPDATE: 2,
+    TRAFFIC_CUSTOMER_SOFT_DELETE: 2,
+}
+
+
+@dataclass(frozen=True)
+class SyntheticScale:
+    """Volumes gerados por tabela para um fator de escala.
+
+    Regioes e equipes sao referencia fixa; pedidos, itens e aplicacoes de
+    desconto derivam de `orders` (itens e descontos sao sorteados por pedido).
+    """
+
+    factor: float
+    suppliers: int
+    customers: int
+    products: int
+    sellers: int
+    discount_campaigns: int
+    orders: int
+
+    @classmethod
+    def from_factor(cls, factor: float) -> "SyntheticScale":
+        if factor <= 0:
+            raise ValueError(f"Fator de escala deve ser positivo: {factor!r}")
+        counts = {name: max(1, int(round(base * factor))) for name, base in SCALE_BASE_COUNTS.items()}
+        # Os primeiros vendedores sao gestores dos demais.
+        counts["sellers"] = max(MANAGERS_COUNT + 1, counts["sellers"])
+        return cls(factor=float(factor), **counts)
+
+    @property
+    def expected_order_items(self) -> int:
+        return int(self.orders * (1 + MAX_ITEMS_PER_ORDER) / 2)
+
+
+@dataclass(frozen=True)
+class TrafficPlan:
+    """Ids sorteados por tipo de alteracao para um tick de trafego."""
+
+    updates: dict[str, list[int]]
+    new_orders: int
+
+    @property
+    def change_count(self) -> int:
+        return self.new_orders + sum(len(ids) for ids in self.updates.values())
+
+
+class OrderFactory:
+    """Gera pedidos com itens e aplicacoes de desconto coerentes entre si.
+
+    Precos dos itens seguem o produto sorteado (`product_prices`), comissao
+    so existe com vendedor e cada item com desconto ganha uma linha em
+    `order_item_discounts`. Os contadores de id sao sequenciais, entao a
+    mesma fabrica serve a carga inicial e aos pedidos novos do trafego.
+    """
+
+    def __init__(
+        self,
+        scale: SyntheticScale,
+        *,
+        rng: random.Random,
+        next_order_id: int = 1,
+        next_item_id: int = 1,
+        next_item_discount_id: int = 1,
+    ) -> None:
+        self.scale = scale
+        self.rng = rng
+        self.next_order_id = next_order_id
+        self.next_item_id = next_item_id
+        self.next_item_discount_id = next_item_discount_id
+
+    def build(
+        self,
+        order_ts: datetime,
+        *,
+        end_at: datetime,
+        order_status: str | None = None,
+    ) -> tuple[tuple[Any, ...], list[tuple[Any, ...]], list[tuple[Any, ...]]]:
+        rng = self.rng
+        scale = self.scale
+        order_id = self.next_order_id
+        self.next_order_id += 1
+
+        status = order_status or rng.choices(_ORDER_STATUSES, weights=_ORDER_STATUS_WEIGHTS)[0]
+        if status in ("Pago", "Faturado", "Enviado", "Entregue", "Devolvido"):
+            payment_status = "Pago"
+        elif status == "Cancelado":
+            payment_status = "Estornado"
+        else:
+            payment_status = "Pendente"
+        approved_at = None if status == "Pendente" else min(order_ts + timedelta(hours=1), end_at)
+        shipped_at = (
+            min(order_ts + timedelta(hours=18), end_at) if status in ("Enviado", "Entregue", "Devolvido") else None
+        )
+        delivered_at = min(order_ts + timedelta(days=4), end_at) if status in ("Entregue", "Devolvido") else None
+        canceled_at = min(order_ts + timedelta(hours=6), end_at) if status == "Cancelado" else None
+        updated_at = delivered_at or canceled_at or shipped_at or approved_at or order_ts
+        seller_id = None if rng.random() < 0.10 else rng.randint(1, scale.sellers)
+
+        order = (
+            order_id,
+            f"ORD-S{order_id:010d}",
+            rng.randint(1, scale.customers),
+            seller_id,
+            None if rng.random() < 0.04 else rng.randint(1, len(REFERENCE_REGIONS)),
+            status,
+            payment_status,
+            order_ts,
+            approved_at,
+            shipped_at,
+            delivered_at,
+            canceled_at,
+            rng.choice(_SALES_CHANNELS),
+            "BRL",
+            None,
+            order_ts,
+            updated_at,
+            None,
+        )
+
+        items: list[tuple[Any, ...]] = []
+        item_discounts: list[tuple[Any, ...]] = []
+        for item_number in range(1, rng.randint(1, MAX_ITEMS_PER_ORDER) + 1):
+            item_id = self.next_item_id
+            self.next_item_id += 1
+            product_id = rng.randint(1, scale.products)
+            cost_cents, list_cents = product_prices(product_id)
+            quantity = rng.randint(1, 5)
+            unit_cents = _round_ratio(list_cents * rng.randint(90, 100), 100)
+            gross_cents = quantity * unit_cents
+            discount_cents = _round_ratio(gross_cents, 10) if rng.random() < _ITEM_DISCOUNT_RATE else 0
+            net_cents = gross_cents - discount_cents
+            returned = status == "Devolvido" and item_number == 1
+            # Percentual em centesimos (350 = 3,50%).
+            commission_bp = 350 + 100 * rng.randint(0, 3) if seller_id is not None else None
+            item_updated_at = min(updated_at + timedelta(minutes=rng.randint(0, 44)), end_at)
+            items.append(
+                (
+                    item_id,
+                    order_id,
+                    item_number,
+                    product_id,
+                    quantity,
+                    _money(unit_cents),
+                    _money(gross_cents),
+                    _money(discount_cents),
+                    _money(net_cents),
+                    _money(quantity * cost_cents),
+                    1 if returned else 0,
+                    _money(unit_cents if returned else 0),
+                    _money(commission_bp) if commission_bp is not None else None,
+                    _money(_round_ratio(net_cents * commission_bp, 10_000)) if commission_bp is not None else None,
+                    discount_cents > 0,
+                    order_ts,
+                    item_updated_at,
+                    None,
+                )
+            )
+            if discount_cents > 0:
+                item_discounts.append(
+                    (
+                        self.next_item_discount_id,
+                        item_id,
+                        order_id,
+                        rng.randint(1, scale.discount_campaigns),
+                        "Item",
+                        _money(discount_cents),
+                        _money(gross_cents),
+                        _money(net_cents),
+                        min(order_ts + timedelta(minutes=5), end_at),
+                        True,
+                        None,
+                        order_ts,
+                        item_updated_at,
+                        None,
+                    )
+                )
+                self.next_item_discount_id += 1
+        return order, items, item_discounts
+
+
+def product_prices(product_id: int) -> tuple[int, int]:
+    """(custo, preco de lista) em centavos, funcao pura do id como no seed base.
+
+    Itens de pedido recalculam o preco a partir do id, sem manter os
+    produtos gerados em memoria.
+    """
+    cost_cents = 1200 + (product_id % 2000) * 20
+    list_cents = _round_ratio(cost_cents * (120 + product_id % 25), 100)
+    return cost_cents, list_cents
+
+
+def generate_tables(
+    scale: SyntheticScale,
+    *,
+    seed: int,
+    end_at: datetime,
+    history_days: int = DEFAULT_HISTORY_DAYS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[tuple[str, list[tuple[Any, ...]]]]:
+    """Gera `(tabela, lote de tuplas)` em ordem compativel com as chaves estrangeiras.
+
+    Cada tabela tem o proprio `random.Random` derivado de `seed`: a mesma
+    semente produz os mesmos dados em qualquer `chunk_size`, para o SQL
+    Server e para o Parquet. Pedidos, itens e descontos saem intercalados
+    por lote de pedidos; cadastros sao criados antes da janela historica e
+    pedidos avancam no tempo junto com o id, terminando em `end_at`.
+    """
+    end_at = end_at.replace(microsecond=0)
+    start_at = end_at - timedelta(days=max(1, int(history_days)))
+    chunk_size = max(1, int(chunk_size))
+
+    yield "regions", _regions(end_at)
+    yield "teams", _teams(end_at)
+    for table in ("suppliers", "customers", "products", "sellers", "discount_campaigns"):
+        builder = _MASTER_BUILDERS[table]
+        rng = random.Random(f"{seed}:{table}")
+        total = getattr(scale, table)
+        for first_id in range(1, total + 1, chunk_size):
+            last_id = min(total, first_id + chunk_size - 1)
+            yield table, [builder(row_id, rng, scale, start_at, end_at) for row_id in range(first_id, last_id + 1)]
+
+    factory = OrderFactory(scale, rng=random.Random(f"{seed}:orders"))
+    span_seconds = int((end_at - start_at).total_seconds())
+    for first_id in range(1, scale.orders + 1, chunk_size):
+        orders: list[tuple[Any, ...]] = []
+        items: list[tuple[Any, ...]] = []
+        item_discounts: list[tuple[Any, ...]] = []
+        for order_id in range(first_id, min(scale.orders, first_id + chunk_size - 1) + 1):
+            jitter = factory.rng.randint(0, 3600)
+            offset = min(span_seconds, span_seconds * (order_id - 1) // scale.orders + jitter)
+            order, order_items, order_item_discounts = factory.build(
+                start_at + timedelta(seconds=offset),
+                end_at=end_at,
+            )
+            orders.append(order)
+            items.extend(order_items)
+            item_discounts.extend(order_item_discounts)
+        yield "orders", orders
+        yield "order_items", items
+        if item_discounts:
+            yield "order_item_discounts", item_discounts
+
+    targets: list[tuple[Any, ...]] = []
+    target_id = 1
+    rng = random.Random(f"{seed}:seller_targets_monthly")
+    months = _months_between(start_at.date(), end_at.date())
+    for seller_id in range(1, scale.sellers + 1):
+        goal_cents = _seller_goal_cents(seller_id)
+        for month in months:
+            created_at = min(datetime.combine(month, datetime.min.time()) + timedelta(days=1), end_at)
+            targets.append(
+                (
+                    target_id,
+                    seller_id,
+                    month,
+                    _money(_round_ratio(goal_cents * rng.randint(85, 119), 100)),
+                    rng.randint(120, 339),
+                    _money(_round_ratio(goal_cents * rng.randint(70, 124), 100)),
+                    rng.randint(90, 289),
+                    "Mensal",
+                    month < months[-1],
+                    created_at,
+                    max(created_at, min(created_at + timedelta(days=14), end_at)),
+                    None,
+                )
+            )
+            target_id += 1
+            if len(targets) >= chunk_size:
+                yield "seller_targets_monthly", targets
+                targets = []
+    if targets:
+        yield "seller_targets_monthly", targets
+
+
+def plan_traffic(
+    rng: random.Random,
+    *,
+    changes: int,
+    max_ids: dict[str, int],
+    mix: dict[str, float] | None = None,
+) -> TrafficPlan:
+    """Sorteia `changes` alteracoes pelos pesos de `mix` e os ids de cada uma.
+
+    `max_ids` traz o maior id atual de cada tabela alvo; tipos cuja tabela
+    esta vazia viram pedidos novos.
+    """
+    weights = dict(mix or DEFAULT_TRAFFIC_MIX)
+    kinds = list(weights)
+    updates: dict[str, list[int]] = {kind: [] for kind in _TRAFFIC_TARGETS if kind in weights}
+    new_orders = 0
+    for kind in rng.choices(kinds, weights=[weights[kind] for kind in kinds], k=max(0, int(changes))):
+        upper = int(max_ids.get(_TRAFFIC_TARGETS.get(kind, ""), 0))
+        if kind == TRAFFIC_NEW_ORDER or upper <= 0:
+            new_orders += 1
+            continue
+        updates[kind].append(rng.randint(1, upper))
+    return TrafficPlan(updates={kind: ids for kind, ids in updates.items() if ids}, new_orders=new_orders)
+
+
+def insert_rows(connection: Any, table: str, rows: Sequence[tuple[Any, ...]]) -> int:
+    """Insere o lote em `core.<table>` com ids explicitos (`IDENTITY_INSERT`), sem confirmar."""
+    if not rows:
+        return 0
+    columns = [name for name, _ in TABLE_COLUMNS[table]]
+    sql = (
+        f"INSERT INTO core.{table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)});"
+    )
+    cursor = connection.cursor()
+    try:
+        # Sem parametros: IDENTITY_INSERT vale para a sessao, nao para um sp_executesql.
+        cursor.execute(f"SET IDENTITY_INSERT core.{table} ON;")
+        try:
+            cursor.fast_executemany = True
+        except Exception:  # noqa: BLE001
+            pass
+        cursor.executemany(sql, list(rows))
+        cursor.execute(f"SET IDENTITY_INSERT core.{table} OFF;")
+    finally:
+        cursor.close()
+    return len(rows)
+
+
+def non_empty_tables(connection: Any) -> list[str]:
+    cursor = connection.cursor()
+    try:
+        found = []
+        for table in TABLE_ORDER:
+            cursor.execute(f"SELECT TOP (1) 1 FROM core.{table};")
+            if cursor.fetchone() is not None:
+                found.append(table)
+        return found
+    finally:
+        cursor.close()
+
+
+def clear_tables(connection: Any) -> None:
+    """Esvazia `core.*` na ordem inversa das chaves e reinicia as identidades, como o seed base."""
+    cursor = connection.cursor()
+    try:
+        for table in reversed(TABLE_ORDER):
+            cursor.execute(f"DELETE FROM core.{table};")
+            cursor.execute(f"DBCC CHECKIDENT ('core.{table}', RESEED, 0) WITH NO_INFOMSGS;")
+    finally:
+        cursor.close()
+
+
+def current_max_ids(connection: Any) -> dict[str, int]:
+    cursor = connection.cursor()
+    try:
+        max_ids = {}
+        for table in TABLE_ORDER:
+            id_column = TABLE_COLUMNS[table][0][0]
+            cursor.execute(f"SELECT ISNULL(MAX({id_column}), 0) FROM core.{table};")
+            max_ids[table] = int(cursor.fetchone()[0])
+        return max_ids
+    finally:
+        cursor.close()
+
+
+def apply_traffic(
+    connection: Any,
+    plan: TrafficPlan,
+    factory: OrderFactory,
+    *,
+    now: datetime,
+) -> dict[str, int]:
+    """Executa um tick de trafego (UPDATEs por id + pedidos novos), sem confirmar.
+
+    Pedidos novos saem como `Pendente` com `now` como data; retorna as
+    linhas afetadas por tipo de alteracao.
+    """
+    now = now.replace(microsecond=0)
+    affected: dict[str, int] = {}
+    cursor = connection.cursor()
+    try:
+        for kind, ids in plan.updates.items():
+            total = 0
+            for row_id in ids:
+                cursor.execute(_TRAFFIC_SQL[kind], (*([now] * _TRAFFIC_NOW_PARAMS[kind]), row_id))
+                total += max(0, cursor.rowcount)
+            affected[kind] = total
+    finally:
+        cursor.close()
+
+    if plan.new_orders:
+        orders: list[tuple[Any, ...]] = []
+        items: list[tuple[Any, ...]] = []
+        item_discounts: list[tuple[Any, ...]] = []
+        for _ in range(plan.new_orders):
+            order, order_items, order_item_discounts = factory.build(now, end_at=now, order_status="Pendente")
+            orders.append(order)
+            items.extend(order_items)
+            item_discounts.extend(order_item_discounts)
+        insert_rows(connection, "orders", orders)
+        insert_rows(connection, "order_items", items)
+        insert_rows(connection, "order_item_discounts", item_discounts)
+        affected[TRAFFIC_NEW_ORDER] = len(orders)
+    return affected
+
+
+class ParquetTableWriter:
+    """Um arquivo Parquet por tabela (`<dir>/<tabela>.parquet`), um row group por lote."""
+
+    def __init__(self, directory: str | Path, *, compression: str = "zstd") -> None:
+        _require_pyarrow_parquet()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.compression = compression
+        self._writers: dict[str, Any] = {}
+
+    def write(self, table: str, rows: Sequence[tuple[Any, ...]]) -> int:
+        if not rows:
+            return 0
+        schema = arrow_schema(table)
+        columns = list(zip(*rows))
+        batch = pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema,
+        )
+        writer = self._writers.get(table)
+        if writer is None:
+            writer = pq.ParquetWriter(self.directory / f"{table}.parquet", schema, compression=self.compression)
+            self._writers[table] = writer
+        writer.write_table(batch)
+        return len(rows)
+
+    def close(self) -> None:
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    def __enter__(self) -> "ParquetTableWriter":
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self.close()
+
+
+def arrow_schema(table: str):
+    _require_pyarrow_parquet()
+    return pa.schema([pa.field(name, _arrow_type(type_name)) for name, type_name in TABLE_COLUMNS[table]])
+
+
+def _arrow_type(type_name: str):
+    if type_name.startswith("decimal("):
+        precision, scale = (int(part) for part in type_name[len("decimal(") : -1].split(","))
+        return pa.decimal128(precision, scale)
+    return {
+        "int64": pa.int64(),
+        "int32": pa.int32(),
+        "str": pa.string(),
+        "bool": pa.bool_(),
+        "date": pa.date32(),
+        "ts": pa.timestamp("s"),
+    }[type_name]
+
+
+def _regions(now: datetime) -> list[tuple[Any, ...]]:
+    return [
+        (region_id, code, "Brasil", region_name, state, state_name, city, ibge, True, now, now, None)
+        for region_id, (code, region_name, state, state_name, city, ibge) in enumerate(REFERENCE_REGIONS, start=1)
+    ]
+
+
+def _teams(now: datetime) -> list[tuple[Any, ...]]:
+    return [
+        (
+            team_id,
+            f"TEAM-{team_id:03d}",
+            f"Time Comercial {team_id}",
+            "Inside Sales" if team_id % 2 == 0 else "Field Sales",
+            ("Enterprise", "SMB", "Mid-Market")[team_id % 3],
+            (team_id - 1) % len(REFERENCE_REGIONS) + 1,
+            True,
+            now,
+            now,
+            None,
+        )
+        for team_id in range(1, TEAMS_COUNT + 1)
+    ]
+
+
+def _supplier(row_id: int, rng: random.Random, _scale: SyntheticScale, start_at: datetime, end_at: datetime):
+    created_at, updated_at = _master_timestamps(rng, start_at, end_at)
+    return (
+        row_id,
+        f"SUP-S{row_id:07d}",
+        f"Fornecedor {row_id}",
+        rng.choice(("Brasil", "Brasil", "Brasil", "China", "Estados Unidos")),
+        rng.random() >= 0.03,
+        created_at,
+        updated_at,
+        None,
+    )
+
+
+def _customer(row_id: int, rng: random.Random, _scale: SyntheticScale, start_at: datetime, end_at: datetime):
+    created_at, updated_at = _master_timestamps(rng, start_at, end_at)
+    _, _, state, _, city, _ = rng.choice(REFERENCE_REGIONS)
+    is_vip = rng.random() < 0.04
+    is_active = rng.random() >= 0.02
+    if not is_active:
+        customer_type = "Inativo"
+    elif is_vip:
+        customer_type = "VIP"
+    else:
+        customer_type = "Recorrente" if rng.random() < 0.15 else "Novo"
+    signup_date = created_at.date()
+    return (
+        row_id,
+        f"CUST-S{row_id:09d}",
+        f"Cliente Sintetico {row_id}",
+        f"cliente.s{row_id}@mail.com",
+        f"+55{11_900_000_000 + row_id % 99_999_999}",
+        f"{row_id:011d}",
+        date(1950, 1, 1) + timedelta(days=rng.randint(0, 18_000)),
+        rng.choice("MFO"),
+        customer_type,
+        "Pessoa Juridica" if rng.random() < 0.09 else "Pessoa Fisica",
+        rng.randint(300, 999),
+        "Alto Valor" if is_vip else rng.choice(("Medio Valor", "Base", "Base", "Base")),
+        f"Rua {row_id}",
+        f"Bairro {row_id % 150 + 1}",
+        city,
+        state,
+        "Brasil",
+        f"{10_000_000 + row_id % 89_999_999:08d}",
+        signup_date,
+        signup_date + timedelta(days=rng.randint(0, max(0, (end_at.date() - signup_date).days))),
+        is_active,
+        rng.random() < 0.33,
+        is_vip,
+        created_at,
+        updated_at,
+        None,
+    )
+
+
+def _product(row_id: int, rng: random.Random, scale: SyntheticScale, start_at: datetime, end_at: datetime):
+    created_at, updated_at = _master_timestamps(rng, start_at, end_at)
+    cost_cents, list_cents = product_prices(row_id)
+    status = rng.choices(("Ativo", "Inativo", "Descontinuado"), weights=(94, 3, 3))[0]
+    launch_date = created_at.date()
+    min_stock = rng.randint(0, 24)
+    return (
+        row_id,
+        f"PROD-S{row_id:09d}",
+        f"SKU-S{row_id:09d}",
+        f"{7_890_000_000_000 + row_id % 9_999_999_999:013d}",
+        f"Produto Sintetico {row_id}",
+        f"Descricao curta do produto {row_id}",
+        _CATEGORIES[row_id % len(_CATEGORIES)],
+        f"Subcategoria {row_id % 20 + 1}",
+        f"Linha {row_id % 10 + 1}",
+        f"Marca {row_id % 60 + 1}",
+        f"Fabricante {row_id % 80 + 1}",
+        rng.randint(1, scale.suppliers),
+        rng.choice(_ORIGINS),
+        Decimal(rng.randint(200, 70_000)).scaleb(-3),
+        _money(rng.randint(500, 10_500)),
+        _money(rng.randint(500, 10_500)),
+        _money(rng.randint(300, 11_300)),
+        rng.choice(_COLORS),
+        rng.choice(_MATERIALS),
+        _money(cost_cents),
+        _money(list_cents),
+        _money(_round_ratio((list_cents - cost_cents) * 10_000, list_cents)),
+        rng.random() < 0.08,
+        rng.random() < 0.14,
+        rng.random() < 0.05,
+        18 if rng.random() < 0.11 else None,
+        min_stock,
+        min_stock + 120,
+        rng.randint(7, 26),
+        status,
+        launch_date,
+        end_at.date() if status == "Descontinuado" else None,
+        Decimal(rng.randint(0, 50)).scaleb(-1),
+        rng.randint(10, 509),
+        f"produto-{row_id},ecommerce,sintetico",
+        created_at,
+        updated_at,
+        None,
+    )
+
+
+def _seller(row_id: int, rng: random.Random, _scale: SyntheticScale, start_at: datetime, end_at: datetime):
+    created_at, updated_at = _master_timestamps(rng, start_at, end_at)
+    _, _, state, _, city, _ = REFERENCE_REGIONS[(row_id - 1) % len(REFERENCE_REGIONS)]
+    return (
+        row_id,
+        f"SELL-S{row_id:07d}",
+        f"Vendedor {row_id}",
+        (row_id - 1) % TEAMS_COUNT + 1,
+        None if row_id <= MANAGERS_COUNT else (row_id - 1) % MANAGERS_COUNT + 1,
+        state,
+        city,
+        _money(_seller_goal_cents(row_id)),
+        created_at.date(),
+        "Inativo" if rng.random() < 0.025 else "Ativo",
+        created_at,
+        updated_at,
+        None,
+    )
+
+
+def _discount_campaign(row_id: int, rng: random.Random, _scale: SyntheticScale, start_at: datetime, end_at: datetime):
+    span_days = max(1, (end_at - start_at).days)
+    campaign_start = start_at + timedelta(days=rng.randint(0, span_days))
+    campaign_end = campaign_start + timedelta(days=rng.randint(45, 165))
+    created_at = min(campaign_start, end_at)
+    return (
+        row_id,
+        f"DISC-S{row_id:07d}",
+        f"Campanha {row_id}",
+        f"Campanha promocional sintetica {row_id}",
+        rng.choice(_DISCOUNT_TYPES),
+        rng.choice(_DISCOUNT_METHODS),
+        _money(rng.randint(5, 34) * 100),
+        _money(rng.randint(80, 665) * 100),
+        _money(rng.randint(120, 1595) * 100),
+        rng.randint(1, 5),
+        rng.randint(1_000, 100_000),
+        rng.choice(_DISCOUNT_SCOPES),
+        rng.choice(("Sem restricao", "Categorias prioritarias")),
+        campaign_start,
+        campaign_end,
+        campaign_end >= end_at,
+        rng.random() < 0.25,
+        rng.random() < 0.10,
+        0,
+        _money(0),
+        _money(0),
+        created_at,
+        created_at,
+        None,
+    )
+
+
+_MASTER_BUILDERS = {
+    "suppliers": _supplier,
+    "customers": _customer,
+    "products": _product,
+    "sellers": _seller,
+    "discount_campaigns": _discount_campaign,
+}
+
+
+def _master_timestamps(rng: random.Random, start_at: datetime, end_at: datetime) -> tuple[datetime, datetime]:
+    """Cadastro criado ate ~2 anos antes da janela, alterado em algum ponto ate `end_at`."""
+    created_at = start_at - timedelta(seconds=rng.randint(0, 730 * 86_400))
+    updated_at = created_at + timedelta(seconds=rng.randint(0, int((end_at - created_at).total_seconds())))
+    return created_at, updated_at
+
+
+def _seller_goal_cents(seller_id: int) -> int:
+    return 6_000_000 + (seller_id % 120) * 250_000
+
+
+def _months_between(start: date, end: date) -> list[date]:
+    months = []
+    current = date(start.year, start.month, 1)
+    while current <= end:
+        months.append(current)
+        current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+    return months
+
+
+def _round_ratio(numerator: int, denominator: int) -> int:
+    """Divisao inteira com arredondamento ROUND_HALF_UP (valores nao negativos)."""
+    return (numerator * 2 + denominator) // (denominator * 2)
+
+
+def _money(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
+
+
+def _require_pyarrow_parquet():
+    if pq is None:
+        raise RuntimeError(
+            "pyarrow nao esta instalado. Instale com: pip install pyarrow (necessario para saida Parquet)."
+        )
+    return pq
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from db import query_one
+
+
+WATERMARK_TYPE_UPDATED_AT = "updated_at"
+WATERMARK_TYPE_ROWVERSION = "rowversion"
+WATERMARK_TYPES = (WATERMARK_TYPE_UPDATED_AT, WATERMARK_TYPE_ROWVERSION)
+
+# Versoes abaixo de MIN_ACTIVE_ROWVERSION() pertencem a transacoes ja
+# confirmadas: nenhuma linha nova pode aparecer atras desse teto.
+_VERSION_CEILING_SQL = "SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) AS version_ceiling;"
+
+
+def normalize_watermark_type(value: Any) -> str:
+    text = str(value or "").strip().lower()
+    if text in WATERMARK_TYPES:
+        return text
+    return WATERMARK_TYPE_UPDATED_AT
+
+
+def supported_watermark_types(entity: Any) -> tuple[str, ...]:
+    """Tipos de watermark declarados pela entidade (`WATERMARK_TYPES`).
+
+    Toda entidade pagina por `updated_at`; `rowversion` exige tambem
+    `extract_batch_by_version`.
+    """
+    declared = tuple(getattr(entity, "WATERMARK_TYPES", (WATERMARK_TYPE_UPDATED_AT,)))
+    if WATERMARK_TYPE_ROWVERSION in declared and not callable(getattr(entity, "extract_batch_by_version", None)):
+        declared = tuple(item for item in declared if item != WATERMARK_TYPE_ROWVERSION)
+    return declared
+
+
+def resolve_watermark_type(entity: Any, value: Any) -> str:
+    watermark_type = normalize_watermark_type(value)
+    supported = supported_watermark_types(entity)
+    if watermark_type not in supported:
+        entity_name = getattr(entity, "ENTITY_NAME", "entidade")
+        raise ValueError(
+            f"Entidade '{entity_name}' nao suporta watermark_type='{watermark_type}'. "
+            f"Opcoes: {', '.join(supported)}"
+        )
+    return watermark_type
+
+
+def read_version_ceiling(oltp_connection: Any) -> int:
+    """Teto exclusivo de `row_version` seguro para leitura (sem transacoes em aberto abaixo dele)."""
+    row = query_one(oltp_connection, _VERSION_CEILING_SQL)
+    if row is None or row["version_ceiling"] is None:
+        raise RuntimeError("Nao foi possivel ler MIN_ACTIVE_ROWVERSION() na origem.")
+    return int(row["version_ceiling"])
+
+
+def max_batch_watermark(
+    entity: Any,
+    rows: list[dict[str, Any]],
+    *,
+    floor: tuple[datetime, int],
+) -> tuple[datetime, int]:
+    """Maior `(updated_at, id)` do lote, nunca abaixo de `floor`.
+
+    Com `rowversion` os lotes vem ordenados por versao, e nao por
+    `updated_at`; o par continua gravado em `ctl.etl_control` para
+    monitoramento de atraso, entao avanca pelo maximo observado.
+    """
+    watermark = floor
+    for row in rows:
+        candidate = entity.get_batch_watermark([row])
+        if candidate[0] is not None and candidate > watermark:
+            watermark = candidate
+    return watermark
@@ -0,0 +1,252 @@
+"""Suite de testes unitarios para `python/etl/backfill.py`.
+
+Proposito deste arquivo:
+- validar a divisao da faixa de ids em particoes contiguas;
+- garantir que o progresso de cada particao acompanha o commit do lote e
+  que a retomada parte do ultimo lote gravado;
+- documentar o watermark global e a execucao apenas das particoes pendentes.
+
+Como ler os testes:
+1. Infra de teste: `FakeBackfillEntity` pagina uma lista em memoria por id.
+2. Casos de particionamento e watermark.
+3. Casos de execucao, falha e retomada.
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import backfill as bfmod  # noqa: E402
+
+
+BASE_TS = datetime(2026, 1, 1, 8, 0, 0)
+CUTOFF = BASE_TS + timedelta(hours=1)
+
+
+class FakeBackfillEntity:
+    """Entidade fake com `extract_backfill_batch` sobre ids 1..`total_rows`.
+
+    - `updated_at` de cada id e deslocado para que a ordem por id difira da
+      ordem por watermark;
+    - ids multiplos de 10 ficam apos o cutoff e nao devem ser lidos;
+    - `fail_on_id`: o upsert falha no lote que contem esse id.
+    """
+
+    ENTITY_NAME = "fake_backfill"
+
+    def __init__(self, total_rows, fail_on_id=None, unchanged_ids=()):
+        self.source = [
+            {"id": row_id, "updated_at": BASE_TS + timedelta(minutes=(row_id * 7) % 50)}
+            for row_id in range(1, total_rows + 1)
+        ]
+        for row in self.source:
+            if row["id"] % 10 == 0:
+                row["updated_at"] = CUTOFF + timedelta(minutes=1)
+        self.fail_on_id = fail_on_id
+        self.unchanged_ids = set(unchanged_ids)
+
+    def extract_backfill_batch(self, oltp_connection, *, id_from, id_to, cutoff_updated_at, batch_size):
+        selected = [
+            row
+            for row in self.source
+            if id_from < row["id"] <= id_to and row["updated_at"] <= cutoff_updated_at
+        ]
+        return iter(selected[:batch_size])
+
+    @staticmethod
+    def transform_rows(raw_rows):
+        rows = [{"source_id": row["id"], "source_updated_at": row["updated_at"]} for row in raw_rows]
+        return rows, 0
+
+    def upsert_rows(self, dw_connection, rows, *, load_mode):
+        if self.fail_on_id is not None and any(row["source_id"] == self.fail_on_id for row in rows):
+            raise RuntimeError("falha simulada no upsert")
+        written = [row["source_id"] for row in rows if row["source_id"] not in self.unchanged_ids]
+        dw_connection.pending.extend(written)
+        return len(written)
+
+    def get_backfill_id_bounds(self, oltp_connection):
+        return 1, len(self.source)
+
+
+class FakeDwConnection:
+    """Conexao fake: ids e progresso so valem apos `commit`."""
+
+    def __init__(self):
+        self.pending = []
+        self.committed_ids = []
+        self.pending_progress = []
+        self.committed_progress = []
+
+    def save_progress(self, dw_connection, *, backfill_id, partition, error_message=None):
+        self.pending_progress.append((partition, error_message))
+
+    def commit(self):
+        self.committed_ids.extend(self.pending)
+        self.committed_progress.extend(self.pending_progress)
+        self.pending = []
+        self.pending_progress = []
+
+    def rollback(self):
+        self.pending = []
+        self.pending_progress = []
+
+
+def _run(entity, dw, partition, batch_size=4):
+    return bfmod.run_partition(
+        entity,
+        None,
+        dw,
+        partition,
+        backfill_id=1,
+        cutoff_updated_at=CUTOFF,
+        batch_size=batch_size,
+        save_progress=dw.save_progress,
+    )
+
+
+def test_split_id_range_covers_range_without_overlap():
+    """Cenario: faixa de ids com particoes de tamanho desigual.
+
+    As faixas `(id_from, id_to]` devem ser contiguas, cobrir todos os ids e
+    nunca gerar mais particoes que ids.
+    """
+
+    ranges = bfmod.split_id_range(5, 27, 4)
+
+    assert ranges[0][0] == 4
+    assert ranges[-1][1] == 27
+    assert all(previous[1] == current[0] for previous, current in zip(ranges, ranges[1:]))
+    widths = [id_to - id_from for id_from, id_to in ranges]
+    assert max(widths) - min(widths) <= 1
+    assert bfmod.split_id_range(1, 3, 8) == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_run_partition_commits_progress_with_each_batch():
+    """Cenario: particao carregada em varios lotes.
+
+    Cada commit leva o upsert e o progresso juntos; ids apos o cutoff sao
+    ignorados e o watermark da particao e o maior `(updated_at, id)`, nao o
+    ultimo id lido.
+    """
+
+    entity = FakeBackfillEntity(total_rows=20)
+    dw = FakeDwConnection()
+    partition = bfmod.BackfillPartition(partition_number=1, id_from=0, id_to=20, last_id=0)
+
+    result = _run(entity, dw, partition)
+
+    assert result.ok
+    assert dw.committed_ids == [row_id for row_id in range(1, 21) if row_id % 10]
+    done = result.partition
+    assert done.status == bfmod.PARTITION_STATUS_SUCCESS
+    assert done.extracted_count == 18
+    expected_mark = max(
+        (row["updated_at"], row["id"]) for row in entity.source if row["updated_at"] <= CUTOFF
+    )
+    assert (done.max_source_updated_at, done.max_source_id) == expected_mark
+    progress_last_ids = [item[0].last_id for item in dw.committed_progress]
+    assert progress_last_ids == [0, 4, 8, 13, 17, 19, 19]
+
+
+def test_run_partition_keeps_unchanged_rows_out_of_upserted_count():
+    """Cenario: reprocessamento em que parte das linhas tem hash igual ao gravado.
+
+    `upserted_count` conta so as gravadas; as inalteradas voltam a parte no
+    resultado desta execucao.
+    """
+
+    entity = FakeBackfillEntity(total_rows=8, unchanged_ids={2, 3, 7})
+    dw = FakeDwConnection()
+    partition = bfmod.BackfillPartition(partition_number=1, id_from=0, id_to=8, last_id=0)
+
+    result = _run(entity, dw, partition)
+
+    assert result.ok
+    assert (result.partition.extracted_count, result.partition.upserted_count) == (8, 5)
+    assert result.unchanged_count == 3
+    assert dw.committed_ids == [1, 4, 5, 6, 8]
+
+
+def test_failed_partition_keeps_last_committed_batch_and_resumes():
+    """Cenario: falha no meio da particao e nova execucao.
+
+    O lote da falha e revertido, a particao volta como `failed` com o
+    progresso do ultimo lote confirmado, e a retomada carrega somente o
+    restante.
+    """
+
+    entity = FakeBackfillEntity(total_rows=12, fail_on_id=7)
+    dw = FakeDwConnection()
+    partition = bfmod.BackfillPartition(partition_number=1, id_from=0, id_to=12, last_id=0)
+
+    failed = _run(entity, dw, partition)
+
+    assert not failed.ok
+    assert failed.partition.status == bfmod.PARTITION_STATUS_FAILED
+    assert failed.partition.last_id == 4
+    assert dw.committed_ids == [1, 2, 3, 4]
+    assert dw.committed_progress[-1][1].startswith("RuntimeError")
+
+    entity.fail_on_id = None
+    resumed = _run(entity, dw, failed.partition)
+
+    assert resumed.ok
+    assert dw.committed_ids == [1, 2, 3, 4, 5, 6, 7, 8, 9, 11, 12]
+    assert resumed.partition.extracted_count == 11
+
+
+def test_run_partitions_runs_only_unfinished_partitions():
+    """Cenario: retomada com particoes ja concluidas.
+
+    Somente particoes pendentes/falhas sao executadas; o resultado mantem a
+    ordem das particoes e o watermark global e o maior entre elas.
+    """
+
+    done = bfmod.BackfillPartition(
+        partition_number=1,
+        id_from=0,
+        id_to=10,
+        last_id=10,
+        status=bfmod.PARTITION_STATUS_SUCCESS,
+        max_source_updated_at=BASE_TS,
+        max_source_id=9,
+    )
+    pending = [
+        bfmod.BackfillPartition(
+            partition_number=number,
+            id_from=(number - 1) * 10,
+            id_to=number * 10,
+            last_id=(number - 1) * 10,
+        )
+        for number in (3, 2)
+    ]
+    executed = []
+
+    def _run_one(partition):
+        executed.append(partition.partition_number)
+        row = {
+            "source_id": partition.id_to,
+            "source_updated_at": BASE_TS + timedelta(minutes=partition.partition_number),
+        }
+        finished = bfmod.advance_partition(
+            partition,
+            [row],
+            extracted_count=1,
+            upserted_count=1,
+        )
+        return bfmod.PartitionResult(partition=finished)
+
+    results = bfmod.run_partitions([done, *pending], workers=2, run_one=_run_one)
+
+    assert sorted(executed) == [2, 3]
+    assert [result.partition.partition_number for result in results] == [1, 2, 3]
+    assert bfmod.global_watermark(result.partition for result in results) == (
+        BASE_TS + timedelta(minutes=3),
+        30,
+    )
+    assert bfmod.global_watermark([]) is None
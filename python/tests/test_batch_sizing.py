@@ -0,0 +1,131 @@
+"""Suite de testes unitarios para `python/etl/batch_sizing.py`.
+
+Proposito deste arquivo:
+- validar que o batch adaptativo converge para a duracao alvo por lote;
+- garantir o recuo quando extracao/upsert se aproximam do timeout;
+- documentar limites, passo maximo e tratamento de lotes parciais.
+"""
+
+import sys
+from pathlib import Path
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import batch_sizing as bsmod  # noqa: E402
+
+
+def _sizer(**overrides):
+    params = {
+        "initial_size": 1000,
+        "min_size": 100,
+        "max_size": 50_000,
+        "target_seconds": 10,
+        "command_timeout_seconds": 120,
+    }
+    params.update(overrides)
+    return bsmod.AdaptiveBatchSizer(**params)
+
+
+def _timing(batch_size, seconds_per_row, *, rows=None, upsert_share=0.5):
+    rows = batch_size if rows is None else rows
+    total = seconds_per_row * rows
+    return bsmod.BatchTiming(
+        batch_size=batch_size,
+        row_count=rows,
+        extract_seconds=total * (1 - upsert_share) / 2,
+        transform_seconds=total * (1 - upsert_share) / 2,
+        upsert_seconds=total * upsert_share,
+    )
+
+
+def test_sizer_grows_at_most_twice_per_batch_until_target():
+    """Cenario: lotes rapidos (1 ms por linha, alvo de 10 s).
+
+    O tamanho ideal e 10.000 linhas; o controlador dobra a cada lote ate
+    chegar nele e depois se mantem estavel.
+    """
+
+    sizer = _sizer()
+    sizes = []
+    for _ in range(6):
+        size = sizer.next_size()
+        sizes.append(size)
+        sizer.observe(_timing(size, 0.001))
+
+    assert sizes[:5] == [1000, 2000, 4000, 8000, 10_000]
+    assert sizer.current_size == 10_000
+    assert sizer.observed_batches == 6
+
+
+def test_sizer_shrinks_and_respects_bounds():
+    """Cenario: lote lento (100 ms por linha) com limite minimo.
+
+    O recuo e de no maximo metade por lote e nunca abaixo de `min_size`.
+    """
+
+    sizer = _sizer(initial_size=400, min_size=150)
+
+    assert sizer.observe(_timing(400, 0.1)) == 200
+    assert sizer.observe(_timing(200, 0.1)) == 150
+    assert _sizer(initial_size=10, min_size=100).current_size == 100
+
+
+def test_sizer_backs_off_near_command_timeout_and_caps_growth():
+    """Cenario: upsert de um lote levou mais da metade do timeout.
+
+    O proximo lote cai pela metade e, mesmo com lotes rapidos depois, o
+    tamanho nao volta a alcancar o tamanho arriscado no mesmo run.
+    """
+
+    sizer = _sizer(initial_size=20_000, command_timeout_seconds=60)
+    risky = bsmod.BatchTiming(
+        batch_size=20_000,
+        row_count=20_000,
+        extract_seconds=1.0,
+        transform_seconds=1.0,
+        upsert_seconds=35.0,
+    )
+
+    assert sizer.observe(risky) == 10_000
+    assert sizer.backoffs == 1
+
+    for _ in range(5):
+        sizer.observe(_timing(sizer.next_size(), 0.0001))
+    assert sizer.current_size == 19_999
+
+
+def test_sizer_projects_timeout_limit_before_reaching_it():
+    """Cenario: duracao alvo alta, mas upsert crescendo rumo ao timeout.
+
+    O tamanho sugerido fica limitado pela projecao linear do comando mais
+    lento, com folga, abaixo de `TIMEOUT_BACKOFF_FRACTION` do timeout.
+    """
+
+    sizer = _sizer(initial_size=10_000, target_seconds=3600, command_timeout_seconds=100)
+    sizer.observe(_timing(10_000, 0.002, upsert_share=1.0))
+
+    # upsert: 0,002 s/linha; limite de 50 s (metade do timeout) com folga de
+    # 20% -> 40 s -> 20.000 linhas, mesmo com alvo de 1 hora por lote.
+    assert sizer.current_size == 20_000
+    sizer.observe(_timing(20_000, 0.002, upsert_share=1.0))
+    assert sizer.current_size == 20_000
+    assert sizer.backoffs == 0
+
+
+def test_sizer_ignores_partial_batches():
+    """Cenario: ultimo lote do run com poucas linhas.
+
+    Lote parcial nao altera a media nem o tamanho (custo fixo de consulta
+    distorce a taxa), e o tamanho gravado continua o do ultimo lote cheio.
+    """
+
+    sizer = _sizer()
+    sizer.observe(_timing(1000, 0.001))
+    size_after_full_batch = sizer.current_size
+
+    sizer.observe(_timing(size_after_full_batch, 0.5, rows=3))
+
+    assert sizer.current_size == size_after_full_batch
+    assert sizer.observed_batches == 1
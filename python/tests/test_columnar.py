@@ -0,0 +1,236 @@
+"""Suite de testes unitarios para `python/etl/columnar.py`.
+
+Proposito deste arquivo:
+- garantir paridade exata (valores e tipos) entre `transform_rows` e
+  `transform_rows_columnar` nas entidades de fato;
+- documentar o fallback linha a linha para valores fora do caminho
+  vetorizado (mais casas decimais, texto, booleanos, magnitude alta);
+- validar a escolha da transformacao por `transform_mode` no pipeline.
+
+Como ler os testes:
+1. Infra de teste: `_rows` monta `Row` como o driver entrega.
+2. Casos de paridade: lotes sinteticos com casos de borda por entidade.
+3. Casos de erro e de selecao do modo.
+"""
+
+import random
+import sys
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import columnar as colmod  # noqa: E402
+import pipeline as pipemod  # noqa: E402
+from db import Row  # noqa: E402
+from entities import fact_descontos, fact_metas, fact_vendas  # noqa: E402
+
+
+BASE_TS = datetime(2026, 1, 1, 8, 0, 0)
+
+# Valores de borda aplicados nas colunas monetarias: nulo, negativo, mais de
+# duas casas (com empate de arredondamento), texto, booleano e magnitude alta.
+MONEY_EDGE_VALUES = [
+    None,
+    Decimal("-1.00"),
+    Decimal("0.00"),
+    Decimal("10.005"),
+    Decimal("2.675"),
+    "15.50",
+    "abc",
+    True,
+    1e14,
+    Decimal("99999999999.99"),
+    7,
+]
+
+
+def _rows(dicts):
+    columns = list(dicts[0])
+    index = {column: position for position, column in enumerate(columns)}
+    return [Row(tuple(item.get(column) for column in columns), index) for item in dicts]
+
+
+def _money(rng):
+    return Decimal(rng.randint(0, 500_000)).scaleb(-2)
+
+
+def _vendas_row(rng, item_id):
+    quantity = rng.randint(1, 5)
+    unit_price = _money(rng)
+    return {
+        "order_item_id": item_id,
+        "order_id": item_id // 3,
+        "order_number": f"PED-{item_id}" if item_id % 7 else None,
+        "customer_id": rng.randint(1, 500),
+        "product_id": rng.randint(1, 300),
+        "resolved_region_id": rng.choice([None, 0, rng.randint(1, 27)]),
+        "seller_id": rng.choice([None, -1, rng.randint(1, 40)]),
+        "quantity": rng.choice([quantity, quantity, None, 0, -2]),
+        "unit_price": unit_price,
+        "gross_amount": rng.choice([unit_price * quantity, None]),
+        "discount_amount": rng.choice([Decimal("0.00"), _money(rng), None]),
+        "cost_amount": _money(rng),
+        "return_quantity": rng.choice([0, 0, 1, 9, None, -1]),
+        "returned_amount": rng.choice([Decimal("0.00"), _money(rng)]),
+        "commission_percent": rng.choice([Decimal("5.00"), Decimal("150.00"), None]),
+        "commission_amount": rng.choice([_money(rng), None]),
+        "had_discount": rng.choice([True, False, 1, 0, "1", None]),
+        "order_date": rng.choice([BASE_TS.date(), BASE_TS, None]),
+        "order_item_created_at": BASE_TS - timedelta(days=1),
+        "order_item_updated_at": BASE_TS,
+        "source_updated_at": rng.choice([BASE_TS + timedelta(minutes=item_id), None]),
+        "order_item_deleted_at": rng.choice([None, None, BASE_TS]),
+        "order_deleted_at": None,
+    }
+
+
+def _metas_row(rng, target_id):
+    return {
+        "seller_target_id": target_id,
+        "seller_id": rng.randint(1, 40),
+        "target_month": rng.choice([date(2026, 1, 15), BASE_TS]),
+        "period_type": rng.choice(["MENSAL", "trimestral", None]),
+        "target_amount": rng.choice([_money(rng) + Decimal("0.01"), Decimal("0.01")]),
+        "target_quantity": rng.choice([None, 0, rng.randint(1, 100)]),
+        "realized_amount": rng.choice([_money(rng), None, Decimal("-3.00")]),
+        "realized_quantity": rng.choice([0, None, -1, rng.randint(1, 90)]),
+        "period_closed": rng.choice([True, False, "true", None]),
+        "target_created_at": BASE_TS,
+        "target_updated_at": rng.choice([BASE_TS + timedelta(minutes=target_id), None]),
+        "target_deleted_at": rng.choice([None, None, BASE_TS]),
+    }
+
+
+def _descontos_row(rng, discount_row_id):
+    base_amount = _money(rng)
+    return {
+        "order_item_discount_id": discount_row_id,
+        "discount_id": rng.randint(0, 50),
+        "order_item_id": rng.randint(1, 5000),
+        "order_id": discount_row_id // 2,
+        "order_number": rng.choice([None, f"PED-{discount_row_id}"]),
+        "customer_id": rng.randint(0, 500),
+        "product_id": rng.choice([None, -1, rng.randint(0, 300)]),
+        "application_level": rng.choice(["item", "PEDIDO", None]),
+        "discount_amount": rng.choice([_money(rng), Decimal("0.00"), None]),
+        "base_amount": rng.choice([base_amount, Decimal("0.00")]),
+        "final_amount": rng.choice([base_amount, None]),
+        "approved": rng.choice([1, 0, "True", None]),
+        "rejection_reason": rng.choice([None, "  fora da politica  ", ""]),
+        "applied_at": rng.choice([BASE_TS, None]),
+        "order_item_discount_created_at": BASE_TS - timedelta(hours=1),
+        "order_item_discount_updated_at": BASE_TS,
+        "source_updated_at": rng.choice([BASE_TS + timedelta(seconds=discount_row_id), None]),
+        "order_item_discount_deleted_at": rng.choice([None, BASE_TS]),
+        "order_item_deleted_at": None,
+        "order_deleted_at": None,
+    }
+
+
+CASES = [
+    (
+        fact_vendas,
+        _vendas_row,
+        [
+            "unit_price",
+            "gross_amount",
+            "discount_amount",
+            "cost_amount",
+            "returned_amount",
+            "commission_percent",
+            "commission_amount",
+        ],
+    ),
+    (fact_metas, _metas_row, ["realized_amount"]),
+    (fact_descontos, _descontos_row, ["discount_amount", "base_amount", "final_amount"]),
+]
+
+
+def _assert_same_output(expected, actual):
+    assert len(actual) == len(expected)
+    for expected_row, actual_row in zip(expected, actual):
+        assert actual_row == expected_row
+        assert list(actual_row) == list(expected_row)
+        for column, value in expected_row.items():
+            assert type(actual_row[column]) is type(value), column
+            assert str(actual_row[column]) == str(value), column
+
+
+@pytest.mark.parametrize("entity, make_row, money_columns", CASES, ids=[case[0].ENTITY_NAME for case in CASES])
+def test_columnar_transform_matches_row_transform(entity, make_row, money_columns):
+    """Cenario: lote sintetico com casos de borda em todas as colunas.
+
+    Cada coluna monetaria recebe tambem os valores de `MONEY_EDGE_VALUES`;
+    o resultado vetorizado deve ser identico ao linha a linha, inclusive no
+    tipo e na representacao (`Decimal('1.50')` e nao `Decimal('1.5')`).
+    """
+
+    rng = random.Random(7)
+    dicts = [make_row(rng, row_id) for row_id in range(1, 401)]
+    for position, edge_value in enumerate(MONEY_EDGE_VALUES):
+        for column in money_columns:
+            dicts[position * len(money_columns) + money_columns.index(column)][column] = edge_value
+
+    expected, expected_soft_deleted = entity.transform_rows(_rows(dicts))
+    actual, actual_soft_deleted = entity.transform_rows_columnar(_rows(dicts))
+
+    _assert_same_output(expected, actual)
+    assert actual_soft_deleted == expected_soft_deleted
+
+
+@pytest.mark.parametrize(
+    "entity, make_row, column, invalid_value",
+    [
+        (fact_metas, _metas_row, "seller_id", 0),
+        (fact_metas, _metas_row, "target_amount", Decimal("0.00")),
+        (fact_descontos, _descontos_row, "customer_id", None),
+    ],
+)
+def test_columnar_transform_raises_same_validation_error(entity, make_row, column, invalid_value):
+    """Cenario: linha invalida no meio do lote.
+
+    A linha segue pelo fallback linha a linha, que levanta a mesma mensagem
+    de `transform_rows`.
+    """
+
+    rng = random.Random(3)
+    dicts = [make_row(rng, row_id) for row_id in range(1, 6)]
+    dicts[2][column] = invalid_value
+
+    with pytest.raises(ValueError) as row_error:
+        entity.transform_rows(_rows(dicts))
+    with pytest.raises(ValueError) as columnar_error:
+        entity.transform_rows_columnar(_rows(dicts))
+
+    assert str(columnar_error.value) == str(row_error.value)
+
+
+def test_columnar_transform_accepts_empty_batch():
+    """Cenario: extracao sem linhas novas."""
+
+    assert fact_vendas.transform_rows_columnar(iter([])) == ([], 0)
+
+
+def test_select_transform_falls_back_to_row_transform():
+    """Cenario: `transform_mode=columnar` em entidade sem variante vetorizada.
+
+    Dimensoes nao expoem `transform_rows_columnar` e seguem linha a linha;
+    valores desconhecidos de modo voltam para `row`.
+    """
+
+    class DimensionEntity:
+        @staticmethod
+        def transform_rows(raw_rows):
+            return list(raw_rows), 0
+
+    assert pipemod.select_transform(fact_vendas, "columnar") is fact_vendas.transform_rows_columnar
+    assert pipemod.select_transform(fact_vendas, "row") is fact_vendas.transform_rows
+    assert pipemod.select_transform(DimensionEntity, "columnar") is DimensionEntity.transform_rows
+    assert colmod.normalize_transform_mode(" COLUMNAR ") == "columnar"
+    assert colmod.normalize_transform_mode("arrow") == "row"
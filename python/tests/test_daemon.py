@@ -0,0 +1,136 @@
+"""Suite de testes unitarios para `python/etl/daemon.py`.
+
+Proposito deste arquivo:
+- validar que cada entidade e consultada no seu proprio intervalo;
+- garantir que so entidades com backlog sao executadas no ciclo;
+- documentar a parada por `stop_event` sem aguardar o proximo intervalo.
+
+Como ler os testes:
+1. `FakeClock` substitui `time.monotonic`; o tempo so avanca quando o
+   laco espera (`stop_event.wait`) ou quando a execucao simula duracao.
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import daemon as daemonmod  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeStopEvent(threading.Event):
+    """`wait` avanca o relogio fake em vez de dormir."""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.waits = []
+
+    def wait(self, timeout=None):
+        self.waits.append(timeout)
+        self.clock.now += timeout
+        return self.is_set()
+
+
+def test_run_daemon_polls_each_entity_on_its_own_interval():
+    """Cenario: `fact_vendas` a cada 5s e `dim_cliente` a cada 20s.
+
+    Em 8 ciclos a fato e consultada em todos e a dimensao so quando o seu
+    intervalo vence; somente entidades com backlog sao executadas.
+    """
+
+    clock = FakeClock()
+    stop_event = FakeStopEvent(clock)
+    polls = []
+    runs = []
+    reports = []
+
+    def has_backlog(name):
+        polls.append((clock.now, name))
+        return name == "fact_vendas" and clock.now < 10
+
+    daemonmod.run_daemon(
+        {"dim_cliente": 20, "fact_vendas": 5},
+        has_backlog=has_backlog,
+        run_entities=lambda names: runs.append((clock.now, names)),
+        stop_event=stop_event,
+        on_cycle=reports.append,
+        clock=clock,
+        max_cycles=8,
+    )
+
+    assert [t for t, name in polls if name == "dim_cliente"] == [0.0, 20.0]
+    assert [t for t, name in polls if name == "fact_vendas"] == [0.0, 5.0, 10.0, 15.0, 20.0, 25.0, 30.0, 35.0]
+    assert runs == [(0.0, ["fact_vendas"]), (5.0, ["fact_vendas"])]
+    assert [r.ran for r in reports[:3]] == [("fact_vendas",), ("fact_vendas",), ()]
+    assert reports[0].polled == ("dim_cliente", "fact_vendas")
+
+
+def test_run_daemon_reports_loop_latency_and_lag():
+    """Cenario: execucao de 3s com intervalo de 5s.
+
+    O ciclo reporta a duracao do laco; o proximo vencimento conta a partir
+    do fim do ciclo, entao o atraso reportado nao acumula.
+    """
+
+    clock = FakeClock()
+    stop_event = FakeStopEvent(clock)
+    reports = []
+
+    def run_entities(names):
+        clock.now += 3
+
+    daemonmod.run_daemon(
+        {"fact_vendas": 5},
+        has_backlog=lambda name: True,
+        run_entities=run_entities,
+        stop_event=stop_event,
+        on_cycle=reports.append,
+        clock=clock,
+        max_cycles=3,
+    )
+
+    assert [r.loop_seconds for r in reports] == [3.0, 3.0, 3.0]
+    assert [r.lag_seconds for r in reports] == [0.0, 0.0, 0.0]
+    assert stop_event.waits == [5.0, 5.0]
+
+
+def test_run_daemon_stops_when_event_is_set_mid_cycle():
+    """Cenario: SIGTERM durante a execucao de um ciclo.
+
+    O ciclo atual termina (e e reportado), nenhuma consulta nova e feita e
+    o laco encerra sem esperar o proximo intervalo.
+    """
+
+    clock = FakeClock()
+    stop_event = FakeStopEvent(clock)
+    polls = []
+    reports = []
+
+    def run_entities(names):
+        stop_event.set()
+
+    cycles = daemonmod.run_daemon(
+        {"dim_cliente": 5, "fact_vendas": 5},
+        has_backlog=lambda name: polls.append(name) or True,
+        run_entities=run_entities,
+        stop_event=stop_event,
+        on_cycle=reports.append,
+        clock=clock,
+    )
+
+    assert cycles == 1
+    assert polls == ["dim_cliente", "fact_vendas"]
+    assert len(reports) == 1
+    assert stop_event.waits == []
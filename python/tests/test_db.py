@@ -8,7 +8,8 @@ Proposito deste arquivo:
 Como ler os testes:
 1. Infra de teste: `DummyCursor` e `DummyConnection` simulam pyodbc.
 2. Casos de conexao: sucesso e ausencia de dependencia (`pyodbc`).
-3. Casos de utilitarios: close seguro, leitura de SQL, query_all/query_one/execute.
+3. Casos de utilitarios: close seguro, leitura de SQL, query_all/query_one/execute
+   e streaming com stream_query.
 
 Limite intencional:
 - estes testes sao unitarios (mock/fake). Conectividade real deve ficar em
@@ -56,6 +57,13 @@ class DummyCursor:
     def fetchone(self):
         return self._rows[0] if self._rows else None
 
+    def fetchmany(self, size):
+        self.fetchmany_sizes = getattr(self, "fetchmany_sizes", []) + [size]
+        offset = getattr(self, "_offset", 0)
+        chunk = self._rows[offset:offset + size]
+        self._offset = offset + len(chunk)
+        return list(chunk)
+
     def close(self):
         self.closed = True
 
@@ -222,6 +230,49 @@ def test_query_all_with_no_description_returns_empty_dicts(dummy_conn):
     assert cur.closed is True
 
 
+def test_stream_query_yields_rows_in_fetchmany_chunks(dummy_conn):
+    """Cenario: extracao em streaming.
+
+    Esperado:
+    - leitura em blocos de `fetchmany(fetch_size)`;
+    - linhas acessiveis por nome como nos dicionarios de `query_all`;
+    - indice de colunas compartilhado entre as linhas;
+    - cursor fechado ao esgotar o iterador.
+    """
+
+    cur = dummy_conn.cursor()
+    cur.description = [("id",), ("name",)]
+    cur._rows = [(1, "Alice"), (2, "Bob"), (3, "Carol")]
+
+    rows = list(dbmod.stream_query(dummy_conn, "SELECT * FROM t WHERE x=?", params=[10], fetch_size=2))
+
+    assert cur.executed == [("SELECT * FROM t WHERE x=?", (10,))]
+    assert cur.fetchmany_sizes == [2, 2, 2]
+    assert [row["name"] for row in rows] == ["Alice", "Bob", "Carol"]
+    assert rows[0].get("id") == 1
+    assert rows[0].get("inexistente", "x") == "x"
+    assert rows[2].to_dict() == {"id": 3, "name": "Carol"}
+    assert rows[0]._index is rows[1]._index
+    assert cur.closed is True
+
+
+def test_stream_query_closes_cursor_when_consumer_stops_early(dummy_conn):
+    """Cenario: consumidor interrompe o streaming.
+
+    Fechar o gerador antes do fim deve fechar o cursor.
+    """
+
+    cur = dummy_conn.cursor()
+    cur.description = [("id",)]
+    cur._rows = [(1,), (2,), (3,)]
+
+    rows = dbmod.stream_query(dummy_conn, "SELECT id FROM t", fetch_size=1)
+    assert next(rows)["id"] == 1
+    rows.close()
+
+    assert cur.closed is True
+
+
 def test_query_one_returns_none_when_no_row(dummy_conn):
     """Cenario: query_one sem resultado.
 
@@ -0,0 +1,228 @@
+"""Suite de testes unitarios para `python/etl/key_cache.py`.
+
+Proposito deste arquivo:
+- validar o refresh incremental dos lookups apos carga das dimensoes;
+- garantir a persistencia em disco e a revalidacao contra o DW;
+- documentar os contadores de hits/misses/refreshes por entidade consumidora.
+"""
+
+import re
+import sys
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import key_cache as kcmod  # noqa: E402
+
+
+_FROM_RE = re.compile(r"FROM\s+([\w.]+)", re.IGNORECASE)
+_WHERE_RE = re.compile(r"WHERE\s+(\w+)\s*(>=|>)\s*\?", re.IGNORECASE)
+
+
+class FakeDwCursor:
+    """Cursor fake que aplica o filtro `coluna > ?`/`coluna >= ?` das specs."""
+
+    def __init__(self, tables, executed):
+        self._tables = tables
+        self._executed = executed
+        self._rows = []
+        self.description = None
+
+    def execute(self, sql, params=()):
+        self._executed.append((sql, tuple(params)))
+        table_name = _FROM_RE.search(sql).group(1)
+        columns, rows = self._tables[table_name]
+        if "COUNT(*)" in sql:
+            self.description = [("total",)]
+            self._rows = [(len(rows),)]
+            return
+
+        where = _WHERE_RE.search(sql)
+        index = columns.index(where.group(1))
+        if where.group(2) == ">=":
+            selected = [row for row in rows if row[index] >= params[0]]
+        else:
+            selected = [row for row in rows if row[index] > params[0]]
+        self.description = [(col,) for col in columns]
+        self._rows = selected
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size):
+        chunk, self._rows = self._rows[:size], self._rows[size:]
+        return chunk
+
+    def close(self):
+        pass
+
+
+class FakeDwConnection:
+    def __init__(self):
+        self.executed = []
+        self.tables = {
+            "dim.DIM_DATA": (["data_completa", "data_id"], [(date(2024, 1, 1), 1)]),
+            "dim.DIM_CLIENTE": (["cliente_original_id", "cliente_id"], [(10, 1), (20, 2)]),
+            "fact.FACT_VENDAS": (
+                ["venda_original_id", "venda_id", "custo_total", "data_atualizacao"],
+                [(100, 1, Decimal("5.50"), datetime(2024, 1, 1, 10, 0))],
+            ),
+        }
+
+    def cursor(self):
+        return FakeDwCursor(self.tables, self.executed)
+
+
+def _new_cache():
+    specs = [spec for spec in kcmod.LOOKUP_SPECS if spec.name in {"data", "cliente", "venda"}]
+    return kcmod.SurrogateKeyCache(specs)
+
+
+def test_lookups_refresh_incrementally_after_notify_loaded():
+    """Cenario: `dim_cliente` carrega novas linhas durante o run.
+
+    O primeiro acesso faz carga completa; depois de `notify_loaded` apenas
+    surrogates acima da maior ja vista devem ser relidas.
+    """
+
+    conn = FakeDwConnection()
+    cache = _new_cache()
+
+    first = cache.lookups(conn, ("cliente",), consumer="fact_vendas")
+    assert first["cliente"].get(10) == 1
+
+    conn.tables["dim.DIM_CLIENTE"][1].append((30, 3))
+    cache.notify_loaded("dim_cliente")
+    conn.executed.clear()
+
+    second = cache.lookups(conn, ("cliente",), consumer="fact_vendas")
+
+    assert second["cliente"].get(30) == 3
+    assert conn.executed == [(conn.executed[0][0], (2,))]
+    stats = cache.pop_stats("fact_vendas")
+    assert (stats.hits, stats.misses, stats.refreshes) == (2, 0, 2)
+
+
+def test_lookups_without_notify_do_not_hit_dw_again():
+    """Cenario: entidades de fato consecutivas sem carga de dimensao no meio.
+
+    O lookup ja carregado deve ser reutilizado sem nova consulta e os
+    contadores devem ser separados por entidade consumidora.
+    """
+
+    conn = FakeDwConnection()
+    cache = _new_cache()
+
+    cache.lookups(conn, ("cliente",), consumer="fact_vendas")
+    conn.executed.clear()
+    lookup = cache.lookups(conn, ("cliente",), consumer="fact_descontos")["cliente"]
+
+    assert lookup.get(99) is None
+    assert conn.executed == []
+    stats = cache.pop_stats("fact_descontos")
+    assert (stats.hits, stats.misses, stats.refreshes) == (0, 1, 0)
+    assert cache.pop_stats("fact_vendas").refreshes == 1
+
+
+def test_lookup_counters_stay_exact_with_concurrent_workers():
+    """Cenario: workers da carga paralela usam os lookups do mesmo consumidor.
+
+    Os contadores sao atualizados sob o lock do cache: nenhum hit ou miss
+    se perde entre as threads.
+    """
+
+    conn = FakeDwConnection()
+    cache = _new_cache()
+    lookup = cache.lookups(conn, ("cliente",), consumer="fact_vendas")["cliente"]
+    previous_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def _work():
+        for _ in range(200):
+            lookup.get_many([10, 20, 99])
+            lookup.get(10)
+
+    workers = [threading.Thread(target=_work) for _ in range(8)]
+    try:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        sys.setswitchinterval(previous_interval)
+
+    stats = cache.pop_stats("fact_vendas")
+    assert (stats.hits, stats.misses, stats.refreshes) == (8 * 200 * 3, 8 * 200, 1)
+
+
+def test_sale_lookup_rereads_updated_rows_with_safety_window():
+    """Cenario: `fact_vendas` atualiza custo de uma venda ja cacheada.
+
+    O refresh por `data_atualizacao` deve reler a linha alterada e
+    substituir o par (venda_id, custo_total).
+    """
+
+    conn = FakeDwConnection()
+    cache = _new_cache()
+    cache.lookups(conn, ("venda",), consumer="fact_descontos")
+
+    conn.tables["fact.FACT_VENDAS"][1][0] = (100, 1, Decimal("7.25"), datetime(2024, 1, 1, 10, 5))
+    cache.notify_loaded("fact_vendas")
+    conn.executed.clear()
+
+    lookup = cache.lookups(conn, ("venda",), consumer="fact_descontos")["venda"]
+
+    assert lookup.get(100) == (1, Decimal("7.25"))
+    assert conn.executed[0][1] == (datetime(2024, 1, 1, 9, 58),)
+
+
+def test_save_and_load_roundtrip_revalidates_against_dw(tmp_path):
+    """Cenario: cache persistido entre execucoes.
+
+    Um cache lido do disco faz refresh incremental no primeiro acesso e,
+    se a contagem do DW divergir, recarrega o lookup por completo.
+    """
+
+    conn = FakeDwConnection()
+    cache = _new_cache()
+    cache.lookups(conn, ("data", "cliente", "venda"), consumer="fact_descontos")
+    cache_path = tmp_path / "key_cache.json.gz"
+    cache.save(cache_path)
+
+    restored = _new_cache()
+    assert restored.load(cache_path) is True
+
+    # Linha removida no DW: a contagem diverge e o lookup deve ser recarregado.
+    conn.tables["dim.DIM_CLIENTE"][1].pop(0)
+    lookups = restored.lookups(conn, ("data", "cliente", "venda"), consumer="fact_descontos")
+
+    assert lookups["data"].get(date(2024, 1, 1)) == 1
+    assert lookups["venda"].get(100) == (1, Decimal("5.50"))
+    assert lookups["cliente"].get(10) is None
+    assert lookups["cliente"].get(20) == 2
+    assert restored.load(tmp_path / "inexistente.json.gz") is False
+
+
+def test_trusted_load_serves_lookups_without_dw(tmp_path):
+    """Cenario: replay de lotes gravados (`benchmark_replay.py`), sem SQL Server.
+
+    Com `trusted=True` o cache lido do disco responde sem refresh nem
+    contagem de validacao.
+    """
+
+    cache = _new_cache()
+    cache.lookups(FakeDwConnection(), ("data", "cliente"), consumer="fact_vendas")
+    cache_path = tmp_path / "key_cache.json.gz"
+    cache.save(cache_path)
+
+    restored = _new_cache()
+    assert restored.load(cache_path, trusted=True) is True
+    lookups = restored.lookups(None, ("data", "cliente"), consumer="fact_vendas")
+
+    assert lookups["data"].get(date(2024, 1, 1)) == 1
+    assert lookups["cliente"].get_many([10, 20, 30]) == [1, 2, None]
@@ -0,0 +1,88 @@
+"""Suite de testes unitarios para `python/etl/key_maps.py`.
+
+Proposito deste arquivo:
+- garantir paridade de `IntKeyMap` com `dict` nos modos ordenado e denso;
+- validar a busca vetorizada (`get_many`) e a substituicao e a mescla
+  incremental em `update`.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import key_maps as kmmod  # noqa: E402
+
+
+def test_int_key_map_uses_dense_layout_for_contiguous_keys():
+    """Cenario: chaves naturais quase contiguas (ids sequenciais do OLTP).
+
+    O mapa deve escolher o vetor denso e manter paridade com `dict`,
+    inclusive para buracos e chaves fora da faixa.
+    """
+
+    reference = {key: key * 10 for key in range(100, 200) if key != 150}
+    key_map = kmmod.IntKeyMap()
+    key_map.update(reference.keys(), reference.values())
+
+    assert key_map.is_dense
+    assert len(key_map) == len(reference)
+    for key in (99, 100, 150, 199, 200):
+        assert key_map.get(key) == reference.get(key)
+
+
+def test_int_key_map_uses_sorted_layout_for_sparse_keys():
+    """Cenario: chaves esparsas.
+
+    Com amplitude muito maior que a quantidade, o mapa usa arrays ordenados
+    e `get_many` devolve `MISSING` nas chaves ausentes.
+    """
+
+    key_map = kmmod.IntKeyMap()
+    key_map.update([5_000_000, 7, 90_000], [3, 1, 2])
+
+    assert not key_map.is_dense
+    found = key_map.get_many(np.array([7, 8, 90_000, 5_000_000, -1]))
+    assert found[:, 0].tolist() == [1, kmmod.MISSING, 2, 3, kmmod.MISSING]
+
+
+def test_int_key_map_update_replaces_existing_keys_and_keeps_width():
+    """Cenario: refresh incremental com chave ja existente e largura 2.
+
+    A ultima ocorrencia vence (inclusive dentro do mesmo lote) e `items`
+    devolve as entradas ordenadas por chave.
+    """
+
+    key_map = kmmod.IntKeyMap(width=2)
+    key_map.update([1, 2], [(10, 100), (20, 200)])
+    key_map.update([2, 3, 3], [(21, 210), (30, 300), (31, 310)])
+
+    assert key_map.get(2) == (21, 210)
+    assert list(key_map.items()) == [(1, (10, 100)), (2, (21, 210)), (3, (31, 310))]
+
+
+def test_int_key_map_incremental_updates_match_dict():
+    """Cenario: refreshes seguidos com chaves intercaladas, repetidas e acima da maior.
+
+    A mescla por `searchsorted` e o acrescimo ao final mantem paridade com
+    `dict` atualizado na mesma ordem, nos dois layouts.
+    """
+
+    rng = np.random.default_rng(7)
+    for high in (400, 1_000_000):
+        reference = {}
+        key_map = kmmod.IntKeyMap()
+        for start in range(0, 2_000, 250):
+            appended = list(range(high + start, high + start + 30))
+            # Lotes alternados: so chaves novas acima da maior, ou intercaladas.
+            keys = appended if start % 500 else rng.integers(0, high, size=120).tolist() + appended
+            values = rng.integers(1, 10_000, size=len(keys)).tolist()
+            reference.update(zip(keys, values))
+            key_map.update(keys, values)
+
+            assert len(key_map) == len(reference)
+            assert list(key_map.items()) == [(key, (reference[key],)) for key in sorted(reference)]
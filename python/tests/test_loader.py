@@ -0,0 +1,179 @@
+"""Suite de testes unitarios para `python/etl/loader.py`.
+
+Proposito deste arquivo:
+- garantir que todo `upsert_*.sql` pode ser convertido para o caminho bulk;
+- validar a sequencia de comandos enviada ao SQL Server nos dois modos
+  de carga, sem conectar em SQL Server real;
+- documentar o descarte de linhas sem mudanca (`row_hash` igual ao gravado).
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import loader as loadmod  # noqa: E402
+from config import SQL_DIR  # noqa: E402
+
+
+UPSERT_FILES = sorted(path.name for path in SQL_DIR.glob("upsert_*.sql"))
+
+
+def _dim_cliente_row(cliente_original_id, row_hash):
+    """Parametros de `upsert_dim_cliente.sql`: chave primeiro, hash por ultimo."""
+    width = (SQL_DIR / "upsert_dim_cliente.sql").read_text(encoding="utf-8").count("?")
+    return (cliente_original_id, *([None] * (width - 2)), row_hash)
+
+
+class RecordingCursor:
+    """Cursor fake que registra `execute`/`executemany` em ordem.
+
+    `stored_rows` simula o retorno das consultas de hash do alvo.
+    """
+
+    def __init__(self, stored_rows=()):
+        self.calls = []
+        self.fast_executemany = False
+        self.closed = False
+        self.stored_rows = list(stored_rows)
+
+    def execute(self, sql, params=()):
+        self.calls.append(("execute", sql, tuple(params)))
+
+    def executemany(self, sql, params):
+        self.calls.append(("executemany", sql, list(params)))
+
+    def fetchall(self):
+        return list(self.stored_rows)
+
+    def fetchone(self):
+        return (len(self.stored_rows),)
+
+    def close(self):
+        self.closed = True
+
+
+class RecordingConnection:
+    def __init__(self, stored_rows=()):
+        self.cursor_obj = RecordingCursor(stored_rows)
+
+    def cursor(self):
+        return self.cursor_obj
+
+
+@pytest.mark.parametrize("upsert_file", UPSERT_FILES)
+def test_build_staged_merge_supports_every_upsert_file(upsert_file):
+    """Cenario: conversao de cada MERGE linha a linha para set-based.
+
+    O numero de colunas da staging deve bater com os parametros do MERGE
+    original e o `USING` deve passar a ler a tabela temporaria.
+    """
+
+    upsert_sql = (SQL_DIR / upsert_file).read_text(encoding="utf-8")
+
+    staged = loadmod.build_staged_merge(upsert_sql, staging_table="#stg_teste")
+
+    assert len(staged.columns) == upsert_sql.count("?")
+    assert staged.key_columns
+    assert "?" not in staged.merge_sql
+    assert "FROM #stg_teste AS stg" in staged.merge_sql
+    assert staged.insert_staging_sql.count("?") == len(staged.columns) + 1
+    assert staged.columns[staged.hash_position] == "row_hash"
+    assert staged.count_unchanged_sql.count("?") == 0
+
+
+def test_build_staged_merge_uses_composite_key_for_fact_metas():
+    """Cenario: chave composta no ON (fact_metas).
+
+    A deduplicacao da staging deve particionar pelas tres colunas da chave.
+    """
+
+    upsert_sql = (SQL_DIR / "upsert_fact_metas.sql").read_text(encoding="utf-8")
+
+    staged = loadmod.build_staged_merge(upsert_sql, staging_table="#stg_fact_metas")
+
+    assert staged.key_columns == ("vendedor_id", "data_id", "tipo_periodo")
+    assert "PARTITION BY vendedor_id, data_id, tipo_periodo" in staged.merge_sql
+
+
+def test_write_upsert_params_bulk_runs_single_set_based_merge():
+    """Cenario: modo bulk.
+
+    Esperado: cria staging, insere o lote com `fast_executemany` e uma
+    sequencia de ordem, conta as linhas sem mudanca, executa um unico MERGE
+    e remove a staging.
+    """
+
+    conn = RecordingConnection()
+    params = [(1, "a"), (2, "b")]
+
+    counts = loadmod.write_upsert_params(conn, "upsert_dim_cliente.sql", params, load_mode="bulk")
+
+    kinds = [call[0] for call in conn.cursor_obj.calls]
+    assert kinds == ["execute", "executemany", "execute", "execute", "execute"]
+    assert "INTO #stg_dim_cliente" in conn.cursor_obj.calls[0][1]
+    assert conn.cursor_obj.calls[1][2] == [(0, 1, "a"), (1, 2, "b")]
+    assert conn.cursor_obj.calls[2][1].startswith("SELECT COUNT(*) AS unchanged_count")
+    assert conn.cursor_obj.calls[3][1].startswith("MERGE dim.DIM_CLIENTE AS target")
+    assert "target.row_hash <> source.row_hash" in conn.cursor_obj.calls[3][1]
+    assert counts == (2, 0)
+    assert conn.cursor_obj.fast_executemany is True
+    assert conn.cursor_obj.closed is True
+
+
+def test_write_upsert_params_merge_mode_keeps_row_by_row_statement():
+    """Cenario: modo padrao (merge).
+
+    Deve ler os hashes gravados e manter o `executemany` do arquivo SQL
+    original, sem staging.
+    """
+
+    conn = RecordingConnection()
+
+    loadmod.write_upsert_params(conn, "upsert_dim_cliente.sql", [_dim_cliente_row(1, b"h1")], load_mode="qualquer")
+
+    assert [call[0] for call in conn.cursor_obj.calls] == ["execute", "executemany"]
+    assert conn.cursor_obj.calls[0][1].startswith("SELECT cliente_original_id, row_hash FROM dim.DIM_CLIENTE")
+    assert "SELECT" in conn.cursor_obj.calls[1][1] and "? AS cliente_original_id" in conn.cursor_obj.calls[1][1]
+
+
+def test_write_upsert_params_merge_mode_skips_rows_with_stored_hash():
+    """Cenario: lote com linha repetida e linha sem mudanca de conteudo.
+
+    Para chave repetida vale a ultima ocorrencia; linhas cujo hash ja esta
+    gravado nao sao enviadas ao MERGE e voltam como inalteradas, fora das
+    gravadas.
+    """
+
+    conn = RecordingConnection(stored_rows=[(1, b"h1"), (2, b"antigo")])
+    params = [
+        _dim_cliente_row(2, b"primeiro"),
+        _dim_cliente_row(1, b"h1"),
+        _dim_cliente_row(2, b"novo"),
+        _dim_cliente_row(3, b"h3"),
+    ]
+
+    written, unchanged = loadmod.write_upsert_params(conn, "upsert_dim_cliente.sql", params, load_mode="merge")
+
+    assert sorted(conn.cursor_obj.calls[0][2]) == [1, 2, 3]
+    sent = conn.cursor_obj.calls[1][2]
+    assert [(row[0], row[-1]) for row in sent] == [(2, b"novo"), (3, b"h3")]
+    assert (written, unchanged) == (3, 1)
+
+
+def test_write_upsert_params_merge_mode_skips_statement_when_nothing_changed():
+    """Cenario: reprocessamento de um lote identico ao gravado.
+
+    Nenhum `executemany` deve ser enviado.
+    """
+
+    conn = RecordingConnection(stored_rows=[(1, b"h1")])
+
+    counts = loadmod.write_upsert_params(conn, "upsert_dim_cliente.sql", [_dim_cliente_row(1, b"h1")], load_mode="merge")
+
+    assert [call[0] for call in conn.cursor_obj.calls] == ["execute"]
+    assert counts == (0, 1)
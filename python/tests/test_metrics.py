@@ -0,0 +1,135 @@
+"""Suite de testes unitarios para `python/etl/metrics.py`.
+
+Proposito deste arquivo:
+- validar a estimativa de bytes lidos por linha extraida;
+- documentar as medidas derivadas de `BatchMetrics` gravadas no audit;
+- validar as faixas do histograma de frescor ponta a ponta;
+- garantir que entidades em paralelo nao gravam o pico de RSS umas das outras.
+"""
+
+import sys
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import metrics as metricsmod  # noqa: E402
+import pipeline as pipemod  # noqa: E402
+
+
+def test_peak_rss_is_unknown_while_entities_overlap(monkeypatch, tmp_path):
+    """Cenario: duas entidades medindo ao mesmo tempo (`--parallelism`).
+
+    Nenhuma zera o VmHWM da outra e o pico lido fica `None` ate o primeiro
+    reset feito com uma entidade so.
+    """
+
+    clear_refs = tmp_path / "clear_refs"
+    monkeypatch.setattr(metricsmod, "_PROC_CLEAR_REFS", clear_refs)
+
+    metricsmod.begin_peak_rss_measurement()
+    try:
+        metricsmod.begin_peak_rss_measurement()
+        assert metricsmod.reset_peak_rss() is False
+        assert not clear_refs.exists()
+        assert metricsmod.read_peak_rss_bytes() is None
+        metricsmod.end_peak_rss_measurement()
+
+        # Ainda sem reset limpo: o pico atual inclui a entidade que ja terminou.
+        assert metricsmod.read_peak_rss_bytes() is None
+        assert metricsmod.reset_peak_rss() is True
+        assert clear_refs.read_text(encoding="ascii") == "5"
+    finally:
+        metricsmod.end_peak_rss_measurement()
+
+
+def test_estimate_row_bytes_uses_wire_size_per_type():
+    """Cenario: linha com tipos variados, como dict ou tupla.
+
+    Texto conta 2 bytes por caractere (NVARCHAR), tipos fixos usam o tamanho
+    do protocolo e `None` nao conta.
+    """
+
+    row = {
+        "id": 10,
+        "name": "abc",
+        "amount": Decimal("1.50"),
+        "updated_at": datetime(2026, 1, 1),
+        "day": date(2026, 1, 1),
+        "active": True,
+        "deleted_at": None,
+    }
+
+    assert metricsmod.estimate_row_bytes(row) == 8 + 6 + 17 + 8 + 3 + 1 + 0
+    assert metricsmod.estimate_row_bytes((b"\x00\x01", 1.5)) == 2 + 8
+
+
+def test_counting_iterator_accumulates_fetched_bytes():
+    """Cenario: extracao consumida pelo `CountingIterator` do pipeline."""
+
+    rows = [{"id": 1, "name": "ab"}, {"id": 2, "name": None}]
+    counting = pipemod.CountingIterator(rows)
+
+    assert list(counting) == rows
+    assert counting.count == 2
+    assert counting.fetched_bytes == (8 + 4) + 8
+
+
+def test_batch_metrics_rows_per_second_covers_all_stages():
+    """Cenario: vazao do lote considera extracao, transformacao, upsert e commit."""
+
+    batch = metricsmod.BatchMetrics(
+        batch_number=1,
+        batch_size=1000,
+        extracted_count=1000,
+        upserted_count=1000,
+        extract_seconds=1.0,
+        transform_seconds=0.5,
+        upsert_seconds=2.0,
+        commit_seconds=0.5,
+        fetched_bytes=10_000,
+        peak_rss_bytes=None,
+    )
+
+    assert batch.total_seconds == 4.0
+    assert batch.rows_per_second == 250.0
+    idle = metricsmod.BatchMetrics(
+        batch_number=1,
+        batch_size=1,
+        extracted_count=0,
+        upserted_count=0,
+        extract_seconds=0.0,
+        transform_seconds=0.0,
+        upsert_seconds=0.0,
+        commit_seconds=0.0,
+        fetched_bytes=0,
+        peak_rss_bytes=None,
+    )
+    assert idle.rows_per_second is None
+
+
+def test_freshness_histogram_counts_rows_per_lag_bucket():
+    """Cenario: lote com atrasos de 1s, 3s, 3s, 2h, 30 dias, futuro e sem timestamp.
+
+    Cada linha cai na primeira faixa cujo limite superior cobre o atraso;
+    atraso negativo vai para a primeira faixa, acima de 7 dias para a faixa
+    de estouro, e so faixas nao vazias sao retornadas.
+    """
+
+    committed_at = datetime(2026, 5, 1, 12, 0, 0)
+    lags = [1, 3, 3, 7200, 30 * 86400, -5]
+    rows = [{"source_updated_at": committed_at - timedelta(seconds=lag)} for lag in lags]
+    rows.append({"source_updated_at": None})
+
+    histogram = metricsmod.freshness_histogram(rows, committed_at=committed_at)
+
+    assert histogram == (
+        (1, 2),
+        (5, 2),
+        (7200, 1),
+        (metricsmod.FRESHNESS_OVERFLOW_BUCKET, 1),
+    )
+    assert metricsmod.freshness_histogram([], committed_at=committed_at) == ()
@@ -0,0 +1,246 @@
+"""Suite de testes unitarios para `python/etl/pipeline.py`.
+
+Proposito deste arquivo:
+- validar a paginacao por watermark sem SQL Server real;
+- garantir que o modo pipelined entrega os mesmos lotes, na mesma ordem,
+  que o modo sequencial;
+- documentar o encerramento da thread produtora em erro;
+- validar a paginacao por `rowversion` (versao da origem, sem cutoff);
+- documentar a consulta de backlog usada pelo modo daemon.
+
+Como ler os testes:
+1. Infra de teste: `FakeEntity` simula o contrato de um modulo em `entities/`.
+2. Casos sequenciais: paginacao, `max_batches` e fim de dados.
+3. Casos pipelined: paridade com o sequencial e propagacao de erro.
+"""
+
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import pipeline as pipemod  # noqa: E402
+
+
+BASE_TS = datetime(2026, 1, 1, 8, 0, 0)
+
+
+class FakeEntity:
+    """Entidade fake com extracao keyset sobre uma lista em memoria.
+
+    - `source`: linhas ordenadas por `(updated_at, id)`;
+    - `extract_calls`: watermarks recebidos em cada `extract_batch`;
+    - `fail_on_call`: numero da chamada de extracao que deve falhar.
+    """
+
+    ENTITY_NAME = "fake"
+
+    def __init__(self, total_rows, fail_on_call=None):
+        self.source = [
+            {"id": idx, "updated_at": BASE_TS + timedelta(seconds=idx // 2)}
+            for idx in range(1, total_rows + 1)
+        ]
+        self.extract_calls = []
+        self.fail_on_call = fail_on_call
+        self.threads = set()
+
+    def extract_batch(self, oltp_connection, *, watermark_updated_at, watermark_id, cutoff_updated_at, batch_size):
+        del oltp_connection, cutoff_updated_at
+        self.threads.add(threading.current_thread().name)
+        self.extract_calls.append((watermark_updated_at, watermark_id))
+        if self.fail_on_call is not None and len(self.extract_calls) == self.fail_on_call:
+            raise RuntimeError("falha simulada na extracao")
+        pending = [
+            row
+            for row in self.source
+            if (row["updated_at"], row["id"]) > (watermark_updated_at, watermark_id)
+        ]
+        return pending[:batch_size]
+
+    def transform_rows(self, raw_rows):
+        rows = [{"source_updated_at": r["updated_at"], "source_id": r["id"]} for r in raw_rows]
+        return rows, 0
+
+    def get_batch_watermark(self, rows):
+        return rows[-1]["source_updated_at"], rows[-1]["source_id"]
+
+
+class FakeVersionEntity(FakeEntity):
+    """Entidade fake com `row_version` crescente fora da ordem de `updated_at`."""
+
+    WATERMARK_TYPES = ("updated_at", "rowversion")
+
+    def __init__(self, total_rows):
+        super().__init__(total_rows)
+        # Linhas alteradas em ordem inversa de id: versao maior para id menor.
+        for row in self.source:
+            row["source_version"] = 1000 + (total_rows - row["id"]) * 10
+        self.version_calls = []
+
+    def extract_batch_by_version(self, oltp_connection, *, watermark_version, version_ceiling, batch_size):
+        self.version_calls.append((watermark_version, version_ceiling))
+        pending = sorted(
+            (row for row in self.source if watermark_version < row["source_version"] < version_ceiling),
+            key=lambda row: row["source_version"],
+        )
+        return pending[:batch_size]
+
+
+def _kwargs(**overrides):
+    params = {
+        "watermark_updated_at": datetime(1900, 1, 1),
+        "watermark_id": 0,
+        "cutoff_minutes": 0,
+        "batch_size": 4,
+        "max_batches": None,
+    }
+    params.update(overrides)
+    return params
+
+
+def test_iter_batches_paginates_until_short_batch():
+    """Cenario: paginacao sequencial por watermark.
+
+    Com 10 linhas e lote 4, esperam-se lotes 4/4/2 e cada extracao deve
+    partir do watermark do lote anterior.
+    """
+
+    entity = FakeEntity(total_rows=10)
+
+    batches = list(pipemod.iter_batches(entity, None, **_kwargs()))
+
+    assert [b.extracted_count for b in batches] == [4, 4, 2]
+    assert [b.batch_number for b in batches] == [1, 2, 3]
+    assert entity.extract_calls[1] == (batches[0].watermark_updated_at, batches[0].watermark_id)
+    assert batches[-1].watermark_id == 10
+
+
+def test_iter_batches_respects_max_batches():
+    """Cenario: limite de lotes.
+
+    `max_batches=2` deve interromper a extracao mesmo havendo dados.
+    """
+
+    entity = FakeEntity(total_rows=20)
+
+    batches = list(pipemod.iter_batches(entity, None, **_kwargs(max_batches=2)))
+
+    assert len(batches) == 2
+    assert len(entity.extract_calls) == 2
+
+
+def test_iter_batches_uses_next_batch_size_per_extraction():
+    """Cenario: batch adaptativo informando o tamanho a cada extracao.
+
+    Cada lote usa o tamanho vigente no momento da extracao e o fim dos
+    dados e detectado comparando com esse tamanho, nao com `batch_size`.
+    """
+
+    entity = FakeEntity(total_rows=10)
+    sizes = iter([2, 3, 6])
+
+    batches = list(pipemod.iter_batches(entity, None, **_kwargs(next_batch_size=lambda: next(sizes))))
+
+    assert [b.batch_size for b in batches] == [2, 3, 6]
+    assert [b.extracted_count for b in batches] == [2, 3, 5]
+    assert batches[-1].watermark_id == 10
+
+
+def test_iter_batches_pipelined_matches_sequential_order():
+    """Cenario: paridade entre modo sequencial e pipelined.
+
+    Os lotes entregues pelo modo pipelined devem ser identicos e na mesma
+    ordem, e a extracao deve acontecer fora da thread consumidora.
+    """
+
+    sequential = list(pipemod.iter_batches(FakeEntity(total_rows=23), None, **_kwargs()))
+    entity = FakeEntity(total_rows=23)
+
+    pipelined = list(pipemod.iter_batches_pipelined(entity, None, queue_depth=1, **_kwargs()))
+
+    assert pipelined == sequential
+    assert threading.current_thread().name not in entity.threads
+
+
+def test_iter_batches_pipelined_reraises_producer_error_after_loaded_batches():
+    """Cenario: falha na extracao do terceiro lote.
+
+    Os dois primeiros lotes devem ser entregues e o erro relancado no
+    consumidor, sem lotes alem do ultimo extraido com sucesso.
+    """
+
+    entity = FakeEntity(total_rows=40, fail_on_call=3)
+    consumed = []
+
+    with pytest.raises(RuntimeError, match="falha simulada"):
+        for batch in pipemod.iter_batches_pipelined(entity, None, queue_depth=2, **_kwargs()):
+            consumed.append(batch.batch_number)
+
+    assert consumed == [1, 2]
+
+
+def test_iter_batches_pipelined_stops_producer_when_consumer_closes():
+    """Cenario: consumidor interrompe a iteracao (ex.: erro no upsert).
+
+    Ao fechar o gerador, a thread produtora deve encerrar e liberar a
+    conexao OLTP antes do retorno.
+    """
+
+    entity = FakeEntity(total_rows=400)
+    batches = pipemod.iter_batches_pipelined(entity, None, queue_depth=1, **_kwargs())
+
+    first = next(batches)
+    batches.close()
+
+    assert first.batch_number == 1
+    assert not any(t.name.startswith("etl-extract-") for t in threading.enumerate())
+    assert len(entity.extract_calls) < 100
+
+
+def test_iter_batches_by_rowversion_pages_on_version_below_ceiling(monkeypatch):
+    """Cenario: watermark `rowversion` com uma linha acima do teto ativo.
+
+    Cada extracao parte da maior versao do lote anterior e respeita o teto de
+    `MIN_ACTIVE_ROWVERSION()`; o par `(updated_at, id)` avanca pelo maior
+    valor observado, mesmo com as linhas fora dessa ordem.
+    """
+
+    entity = FakeVersionEntity(total_rows=10)
+    # Versao 1090 (id 1) pertence a uma transacao ainda aberta: fica para depois.
+    monkeypatch.setattr(pipemod, "read_version_ceiling", lambda connection: 1090)
+
+    batches = list(
+        pipemod.iter_batches(entity, None, **_kwargs(watermark_type="rowversion", watermark_version=None))
+    )
+
+    assert [b.extracted_count for b in batches] == [4, 4, 1]
+    assert [b.watermark_version for b in batches] == [1030, 1070, 1080]
+    assert entity.version_calls == [(0, 1090), (1030, 1090), (1070, 1090)]
+    # Ultima linha do primeiro lote e o id 7, mas o maior par observado e o id 10.
+    assert [(b.watermark_updated_at, b.watermark_id) for b in batches] == [(BASE_TS + timedelta(seconds=5), 10)] * 3
+    assert entity.extract_calls == []
+
+
+def test_has_pending_rows_probes_one_row_after_watermark():
+    """Cenario: consulta de backlog do modo daemon.
+
+    Extrai no maximo uma linha a partir do watermark informado, sem
+    transformar; no fim dos dados responde `False`.
+    """
+
+    entity = FakeEntity(total_rows=4)
+    last = entity.source[-1]
+
+    assert pipemod.has_pending_rows(
+        entity, None, watermark_updated_at=datetime(1900, 1, 1), watermark_id=0, cutoff_minutes=0
+    )
+    assert not pipemod.has_pending_rows(
+        entity, None, watermark_updated_at=last["updated_at"], watermark_id=last["id"], cutoff_minutes=0
+    )
+    assert len(entity.extract_calls) == 2
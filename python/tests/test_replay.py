@@ -0,0 +1,139 @@
+"""Suite de testes unitarios para `python/etl/replay.py`.
+
+Proposito deste arquivo:
+- validar o formato das fixtures gravadas (tipos preservados no replay);
+- garantir que o replay mede transformacao e parametros sem tocar no banco;
+- documentar a regra de regressao contra o baseline JSON.
+"""
+
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import replay as replaymod  # noqa: E402
+from db import Row  # noqa: E402
+from row_hash import add_row_hashes  # noqa: E402
+
+
+def _raw_rows(count, start=1):
+    index = {"id": 0, "valor": 1, "dia": 2, "updated_at": 3, "hash": 4}
+    return [
+        Row(
+            (row_id, Decimal(f"{row_id}.50"), date(2026, 1, row_id), datetime(2026, 1, 1, 10, row_id), b"\x01\xff"),
+            index,
+        )
+        for row_id in range(start, start + count)
+    ]
+
+
+def _fake_entity():
+    """Entidade minima com o mesmo contrato dos modulos de `entities/`."""
+
+    calls = []
+
+    def transform_rows(raw_rows):
+        rows = [{"source_id": row["id"], "valor": row["valor"] * 2} for row in raw_rows]
+        return add_row_hashes(rows), 0
+
+    def upsert_rows(dw_connection, rows, *, load_mode):
+        params = [(row["source_id"], row["valor"]) for row in rows]
+        written, _ = entity.write_upsert_params(dw_connection, "upsert_fake.sql", params, load_mode=load_mode)
+        return written
+
+    def write_upsert_params(*_args, **_kwargs):
+        calls.append("banco")
+        return 0, 0
+
+    entity = SimpleNamespace(
+        ENTITY_NAME="fake",
+        transform_rows=transform_rows,
+        upsert_rows=upsert_rows,
+        write_upsert_params=write_upsert_params,
+    )
+    return entity, calls
+
+
+def test_fixture_round_trip_preserves_types_and_batches(tmp_path):
+    """Cenario: dois lotes brutos gravados e lidos de volta como `db.Row`."""
+
+    path = replaymod.fixture_path(tmp_path, "dim_fake")
+    total = replaymod.write_fixture(path, "dim_fake", [_raw_rows(2), _raw_rows(1, start=3)])
+
+    fixture = replaymod.read_fixture(path)
+
+    assert total == 3
+    assert fixture.entity_name == "dim_fake"
+    assert fixture.columns == ("id", "valor", "dia", "updated_at", "hash")
+    assert [len(batch) for batch in fixture.batches] == [2, 1]
+    assert [row.to_dict() for row in fixture.batches[0]] == [row.to_dict() for row in _raw_rows(2)]
+    assert replaymod.list_fixtures(tmp_path) == ["dim_fake"]
+
+
+def test_measure_entity_replays_without_database():
+    """Cenario: replay de 2 lotes; `write_upsert_params` real nunca e chamado.
+
+    O coletor e restaurado ao final e o digest reflete a saida transformada.
+    """
+
+    entity, calls = _fake_entity()
+    original_writer = entity.write_upsert_params
+    fixture = replaymod.ReplayFixture(
+        entity_name="fake",
+        columns=("id", "valor", "dia", "updated_at", "hash"),
+        batches=(tuple(_raw_rows(3)), tuple(_raw_rows(2, start=4))),
+    )
+
+    result = replaymod.measure_entity(entity, fixture, repeat=2)
+
+    assert calls == []
+    assert entity.write_upsert_params is original_writer
+    assert (result.rows, result.batches) == (5, 2)
+    assert result.transform_rows_per_second > 0
+    assert result.upsert_params_rows_per_second > 0
+    assert result.peak_alloc_bytes > 0
+    assert result.output_digest == replaymod.measure_entity(entity, fixture, repeat=1).output_digest
+
+
+def test_compare_to_baseline_flags_slowdown_and_allocation_growth(tmp_path):
+    """Cenario: baseline gravado; nova medicao 30% mais lenta e com o dobro de alocacao.
+
+    Com limite de 20% as duas regressoes sao reportadas; variacao de 10% passa.
+    """
+
+    reference = replaymod.ReplayResult(
+        entity_name="fact_vendas",
+        rows=1000,
+        batches=1,
+        transform_rows_per_second=10_000.0,
+        upsert_params_rows_per_second=20_000.0,
+        peak_alloc_bytes=1_000_000,
+        output_digest="abc",
+    )
+    baseline_path = tmp_path / "baseline.json"
+    replaymod.save_baseline(baseline_path, [reference])
+    baseline = replaymod.load_baseline(baseline_path)
+
+    slower = replaymod.ReplayResult(
+        entity_name="fact_vendas",
+        rows=1000,
+        batches=1,
+        transform_rows_per_second=7_000.0,
+        upsert_params_rows_per_second=18_000.0,
+        peak_alloc_bytes=2_000_000,
+        output_digest="def",
+    )
+    regressions = replaymod.compare_to_baseline([slower], baseline, threshold=0.20)
+
+    assert [message.split(":")[0] for message in regressions] == [
+        "fact_vendas.transform_rows_per_second",
+        "fact_vendas.peak_alloc_bytes",
+    ]
+    assert replaymod.changed_outputs([slower], baseline) == ["fact_vendas"]
+    assert replaymod.compare_to_baseline([reference], baseline, threshold=0.20) == []
+    assert replaymod.load_baseline(tmp_path / "inexistente.json") == {}
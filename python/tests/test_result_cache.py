@@ -0,0 +1,272 @@
+"""Suite de testes unitarios para `dashboards/streamlit/result_cache.py`.
+
+Proposito deste arquivo:
+- garantir que a chave ignora formatacao do SQL mas separa parametros,
+  escopo da conexao e versao de dados;
+- validar limites de bytes, despejo LRU e expiracao nos dois backends;
+- documentar que um acerto nao abre conexao e que processos diferentes
+  compartilham entradas e contadores pelo diretorio em disco;
+- garantir que entradas em disco sem a assinatura do segredo nunca chegam
+  ao unpickle;
+- fixar o formato do token de versao de dados e a janela de tempo sem a view.
+"""
+
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+DASH_DIR = Path(__file__).resolve().parents[2] / "dashboards" / "streamlit"
+if str(DASH_DIR) not in sys.path:
+    sys.path.insert(0, str(DASH_DIR))
+
+import result_cache as rcmod  # noqa: E402
+
+
+SECRET = "segredo-de-teste"
+
+
+def _memory_cache(max_bytes=10_000, max_entry_bytes=10_000):
+    return rcmod.MemoryResultCache(max_bytes=max_bytes, max_entry_bytes=max_entry_bytes)
+
+
+def test_query_key_ignores_whitespace_but_not_params_scope_or_version():
+    """Cenario: mesma consulta com outra formatacao, parametros, conexao ou versao de dados."""
+
+    base = rcmod.query_key("SELECT a\n  FROM t WHERE x = ?;", [1], scope="srv/dw", version="v1")
+
+    assert base == rcmod.query_key("SELECT a FROM t  WHERE x = ?", (1,), scope="srv/dw", version="v1")
+    assert base != rcmod.query_key("SELECT a FROM t WHERE x = ?", [2], scope="srv/dw", version="v1")
+    assert base != rcmod.query_key("SELECT a FROM t WHERE x = ?", [1], scope="srv/oltp", version="v1")
+    assert base != rcmod.query_key("SELECT a FROM t WHERE x = ?", [1], scope="srv/dw", version="v2")
+
+
+def test_connection_scope_drops_credentials():
+    """Cenario: string ODBC com usuario e senha; o escopo guarda so servidor e banco."""
+
+    scope = rcmod.connection_scope("Driver={ODBC};Server=SQL,1433;Database=DW_ECOMMERCE;UID=bi;PWD=secret;")
+
+    assert scope == "sql,1433/dw_ecommerce"
+
+
+def test_backend_must_implement_every_storage_method():
+    """Cenario: backend novo sem `_usage`; o erro sai na criacao, nao no primeiro acesso."""
+
+    class IncompleteCache(rcmod.ResultCache):
+        def clear(self):
+            pass
+
+        def _read(self, key):
+            return None
+
+        def _write(self, key, created_at, payload):
+            pass
+
+        def _delete(self, key):
+            pass
+
+        def _evict(self):
+            return 0
+
+    with pytest.raises(TypeError, match="_usage"):
+        IncompleteCache(max_bytes=100, max_entry_bytes=100)
+    with pytest.raises(TypeError):
+        rcmod.ResultCache(max_bytes=100, max_entry_bytes=100)
+
+
+def test_memory_cache_evicts_least_recently_used_over_byte_limit():
+    """Cenario: tres entradas de ~400 bytes em limite de 1000; a menos usada sai."""
+
+    cache = _memory_cache(max_bytes=1000)
+    cache.put("a", "x" * 380)
+    cache.put("b", "y" * 380)
+    assert cache.get("a", ttl_seconds=60)[0] is True
+
+    cache.put("c", "z" * 380)
+
+    assert cache.get("b", ttl_seconds=60) == (False, None)
+    assert cache.get("a", ttl_seconds=60)[0] is True
+    stats = cache.stats()
+    assert stats.entries == 2
+    assert stats.bytes <= 1000
+    assert stats.evictions == 1
+
+
+def test_cache_skips_entries_over_entry_limit_and_expires_by_ttl():
+    """Cenario: resultado acima do limite por entrada e leitura com TTL zero."""
+
+    cache = _memory_cache(max_entry_bytes=100)
+
+    assert cache.put("grande", "x" * 500) is False
+    assert cache.put("pequeno", 1) is True
+    assert cache.get("pequeno", ttl_seconds=0.0) == (False, None)
+    assert cache.stats().entries == 0
+
+
+def test_get_or_compute_counts_hits_and_misses():
+    """Cenario: duas leituras da mesma chave; so a primeira executa a consulta."""
+
+    cache = _memory_cache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"total": 10}
+
+    assert cache.get_or_compute("k", compute, ttl_seconds=60) == {"total": 10}
+    assert cache.get_or_compute("k", compute, ttl_seconds=60) == {"total": 10}
+
+    stats = cache.stats()
+    assert len(calls) == 1
+    assert (stats.hits, stats.misses, stats.stores) == (1, 1, 1)
+    assert stats.hit_ratio == 0.5
+
+
+def test_disk_cache_is_shared_between_instances_and_sums_stats(tmp_path):
+    """Cenario: duas instancias no mesmo diretorio fazem o papel de duas replicas."""
+
+    writer = rcmod.DiskResultCache(tmp_path, secret=SECRET, max_bytes=100_000, max_entry_bytes=100_000)
+    reader = rcmod.DiskResultCache(tmp_path, secret=SECRET, max_bytes=100_000, max_entry_bytes=100_000)
+    # Os contadores publicados sao por host-pid; simula o segundo processo.
+    reader._stats_file = reader._stats_file.with_name("outra-replica.json")
+    frame = pd.DataFrame({"estado": ["SP", "RJ"], "receita": [10.5, 3.0]})
+
+    assert writer.get("k", ttl_seconds=60) == (False, None)
+    writer.put("k", frame)
+    hit, value = reader.get("k", ttl_seconds=60)
+    # A publicacao dos contadores e espacada; `shared_stats` forca a do proprio processo.
+    writer.shared_stats()
+
+    assert hit is True
+    pd.testing.assert_frame_equal(value, frame)
+    shared = reader.shared_stats()
+    assert (shared.hits, shared.misses, shared.stores) == (1, 1, 1)
+    assert shared.entries == 1
+
+
+def test_disk_cache_rejects_entries_not_signed_with_the_secret(tmp_path, monkeypatch):
+    """Cenario: arquivo trocado no volume e processo com outro segredo.
+
+    Os dois viram falta contada como erro, o arquivo e removido e o pickle
+    nunca e desserializado.
+    """
+
+    cache = rcmod.DiskResultCache(tmp_path, secret=SECRET, max_bytes=100_000, max_entry_bytes=100_000)
+    intruder = rcmod.DiskResultCache(tmp_path, secret="outro", max_bytes=100_000, max_entry_bytes=100_000)
+    cache.put("k", {"total": 1})
+    cache.put("outra", {"total": 2})
+    path = tmp_path / f"k{rcmod.ENTRY_SUFFIX}"
+    data = path.read_bytes()
+    path.write_bytes(data[:-1] + bytes([data[-1] ^ 1]))
+
+    def fail_loads(payload):
+        raise AssertionError("unpickle de entrada nao assinada")
+
+    monkeypatch.setattr(rcmod.pickle, "loads", fail_loads)
+
+    assert cache.get("k", ttl_seconds=60) == (False, None)
+    assert intruder.get("outra", ttl_seconds=60) == (False, None)
+    assert not path.exists()
+    assert cache.stats().errors == 1
+    with pytest.raises(ValueError, match=rcmod.CACHE_SECRET_ENV):
+        rcmod.DiskResultCache(tmp_path, secret="", max_bytes=100, max_entry_bytes=100)
+
+
+def test_from_env_needs_directory_and_secret_for_disk(tmp_path, monkeypatch):
+    """Cenario: diretorio configurado sem segredo cai na memoria; com segredo usa o disco."""
+
+    monkeypatch.setenv(rcmod.CACHE_DIR_ENV, str(tmp_path))
+    monkeypatch.delenv(rcmod.CACHE_SECRET_ENV, raising=False)
+    assert rcmod.from_env().backend == "memory"
+
+    monkeypatch.setenv(rcmod.CACHE_SECRET_ENV, SECRET)
+    assert rcmod.from_env().backend == "disk"
+
+
+def test_disk_cache_evicts_oldest_file_by_mtime(tmp_path):
+    """Cenario: volume cheio; a entrada com mtime mais antigo sai primeiro."""
+
+    cache = rcmod.DiskResultCache(tmp_path, secret=SECRET, max_bytes=1000, max_entry_bytes=1000)
+    cache.put("antigo", "x" * 380)
+    cache.put("recente", "y" * 380)
+    old_mtime = time.time() - 3600
+    os.utime(tmp_path / f"antigo{rcmod.ENTRY_SUFFIX}", (old_mtime, old_mtime))
+    os.utime(tmp_path / f"recente{rcmod.ENTRY_SUFFIX}", (old_mtime + 60, old_mtime + 60))
+
+    cache.put("novo", "z" * 380)
+
+    assert not (tmp_path / f"antigo{rcmod.ENTRY_SUFFIX}").exists()
+    assert cache.get("recente", ttl_seconds=60)[0] is True
+    assert cache.get("novo", ttl_seconds=60)[0] is True
+
+
+def test_cached_reader_opens_connection_only_on_miss():
+    """Cenario: mesma consulta em duas sessoes; a conexao so abre no miss."""
+
+    cache = _memory_cache(max_bytes=1_000_000, max_entry_bytes=1_000_000)
+    opened = []
+
+    def connect():
+        connection = sqlite3.connect(":memory:")
+        connection.execute("CREATE TABLE vendas (estado TEXT, receita REAL)")
+        connection.executemany("INSERT INTO vendas VALUES (?, ?)", [("SP", 10.0), ("RJ", 4.0)])
+        opened.append(connection)
+        return connection
+
+    sql = "SELECT estado, receita FROM vendas WHERE receita > ? ORDER BY estado"
+    with rcmod.CachedReader(cache, connect, scope="mem", version="v1", ttl_seconds=60) as reader:
+        first = reader.read_sql(sql, [5])
+    with rcmod.CachedReader(cache, connect, scope="mem", version="v1", ttl_seconds=60) as reader:
+        second = reader.read_sql(sql, [5])
+
+    assert len(opened) == 1
+    assert first["estado"].tolist() == ["SP"]
+    pd.testing.assert_frame_equal(first, second)
+
+
+def _data_version_connection(with_view):
+    """sqlite com o schema `fact` anexado e as funcoes do SQL Server usadas no token."""
+
+    connection = sqlite3.connect(":memory:")
+    connection.execute("ATTACH DATABASE ':memory:' AS fact")
+    connection.create_function("OBJECT_ID", 2, lambda name, kind: 1 if with_view else None)
+    connection.create_function("GETDATE", 0, lambda: "2026-03-31 23:59:00")
+    connection.create_function("CONVERT", 3, lambda kind, value, style: value[:10])
+    if with_view:
+        connection.execute("CREATE TABLE fact.VW_DASH_DATA_VERSION (entity_name TEXT, data_version INTEGER)")
+        connection.executemany(
+            "INSERT INTO fact.VW_DASH_DATA_VERSION VALUES (?, ?)",
+            [("fact_vendas", 42), ("dim_vendedor", 7), ("dim_cliente", 3)],
+        )
+    return connection
+
+
+def test_load_data_version_lists_entities_sorted_with_optional_server_date():
+    """Cenario: view presente; entidade fora da lista nao entra no token."""
+
+    connection = _data_version_connection(with_view=True)
+
+    token = rcmod.load_data_version(connection, ("fact_vendas", "dim_vendedor"))
+    dated = rcmod.load_data_version(connection, ("fact_vendas", "dim_vendedor"), with_server_date=True)
+
+    assert token == "dim_vendedor=7;fact_vendas=42"
+    assert dated == "dim_vendedor=7;fact_vendas=42;data=2026-03-31"
+
+
+def test_load_data_version_falls_back_to_time_bucket_without_view():
+    """Cenario: DW sem o script 29; a versao muda a cada janela fixa."""
+
+    connection = _data_version_connection(with_view=False)
+    window = rcmod.DATA_VERSION_FALLBACK_SECONDS
+    start = 1_000 * window
+
+    first = rcmod.load_data_version(connection, ("fact_vendas",), now=start)
+    same_window = rcmod.load_data_version(connection, ("fact_vendas",), now=start + window - 1)
+    next_window = rcmod.load_data_version(connection, ("fact_vendas",), now=start + window)
+
+    assert first == same_window == "ttl=1000"
+    assert next_window == "ttl=1001"
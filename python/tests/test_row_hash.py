@@ -0,0 +1,97 @@
+"""Suite de testes unitarios para `python/etl/row_hash.py`.
+
+Proposito deste arquivo:
+- garantir que o hash de linha e estavel e sensivel ao conteudo;
+- validar a normalizacao de tipos (Decimal, bool, datas) e as colunas
+  excluidas do hash;
+- documentar a extensao do hash com as chaves surrogate resolvidas.
+"""
+
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import row_hash as rhmod  # noqa: E402
+
+
+def _row(**overrides):
+    row = {
+        "cliente_original_id": 10,
+        "nome_cliente": "Ana",
+        "score_credito": Decimal("1.50"),
+        "data_cadastro": date(2025, 3, 1),
+        "eh_ativo": True,
+        "data_ultima_atualizacao": datetime(2026, 1, 1, 8, 0, 0),
+        "source_updated_at": datetime(2026, 1, 1, 8, 0, 0),
+        "source_id": 10,
+    }
+    row.update(overrides)
+    return row
+
+
+def _hash(row, exclude=("data_ultima_atualizacao",)):
+    return rhmod.add_row_hashes([row], exclude=exclude)[0][rhmod.ROW_HASH_COLUMN]
+
+
+def test_row_hash_is_stable_and_detects_content_changes():
+    """Cenario: mesma linha transformada duas vezes e linha com nome alterado.
+
+    O hash tem 16 bytes, independe da ordem das chaves do dict e muda com
+    qualquer coluna de negocio.
+    """
+
+    reordered = dict(reversed(list(_row().items())))
+
+    assert len(_hash(_row())) == rhmod.ROW_HASH_BYTES
+    assert _hash(_row()) == _hash(reordered)
+    assert _hash(_row()) != _hash(_row(nome_cliente="Ana Maria"))
+    assert _hash(_row()) != _hash(_row(nome_cliente=None))
+
+
+def test_row_hash_ignores_watermark_and_excluded_columns():
+    """Cenario: origem tocada sem mudanca de conteudo.
+
+    `source_updated_at`/`source_id` nunca entram no hash; colunas de
+    auditoria informadas em `exclude` tambem nao.
+    """
+
+    touched = _row(
+        data_ultima_atualizacao=datetime(2026, 2, 1),
+        source_updated_at=datetime(2026, 2, 1),
+        source_id=99,
+    )
+
+    assert _hash(touched) == _hash(_row())
+    assert _hash(touched, exclude=()) != _hash(_row(), exclude=())
+
+
+def test_row_hash_normalizes_types_like_the_target_columns():
+    """Cenario: valores equivalentes no DW com representacoes diferentes.
+
+    `Decimal("1.50")` e `Decimal("1.5")` gravam o mesmo DECIMAL e `True`
+    grava o mesmo BIT que `1`; ja `1`, `"1"` e `Decimal("1")` sao distintos.
+    """
+
+    assert _hash(_row(score_credito=Decimal("1.5"))) == _hash(_row())
+    assert _hash(_row(score_credito=Decimal("0.00"))) == _hash(_row(score_credito=Decimal("0")))
+    assert rhmod.compute_row_hash([True]) == rhmod.compute_row_hash([1])
+    assert len({rhmod.compute_row_hash([value]) for value in (1, "1", Decimal("1"))}) == 3
+
+
+def test_extend_row_hash_changes_with_resolved_surrogate_keys():
+    """Cenario: fato com mesmo conteudo de origem, mas dimensao remapeada.
+
+    O hash estendido com as chaves surrogate muda quando a chave resolvida
+    muda, para que o MERGE atualize a referencia.
+    """
+
+    content_hash = rhmod.compute_row_hash(["pedido-1", Decimal("10.00")])
+
+    assert rhmod.extend_row_hash(content_hash, 1, 2) == rhmod.extend_row_hash(content_hash, 1, 2)
+    assert rhmod.extend_row_hash(content_hash, 1, 2) != rhmod.extend_row_hash(content_hash, 1, 3)
+    assert rhmod.extend_row_hash(content_hash, 1, None) != rhmod.extend_row_hash(content_hash, 1, 2)
@@ -0,0 +1,237 @@
+"""Suite de testes unitarios para `python/etl/run_etl.py`.
+
+Proposito deste arquivo:
+- validar que o checkpoint de watermark e confirmado no mesmo commit do
+  upsert do lote;
+- garantir que, apos falha, o watermark em `ctl.etl_control` aponta para o
+  ultimo lote gravado e que a nova execucao continua a partir dele;
+- documentar a contagem de checkpoints gravada em `audit.etl_run_entity`;
+- validar a parada solicitada pelo modo daemon (SIGTERM) apos o lote atual.
+
+Como ler os testes:
+1. Infra de teste: `FakeEntity` pagina uma lista em memoria e
+   `FakeDwConnection` so publica escritas apos `commit`.
+2. As funcoes de controle/auditoria sao substituidas por versoes que
+   escrevem no estado transacional da conexao fake.
+"""
+
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import run_etl as runmod  # noqa: E402
+from control import EntityControl  # noqa: E402
+
+
+BASE_TS = datetime(2026, 1, 1, 8, 0, 0)
+INITIAL_WATERMARK = (datetime(1900, 1, 1), 0)
+
+
+class FakeEntity:
+    """Entidade fake com 10 linhas; `fail_on_id` faz o upsert do lote falhar."""
+
+    ENTITY_NAME = "fake"
+
+    def __init__(self, fail_on_id=None):
+        self.source = [
+            {"id": idx, "updated_at": BASE_TS + timedelta(seconds=idx)} for idx in range(1, 11)
+        ]
+        self.fail_on_id = fail_on_id
+
+    def extract_batch(self, oltp_connection, *, watermark_updated_at, watermark_id, cutoff_updated_at, batch_size):
+        pending = [
+            row
+            for row in self.source
+            if (row["updated_at"], row["id"]) > (watermark_updated_at, watermark_id)
+        ]
+        return pending[:batch_size]
+
+    def transform_rows(self, raw_rows):
+        rows = [{"source_updated_at": r["updated_at"], "source_id": r["id"]} for r in raw_rows]
+        return rows, 0
+
+    def get_batch_watermark(self, rows):
+        return rows[-1]["source_updated_at"], rows[-1]["source_id"]
+
+    def upsert_rows(self, dw_connection, rows, *, load_mode):
+        if self.fail_on_id is not None and any(row["source_id"] == self.fail_on_id for row in rows):
+            raise RuntimeError("falha simulada no upsert")
+        dw_connection.pending_ids.extend(row["source_id"] for row in rows)
+        return len(rows)
+
+
+class FakeDwConnection:
+    """Estado do DW com semantica de transacao: ids e watermark so valem apos `commit`."""
+
+    def __init__(self):
+        self.loaded_ids = []
+        self.watermark = INITIAL_WATERMARK
+        self.audit = {}
+        self.pending_ids = []
+        self.pending_watermark = None
+        self.pending_audit = None
+        # Para cada commit com linhas carregadas: o watermark foi junto?
+        self.commits_with_checkpoint = []
+
+    def commit(self):
+        if self.pending_ids:
+            self.commits_with_checkpoint.append(self.pending_watermark is not None)
+        self.loaded_ids.extend(self.pending_ids)
+        if self.pending_watermark is not None:
+            self.watermark = self.pending_watermark
+        if self.pending_audit is not None:
+            self.audit = self.pending_audit
+        self.rollback()
+
+    def rollback(self):
+        self.pending_ids = []
+        self.pending_watermark = None
+        self.pending_audit = None
+
+
+@pytest.fixture
+def fake_control(monkeypatch):
+    def _get_entity_control(dw_connection, entity_name):
+        updated_at, watermark_id = dw_connection.watermark
+        return EntityControl(
+            entity_name=entity_name,
+            watermark_updated_at=updated_at,
+            watermark_id=watermark_id,
+            batch_size=3,
+            cutoff_minutes=0,
+        )
+
+    def _set_watermark(dw_connection, *, watermark_updated_at, watermark_id, **kwargs):
+        dw_connection.pending_watermark = (watermark_updated_at, watermark_id)
+
+    def _finish_entity_run(dw_connection, **kwargs):
+        dw_connection.pending_audit = kwargs
+
+    def _noop(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(runmod, "get_entity_control", _get_entity_control)
+    monkeypatch.setattr(runmod, "start_entity_run", lambda *args, **kwargs: 1)
+    monkeypatch.setattr(runmod, "checkpoint_control_watermark", _set_watermark)
+    monkeypatch.setattr(runmod, "mark_control_success_with_watermark", _set_watermark)
+    monkeypatch.setattr(runmod, "mark_control_success_without_watermark", _noop)
+    monkeypatch.setattr(runmod, "mark_control_failed", _noop)
+    monkeypatch.setattr(runmod, "finish_entity_run", _finish_entity_run)
+    monkeypatch.setattr(runmod, "insert_batch_metrics", _noop)
+
+
+def _run(monkeypatch, entity, dw, *, checkpoint_every_batches, stop_event=None):
+    monkeypatch.setattr(runmod, "get_entity", lambda name: entity)
+    return runmod.run_entity(
+        entity_name="fake",
+        oltp_connection=None,
+        dw_connection=dw,
+        run_id=1,
+        default_batch_size=3,
+        default_cutoff_minutes=0,
+        batch_size_override=None,
+        cutoff_minutes_override=None,
+        dry_run=False,
+        max_batches=None,
+        checkpoint_every_batches=checkpoint_every_batches,
+        stop_event=stop_event,
+    )
+
+
+def test_checkpoint_commits_watermark_with_each_batch_and_resumes(monkeypatch, fake_control):
+    """Cenario: falha no terceiro lote com checkpoint a cada lote.
+
+    Cada commit de lote leva upsert e watermark juntos; apos a falha o
+    watermark aponta para o segundo lote e a nova execucao carrega somente
+    o restante, sem reprocessar os lotes ja gravados.
+    """
+
+    dw = FakeDwConnection()
+    entity = FakeEntity(fail_on_id=8)
+
+    ok, error = _run(monkeypatch, entity, dw, checkpoint_every_batches=1)
+
+    assert not ok
+    assert error.startswith("RuntimeError")
+    assert dw.loaded_ids == [1, 2, 3, 4, 5, 6]
+    assert dw.watermark == (BASE_TS + timedelta(seconds=6), 6)
+    assert dw.commits_with_checkpoint[:2] == [True, True]
+    assert dw.audit["status"] == "failed"
+    assert dw.audit["checkpoint_count"] == 2
+
+    entity.fail_on_id = None
+    ok, _ = _run(monkeypatch, entity, dw, checkpoint_every_batches=1)
+
+    assert ok
+    assert dw.loaded_ids == list(range(1, 11))
+    assert dw.watermark == (BASE_TS + timedelta(seconds=10), 10)
+    assert dw.audit["checkpoint_count"] == 2
+
+
+def test_checkpoint_every_n_batches_saves_last_committed_batch_on_failure(monkeypatch, fake_control):
+    """Cenario: checkpoint a cada 2 lotes e falha no quarto lote.
+
+    O terceiro lote foi confirmado sem checkpoint; no tratamento da falha o
+    watermark avanca ate ele, contando um checkpoint adicional.
+    """
+
+    dw = FakeDwConnection()
+
+    ok, _ = _run(monkeypatch, FakeEntity(fail_on_id=10), dw, checkpoint_every_batches=2)
+
+    assert not ok
+    assert dw.loaded_ids == list(range(1, 10))
+    assert dw.watermark == (BASE_TS + timedelta(seconds=9), 9)
+    assert dw.commits_with_checkpoint[:3] == [False, True, False]
+    assert dw.audit["checkpoint_count"] == 2
+
+
+def test_checkpoint_disabled_keeps_watermark_until_entity_finishes(monkeypatch, fake_control):
+    """Cenario: `checkpoint_every_batches=0` (comportamento anterior).
+
+    Os lotes sao gravados, mas o watermark so avancaria ao fim da entidade;
+    com falha ele permanece no valor inicial.
+    """
+
+    dw = FakeDwConnection()
+
+    ok, _ = _run(monkeypatch, FakeEntity(fail_on_id=8), dw, checkpoint_every_batches=0)
+
+    assert not ok
+    assert dw.loaded_ids == [1, 2, 3, 4, 5, 6]
+    assert dw.watermark == INITIAL_WATERMARK
+    assert dw.audit["checkpoint_count"] == 0
+
+
+def test_stop_event_drains_current_batch_and_records_success(monkeypatch, fake_control):
+    """Cenario: sinal de parada recebido durante o upsert do segundo lote.
+
+    O lote em andamento e gravado com o watermark; nenhum lote novo e
+    extraido e a entidade termina com sucesso, retomavel do ponto gravado.
+    """
+
+    dw = FakeDwConnection()
+    entity = FakeEntity()
+    stop_event = threading.Event()
+    upsert_rows = entity.upsert_rows
+
+    def _upsert_and_signal(dw_connection, rows, *, load_mode):
+        if rows[0]["source_id"] == 4:
+            stop_event.set()
+        return upsert_rows(dw_connection, rows, load_mode=load_mode)
+
+    entity.upsert_rows = _upsert_and_signal
+
+    ok, error = _run(monkeypatch, entity, dw, checkpoint_every_batches=1, stop_event=stop_event)
+
+    assert ok and error is None
+    assert dw.loaded_ids == [1, 2, 3, 4, 5, 6]
+    assert dw.watermark == (BASE_TS + timedelta(seconds=6), 6)
+    assert dw.audit["status"] == "success"
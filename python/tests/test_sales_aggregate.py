@@ -0,0 +1,172 @@
+"""Suite de testes unitarios para `python/etl/sales_aggregate.py`.
+
+Proposito deste arquivo:
+- garantir a ordem imagem anterior -> upsert -> imagem nova -> MERGE do
+  delta, toda na conexao (transacao) do lote;
+- validar que as consultas geradas cobrem todas as medidas do agregado;
+- documentar quais entidades mantem `fact.AGG_VENDAS_DIARIA`.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import sales_aggregate as aggmod  # noqa: E402
+
+
+class RecordingCursor:
+    def __init__(self, log, fetch_row=None):
+        self.log = log
+        self.fast_executemany = False
+        self.rowcount = 3
+        self.description = [("aggregate_id",), ("sketch_id",)]
+        self.fetch_row = fetch_row
+
+    def execute(self, sql, params=()):
+        self.log.append(("execute", sql, tuple(params)))
+
+    def executemany(self, sql, params):
+        self.log.append(("executemany", sql, list(params)))
+
+    def fetchone(self):
+        return self.fetch_row
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    def __init__(self, fetch_row=None):
+        self.log = []
+        self.fetch_row = fetch_row
+
+    def cursor(self):
+        return RecordingCursor(self.log, self.fetch_row)
+
+
+class FakeVendas:
+    ENTITY_NAME = "fact_vendas"
+
+    def upsert_rows(self, dw_connection, rows, *, load_mode):
+        dw_connection.log.append(("upsert", load_mode, len(rows)))
+        return len(rows)
+
+
+def test_upsert_with_sales_aggregate_wraps_upsert_with_previous_and_new_images():
+    """Cenario: lote de vendas com id repetido.
+
+    Os ids vao deduplicados para a temporaria, a imagem anterior e subtraida
+    antes do upsert e a nova somada depois, seguidas do lock e do MERGE.
+    """
+
+    connection = RecordingConnection()
+    rows = [{"venda_original_id": 10}, {"venda_original_id": 11}, {"venda_original_id": 10}]
+
+    upserted = aggmod.upsert_with_sales_aggregate(FakeVendas(), connection, rows, load_mode="bulk")
+
+    assert upserted == 3
+    steps = [entry[0] if entry[0] == "upsert" else entry[1].split()[0] for entry in connection.log]
+    assert steps == ["IF", "INSERT", "INSERT", "upsert", "INSERT", "EXEC", "MERGE", "DROP"]
+    assert connection.log[1][0] == "executemany"
+    assert connection.log[1][2] == [(10,), (11,)]
+    assert "-COUNT_BIG(*)" in connection.log[2][1]
+    assert "UPDLOCK" in connection.log[2][1]
+    assert "-COUNT_BIG(*)" not in connection.log[4][1]
+    assert "sp_getapplock" in connection.log[5][1]
+
+
+def test_upsert_with_sales_aggregate_refreshes_order_sketch_of_touched_cells():
+    """Cenario: com o sketch de pedidos no DW, as celulas do delta sao refeitas apos o MERGE."""
+
+    connection = RecordingConnection()
+    targets = aggmod.SalesAggregateTargets(order_sketch=True)
+
+    aggmod.upsert_with_sales_aggregate(
+        FakeVendas(), connection, [{"venda_original_id": 7}], load_mode="merge", targets=targets
+    )
+
+    sqls = [entry[1] for entry in connection.log if entry[0] != "upsert"]
+    merge_index = next(index for index, sql in enumerate(sqls) if sql.startswith("MERGE"))
+    refresh = sqls[merge_index + 1]
+    assert refresh.startswith(f"DELETE s\nFROM {aggmod.SKETCH_TABLE}")
+    assert f"CROSS APPLY {aggmod.SKETCH_FUNCTION}(fv.numero_pedido)" in refresh
+    assert "#agg_vendas_delta" in refresh
+    assert sqls[-1].startswith("DROP TABLE")
+
+
+def test_upsert_with_sales_aggregate_skips_aggregate_for_empty_batch():
+    """Cenario: lote vazio nao cria temporarias nem toca o agregado."""
+
+    connection = RecordingConnection()
+
+    assert aggmod.upsert_with_sales_aggregate(FakeVendas(), connection, [], load_mode="merge") == 0
+    assert connection.log == [("upsert", "merge", 0)]
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        aggmod.contribution_sql(sign=1, lock_source=False),
+        aggmod.merge_delta_sql(),
+        aggmod.rebuild_sql(),
+        aggmod.reconcile_sql(),
+    ],
+)
+def test_generated_sql_covers_every_measure(sql):
+    """Cenario: uma medida nova em `MEASURES` entra em todas as consultas."""
+
+    for column in aggmod.MEASURE_COLUMNS:
+        assert column in sql
+
+
+def test_merge_delta_removes_groups_without_rows():
+    """Cenario: vendas que mudam de dia/produto esvaziam o grupo antigo, que sai da tabela."""
+
+    sql = aggmod.merge_delta_sql()
+
+    assert "WHEN MATCHED AND target.linhas + source.linhas = 0 THEN\n    DELETE" in sql
+    assert "HAVING" in sql
+
+
+def test_contribution_sql_rejects_invalid_sign():
+    """Cenario: sinal diferente de +1/-1 na contribuicao do lote."""
+
+    with pytest.raises(ValueError):
+        aggmod.contribution_sql(sign=0, lock_source=False)
+
+
+def test_supports_sales_aggregate_only_for_fact_vendas():
+    """Cenario: so fact_vendas alimenta `fact.AGG_VENDAS_DIARIA`; outras fatos nao."""
+
+    class Other:
+        ENTITY_NAME = "fact_metas"
+
+    assert aggmod.supports_sales_aggregate(FakeVendas()) is True
+    assert aggmod.supports_sales_aggregate(Other()) is False
+
+
+def test_detect_sales_aggregate_checks_both_tables():
+    """Cenario: DW sem o script 27 segue sem agregado; sem o 28, agregado sem sketch."""
+
+    assert aggmod.detect_sales_aggregate(RecordingConnection(fetch_row=(None, None))) is None
+    assert aggmod.detect_sales_aggregate(RecordingConnection(fetch_row=(1234, None))) == (
+        aggmod.SalesAggregateTargets(order_sketch=False)
+    )
+    assert aggmod.detect_sales_aggregate(RecordingConnection(fetch_row=(1234, 5678))) == (
+        aggmod.SalesAggregateTargets(order_sketch=True)
+    )
+
+
+def test_reconcile_result_fails_on_sketch_mismatch():
+    """Cenario: grupos batem, mas registros do sketch de pedidos divergem."""
+
+    clean = aggmod.ReconcileResult(base_groups=3, aggregate_groups=3, mismatched_groups=0)
+
+    assert clean.ok is True
+    assert aggmod.ReconcileResult(3, 3, 0, mismatched_sketch_registers=0).ok is True
+    assert aggmod.ReconcileResult(3, 3, 0, mismatched_sketch_registers=2).ok is False
@@ -0,0 +1,244 @@
+"""Suite de testes unitarios para `dashboards/streamlit/vendas/sales_queries.py`.
+
+Proposito deste arquivo:
+- garantir que `SalesFilters` gera placeholders e parametros na mesma ordem
+  e que a mascara do modo snapshot seleciona as mesmas linhas;
+- validar os parametros de paginacao (OFFSET/FETCH) da aba de base;
+- documentar que as grades do modo SQL e do modo snapshot coincidem sobre
+  o mesmo conjunto de linhas;
+- fixar o calculo de (registro, rho) do sketch HLL igual ao de
+  `fact.fn_hll_numero_pedido` e a precisao da estimativa de pedidos.
+"""
+
+import math
+import re
+import sqlite3
+import sys
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+VENDAS_DIR = Path(__file__).resolve().parents[2] / "dashboards" / "streamlit" / "vendas"
+if str(VENDAS_DIR) not in sys.path:
+    sys.path.insert(0, str(VENDAS_DIR))
+
+import sales_queries as sqmod  # noqa: E402
+
+
+FILTERS = sqmod.SalesFilters(
+    start_date=date(2026, 3, 1),
+    end_date=date(2026, 3, 2),
+    estados=("SP", "RJ"),
+    categorias=("Eletronicos",),
+)
+
+SALES_ROWS = [
+    # data_completa, estado, regiao_pais, categoria, nome_produto, vendedor, equipe, pedido, qtd, bruto, desc, liquido, margem
+    ("2026-03-01 09:00:00", "SP", "Sudeste", "Eletronicos", "Notebook", "Ana", "Alfa", "P1", 1, 5000.0, 200.0, 4800.0, 900.0),
+    ("2026-03-01 10:30:00", "SP", "Sudeste", "Eletronicos", "Mouse", "Ana", "Alfa", "P1", 2, 200.0, 0.0, 200.0, 60.0),
+    ("2026-03-01 15:00:00", "RJ", "Sudeste", "Eletronicos", "Monitor", "Bruno", "Beta", "P2", 1, 1500.0, 100.0, 1400.0, 350.0),
+    ("2026-03-02 11:00:00", "RJ", "Sudeste", "Eletronicos", "Teclado", "Carla", "Beta", "P3", 3, 330.0, 30.0, 300.0, 75.0),
+    # Fora do filtro: estado, categoria e data.
+    ("2026-03-01 12:00:00", "MG", "Sudeste", "Eletronicos", "Notebook", "Ana", "Alfa", "P4", 1, 5000.0, 0.0, 5000.0, 950.0),
+    ("2026-03-02 13:00:00", "SP", "Sudeste", "Moveis", "Cadeira", "Bruno", "Beta", "P5", 1, 800.0, 0.0, 800.0, 240.0),
+    ("2026-03-03 08:00:00", "SP", "Sudeste", "Eletronicos", "Mouse", "Carla", "Beta", "P6", 1, 100.0, 0.0, 100.0, 30.0),
+]
+
+
+def _sales_frame():
+    df = pd.DataFrame(
+        SALES_ROWS,
+        columns=[
+            "data_completa",
+            "estado",
+            "regiao_pais",
+            "categoria",
+            "nome_produto",
+            "nome_vendedor",
+            "nome_equipe",
+            "numero_pedido",
+            "quantidade_vendida",
+            "valor_total_bruto",
+            "valor_total_descontos",
+            "valor_total_liquido",
+            "margem_bruta",
+        ],
+    )
+    df["quantidade_devolvida"] = 0
+    df["valor_comissao"] = df["valor_total_liquido"] * 0.02
+    df["data_atualizacao"] = "2026-03-03 00:00:00"
+    df["venda_id"] = range(1, len(df) + 1)
+    df["subcategoria"] = df["categoria"]
+    return df
+
+
+class RecordingReader:
+    """Faz o papel do `CachedReader`: so registra o SQL e os parametros."""
+
+    def __init__(self, result=None):
+        self.calls = []
+        self._result = result if result is not None else pd.DataFrame({"data_completa": []})
+
+    def read_sql(self, sql, params):
+        self.calls.append((sql, list(params)))
+        return self._result.copy()
+
+
+class SqliteViewReader:
+    """Executa no sqlite as consultas escritas para o SQL Server.
+
+    Traduz apenas o dialeto usado por `sales_queries` (TOP, CAST para date,
+    COUNT_BIG e OBJECT_ID), para comparar as grades SQL com as do pandas.
+    """
+
+    def __init__(self, df):
+        self._connection = sqlite3.connect(":memory:")
+        df.to_sql("vendas", self._connection, index=False)
+
+    def read_sql(self, sql, params):
+        if "OBJECT_ID(" in sql:
+            return pd.DataFrame({"object_id": [None]})
+        params = [value.isoformat() if isinstance(value, date) else value for value in params]
+        sql = sql.replace(sqmod.VIEW_NAME, "vendas").replace("COUNT_BIG(*)", "COUNT(*)")
+        sql = sql.replace("CAST(data_completa AS date)", "date(data_completa)").strip().rstrip(";")
+        if "TOP (?)" in sql:
+            sql = sql.replace("TOP (?)", "") + " LIMIT ?"
+            params = [*params[1:], params[0]]
+        sql = re.sub(r"\s+", " ", sql)
+        return pd.read_sql(sql, self._connection, params=params)
+
+
+def test_sql_where_lists_placeholders_in_parameter_order():
+    """Cenario: periodo, dois estados e uma categoria; filtros vazios nao entram."""
+
+    where, params = FILTERS.sql_where()
+
+    assert where == (
+        "WHERE CAST(data_completa AS date) BETWEEN ? AND ?"
+        " AND estado IN (?, ?)"
+        " AND categoria IN (?)"
+    )
+    assert params == [date(2026, 3, 1), date(2026, 3, 2), "SP", "RJ", "Eletronicos"]
+    assert where.count("?") == len(params)
+
+
+def test_frame_mask_selects_the_same_rows_as_sql_where():
+    """Cenario: filtros de periodo, estado e categoria no pandas e no sqlite."""
+
+    df = _sales_frame()
+    df["data_completa"] = pd.to_datetime(df["data_completa"])
+    reader = SqliteViewReader(_sales_frame())
+    where, params = FILTERS.sql_where()
+
+    from_sql = reader.read_sql(f"SELECT venda_id FROM {sqmod.VIEW_NAME} {where} ORDER BY venda_id", params)
+
+    assert df.loc[FILTERS.frame_mask(df), "venda_id"].tolist() == from_sql["venda_id"].tolist() == [1, 2, 3, 4]
+
+
+def test_grouped_top_n_goes_before_filter_params():
+    """Cenario: top 5 produtos; o `TOP (?)` vem antes dos parametros do WHERE."""
+
+    reader = RecordingReader(pd.DataFrame({"nome_produto": [], "valor_total_liquido": []}))
+
+    sqmod.fetch_top_products(reader, FILTERS, top_n=5)
+
+    sql, params = reader.calls[0]
+    assert "SELECT TOP (?)" in sql
+    assert params == [5, *FILTERS.sql_where()[1]]
+
+
+def test_detail_page_appends_offset_and_fetch_after_filter_params():
+    """Cenario: terceira pagina de 50 linhas e pagina 0 (tratada como a primeira)."""
+
+    reader = RecordingReader()
+    filter_params = FILTERS.sql_where()[1]
+
+    sqmod.fetch_sales_detail_page(reader, FILTERS, page=3, page_size=50)
+    sqmod.fetch_sales_detail_page(reader, FILTERS, page=0, page_size=50)
+
+    (sql, third), (_, first) = reader.calls
+    assert sql.rstrip().endswith("OFFSET ? ROWS FETCH NEXT ? ROWS ONLY;")
+    assert sql.count("?") == len(third)
+    assert third == [*filter_params, 100, 50]
+    assert first == [*filter_params, 0, 50]
+
+
+def test_sql_grids_match_pandas_aggregation_on_the_same_rows():
+    """Cenario: mesmas linhas no sqlite (modo SQL) e em memoria (modo snapshot).
+
+    Totais, dia, estado, top produtos, mix de categorias e ranking de
+    vendedores saem iguais nos dois caminhos.
+    """
+
+    df = _sales_frame()
+    df["data_completa"] = pd.to_datetime(df["data_completa"])
+    from_frame = sqmod.aggregate_sales_frame(df[FILTERS.frame_mask(df)], top_n=2)
+    reader = SqliteViewReader(_sales_frame())
+
+    totals, updated_at = sqmod.fetch_sales_totals(reader, FILTERS, order_count=sqmod.ORDER_COUNT_EXACT)
+    from_sql = sqmod.fetch_sales_aggregates(reader, FILTERS, top_n=2)
+
+    assert updated_at == "2026-03-03 00:00:00"
+    assert {column: totals[column] for column in sqmod.TOTALS_COLUMNS} == from_frame.totals
+    assert from_frame.totals["pedidos"] == 3.0
+    for grid in ("daily", "by_state", "top_products", "category_mix", "seller_ranking"):
+        pd.testing.assert_frame_equal(
+            getattr(from_sql, grid).reset_index(drop=True),
+            getattr(from_frame, grid),
+            check_dtype=False,
+            check_names=False,
+        )
+
+
+@pytest.mark.parametrize(
+    ("numero_pedido", "expected"),
+    [
+        # MD5 bdefc522...: registro 0xbdef % 1024, primeiro bit de 0xc522... ligado.
+        ("PED-000001", (495, 1)),
+        ("PED-000002", (775, 1)),
+        # MD5 e92e0612...: 0x06 = 0b00000110, primeiro bit 1 na posicao 6.
+        ("PED-000004", (302, 6)),
+        ("PED-123456", (13, 2)),
+        ("A", (965, 2)),
+    ],
+)
+def test_order_sketch_register_matches_sql_function(numero_pedido, expected):
+    """Cenario: vetores fixos calculados pela regra de `fact.fn_hll_numero_pedido`.
+
+    Bytes 1-2 do MD5 (mod 1024) escolhem o registro; rho e a posicao do
+    primeiro bit 1 nos bytes 3-6. Mudar o calculo em um lado so quebra aqui.
+    """
+
+    assert sqmod.order_sketch_register(numero_pedido) == expected
+
+
+def test_estimate_switches_to_linear_counting_with_empty_registers():
+    """Cenario: sketch quase vazio usa contagem linear; sketch cheio, a estimativa HLL."""
+
+    m = sqmod.HLL_REGISTERS
+    sparse = {0: 1, 7: 3}
+    full = {register: 10 for register in range(m)}
+    alpha = 0.7213 / (1.0 + 1.079 / m)
+
+    assert sqmod.estimate_distinct_orders({}) == 0.0
+    assert sqmod.estimate_distinct_orders(sparse) == pytest.approx(m * math.log(m / (m - 2)))
+    assert sqmod.estimate_distinct_orders(full) == pytest.approx(alpha * m * 2.0**10)
+
+
+@pytest.mark.parametrize("distinct_orders", [10, 10_000])
+def test_estimate_stays_within_three_standard_errors(distinct_orders):
+    """Cenario: pedidos distintos repetidos e sketches unidos em partes."""
+
+    numeros = [f"PED-{index:08d}" for index in range(distinct_orders)]
+    half = distinct_orders // 2
+    sketch = sqmod.merge_order_sketches(
+        sqmod.build_order_sketch(numeros[:half]),
+        sqmod.build_order_sketch(numeros[half:] + numeros[:10]),
+    )
+
+    estimate = sqmod.estimate_distinct_orders(sketch)
+
+    assert sketch == sqmod.build_order_sketch(numeros)
+    assert abs(estimate - distinct_orders) <= 3 * sqmod.HLL_RELATIVE_ERROR * distinct_orders
@@ -0,0 +1,122 @@
+"""Suite de testes unitarios para `python/etl/scheduler.py`.
+
+Proposito deste arquivo:
+- validar que dependencias declaradas entre entidades sao respeitadas;
+- garantir que entidades independentes rodam em paralelo;
+- documentar o tratamento de excecoes fatais no pool de workers.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import scheduler as schedmod  # noqa: E402
+from entities import list_entities_execution_order  # noqa: E402
+
+
+def test_run_with_dependencies_respects_declared_edges():
+    """Cenario: `--entity all` com pool de 4 workers.
+
+    Cada fato so pode iniciar depois que todas as suas dependencias
+    terminaram.
+    """
+
+    entity_names = list_entities_execution_order()
+    finished_at: dict[str, float] = {}
+    started_at: dict[str, float] = {}
+    lock = threading.Lock()
+
+    def run_one(name):
+        with lock:
+            started_at[name] = time.monotonic()
+        time.sleep(0.01)
+        with lock:
+            finished_at[name] = time.monotonic()
+        return True, None
+
+    results = schedmod.run_with_dependencies(entity_names, parallelism=4, run_one=run_one)
+
+    assert set(results) == set(entity_names)
+    for name, deps in schedmod.resolve_dependencies(entity_names).items():
+        for dep in deps:
+            assert finished_at[dep] <= started_at[name], f"{name} iniciou antes de {dep}"
+
+
+def test_run_with_dependencies_runs_independent_entities_concurrently():
+    """Cenario: dimensoes independentes.
+
+    Com paralelismo 3, tres dimensoes sem dependencia entre si devem estar
+    em execucao ao mesmo tempo (barreira so libera com as tres presentes).
+    """
+
+    barrier = threading.Barrier(3, timeout=2)
+
+    def run_one(name):
+        barrier.wait()
+        return name
+
+    results = schedmod.run_with_dependencies(
+        ["dim_cliente", "dim_produto", "dim_regiao"],
+        parallelism=3,
+        run_one=run_one,
+    )
+
+    assert results == {"dim_cliente": "dim_cliente", "dim_produto": "dim_produto", "dim_regiao": "dim_regiao"}
+
+
+def test_run_with_dependencies_reraises_fatal_error_and_skips_dependents():
+    """Cenario: excecao fatal em uma dependencia.
+
+    A excecao deve ser relancada e entidades dependentes nao devem iniciar.
+    """
+
+    started = []
+
+    def run_one(name):
+        started.append(name)
+        if name == "fact_vendas":
+            raise RuntimeError("entidade inativa")
+        return True, None
+
+    with pytest.raises(RuntimeError, match="entidade inativa"):
+        schedmod.run_with_dependencies(
+            ["fact_vendas", "fact_descontos"],
+            parallelism=2,
+            run_one=run_one,
+        )
+
+    assert "fact_descontos" not in started
+
+
+def test_run_with_dependencies_accepts_explicit_graph():
+    """Cenario: grafo informado pelo chamador (arquivos da landing zone).
+
+    As dependencias declaradas pelas entidades sao ignoradas; `b` espera `a`.
+    """
+
+    finished = []
+    lock = threading.Lock()
+
+    def run_one(name):
+        if name == "a":
+            time.sleep(0.02)
+        with lock:
+            finished.append(name)
+        return name
+
+    results = schedmod.run_with_dependencies(
+        ["a", "b", "c"],
+        parallelism=3,
+        run_one=run_one,
+        dependencies={"b": {"a"}},
+    )
+
+    assert results == {"a": "a", "b": "b", "c": "c"}
+    assert finished.index("a") < finished.index("b")
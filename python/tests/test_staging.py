@@ -0,0 +1,186 @@
+"""Suite de testes unitarios para `python/etl/staging.py`.
+
+Proposito deste arquivo:
+- validar o manifesto da landing zone (gravacao, leitura e prefixo carregado);
+- garantir que a carga paralela preserva a ordem entre arquivos com chaves em comum;
+- documentar de onde a extracao parte quando ha arquivos aguardando carga.
+"""
+
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import staging as stagingmod  # noqa: E402
+
+
+def _staged(number, *, loaded=False, minute=0, watermark_id=None):
+    return stagingmod.StagedFile(
+        file_name=f"part-{number:05d}.parquet",
+        batch_number=number,
+        row_count=2,
+        extracted_count=2,
+        soft_deleted_count=0,
+        watermark_updated_at=datetime(2026, 1, 1, 10, minute),
+        watermark_id=watermark_id if watermark_id is not None else number * 10,
+        loaded=loaded,
+    )
+
+
+def _manifest(run_id, files, *, complete=True):
+    return stagingmod.StagingManifest(
+        entity_name="fact_vendas",
+        run_id=run_id,
+        watermark_type="updated_at",
+        files=tuple(files),
+        extraction_complete=complete,
+    )
+
+
+def test_manifest_round_trip_and_loaded_prefix(tmp_path):
+    """Cenario: carga parou com o arquivo 2 pendente e o 3 ja gravado.
+
+    O watermark so pode avancar ate o arquivo 1 (prefixo contiguo).
+    """
+
+    manifest = _manifest(7, [_staged(1, loaded=True), _staged(2), _staged(3, loaded=True)])
+    directory = stagingmod.run_directory(tmp_path, "fact_vendas", 7)
+    stagingmod.write_manifest(directory, manifest)
+
+    restored = stagingmod.read_manifest(directory)
+
+    assert restored == manifest
+    assert restored.loaded_prefix().file_name == "part-00001.parquet"
+    assert [item.file_name for item in restored.pending_files] == ["part-00002.parquet"]
+    assert not restored.is_loaded
+    assert [item.run_id for item in stagingmod.list_manifests(tmp_path, "fact_vendas")] == [7]
+
+
+def test_loadable_manifests_stop_at_open_extraction():
+    """Cenario: run 2 ainda extraindo e run 3 ja fechado.
+
+    Carregar o run 3 antes do 2 poderia gravar versoes antigas por ultimo.
+    """
+
+    manifests = [
+        _manifest(1, [_staged(1, loaded=True)]),
+        _manifest(2, [_staged(1)], complete=False),
+        _manifest(3, [_staged(1)]),
+    ]
+
+    assert stagingmod.loadable_manifests(manifests) == []
+    assert [item.run_id for item in stagingmod.loadable_manifests([manifests[0], manifests[2]])] == [3]
+
+
+def test_extraction_start_skips_rows_already_staged():
+    """Cenario: run anterior extraido e ainda nao carregado.
+
+    A proxima extracao parte do ultimo lote em disco, nao do watermark do DW.
+    """
+
+    pending = _manifest(1, [_staged(1, minute=5), _staged(2, minute=9, watermark_id=99)])
+    loaded = _manifest(0, [_staged(1, loaded=True, minute=30)])
+
+    start = stagingmod.extraction_start(
+        [loaded, pending],
+        watermark_updated_at=datetime(2026, 1, 1, 10, 0),
+        watermark_id=3,
+        watermark_version=None,
+    )
+
+    assert start == (datetime(2026, 1, 1, 10, 9), 99, None)
+
+
+def test_plan_load_dependencies_only_links_overlapping_files():
+    """Cenario: arquivos 1 e 3 atualizam o mesmo pedido; o 2 e independente."""
+
+    dependencies = stagingmod.plan_load_dependencies(
+        {"a": {1, 2}, "b": {5, 6}, "c": {2, 9}},
+    )
+
+    assert dependencies == {"a": set(), "b": set(), "c": {"a"}}
+
+
+def test_load_manifest_orders_overlapping_files_and_resumes(tmp_path, monkeypatch):
+    """Cenario: 3 arquivos, o terceiro repete chave do primeiro; o segundo falha.
+
+    O terceiro so roda depois do primeiro; o manifesto em disco guarda os
+    concluidos e a nova carga reprocessa apenas o que faltou.
+    """
+
+    keys = {"part-00001.parquet": {1}, "part-00002.parquet": {2}, "part-00003.parquet": {1}}
+    monkeypatch.setattr(stagingmod, "read_staged_keys", lambda _directory, staged: keys[staged.file_name])
+    directory = stagingmod.run_directory(tmp_path, "fact_vendas", 4)
+    manifest = _manifest(4, [_staged(1), _staged(2), _staged(3)])
+    stagingmod.write_manifest(directory, manifest)
+
+    order: list[str] = []
+    lock = threading.Lock()
+    fail_second = {"enabled": True}
+
+    def load_file(staged):
+        if staged.file_name == "part-00002.parquet" and fail_second["enabled"]:
+            raise RuntimeError("DW indisponivel")
+        with lock:
+            order.append(staged.file_name)
+        return staged.row_count
+
+    with pytest.raises(RuntimeError):
+        stagingmod.load_manifest(directory, manifest, workers=3, load_file=load_file)
+
+    partial = stagingmod.read_manifest(directory)
+    pending = [item.file_name for item in partial.pending_files]
+    assert "part-00002.parquet" in pending
+    assert "part-00001.parquet" not in pending
+
+    fail_second["enabled"] = False
+    updated, upserted = stagingmod.load_manifest(directory, partial, workers=3, load_file=load_file)
+
+    assert sorted(order) == ["part-00001.parquet", "part-00002.parquet", "part-00003.parquet"]
+    assert order.index("part-00001.parquet") < order.index("part-00003.parquet")
+    assert upserted == 2 * len(pending)
+    assert updated.is_loaded
+    assert stagingmod.read_manifest(directory).is_loaded
+
+
+def test_replay_requires_loaded_manifest(tmp_path):
+    """Cenario: replay de um run ainda pendente deve usar a carga normal."""
+
+    manifest = _manifest(5, [_staged(1)])
+
+    with pytest.raises(ValueError, match="ainda nao foi carregado"):
+        stagingmod.load_manifest(tmp_path, manifest, workers=1, load_file=lambda staged: 0, replay=True)
+
+
+def test_stage_rows_parquet_round_trip(tmp_path):
+    """Cenario: lote transformado gravado e lido de volta sem perda de tipos."""
+
+    pytest.importorskip("pyarrow")
+    from decimal import Decimal
+
+    rows = [
+        {"source_id": 1, "valor": Decimal("10.50"), "source_updated_at": datetime(2026, 1, 1, 10, 0)},
+        {"source_id": 2, "valor": None, "source_updated_at": datetime(2026, 1, 1, 10, 1)},
+    ]
+    directory = stagingmod.run_directory(tmp_path, "fact_vendas", 9)
+    manifest = stagingmod.stage_rows(
+        directory,
+        stagingmod.new_manifest("fact_vendas", 9),
+        rows,
+        batch_number=1,
+        extracted_count=2,
+        soft_deleted_count=0,
+        watermark_updated_at=datetime(2026, 1, 1, 10, 1),
+        watermark_id=2,
+    )
+
+    staged = manifest.files[0]
+    assert stagingmod.read_staged_rows(directory, staged) == rows
+    assert stagingmod.read_staged_keys(directory, staged) == {1, 2}
+    assert stagingmod.read_manifest(directory) == manifest
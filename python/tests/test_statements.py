@@ -0,0 +1,133 @@
+"""Suite de testes unitarios para `python/etl/statements.py`.
+
+Proposito deste arquivo:
+- garantir que todo `python/etl/sql/*.sql` carrega sem placeholder de
+  formatacao de texto (ex.: `{batch_size}`);
+- validar que cada extracao das entidades envia a quantidade de parametros
+  esperada e o mesmo texto SQL para qualquer tamanho de lote;
+- documentar os contadores de execucao e tempo por comando.
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import statements as stmtmod  # noqa: E402
+from config import SQL_DIR  # noqa: E402
+from entities import get_entity, list_entities  # noqa: E402
+
+
+WATERMARK = datetime(2026, 1, 1)
+
+
+class RecordingCursor:
+    def __init__(self, calls):
+        self.calls = calls
+        self.description = [("id",)]
+
+    def execute(self, sql, params=()):
+        self.calls.append((sql, tuple(params)))
+
+    def fetchmany(self, size):
+        return []
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.calls = []
+
+    def cursor(self):
+        return RecordingCursor(self.calls)
+
+
+def _extract_calls(entity, batch_size):
+    """Executa as extracoes que a entidade oferece e devolve `(sql, params)` de cada uma."""
+    connection = RecordingConnection()
+    list(
+        entity.extract_batch(
+            connection,
+            watermark_updated_at=WATERMARK,
+            watermark_id=0,
+            cutoff_updated_at=WATERMARK,
+            batch_size=batch_size,
+        )
+    )
+    if hasattr(entity, "extract_batch_by_version"):
+        list(entity.extract_batch_by_version(connection, watermark_version=0, version_ceiling=10, batch_size=batch_size))
+    if hasattr(entity, "extract_backfill_batch"):
+        list(entity.extract_backfill_batch(connection, id_from=0, id_to=10, cutoff_updated_at=WATERMARK, batch_size=batch_size))
+    return connection.calls
+
+
+def test_registry_loads_every_sql_file_without_format_placeholders():
+    """Cenario: carga do registro no inicio do runner.
+
+    Todos os arquivos entram e nenhum usa `{...}` no texto.
+    """
+
+    registry = stmtmod.StatementRegistry(SQL_DIR)
+
+    assert registry.load() == len(list(SQL_DIR.glob("*.sql")))
+    assert registry.get("extract_fact_vendas.sql").param_count == 17
+    assert registry.get("update_watermark.sql").param_count == 7
+
+
+def test_registry_rejects_format_placeholder(tmp_path):
+    """Cenario: arquivo novo ainda com `TOP ({batch_size})`."""
+
+    (tmp_path / "extract_novo.sql").write_text("SELECT TOP ({batch_size}) 1 AS id;", encoding="utf-8")
+
+    with pytest.raises(ValueError, match="extract_novo.sql"):
+        stmtmod.StatementRegistry(tmp_path).load()
+
+
+@pytest.mark.parametrize("entity_name", list_entities())
+def test_entity_extractions_send_batch_size_as_parameter(entity_name):
+    """Cenario: mesma entidade com lotes de 7 e 5003 linhas.
+
+    O texto SQL enviado e identico (um unico plano no cache do SQL Server) e
+    o tamanho do lote aparece somente nos parametros.
+    """
+
+    entity = get_entity(entity_name)
+
+    small = _extract_calls(entity, 7)
+    large = _extract_calls(entity, 5003)
+
+    assert [sql for sql, _ in small] == [sql for sql, _ in large]
+    for (sql, params_small), (_, params_large) in zip(small, large):
+        assert stmtmod.count_parameters(sql) == len(params_small)
+        # Alem dos TOP, a pagina de pedidos da fact_vendas testa se veio cheia.
+        batch_size_slots = sql.count("TOP (?)") + sql.count("COUNT(*) < ?")
+        assert params_small.count(7) == params_large.count(5003) == batch_size_slots
+
+
+def test_stream_records_executions_and_validates_parameter_count():
+    """Cenario: duas execucoes validas e uma com parametros a menos.
+
+    As validas acumulam execucoes e tempo; a invalida falha antes de chegar
+    ao banco.
+    """
+
+    registry = stmtmod.StatementRegistry(SQL_DIR)
+    connection = RecordingConnection()
+    params = (1, WATERMARK, WATERMARK, WATERMARK, 0)
+
+    list(registry.stream(connection, "extract_dim_cliente.sql", params))
+    list(registry.stream(connection, "extract_dim_cliente.sql", params))
+    with pytest.raises(ValueError, match="espera 5 parametros"):
+        registry.stream(connection, "extract_dim_cliente.sql", params[:-1])
+
+    stats = registry.stats()
+    assert [(item.name, item.executions) for item in stats] == [("extract_dim_cliente.sql", 2)]
+    assert stats[0].total_seconds >= 0.0
+    assert len(connection.calls) == 2
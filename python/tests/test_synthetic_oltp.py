@@ -0,0 +1,122 @@
+"""Suite de testes unitarios para `python/etl/synthetic_oltp.py`.
+
+Proposito deste arquivo:
+- garantir que a geracao e deterministica pela semente, em qualquer tamanho de lote;
+- validar a coerencia entre pedidos, itens e aplicacoes de desconto;
+- documentar o sorteio do trafego continuo.
+"""
+
+import random
+import sys
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import synthetic_oltp as synthmod  # noqa: E402
+
+
+END_AT = datetime(2026, 10, 1, 12, 0, 0)
+
+
+def _generate(scale, *, chunk_size):
+    tables = defaultdict(list)
+    for table, rows in synthmod.generate_tables(scale, seed=7, end_at=END_AT, history_days=90, chunk_size=chunk_size):
+        tables[table].extend(rows)
+    return tables
+
+
+def _by_column(table, rows):
+    names = [name for name, _ in synthmod.TABLE_COLUMNS[table]]
+    return [dict(zip(names, row)) for row in rows]
+
+
+def test_generation_is_deterministic_and_independent_of_chunk_size():
+    """Cenario: mesma semente gerada com lotes de 7 e de 1000 linhas.
+
+    As tabelas sao identicas, os ids sao sequenciais e os volumes seguem a escala.
+    """
+
+    scale = synthmod.SyntheticScale.from_factor(0.005)
+
+    small_chunks = _generate(scale, chunk_size=7)
+    large_chunks = _generate(scale, chunk_size=1000)
+
+    assert small_chunks == large_chunks
+    assert list(small_chunks)[:2] == ["regions", "teams"]
+    assert len(small_chunks["customers"]) == scale.customers
+    assert len(small_chunks["orders"]) == scale.orders
+    for table, rows in small_chunks.items():
+        assert [row[0] for row in rows] == list(range(1, len(rows) + 1)), table
+        assert all(len(row) == len(synthmod.TABLE_COLUMNS[table]) for row in rows), table
+
+
+def test_orders_items_and_discounts_are_consistent():
+    """Cenario: escala pequena; regras das constraints de `core.*` conferidas em Python.
+
+    Itens apontam para pedidos/produtos existentes, `net = gross - discount`,
+    comissao so com vendedor e cada item com desconto tem uma aplicacao.
+    """
+
+    scale = synthmod.SyntheticScale.from_factor(0.005)
+    tables = _generate(scale, chunk_size=50)
+    orders = {row["order_id"]: row for row in _by_column("orders", tables["orders"])}
+    items = _by_column("order_items", tables["order_items"])
+    discounts = _by_column("order_item_discounts", tables["order_item_discounts"])
+
+    for order in orders.values():
+        assert 1 <= order["customer_id"] <= scale.customers
+        assert order["created_at"] <= order["updated_at"] <= END_AT
+    for item in items:
+        order = orders[item["order_id"]]
+        assert 1 <= item["product_id"] <= scale.products
+        assert item["net_amount"] == item["gross_amount"] - item["discount_amount"]
+        assert item["had_discount"] == (item["discount_amount"] > 0)
+        assert (item["commission_amount"] is None) == (order["seller_id"] is None)
+        assert item["created_at"] <= item["updated_at"] <= END_AT
+    discounted = {item["order_item_id"]: item for item in items if item["had_discount"]}
+    assert sorted(row["order_item_id"] for row in discounts) == sorted(discounted)
+    for row in discounts:
+        assert row["final_amount"] == discounted[row["order_item_id"]]["net_amount"]
+        assert 1 <= row["discount_id"] <= scale.discount_campaigns
+
+
+def test_plan_traffic_draws_ids_within_existing_ranges():
+    """Cenario: 500 alteracoes sorteadas; ids ficam dentro das tabelas e a semente repete o plano.
+
+    Sem itens na base, devolucoes viram pedidos novos.
+    """
+
+    max_ids = {"orders": 40, "order_items": 0, "products": 10, "customers": 25}
+
+    plan = synthmod.plan_traffic(random.Random(3), changes=500, max_ids=max_ids)
+
+    assert plan.change_count == 500
+    assert plan.new_orders > 0
+    assert synthmod.TRAFFIC_ITEM_RETURN not in plan.updates
+    assert all(1 <= order_id <= 40 for order_id in plan.updates[synthmod.TRAFFIC_ORDER_PROGRESS])
+    assert all(1 <= product_id <= 10 for product_id in plan.updates[synthmod.TRAFFIC_PRODUCT_PRICE])
+    assert plan == synthmod.plan_traffic(random.Random(3), changes=500, max_ids=max_ids)
+
+
+def test_parquet_writer_round_trip(tmp_path):
+    """Cenario: pedidos e itens gravados em lotes; o Parquet devolve as mesmas linhas."""
+
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    scale = synthmod.SyntheticScale.from_factor(0.001)
+    tables = defaultdict(list)
+    with synthmod.ParquetTableWriter(tmp_path) as writer:
+        for table, rows in synthmod.generate_tables(scale, seed=1, end_at=END_AT, history_days=30, chunk_size=20):
+            writer.write(table, rows)
+            tables[table].extend(rows)
+
+    for table in ("orders", "order_items", "products"):
+        read_back = pq.read_table(tmp_path / f"{table}.parquet").to_pylist()
+        assert read_back == _by_column(table, tables[table])
@@ -0,0 +1,122 @@
+"""Suite de testes unitarios para `python/etl/watermark.py`.
+
+Proposito deste arquivo:
+- validar a normalizacao de `watermark_type` vindo do `ctl.etl_control`;
+- garantir que cada entidade declara os tipos de watermark suportados e
+  que `rowversion` so vale para quem extrai por versao;
+- garantir que gravar o watermark em `updated_at` limpa a rowversion antiga.
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+ETL_DIR = Path(__file__).resolve().parents[1] / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+import control as controlmod  # noqa: E402
+import watermark as wmmod  # noqa: E402
+from entities import ENTITY_REGISTRY  # noqa: E402
+
+
+ROWVERSION_ENTITIES = {
+    "dim_cliente",
+    "dim_desconto",
+    "dim_equipe",
+    "dim_produto",
+    "dim_regiao",
+    "dim_vendedor",
+    "fact_metas",
+}
+
+
+def test_normalize_watermark_type_defaults_to_updated_at():
+    """Cenario: valores nulos, com caixa/espacos ou desconhecidos.
+
+    Segue o padrao de `load_mode`/`transform_mode`: valor invalido cai no
+    comportamento original (`updated_at`).
+    """
+
+    assert wmmod.normalize_watermark_type(None) == "updated_at"
+    assert wmmod.normalize_watermark_type(" RowVersion ") == "rowversion"
+    assert wmmod.normalize_watermark_type("change_tracking") == "updated_at"
+
+
+def test_entities_declare_supported_watermark_types():
+    """Cenario: registro de entidades.
+
+    Entidades de tabela unica suportam `rowversion`; fact_vendas e
+    fact_descontos (watermark combinado entre tabelas) ficam so em
+    `updated_at`, e pedir `rowversion` nelas e erro.
+    """
+
+    supported = {
+        name: wmmod.supported_watermark_types(entity) for name, entity in ENTITY_REGISTRY.items()
+    }
+
+    assert {name for name, types in supported.items() if "rowversion" in types} == ROWVERSION_ENTITIES
+    assert all("updated_at" in types for types in supported.values())
+    assert wmmod.resolve_watermark_type(ENTITY_REGISTRY["dim_cliente"], "rowversion") == "rowversion"
+    with pytest.raises(ValueError, match="nao suporta"):
+        wmmod.resolve_watermark_type(ENTITY_REGISTRY["fact_vendas"], "rowversion")
+
+
+def test_rowversion_requires_extract_batch_by_version():
+    """Cenario: entidade declara `rowversion` sem a funcao de extracao.
+
+    A declaracao sozinha nao basta; o tipo e ignorado.
+    """
+
+    class Incomplete:
+        WATERMARK_TYPES = ("updated_at", "rowversion")
+
+    assert wmmod.supported_watermark_types(Incomplete) == ("updated_at",)
+
+
+class _RecordingCursor:
+    rowcount = 1
+
+    def __init__(self, calls):
+        self._calls = calls
+
+    def execute(self, sql, params):
+        self._calls.append((" ".join(sql.split()), params))
+
+    def close(self):
+        pass
+
+
+class _RecordingConnection:
+    def __init__(self):
+        self.calls = []
+
+    def cursor(self):
+        return _RecordingCursor(self.calls)
+
+
+def test_updated_at_watermark_writes_null_version():
+    """Cenario: entidade voltou de `rowversion` para `updated_at`.
+
+    Checkpoint e sucesso gravam `watermark_version` NULL em vez de manter a
+    versao antiga, que seria retomada numa nova troca para `rowversion`.
+    """
+
+    connection = _RecordingConnection()
+    watermark = dict(
+        entity_name="dim_cliente",
+        watermark_updated_at=datetime(2026, 1, 1),
+        watermark_id=10,
+        run_id=7,
+    )
+
+    controlmod.checkpoint_control_watermark(connection, **watermark)
+    controlmod.mark_control_success_with_watermark(connection, **watermark)
+
+    assert len(connection.calls) == 2
+    for sql, params in connection.calls:
+        assert "watermark_version = ?," in sql
+        assert "COALESCE" not in sql
+        assert params[:3] == (datetime(2026, 1, 1), 10, None)
@@ -30,6 +30,8 @@ class AlertSettings:
     cooldown_minutes: int
     sla_watermark_delay_minutes: int
     sla_no_run_hours: int
+    sla_freshness_p95_seconds: int
+    sla_freshness_min_rows: int
     fail_rate_threshold: float
     fail_rate_min_runs: int
     timezone_name: str
@@ -51,6 +53,8 @@ class AlertSettings:
             cooldown_minutes=max(1, _to_int(os.getenv("ALERT_COOLDOWN_MINUTES"), 30)),
             sla_watermark_delay_minutes=max(5, _to_int(os.getenv("ALERT_SLA_WATERMARK_DELAY_MINUTES"), 120)),
             sla_no_run_hours=max(1, _to_int(os.getenv("ALERT_SLA_NO_RUN_HOURS"), 24)),
+            sla_freshness_p95_seconds=max(1, _to_int(os.getenv("ALERT_SLA_FRESHNESS_P95_SECONDS"), 3600)),
+            sla_freshness_min_rows=max(1, _to_int(os.getenv("ALERT_SLA_FRESHNESS_MIN_ROWS"), 100)),
             fail_rate_threshold=_to_float(os.getenv("ALERT_FAIL_RATE_THRESHOLD"), 0.30),
             fail_rate_min_runs=max(1, _to_int(os.getenv("ALERT_FAIL_RATE_MIN_RUNS"), 3)),
             timezone_name=timezone_name,
@@ -198,6 +202,37 @@ def _query_active_entities(connection: Any) -> list[dict[str, Any]]:
     return _query_all(connection, query)
 
 
+def _query_freshness_percentiles(connection: Any) -> dict[str, dict[str, Any]]:
+    """Percentis de frescor (24h) por entidade; vazio se a view ainda nao existe no DW."""
+    exists = _query_all(
+        connection,
+        "SELECT CASE WHEN OBJECT_ID('audit.vw_etl_freshness_percentiles', 'V') IS NOT NULL THEN 1 ELSE 0 END AS exists_flag;",
+    )
+    if not exists or not exists[0].get("exists_flag"):
+        return {}
+    query = """
+    SELECT
+        entity_name,
+        sample_rows AS freshness_sample_rows,
+        p50_seconds AS freshness_p50_seconds,
+        p95_seconds AS freshness_p95_seconds,
+        p99_seconds AS freshness_p99_seconds
+    FROM audit.vw_etl_freshness_percentiles;
+    """
+    return {_safe_str(row.get("entity_name")): row for row in _query_all(connection, query)}
+
+
+# Faixa do histograma de frescor acima de 7 dias (ver 26_create_audit_etl_freshness_histogram.sql).
+_FRESHNESS_OVERFLOW_BUCKET = 2_147_483_647
+
+
+def _format_freshness_seconds(value: Any) -> str:
+    seconds = _to_int(_safe_str(value, "0"), 0)
+    if seconds >= _FRESHNESS_OVERFLOW_BUCKET:
+        return ">7d"
+    return f"<={seconds}s"
+
+
 def _as_utc(dt: Any) -> datetime | None:
     if not isinstance(dt, datetime):
         return None
@@ -298,6 +333,28 @@ def _evaluate_entity_alerts(
                 }
             )
 
+    freshness_sample_rows = _to_int(_safe_str(row.get("freshness_sample_rows"), "0"), 0)
+    freshness_p95_seconds = _to_int(_safe_str(row.get("freshness_p95_seconds"), "0"), 0)
+    if (
+        freshness_sample_rows >= settings.sla_freshness_min_rows
+        and freshness_p95_seconds > settings.sla_freshness_p95_seconds
+    ):
+        findings.append(
+            {
+                "key": f"{entity_name}|sla_freshness_p95",
+                "entity_name": entity_name,
+                "alert_type": "sla_freshness_p95",
+                "severity": "ATENCAO",
+                "title": "Frescor p95 acima do SLA (24h)",
+                "detail": (
+                    f"p50={_format_freshness_seconds(row.get('freshness_p50_seconds'))} "
+                    f"p95={_format_freshness_seconds(freshness_p95_seconds)} "
+                    f"p99={_format_freshness_seconds(row.get('freshness_p99_seconds'))} "
+                    f"em {freshness_sample_rows} linhas; limite p95={settings.sla_freshness_p95_seconds}s."
+                ),
+            }
+        )
+
     total_runs_7d = _to_int(_safe_str(row.get("total_runs_7d"), "0"), 0)
     failed_runs_7d = _to_int(_safe_str(row.get("failed_runs_7d"), "0"), 0)
     fail_rate_7d = _to_float(_safe_str(row.get("fail_rate_7d"), "0"), 0.0)
@@ -534,11 +591,13 @@ def _run_cycle(settings: AlertSettings) -> None:
     connection = _connect_dw(settings)
     try:
         active_entities = _query_active_entities(connection)
+        freshness_by_entity = _query_freshness_percentiles(connection)
     finally:
         connection.close()
 
     findings: list[dict[str, Any]] = []
     for row in active_entities:
+        row.update(freshness_by_entity.get(_safe_str(row.get("entity_name")), {}))
         findings.extend(_evaluate_entity_alerts(row, settings, now_utc))
 
     print(
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Benchmark do dashboard de vendas: agregacao em pandas vs GROUP BY no SQL Server.
+
+A estrategia `aggregate` le as grades aditivas de `fact.VW_AGG_VENDAS_DIARIA`
+(agregado diario mantido pelo ETL) em vez da view de detalhe, e os totais do
+agregado com pedidos distintos estimados pelo sketch HLL.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import statistics
+import time
+import warnings
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+DASH_DIR = Path(__file__).resolve().parents[2] / "dashboards" / "streamlit" / "vendas"
+DEFAULT_APP_PATH = DASH_DIR / "app.py"
+
+STRATEGY_LEGACY = "legacy"
+STRATEGY_PUSHDOWN = "pushdown"
+STRATEGY_AGGREGATE = "aggregate"
+STRATEGIES = (STRATEGY_LEGACY, STRATEGY_PUSHDOWN, STRATEGY_AGGREGATE)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Mede tempo ate o primeiro grafico (KPIs + tendencia) e ate todas as abas do "
+            "dashboard de vendas, com detalhe completo em pandas ou GROUP BY no SQL Server."
+        )
+    )
+    parser.add_argument(
+        "--app-path",
+        default=str(DEFAULT_APP_PATH),
+        help=f"Caminho para o app Streamlit de vendas (default: {DEFAULT_APP_PATH}).",
+    )
+    parser.add_argument(
+        "--days",
+        default="30,90,365",
+        help="Periodos (em dias, terminando na data maxima da view) separados por virgula.",
+    )
+    parser.add_argument("--repeats", type=int, default=3, help="Repeticoes por periodo (usa a mediana).")
+    parser.add_argument(
+        "--strategies",
+        default=",".join(STRATEGIES),
+        help=f"Estrategias a medir: {', '.join(STRATEGIES)}.",
+    )
+    parser.add_argument("--json", action="store_true", help="Emite resultado em JSON.")
+    return parser.parse_args()
+
+
+def _load_app(app_path: Path):
+    if not app_path.exists():
+        raise FileNotFoundError(f"Arquivo do dashboard nao encontrado: {app_path}")
+    spec = importlib.util.spec_from_file_location("dash_vendas_app", app_path)
+    if spec is None or spec.loader is None:
+        raise RuntimeError(f"Nao foi possivel criar loader para: {app_path}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _unwrap_cache(func):
+    return getattr(func, "__wrapped__", func)
+
+
+def _measure_legacy(app: Any, conn_str: str, filters: Any) -> dict[str, Any]:
+    # Caminho anterior: todas as linhas de detalhe via ODBC, agregacao em pandas.
+    load_sales_data = _unwrap_cache(app._load_sales_data)
+    started = time.perf_counter()
+    df = load_sales_data(
+        conn_str=conn_str,
+        start_date=filters.start_date,
+        end_date=filters.end_date,
+        estados=filters.estados,
+        regioes=filters.regioes,
+        categorias=filters.categorias,
+        vendedores=filters.vendedores,
+        equipes=filters.equipes,
+    )
+    aggregates = app.sq.aggregate_sales_frame(df)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    return {
+        "first_chart_ms": elapsed_ms,
+        "all_tabs_ms": elapsed_ms,
+        "rows_transferred": int(len(df)),
+        "totals": aggregates.totals,
+    }
+
+
+def _measure_pushdown(
+    app: Any,
+    conn_str: str,
+    filters: Any,
+    *,
+    source: str | None = None,
+    order_count: str | None = None,
+) -> dict[str, Any]:
+    sq = app.sq
+    source = source or sq.VIEW_NAME
+    started = time.perf_counter()
+    connection = app._open_connection(conn_str)
+    try:
+        totals, _ = sq.fetch_sales_totals(connection, filters, order_count=order_count or sq.ORDER_COUNT_EXACT)
+        daily = sq.fetch_daily_revenue(connection, filters, source=source)
+        first_chart_ms = (time.perf_counter() - started) * 1000.0
+        grids = [
+            daily,
+            sq.fetch_revenue_by_state(connection, filters, source=source),
+            sq.fetch_top_products(connection, filters, source=source),
+            sq.fetch_category_mix(connection, filters, source=source),
+            sq.fetch_seller_ranking(connection, filters),
+            sq.fetch_sales_detail_page(connection, filters, page=1),
+        ]
+    finally:
+        connection.close()
+    return {
+        "first_chart_ms": first_chart_ms,
+        "all_tabs_ms": (time.perf_counter() - started) * 1000.0,
+        "rows_transferred": 1 + sum(len(grid) for grid in grids),
+        "totals": totals,
+    }
+
+
+def _measure_aggregate(app: Any, conn_str: str, filters: Any) -> dict[str, Any]:
+    return _measure_pushdown(
+        app,
+        conn_str,
+        filters,
+        source=app.sq.AGGREGATE_VIEW_NAME,
+        order_count=app.sq.ORDER_COUNT_SKETCH,
+    )
+
+
+_MEASURES = {
+    STRATEGY_LEGACY: _measure_legacy,
+    STRATEGY_PUSHDOWN: _measure_pushdown,
+    STRATEGY_AGGREGATE: _measure_aggregate,
+}
+
+
+def _totals_match(left: dict[str, float], right: dict[str, float], *, order_tolerance: float) -> bool:
+    # Pedidos vindos do sketch HLL sao estimativa: aceita ate `order_tolerance`.
+    for key in left.keys() & right.keys():
+        tolerance = order_tolerance if key == "pedidos" else 1e-9
+        if abs(left[key] - right[key]) > max(1e-6, abs(left[key]) * tolerance):
+            return False
+    return True
+
+
+def main() -> int:
+    args = _parse_args()
+    periods = sorted({int(value) for value in args.days.split(",") if value.strip()})
+    strategies = [value.strip() for value in args.strategies.split(",") if value.strip()]
+    unknown = sorted(set(strategies) - set(STRATEGIES))
+    if unknown:
+        raise SystemExit(f"Estrategias invalidas: {', '.join(unknown)}")
+
+    warnings.filterwarnings("ignore", message="pandas only supports SQLAlchemy")
+    logging.getLogger("streamlit").setLevel(logging.CRITICAL + 1)
+    # Desliga o cache compartilhado de resultados: toda repeticao deve ir ao SQL Server.
+    os.environ["DASH_RESULT_CACHE_MAX_MB"] = "0"
+    os.environ.pop("DASH_RESULT_CACHE_DIR", None)
+    app = _load_app(Path(args.app_path))
+    conn_str = app._build_conn_str()
+    metadata = _unwrap_cache(app._load_metadata)(conn_str)
+
+    results: list[dict[str, Any]] = []
+    for days in periods:
+        end_date = metadata["max_data"]
+        start_date = max(metadata["min_data"], end_date - timedelta(days=days - 1))
+        filters = app.sq.SalesFilters(start_date=start_date, end_date=end_date)
+
+        totals_by_strategy: dict[str, dict[str, float]] = {}
+        for strategy in strategies:
+            runs = [_MEASURES[strategy](app, conn_str, filters) for _ in range(max(args.repeats, 1))]
+            totals_by_strategy[strategy] = runs[-1]["totals"]
+            result = {
+                "strategy": strategy,
+                "days": days,
+                "period": f"{start_date.isoformat()}..{end_date.isoformat()}",
+                "detail_rows": int(runs[-1]["totals"]["linhas"]),
+                "rows_transferred": runs[-1]["rows_transferred"],
+                "first_chart_ms": round(statistics.median(run["first_chart_ms"] for run in runs), 1),
+                "all_tabs_ms": round(statistics.median(run["all_tabs_ms"] for run in runs), 1),
+            }
+            results.append(result)
+            if not args.json:
+                print(
+                    f"[{strategy:>8}] {days:>4} dias linhas={result['detail_rows']:>9} "
+                    f"trafegadas={result['rows_transferred']:>9} "
+                    f"primeiro grafico={result['first_chart_ms']} ms todas as abas={result['all_tabs_ms']} ms"
+                )
+
+        # Todas as estrategias devem chegar aos mesmos KPIs.
+        reference, *others = totals_by_strategy.values()
+        order_tolerance = 3 * app.sq.HLL_RELATIVE_ERROR
+        if any(not _totals_match(reference, other, order_tolerance=order_tolerance) for other in others):
+            raise RuntimeError(f"Estrategias divergiram nos totais ({days} dias): {totals_by_strategy}")
+
+    if args.json:
+        print(json.dumps({"dashboard": "vendas", "results": results}, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
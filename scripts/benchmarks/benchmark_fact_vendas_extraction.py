@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""Benchmark de extracao da FACT_VENDAS: latencia por lote conforme `order_items` cresce."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+ETL_DIR = Path(__file__).resolve().parents[2] / "python" / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+from config import ETLConfig  # noqa: E402
+from db import Row, close_quietly, connect_sqlserver, execute, query_one, stream_query  # noqa: E402
+from entities import fact_vendas  # noqa: E402
+
+
+STRATEGY_LEGACY = "legacy"
+STRATEGY_KEYSET = "keyset"
+STRATEGIES = (STRATEGY_LEGACY, STRATEGY_KEYSET)
+
+ITEMS_PER_ORDER = 4
+# Historico sintetico fica antes do watermark; a janela recente fica depois
+# de qualquer dado real da base, para que so ela seja extraida.
+HISTORY_UPDATED_AT = datetime(2000, 1, 1)
+WINDOW_START = datetime(2099, 1, 1)
+
+# Consulta anterior: filtra e ordena por CASE(orders.updated_at, order_items.updated_at),
+# sem seek possivel. Mantida aqui apenas como referencia de comparacao.
+LEGACY_EXTRACT_SQL = """
+SELECT TOP ({batch_size})
+    oi.order_item_id,
+    oi.order_id,
+    oi.item_number,
+    oi.product_id,
+    oi.quantity,
+    oi.unit_price,
+    oi.gross_amount,
+    oi.discount_amount,
+    oi.net_amount,
+    oi.cost_amount,
+    oi.return_quantity,
+    oi.returned_amount,
+    oi.commission_percent,
+    oi.commission_amount,
+    oi.had_discount,
+    oi.created_at AS order_item_created_at,
+    oi.updated_at AS order_item_updated_at,
+    oi.deleted_at AS order_item_deleted_at,
+    o.order_number,
+    o.order_date,
+    o.customer_id,
+    o.seller_id,
+    COALESCE(o.region_id, rc.region_id) AS resolved_region_id,
+    o.updated_at AS order_updated_at,
+    o.deleted_at AS order_deleted_at,
+    src.source_updated_at
+FROM core.order_items AS oi
+INNER JOIN core.orders AS o
+    ON o.order_id = oi.order_id
+LEFT JOIN core.customers AS c
+    ON c.customer_id = o.customer_id
+LEFT JOIN core.regions AS rc
+    ON rc.state = c.state
+   AND rc.city = c.city
+   AND rc.deleted_at IS NULL
+CROSS APPLY
+(
+    SELECT
+        CASE
+            WHEN o.updated_at > oi.updated_at THEN o.updated_at
+            ELSE oi.updated_at
+        END AS source_updated_at
+) AS src
+WHERE
+    src.source_updated_at <= ?
+    AND
+    (
+        src.source_updated_at > ?
+        OR (src.source_updated_at = ? AND oi.order_item_id > ?)
+    )
+ORDER BY
+    src.source_updated_at ASC,
+    oi.order_item_id ASC;
+"""
+
+_INSERT_ORDERS_SQL = """
+WITH numbers AS
+(
+    SELECT TOP (?) ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) AS n
+    FROM sys.all_objects AS a
+    CROSS JOIN sys.all_objects AS b
+    CROSS JOIN sys.all_objects AS c
+)
+INSERT INTO core.orders (order_number, customer_id, order_status, order_date, created_at, updated_at)
+SELECT
+    CONCAT(?, n),
+    ?,
+    'Pago',
+    ?,
+    ?,
+    DATEADD(SECOND, CASE WHEN ? = 1 THEN n ELSE 0 END, ?)
+FROM numbers;
+"""
+
+_INSERT_ITEMS_SQL = """
+INSERT INTO core.order_items
+(
+    order_id, item_number, product_id, quantity, unit_price, gross_amount, net_amount,
+    created_at, updated_at
+)
+SELECT
+    o.order_id,
+    k.item_number,
+    ?,
+    1,
+    10.00,
+    10.00,
+    10.00,
+    o.created_at,
+    CASE WHEN ? = 1 THEN DATEADD(SECOND, k.item_number, ?) ELSE o.created_at END
+FROM core.orders AS o
+CROSS JOIN (VALUES (1), (2), (3), (4)) AS k (item_number)
+WHERE o.order_number LIKE ?;
+"""
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Mede a latencia por lote da extracao incremental da FACT_VENDAS enquanto "
+            "core.order_items cresce, comparando a consulta anterior (legacy) com a "
+            "keyset por indice. Tudo roda em transacao revertida ao final."
+        )
+    )
+    parser.add_argument(
+        "--growth",
+        default="0,250000,500000,1000000",
+        help="Total de itens historicos adicionados a cada passo, separados por virgula.",
+    )
+    parser.add_argument("--batch-size", type=int, default=5000, help="Tamanho do lote de extracao.")
+    parser.add_argument("--batches", type=int, default=4, help="Lotes medidos por passo.")
+    parser.add_argument(
+        "--strategies",
+        default=",".join(STRATEGIES),
+        help="Estrategias separadas por virgula (legacy, keyset).",
+    )
+    parser.add_argument("--json", action="store_true", help="Emite resultado em JSON.")
+    return parser.parse_args()
+
+
+def _reference_keys(oltp_connection: Any) -> tuple[int, int]:
+    row = query_one(
+        oltp_connection,
+        """
+        SELECT
+            (SELECT MIN(customer_id) FROM core.customers) AS customer_id,
+            (SELECT MIN(product_id) FROM core.products) AS product_id;
+        """,
+    )
+    if row is None or row["customer_id"] is None or row["product_id"] is None:
+        raise RuntimeError("core.customers/core.products vazias. Rode o seed OLTP antes do benchmark.")
+    return int(row["customer_id"]), int(row["product_id"])
+
+
+def _insert_orders_with_items(
+    oltp_connection: Any,
+    *,
+    prefix: str,
+    order_count: int,
+    keys: tuple[int, int],
+    order_updated_at: datetime,
+    spread_order_updates: bool,
+    item_updated_at: datetime | None,
+) -> None:
+    """Insere pedidos com `ITEMS_PER_ORDER` itens cada, sem confirmar a transacao.
+
+    `item_updated_at=None` mantem o item com o `created_at` do pedido (historico);
+    caso contrario o item fica mais novo que o pedido.
+    """
+    if order_count <= 0:
+        return
+    customer_id, product_id = keys
+    created_at = min(order_updated_at, HISTORY_UPDATED_AT)
+    execute(
+        oltp_connection,
+        _INSERT_ORDERS_SQL,
+        (
+            int(order_count),
+            prefix,
+            customer_id,
+            created_at,
+            created_at,
+            1 if spread_order_updates else 0,
+            order_updated_at,
+        ),
+    )
+    execute(
+        oltp_connection,
+        _INSERT_ITEMS_SQL,
+        (
+            product_id,
+            1 if item_updated_at is not None else 0,
+            item_updated_at or created_at,
+            f"{prefix}%",
+        ),
+    )
+
+
+def _seed_change_window(oltp_connection: Any, *, keys: tuple[int, int], rows: int) -> datetime:
+    """Janela recente com metade dos itens alterados e metade via pedido alterado."""
+    orders_per_stream = max(1, rows // (2 * ITEMS_PER_ORDER))
+    # Fluxo "itens alterados": pedido antigo, itens novos.
+    _insert_orders_with_items(
+        oltp_connection,
+        prefix="BENCH-XI-",
+        order_count=orders_per_stream,
+        keys=keys,
+        order_updated_at=HISTORY_UPDATED_AT,
+        spread_order_updates=False,
+        item_updated_at=WINDOW_START,
+    )
+    # Fluxo "pedidos alterados": itens antigos, pedido novo.
+    _insert_orders_with_items(
+        oltp_connection,
+        prefix="BENCH-XO-",
+        order_count=orders_per_stream,
+        keys=keys,
+        order_updated_at=WINDOW_START,
+        spread_order_updates=True,
+        item_updated_at=None,
+    )
+    return WINDOW_START + timedelta(seconds=orders_per_stream + ITEMS_PER_ORDER + 1)
+
+
+def _legacy_extract(
+    oltp_connection: Any,
+    *,
+    watermark_updated_at: datetime,
+    watermark_id: int,
+    cutoff_updated_at: datetime,
+    batch_size: int,
+) -> Iterator[Row]:
+    return stream_query(
+        oltp_connection,
+        LEGACY_EXTRACT_SQL.format(batch_size=max(1, int(batch_size))),
+        (cutoff_updated_at, watermark_updated_at, watermark_updated_at, int(watermark_id)),
+    )
+
+
+_EXTRACTORS: dict[str, Callable[..., Iterator[Row]]] = {
+    STRATEGY_LEGACY: _legacy_extract,
+    STRATEGY_KEYSET: fact_vendas.extract_batch,
+}
+
+
+def _measure_batches(
+    oltp_connection: Any,
+    extractor: Callable[..., Iterator[Row]],
+    *,
+    cutoff_updated_at: datetime,
+    batch_size: int,
+    batches: int,
+) -> tuple[list[float], list[tuple[datetime, int]]]:
+    """Pagina `batches` lotes a partir do inicio da janela; devolve ms e watermarks."""
+    watermark = (WINDOW_START - timedelta(seconds=1), 0)
+    latencies_ms: list[float] = []
+    watermarks: list[tuple[datetime, int]] = []
+    for _ in range(batches):
+        started = time.perf_counter()
+        rows = list(
+            extractor(
+                oltp_connection,
+                watermark_updated_at=watermark[0],
+                watermark_id=watermark[1],
+                cutoff_updated_at=cutoff_updated_at,
+                batch_size=batch_size,
+            )
+        )
+        latencies_ms.append((time.perf_counter() - started) * 1000)
+        if not rows:
+            break
+        watermark = (rows[-1]["source_updated_at"], int(rows[-1]["order_item_id"]))
+        watermarks.append(watermark)
+    return latencies_ms, watermarks
+
+
+def main() -> int:
+    args = _parse_args()
+    growth = sorted({int(value) for value in args.growth.split(",") if value.strip()})
+    strategies = [value.strip() for value in args.strategies.split(",") if value.strip()]
+    unknown = sorted(set(strategies) - set(STRATEGIES))
+    if unknown:
+        raise SystemExit(f"Estrategias invalidas: {', '.join(unknown)}")
+    config = ETLConfig.from_env()
+
+    results: list[dict[str, Any]] = []
+    oltp_connection = None
+    try:
+        oltp_connection = connect_sqlserver(
+            config.oltp_conn_str,
+            command_timeout_seconds=max(config.command_timeout_seconds, 1800),
+        )
+        keys = _reference_keys(oltp_connection)
+        cutoff = _seed_change_window(oltp_connection, keys=keys, rows=args.batch_size * args.batches)
+
+        history_items = 0
+        for step, target_items in enumerate(growth):
+            _insert_orders_with_items(
+                oltp_connection,
+                prefix=f"BENCH-H{step}-",
+                order_count=(target_items - history_items) // ITEMS_PER_ORDER,
+                keys=keys,
+                order_updated_at=HISTORY_UPDATED_AT,
+                spread_order_updates=False,
+                item_updated_at=None,
+            )
+            history_items = target_items
+            total_items = query_one(oltp_connection, "SELECT COUNT_BIG(*) AS total FROM core.order_items;")
+
+            watermarks_by_strategy: dict[str, list[tuple[datetime, int]]] = {}
+            for strategy in strategies:
+                latencies_ms, watermarks = _measure_batches(
+                    oltp_connection,
+                    _EXTRACTORS[strategy],
+                    cutoff_updated_at=cutoff,
+                    batch_size=args.batch_size,
+                    batches=args.batches,
+                )
+                watermarks_by_strategy[strategy] = watermarks
+                result = {
+                    "strategy": strategy,
+                    "order_items": int(total_items["total"]) if total_items else None,
+                    "history_items_added": history_items,
+                    "batch_size": args.batch_size,
+                    "batches": len(latencies_ms),
+                    "median_batch_ms": round(statistics.median(latencies_ms), 1),
+                    "max_batch_ms": round(max(latencies_ms), 1),
+                }
+                results.append(result)
+                if not args.json:
+                    print(
+                        f"[{strategy:>6}] order_items={result['order_items']:>9} "
+                        f"lote mediano={result['median_batch_ms']} ms max={result['max_batch_ms']} ms"
+                    )
+
+            # As duas estrategias devem paginar exatamente as mesmas linhas.
+            if len({tuple(w) for w in watermarks_by_strategy.values()}) > 1:
+                raise RuntimeError(f"Estrategias divergiram nos watermarks (passo {step}).")
+    finally:
+        if oltp_connection is not None:
+            oltp_connection.rollback()
+        close_quietly(oltp_connection)
+
+    if args.json:
+        print(json.dumps({"entity": "fact_vendas", "results": results}, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
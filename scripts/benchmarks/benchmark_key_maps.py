@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Benchmark de lookup de chave surrogate: `dict[int, int]` vs `IntKeyMap`."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+ETL_DIR = Path(__file__).resolve().parents[2] / "python" / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+from key_maps import IntKeyMap  # noqa: E402
+
+
+LAYOUTS = ("dict", "sorted", "dense")
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compara memoria e velocidade de lookup entre dict e IntKeyMap "
+            "(arrays ordenados e vetor denso). Nao acessa banco."
+        )
+    )
+    parser.add_argument(
+        "--sizes",
+        default="100000,1000000,10000000",
+        help="Quantidade de chaves por lookup, separada por virgula.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Chaves por lote de lookup (mesmo tamanho de lote do ETL).",
+    )
+    parser.add_argument(
+        "--batches",
+        type=int,
+        default=200,
+        help="Quantidade de lotes de lookup medidos.",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Emite resultado em JSON.")
+    return parser.parse_args()
+
+
+def _natural_keys(size: int, layout: str) -> np.ndarray:
+    if layout == "dense":
+        # ids sequenciais do OLTP com poucos buracos.
+        return np.arange(1, size + 1, dtype=np.int64)
+    # ids espalhados (ex.: apos purgas ou ids de sistemas externos).
+    return np.arange(1, size + 1, dtype=np.int64) * 7 + 1_000_000
+
+
+def _build(layout: str, keys: np.ndarray, surrogates: np.ndarray) -> Any:
+    if layout == "dict":
+        return dict(zip(keys.tolist(), surrogates.tolist()))
+    key_map = IntKeyMap()
+    key_map.update(keys, surrogates)
+    return key_map
+
+
+def _measure_memory(build: Callable[[], Any]) -> tuple[Any, int]:
+    tracemalloc.start()
+    try:
+        structure = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return structure, current
+
+
+def _measure(layout: str, size: int, args: argparse.Namespace) -> dict[str, Any]:
+    key_layout = "dense" if layout == "dense" else "sparse"
+    keys = _natural_keys(size, key_layout)
+    surrogates = np.arange(1, size + 1, dtype=np.int64)
+
+    started = time.perf_counter()
+    structure, memory_bytes = _measure_memory(lambda: _build(layout, keys, surrogates))
+    build_seconds = time.perf_counter() - started
+
+    rng = random.Random(args.seed)
+    batches = [
+        [int(keys[rng.randrange(size)]) for _ in range(args.batch_size)]
+        for _ in range(args.batches)
+    ]
+
+    started = time.perf_counter()
+    if layout == "dict":
+        for batch in batches:
+            [structure.get(key) for key in batch]
+    else:
+        for batch in batches:
+            structure.get_many(batch)
+    batch_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for batch in batches[: max(1, args.batches // 10)]:
+        for key in batch:
+            structure.get(key)
+    scalar_lookups = max(1, args.batches // 10) * args.batch_size
+    scalar_seconds = time.perf_counter() - started
+
+    total_lookups = args.batches * args.batch_size
+    return {
+        "layout": layout,
+        "keys": size,
+        "is_dense": getattr(structure, "is_dense", None),
+        "memory_bytes": memory_bytes,
+        "bytes_per_key": round(memory_bytes / size, 1),
+        "build_seconds": round(build_seconds, 3),
+        "batch_lookups_per_sec": round(total_lookups / batch_seconds, 1) if batch_seconds > 0 else None,
+        "scalar_lookups_per_sec": round(scalar_lookups / scalar_seconds, 1) if scalar_seconds > 0 else None,
+    }
+
+
+def main() -> int:
+    args = _parse_args()
+    sizes = [int(value) for value in args.sizes.split(",") if value.strip()]
+
+    results: list[dict[str, Any]] = []
+    for size in sizes:
+        for layout in LAYOUTS:
+            result = _measure(layout, size, args)
+            results.append(result)
+            if not args.json:
+                print(
+                    f"[{layout:>6}] keys={size:>9} "
+                    f"mem={result['memory_bytes'] / (1024 * 1024):.1f}MB "
+                    f"({result['bytes_per_key']} B/chave) "
+                    f"lote={result['batch_lookups_per_sec']} lookups/s "
+                    f"unitario={result['scalar_lookups_per_sec']} lookups/s"
+                )
+
+    if args.json:
+        print(json.dumps({"batch_size": args.batch_size, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
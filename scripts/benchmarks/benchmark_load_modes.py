@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Benchmark de carga na FACT_VENDAS: MERGE linha a linha vs staging set-based."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+ETL_DIR = Path(__file__).resolve().parents[2] / "python" / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+from config import ETLConfig  # noqa: E402
+from db import close_quietly, connect_sqlserver, query_one  # noqa: E402
+from loader import LOAD_MODE_BULK, LOAD_MODE_MERGE, write_upsert_params  # noqa: E402
+from row_hash import compute_row_hash  # noqa: E402
+
+
+UPSERT_SQL_FILE = "upsert_fact_vendas.sql"
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Mede linhas/s de upsert na FACT_VENDAS nos modos merge e bulk. "
+            "Tudo roda em transacao revertida ao final de cada medicao."
+        )
+    )
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000",
+        help="Tamanhos de lote separados por virgula.",
+    )
+    parser.add_argument(
+        "--modes",
+        default=f"{LOAD_MODE_MERGE},{LOAD_MODE_BULK}",
+        help="Modos de carga separados por virgula.",
+    )
+    parser.add_argument("--json", action="store_true", help="Emite resultado em JSON.")
+    return parser.parse_args()
+
+
+def _resolve_reference_keys(dw_connection: Any) -> dict[str, int]:
+    row = query_one(
+        dw_connection,
+        """
+        SELECT
+            (SELECT MIN(data_id) FROM dim.DIM_DATA) AS data_id,
+            (SELECT MIN(cliente_id) FROM dim.DIM_CLIENTE) AS cliente_id,
+            (SELECT MIN(produto_id) FROM dim.DIM_PRODUTO) AS produto_id,
+            (SELECT MIN(regiao_id) FROM dim.DIM_REGIAO) AS regiao_id,
+            (SELECT ISNULL(MAX(venda_original_id), 0) FROM fact.FACT_VENDAS) AS max_venda_original_id;
+        """,
+    )
+    if row is None or any(row[key] is None for key in ("data_id", "cliente_id", "produto_id", "regiao_id")):
+        raise RuntimeError("Dimensoes vazias. Carregue as dimensoes antes do benchmark.")
+    return {key: int(value) for key, value in row.items()}
+
+
+def _build_params(size: int, keys: dict[str, int]) -> list[tuple[Any, ...]]:
+    first_id = keys["max_venda_original_id"] + 1_000_000
+    params: list[tuple[Any, ...]] = []
+    for offset in range(size):
+        quantidade = 1 + offset % 5
+        preco = Decimal("19.90") + Decimal(offset % 100)
+        bruto = preco * quantidade
+        desconto = Decimal("0.00") if offset % 3 else Decimal("5.00")
+        params.append(
+            (
+                first_id + offset,
+                keys["data_id"],
+                keys["cliente_id"],
+                keys["produto_id"],
+                keys["regiao_id"],
+                None,
+                quantidade,
+                preco,
+                bruto,
+                desconto,
+                bruto - desconto,
+                Decimal("10.00"),
+                0,
+                Decimal("0.00"),
+                None,
+                None,
+                f"BENCH-{offset}",
+                1 if desconto > 0 else 0,
+                compute_row_hash((first_id + offset, quantidade, preco, desconto)),
+            )
+        )
+    return params
+
+
+def _measure(dw_connection: Any, params: list[tuple[Any, ...]], load_mode: str) -> dict[str, Any]:
+    try:
+        started = time.perf_counter()
+        write_upsert_params(dw_connection, UPSERT_SQL_FILE, params, load_mode=load_mode)
+        insert_seconds = time.perf_counter() - started
+
+        # Segunda passada com as mesmas chaves exercita o ramo WHEN MATCHED; o
+        # row_hash trocado evita que as linhas sejam ignoradas como inalteradas.
+        changed_params = [(*row[:-1], bytes(len(row[-1]))) for row in params]
+        started = time.perf_counter()
+        write_upsert_params(dw_connection, UPSERT_SQL_FILE, changed_params, load_mode=load_mode)
+        update_seconds = time.perf_counter() - started
+    finally:
+        dw_connection.rollback()
+
+    return {
+        "mode": load_mode,
+        "rows": len(params),
+        "insert_seconds": round(insert_seconds, 3),
+        "insert_rows_per_sec": round(len(params) / insert_seconds, 1) if insert_seconds > 0 else None,
+        "update_seconds": round(update_seconds, 3),
+        "update_rows_per_sec": round(len(params) / update_seconds, 1) if update_seconds > 0 else None,
+    }
+
+
+def main() -> int:
+    args = _parse_args()
+    sizes = [int(value) for value in args.sizes.split(",") if value.strip()]
+    modes = [value.strip() for value in args.modes.split(",") if value.strip()]
+    config = ETLConfig.from_env()
+
+    dw_connection = None
+    try:
+        dw_connection = connect_sqlserver(
+            config.dw_conn_str,
+            command_timeout_seconds=max(config.command_timeout_seconds, 1800),
+        )
+        keys = _resolve_reference_keys(dw_connection)
+        results: list[dict[str, Any]] = []
+        for size in sizes:
+            params = _build_params(size, keys)
+            for mode in modes:
+                result = _measure(dw_connection, params, mode)
+                results.append(result)
+                if not args.json:
+                    print(
+                        f"[{mode:>5}] rows={size:>7} "
+                        f"insert={result['insert_rows_per_sec']} rows/s "
+                        f"update={result['update_rows_per_sec']} rows/s"
+                    )
+    finally:
+        if dw_connection is not None:
+            dw_connection.rollback()
+        close_quietly(dw_connection)
+
+    if args.json:
+        print(json.dumps({"entity": "fact_vendas", "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Benchmark de regressao por replay: lotes gravados por `transform_rows` e parametros do upsert."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+ETL_DIR = Path(__file__).resolve().parents[2] / "python" / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+from columnar import TRANSFORM_MODES, TRANSFORM_MODE_ROW  # noqa: E402
+from entities import get_entity  # noqa: E402
+from key_cache import KEY_CACHE  # noqa: E402
+from replay import (  # noqa: E402
+    DEFAULT_REGRESSION_THRESHOLD,
+    KEY_CACHE_FILE,
+    changed_outputs,
+    compare_to_baseline,
+    fixture_path,
+    list_fixtures,
+    load_baseline,
+    measure_entity,
+    read_fixture,
+    save_baseline,
+)
+
+
+DEFAULT_FIXTURE_DIR = Path(__file__).resolve().parents[2] / "data" / "raw" / "replay"
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Reexecuta os lotes gravados por record_replay_fixtures.py em transform_rows e na "
+            "montagem de parametros do upsert de cada entidade; compara com um baseline JSON. "
+            "Nao acessa banco."
+        )
+    )
+    parser.add_argument("--fixture-dir", default=str(DEFAULT_FIXTURE_DIR), help="Diretorio das fixtures.")
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="Baseline JSON (padrao: <fixture-dir>/baseline.json).",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Grava o resultado atual como baseline em vez de comparar.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_REGRESSION_THRESHOLD,
+        help="Regressao tolerada como fracao (0.20 = 20%% mais lento ou com 20%% mais alocacao).",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticoes por entidade (vale a melhor).")
+    parser.add_argument("--transform-mode", default=TRANSFORM_MODE_ROW, choices=list(TRANSFORM_MODES))
+    parser.add_argument("--json", action="store_true", help="Emite resultado em JSON.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    fixture_dir = Path(args.fixture_dir)
+    baseline_path = Path(args.baseline) if args.baseline else fixture_dir / "baseline.json"
+
+    entity_names = list_fixtures(fixture_dir)
+    if not entity_names:
+        print(f"Nenhuma fixture em {fixture_dir}. Grave com scripts/benchmarks/record_replay_fixtures.py.")
+        return 2
+    if not KEY_CACHE.load(fixture_dir / KEY_CACHE_FILE, trusted=True):
+        print(f"Aviso: {KEY_CACHE_FILE} ausente; entidades de fato vao falhar no lookup de chaves.")
+
+    results = []
+    for entity_name in entity_names:
+        fixture = read_fixture(fixture_path(fixture_dir, entity_name))
+        result = measure_entity(
+            get_entity(entity_name),
+            fixture,
+            repeat=args.repeat,
+            transform_mode=args.transform_mode,
+        )
+        results.append(result)
+        if not args.json:
+            print(
+                f"[{result.entity_name:>14}] linhas={result.rows} lotes={result.batches} "
+                f"transform={result.transform_rows_per_second:,.0f} linhas/s "
+                f"upsert_params={result.upsert_params_rows_per_second:,.0f} linhas/s "
+                f"pico_alocacao={result.peak_alloc_bytes / 1024 / 1024:.1f} MiB"
+            )
+
+    if args.update_baseline:
+        save_baseline(baseline_path, results)
+        print(f"Baseline gravado em {baseline_path}")
+        return 0
+
+    baseline = load_baseline(baseline_path)
+    regressions = compare_to_baseline(results, baseline, threshold=args.threshold) if baseline else []
+    changed = changed_outputs(results, baseline) if baseline else []
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "results": [asdict(result) for result in results],
+                    "regressions": regressions,
+                    "changed_outputs": changed,
+                },
+                indent=2,
+            )
+        )
+    else:
+        if not baseline:
+            print(f"Sem baseline em {baseline_path}; use --update-baseline para criar.")
+        for entity_name in changed:
+            print(f"Saida transformada de {entity_name} difere do baseline (mudanca de regra ou de fixture).")
+        for message in regressions:
+            print(f"REGRESSAO {message}")
+        if baseline and not regressions:
+            print(f"Sem regressao acima de {args.threshold:.0%} em relacao a {baseline_path}.")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Benchmark de transformacao das fatos: `transform_rows` vs `transform_rows_columnar`."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable
+
+ETL_DIR = Path(__file__).resolve().parents[2] / "python" / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+from db import Row  # noqa: E402
+from entities import fact_descontos, fact_metas, fact_vendas  # noqa: E402
+
+
+BASE_TS = datetime(2026, 1, 1, 8, 0, 0)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compara linhas/s entre a transformacao linha a linha e a vetorizada "
+            "das entidades de fato, conferindo paridade. Nao acessa banco."
+        )
+    )
+    parser.add_argument("--rows", type=int, default=50_000, help="Linhas sinteticas por entidade.")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticoes (vale a melhor).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Emite resultado em JSON.")
+    return parser.parse_args()
+
+
+def _money(rng: random.Random, upper_cents: int = 500_000) -> Decimal:
+    return Decimal(rng.randint(0, upper_cents)).scaleb(-2)
+
+
+def _vendas_row(rng: random.Random, row_id: int) -> dict[str, Any]:
+    quantity = rng.randint(1, 5)
+    unit_price = _money(rng)
+    return {
+        "order_item_id": row_id,
+        "order_id": row_id // 3,
+        "order_number": f"PED-{row_id}",
+        "customer_id": rng.randint(1, 50_000),
+        "product_id": rng.randint(1, 5_000),
+        "resolved_region_id": rng.choice([None, rng.randint(1, 27)]),
+        "seller_id": rng.choice([None, rng.randint(1, 200)]),
+        "quantity": quantity,
+        "unit_price": unit_price,
+        "gross_amount": unit_price * quantity,
+        "discount_amount": rng.choice([Decimal("0.00"), _money(rng, 5_000)]),
+        "cost_amount": _money(rng),
+        "return_quantity": rng.choice([0, 0, 0, 1]),
+        "returned_amount": Decimal("0.00"),
+        "commission_percent": rng.choice([None, Decimal("4.00")]),
+        "commission_amount": None,
+        "had_discount": rng.choice([0, 1]),
+        "order_date": BASE_TS.date(),
+        "order_item_created_at": BASE_TS,
+        "order_item_updated_at": BASE_TS,
+        "source_updated_at": BASE_TS + timedelta(seconds=row_id),
+        "order_item_deleted_at": None,
+        "order_deleted_at": None,
+    }
+
+
+def _metas_row(rng: random.Random, row_id: int) -> dict[str, Any]:
+    return {
+        "seller_target_id": row_id,
+        "seller_id": rng.randint(1, 200),
+        "target_month": BASE_TS.date(),
+        "period_type": "MENSAL",
+        "target_amount": _money(rng) + Decimal("0.01"),
+        "target_quantity": rng.randint(1, 100),
+        "realized_amount": _money(rng),
+        "realized_quantity": rng.randint(0, 90),
+        "period_closed": rng.choice([0, 1]),
+        "target_created_at": BASE_TS,
+        "target_updated_at": BASE_TS + timedelta(seconds=row_id),
+        "target_deleted_at": None,
+    }
+
+
+def _descontos_row(rng: random.Random, row_id: int) -> dict[str, Any]:
+    base_amount = _money(rng)
+    discount_amount = _money(rng, 5_000)
+    return {
+        "order_item_discount_id": row_id,
+        "discount_id": rng.randint(1, 50),
+        "order_item_id": rng.randint(1, 100_000),
+        "order_id": row_id // 2,
+        "order_number": f"PED-{row_id}",
+        "customer_id": rng.randint(1, 50_000),
+        "product_id": rng.randint(1, 5_000),
+        "application_level": "item",
+        "discount_amount": discount_amount,
+        "base_amount": base_amount,
+        "final_amount": max(base_amount - discount_amount, Decimal("0.00")),
+        "approved": 1,
+        "rejection_reason": None,
+        "applied_at": BASE_TS,
+        "order_item_discount_created_at": BASE_TS,
+        "order_item_discount_updated_at": BASE_TS,
+        "source_updated_at": BASE_TS + timedelta(seconds=row_id),
+        "order_item_discount_deleted_at": None,
+        "order_item_deleted_at": None,
+        "order_deleted_at": None,
+    }
+
+
+CASES: list[tuple[Any, Callable[[random.Random, int], dict[str, Any]]]] = [
+    (fact_vendas, _vendas_row),
+    (fact_metas, _metas_row),
+    (fact_descontos, _descontos_row),
+]
+
+
+def _build_rows(make_row: Callable[[random.Random, int], dict[str, Any]], count: int, seed: int) -> list[Row]:
+    rng = random.Random(seed)
+    dicts = [make_row(rng, row_id) for row_id in range(1, count + 1)]
+    index = {column: position for position, column in enumerate(dicts[0])}
+    return [Row(tuple(item.values()), index) for item in dicts]
+
+
+def _best_seconds(transform: Callable[[Any], Any], rows: list[Row], repeat: int) -> tuple[float, Any]:
+    best = float("inf")
+    result = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        result = transform(rows)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> int:
+    args = _parse_args()
+    results: list[dict[str, Any]] = []
+
+    for entity, make_row in CASES:
+        rows = _build_rows(make_row, args.rows, args.seed)
+        row_seconds, row_result = _best_seconds(entity.transform_rows, rows, args.repeat)
+        columnar_seconds, columnar_result = _best_seconds(entity.transform_rows_columnar, rows, args.repeat)
+        result = {
+            "entity": entity.ENTITY_NAME,
+            "rows": args.rows,
+            "row_rows_per_sec": round(args.rows / row_seconds, 1),
+            "columnar_rows_per_sec": round(args.rows / columnar_seconds, 1),
+            "speedup": round(row_seconds / columnar_seconds, 2),
+            "parity": row_result == columnar_result,
+        }
+        results.append(result)
+        if not args.json:
+            print(
+                f"[{result['entity']:>14}] row={result['row_rows_per_sec']} linhas/s "
+                f"columnar={result['columnar_rows_per_sec']} linhas/s "
+                f"speedup={result['speedup']}x paridade={result['parity']}"
+            )
+
+    if args.json:
+        print(json.dumps({"results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
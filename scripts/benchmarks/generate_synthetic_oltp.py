@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Gera dados OLTP sinteticos em escala (`core.*` no SQL Server e/ou Parquet) para testes de carga."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+ETL_DIR = Path(__file__).resolve().parents[2] / "python" / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+from config import ETLConfig  # noqa: E402
+from db import close_quietly, connect_sqlserver  # noqa: E402
+from synthetic_oltp import (  # noqa: E402
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_HISTORY_DAYS,
+    ParquetTableWriter,
+    SyntheticScale,
+    clear_tables,
+    generate_tables,
+    insert_rows,
+    non_empty_tables,
+)
+
+
+TARGET_SQLSERVER = "sqlserver"
+TARGET_PARQUET = "parquet"
+TARGETS = (TARGET_SQLSERVER, TARGET_PARQUET)
+DEFAULT_PARQUET_DIR = Path(__file__).resolve().parents[2] / "data" / "raw" / "synthetic_oltp"
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Gera clientes, produtos, regioes, equipes, vendedores, campanhas, pedidos, itens e "
+            "aplicacoes de desconto coerentes entre si, na escala pedida, e carrega em lote em "
+            "core.* e/ou grava os mesmos dados em Parquet."
+        )
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Fator de escala (1 = volumes do seed base, ~225 mil itens; 45 passa de 10M itens).",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Semente (mesma semente = mesmos dados).")
+    parser.add_argument(
+        "--history-days",
+        type=int,
+        default=DEFAULT_HISTORY_DAYS,
+        help="Janela historica dos pedidos, em dias, terminando agora.",
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Linhas por lote/commit.")
+    parser.add_argument(
+        "--targets",
+        default=",".join(TARGETS),
+        help="Destinos separados por virgula (sqlserver, parquet).",
+    )
+    parser.add_argument(
+        "--parquet-dir",
+        default=str(DEFAULT_PARQUET_DIR),
+        help="Diretorio dos arquivos Parquet (um por tabela).",
+    )
+    parser.add_argument(
+        "--replace",
+        action="store_true",
+        help="Apaga core.* antes da carga (sem a flag, a carga exige tabelas vazias).",
+    )
+    parser.add_argument("--json", action="store_true", help="Emite resultado em JSON.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    targets = [value.strip() for value in args.targets.split(",") if value.strip()]
+    unknown = sorted(set(targets) - set(TARGETS))
+    if unknown or not targets:
+        raise SystemExit(f"Destinos invalidos: {', '.join(unknown) or '(nenhum)'}")
+    scale = SyntheticScale.from_factor(args.scale)
+    end_at = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    if not args.json:
+        print(
+            f"Escala {scale.factor:g}: {scale.customers} clientes, {scale.products} produtos, "
+            f"{scale.orders} pedidos (~{scale.expected_order_items} itens)."
+        )
+
+    oltp_connection = None
+    parquet_writer = None
+    counts: Counter[str] = Counter()
+    started = time.perf_counter()
+    try:
+        if TARGET_SQLSERVER in targets:
+            config = ETLConfig.from_env()
+            oltp_connection = connect_sqlserver(
+                config.oltp_conn_str,
+                command_timeout_seconds=max(config.command_timeout_seconds, 1800),
+            )
+            if args.replace:
+                clear_tables(oltp_connection)
+                oltp_connection.commit()
+            else:
+                occupied = non_empty_tables(oltp_connection)
+                if occupied:
+                    raise SystemExit(
+                        "Tabelas core.* com dados: "
+                        f"{', '.join(occupied)}. Use --replace ou recrie com 01_create_tables_core.sql."
+                    )
+        if TARGET_PARQUET in targets:
+            parquet_writer = ParquetTableWriter(args.parquet_dir)
+
+        for table, rows in generate_tables(
+            scale,
+            seed=args.seed,
+            end_at=end_at,
+            history_days=args.history_days,
+            chunk_size=args.chunk_size,
+        ):
+            if oltp_connection is not None:
+                insert_rows(oltp_connection, table, rows)
+                # Commit por lote: log de transacao limitado ao tamanho do lote.
+                oltp_connection.commit()
+            if parquet_writer is not None:
+                parquet_writer.write(table, rows)
+            counts[table] += len(rows)
+            if not args.json and table == "orders":
+                elapsed = time.perf_counter() - started
+                print(f"  pedidos={counts['orders']}/{scale.orders} itens={counts['order_items']} ({elapsed:,.0f}s)")
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+        if oltp_connection is not None:
+            oltp_connection.rollback()
+        close_quietly(oltp_connection)
+
+    elapsed = time.perf_counter() - started
+    total_rows = sum(counts.values())
+    result = {
+        "scale": scale.factor,
+        "seed": args.seed,
+        "targets": targets,
+        "parquet_dir": args.parquet_dir if TARGET_PARQUET in targets else None,
+        "rows": dict(counts),
+        "total_rows": total_rows,
+        "seconds": round(elapsed, 1),
+        "rows_per_second": round(total_rows / elapsed) if elapsed > 0 else None,
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for table, count in counts.items():
+            print(f"[{table:>22}] {count:>11,} linhas")
+        print(f"Total {total_rows:,} linhas em {elapsed:,.0f}s ({result['rows_per_second'] or 0:,} linhas/s).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Grava lotes reais de `extract_batch` como fixtures para `benchmark_replay.py`."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+ETL_DIR = Path(__file__).resolve().parents[2] / "python" / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+from config import ETLConfig  # noqa: E402
+from db import close_quietly, connect_sqlserver  # noqa: E402
+from entities import get_entity, list_entities_execution_order  # noqa: E402
+from key_cache import KEY_CACHE, LOOKUP_SPECS  # noqa: E402
+from pipeline import utcnow_naive  # noqa: E402
+from replay import KEY_CACHE_FILE, fixture_path, write_fixture  # noqa: E402
+
+
+DEFAULT_FIXTURE_DIR = Path(__file__).resolve().parents[2] / "data" / "raw" / "replay"
+# Inicio da paginacao: os primeiros lotes de cada tabela, sempre os mesmos.
+EPOCH = datetime(1900, 1, 1)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Grava as linhas brutas devolvidas por extract_batch de cada entidade (JSON Lines gzip) "
+            "e o cache de chaves surrogate do DW, para replay sem SQL Server."
+        )
+    )
+    parser.add_argument(
+        "--entities",
+        default="all",
+        help="Entidades separadas por virgula (padrao: todas).",
+    )
+    parser.add_argument("--batch-size", type=int, default=5000, help="Linhas por lote gravado.")
+    parser.add_argument("--batches", type=int, default=4, help="Lotes gravados por entidade.")
+    parser.add_argument(
+        "--output-dir",
+        default=str(DEFAULT_FIXTURE_DIR),
+        help="Diretorio das fixtures (contem dados reais da origem; fora do controle de versao).",
+    )
+    return parser.parse_args()
+
+
+def _record_batches(entity: Any, oltp_connection: Any, *, batch_size: int, batches: int) -> Iterator[list[Any]]:
+    """Pagina do inicio da tabela pelo watermark, como o runner, guardando as linhas brutas."""
+    watermark_updated_at, watermark_id = EPOCH, 0
+    cutoff_updated_at = utcnow_naive()
+    for _ in range(max(1, batches)):
+        rows = list(
+            entity.extract_batch(
+                oltp_connection,
+                watermark_updated_at=watermark_updated_at,
+                watermark_id=watermark_id,
+                cutoff_updated_at=cutoff_updated_at,
+                batch_size=batch_size,
+            )
+        )
+        if not rows:
+            return
+        yield rows
+        transformed, _ = entity.transform_rows(iter(rows))
+        if not transformed or len(rows) < batch_size:
+            return
+        watermark_updated_at, watermark_id = entity.get_batch_watermark(transformed)
+
+
+def main() -> int:
+    args = _parse_args()
+    config = ETLConfig.from_env()
+    entity_names = (
+        list_entities_execution_order()
+        if args.entities == "all"
+        else [name.strip() for name in args.entities.split(",") if name.strip()]
+    )
+    output_dir = Path(args.output_dir)
+
+    oltp_connection = None
+    dw_connection = None
+    try:
+        oltp_connection = connect_sqlserver(config.oltp_conn_str, command_timeout_seconds=config.command_timeout_seconds)
+        dw_connection = connect_sqlserver(config.dw_conn_str, command_timeout_seconds=config.command_timeout_seconds)
+
+        for entity_name in entity_names:
+            entity = get_entity(entity_name)
+            total = write_fixture(
+                fixture_path(output_dir, entity_name),
+                entity_name,
+                _record_batches(entity, oltp_connection, batch_size=args.batch_size, batches=args.batches),
+            )
+            print(f"[{entity_name}] {total} linhas gravadas em {fixture_path(output_dir, entity_name)}")
+        oltp_connection.rollback()
+
+        # Lookups usados pelas fatos no upsert: o replay resolve chaves sem DW.
+        KEY_CACHE.lookups(dw_connection, [spec.name for spec in LOOKUP_SPECS], consumer="replay")
+        dw_connection.rollback()
+        KEY_CACHE.save(output_dir / KEY_CACHE_FILE)
+        print(f"Cache de chaves gravado em {output_dir / KEY_CACHE_FILE}")
+        return 0
+    finally:
+        close_quietly(oltp_connection)
+        close_quietly(dw_connection)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
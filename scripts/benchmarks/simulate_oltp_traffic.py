@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Simula trafego continuo de alteracoes em `core.*` enquanto o ETL roda."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+ETL_DIR = Path(__file__).resolve().parents[2] / "python" / "etl"
+if str(ETL_DIR) not in sys.path:
+    sys.path.insert(0, str(ETL_DIR))
+
+from config import ETLConfig  # noqa: E402
+from db import close_quietly, connect_sqlserver  # noqa: E402
+from synthetic_oltp import (  # noqa: E402
+    OrderFactory,
+    SyntheticScale,
+    apply_traffic,
+    current_max_ids,
+    plan_traffic,
+)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Aplica alteracoes continuas em core.* (avanco de status de pedidos, devolucoes, "
+            "reajuste de precos, clientes alterados/inativados e pedidos novos), em ticks com "
+            "commit, para validar o ETL incremental sob carga."
+        )
+    )
+    parser.add_argument("--rate", type=int, default=200, help="Alteracoes por segundo.")
+    parser.add_argument("--tick-seconds", type=float, default=1.0, help="Intervalo entre commits.")
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=60.0,
+        help="Duracao em segundos (0 = ate Ctrl+C).",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Semente do sorteio (padrao: aleatoria).")
+    parser.add_argument("--json", action="store_true", help="Emite resultado em JSON.")
+    return parser.parse_args()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def main() -> int:
+    args = _parse_args()
+    config = ETLConfig.from_env()
+    rng = random.Random(args.seed)
+    changes_per_tick = max(1, int(round(args.rate * args.tick_seconds)))
+
+    totals: Counter[str] = Counter()
+    ticks = 0
+    started = time.perf_counter()
+    oltp_connection = None
+    try:
+        oltp_connection = connect_sqlserver(config.oltp_conn_str, command_timeout_seconds=config.command_timeout_seconds)
+        max_ids = current_max_ids(oltp_connection)
+        if not max_ids["customers"] or not max_ids["products"]:
+            raise SystemExit("core.customers/core.products vazias. Gere os dados antes do trafego.")
+        # Pedidos novos referenciam os cadastros existentes e continuam os ids atuais.
+        scale = SyntheticScale(
+            factor=0.0,
+            suppliers=max_ids["suppliers"],
+            customers=max_ids["customers"],
+            products=max_ids["products"],
+            sellers=max(1, max_ids["sellers"]),
+            discount_campaigns=max(1, max_ids["discount_campaigns"]),
+            orders=max_ids["orders"],
+        )
+        factory = OrderFactory(
+            scale,
+            rng=rng,
+            next_order_id=max_ids["orders"] + 1,
+            next_item_id=max_ids["order_items"] + 1,
+            next_item_discount_id=max_ids["order_item_discounts"] + 1,
+        )
+
+        while args.duration <= 0 or time.perf_counter() - started < args.duration:
+            tick_started = time.perf_counter()
+            plan = plan_traffic(
+                rng,
+                changes=changes_per_tick,
+                max_ids={
+                    "orders": factory.next_order_id - 1,
+                    "order_items": factory.next_item_id - 1,
+                    "products": max_ids["products"],
+                    "customers": max_ids["customers"],
+                },
+            )
+            affected = apply_traffic(oltp_connection, plan, factory, now=_utcnow())
+            oltp_connection.commit()
+            totals.update(affected)
+            ticks += 1
+            if not args.json:
+                summary = " ".join(f"{kind}={count}" for kind, count in sorted(affected.items()))
+                print(f"[tick {ticks}] {summary} ({(time.perf_counter() - tick_started) * 1000:.0f} ms)")
+            time.sleep(max(0.0, args.tick_seconds - (time.perf_counter() - tick_started)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if oltp_connection is not None:
+            oltp_connection.rollback()
+        close_quietly(oltp_connection)
+
+    elapsed = time.perf_counter() - started
+    result = {
+        "ticks": ticks,
+        "seconds": round(elapsed, 1),
+        "affected": dict(totals),
+        "changes_per_second": round(sum(totals.values()) / elapsed, 1) if elapsed > 0 else None,
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{ticks} ticks em {elapsed:,.0f}s: {sum(totals.values()):,} linhas alteradas.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
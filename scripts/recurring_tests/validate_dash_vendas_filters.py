@@ -204,6 +204,34 @@ def run_checks(app_module) -> tuple[dict[str, Any], list[dict[str, Any]]]:
         }
     )
 
+    sq = app_module.sq
+    connection = app_module._open_connection(conn_str)
+    try:
+        sketch_available = sq.sketch_view_available(connection)
+        sql_sketch = (
+            sq.fetch_order_sketch(connection, sq.SalesFilters(start_date=start_date, end_date=end_date))
+            if sketch_available
+            else {}
+        )
+    finally:
+        connection.close()
+    if sketch_available:
+        # O sketch do SQL Server deve ser identico ao calculado em Python
+        # sobre os mesmos pedidos (hash espelhado) e estimar dentro de 3x o erro tipico.
+        exact_orders = int(base_df["numero_pedido"].nunique())
+        estimate = sq.estimate_distinct_orders(sql_sketch)
+        tests.append(
+            {
+                "test": "sketch_pedidos_hll",
+                "ok": bool(
+                    sql_sketch == sq.build_order_sketch(base_df["numero_pedido"].astype(str))
+                    and abs(estimate - exact_orders) <= max(1.0, exact_orders * 3 * sq.HLL_RELATIVE_ERROR)
+                ),
+                "pedidos_exatos": exact_orders,
+                "pedidos_estimados": round(estimate, 1),
+            }
+        )
+
     missing_df = load(estados=("__ESTADO_INEXISTENTE__",))
     tests.append(
         {
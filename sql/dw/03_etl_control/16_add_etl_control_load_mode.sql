@@ -0,0 +1,50 @@
+-- ========================================
+-- SCRIPT: 16_add_etl_control_load_mode.sql
+-- OBJETIVO: permitir modo de carga por entidade (merge linha a linha ou bulk set-based)
+-- ========================================
+
+USE DW_ECOMMERCE;
+GO
+
+IF OBJECT_ID('ctl.etl_control', 'U') IS NULL
+BEGIN
+    RAISERROR('Tabela ctl.etl_control nao existe. Execute 02_create_etl_control.sql antes.', 16, 1);
+    RETURN;
+END;
+GO
+
+IF COL_LENGTH('ctl.etl_control', 'load_mode') IS NULL
+BEGIN
+    ALTER TABLE ctl.etl_control
+        ADD load_mode VARCHAR(20) NOT NULL
+            CONSTRAINT DF_ctl_etl_control_load_mode DEFAULT ('merge');
+
+    PRINT 'Coluna ctl.etl_control.load_mode criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Coluna ctl.etl_control.load_mode ja existe.';
+END;
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.check_constraints
+    WHERE parent_object_id = OBJECT_ID('ctl.etl_control')
+      AND name = 'CK_ctl_etl_control_load_mode'
+)
+BEGIN
+    ALTER TABLE ctl.etl_control
+        ADD CONSTRAINT CK_ctl_etl_control_load_mode CHECK (load_mode IN ('merge', 'bulk'));
+
+    PRINT 'Constraint CK_ctl_etl_control_load_mode criada.';
+END;
+GO
+
+-- Opt-in por entidade, por exemplo:
+-- UPDATE ctl.etl_control SET load_mode = 'bulk' WHERE entity_name = 'fact_vendas';
+
+SELECT entity_name, batch_size, load_mode
+FROM ctl.etl_control
+ORDER BY entity_name;
+GO
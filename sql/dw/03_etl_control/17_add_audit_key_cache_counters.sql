@@ -0,0 +1,67 @@
+-- ========================================
+-- SCRIPT: 17_add_audit_key_cache_counters.sql
+-- OBJETIVO: registrar hits/misses/refreshes do cache de chaves surrogate por entidade no audit
+-- ========================================
+
+USE DW_ECOMMERCE;
+GO
+
+IF OBJECT_ID('audit.etl_run_entity', 'U') IS NULL
+BEGIN
+    RAISERROR('Tabela audit.etl_run_entity nao existe. Execute 03_create_audit_etl_tables.sql antes.', 16, 1);
+    RETURN;
+END;
+GO
+
+IF COL_LENGTH('audit.etl_run_entity', 'key_cache_hits') IS NULL
+BEGIN
+    ALTER TABLE audit.etl_run_entity
+        ADD key_cache_hits INT NOT NULL
+            CONSTRAINT DF_audit_etl_run_entity_key_cache_hits DEFAULT (0);
+
+    PRINT 'Coluna audit.etl_run_entity.key_cache_hits criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Coluna audit.etl_run_entity.key_cache_hits ja existe.';
+END;
+GO
+
+IF COL_LENGTH('audit.etl_run_entity', 'key_cache_misses') IS NULL
+BEGIN
+    ALTER TABLE audit.etl_run_entity
+        ADD key_cache_misses INT NOT NULL
+            CONSTRAINT DF_audit_etl_run_entity_key_cache_misses DEFAULT (0);
+
+    PRINT 'Coluna audit.etl_run_entity.key_cache_misses criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Coluna audit.etl_run_entity.key_cache_misses ja existe.';
+END;
+GO
+
+IF COL_LENGTH('audit.etl_run_entity', 'key_cache_refreshes') IS NULL
+BEGIN
+    ALTER TABLE audit.etl_run_entity
+        ADD key_cache_refreshes INT NOT NULL
+            CONSTRAINT DF_audit_etl_run_entity_key_cache_refreshes DEFAULT (0);
+
+    PRINT 'Coluna audit.etl_run_entity.key_cache_refreshes criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Coluna audit.etl_run_entity.key_cache_refreshes ja existe.';
+END;
+GO
+
+SELECT TOP (20)
+    run_entity_id,
+    entity_name,
+    status,
+    key_cache_hits,
+    key_cache_misses,
+    key_cache_refreshes
+FROM audit.etl_run_entity
+ORDER BY run_entity_id DESC;
+GO
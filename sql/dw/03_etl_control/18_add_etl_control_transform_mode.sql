@@ -0,0 +1,51 @@
+-- ========================================
+-- SCRIPT: 18_add_etl_control_transform_mode.sql
+-- OBJETIVO: permitir modo de transformacao por entidade (linha a linha ou vetorizado)
+-- ========================================
+
+USE DW_ECOMMERCE;
+GO
+
+IF OBJECT_ID('ctl.etl_control', 'U') IS NULL
+BEGIN
+    RAISERROR('Tabela ctl.etl_control nao existe. Execute 02_create_etl_control.sql antes.', 16, 1);
+    RETURN;
+END;
+GO
+
+IF COL_LENGTH('ctl.etl_control', 'transform_mode') IS NULL
+BEGIN
+    ALTER TABLE ctl.etl_control
+        ADD transform_mode VARCHAR(20) NOT NULL
+            CONSTRAINT DF_ctl_etl_control_transform_mode DEFAULT ('row');
+
+    PRINT 'Coluna ctl.etl_control.transform_mode criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Coluna ctl.etl_control.transform_mode ja existe.';
+END;
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.check_constraints
+    WHERE parent_object_id = OBJECT_ID('ctl.etl_control')
+      AND name = 'CK_ctl_etl_control_transform_mode'
+)
+BEGIN
+    ALTER TABLE ctl.etl_control
+        ADD CONSTRAINT CK_ctl_etl_control_transform_mode CHECK (transform_mode IN ('row', 'columnar'));
+
+    PRINT 'Constraint CK_ctl_etl_control_transform_mode criada.';
+END;
+GO
+
+-- Opt-in por entidade (somente fact_vendas, fact_metas e fact_descontos
+-- possuem transformacao vetorizada; as demais seguem linha a linha):
+-- UPDATE ctl.etl_control SET transform_mode = 'columnar' WHERE entity_name = 'fact_vendas';
+
+SELECT entity_name, batch_size, load_mode, transform_mode
+FROM ctl.etl_control
+ORDER BY entity_name;
+GO
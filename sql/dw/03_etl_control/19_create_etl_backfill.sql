@@ -0,0 +1,111 @@
+-- ========================================
+-- SCRIPT: 19_create_etl_backfill.sql
+-- OBJETIVO: controlar carga inicial (backfill) particionada por faixa de id,
+--           com progresso por particao para retomada apos falha
+-- ========================================
+
+USE DW_ECOMMERCE;
+GO
+
+IF OBJECT_ID('ctl.etl_control', 'U') IS NULL
+BEGIN
+    RAISERROR('Tabela ctl.etl_control nao existe. Execute 02_create_etl_control.sql antes.', 16, 1);
+    RETURN;
+END;
+GO
+
+IF OBJECT_ID('ctl.etl_backfill', 'U') IS NULL
+BEGIN
+    CREATE TABLE ctl.etl_backfill
+    (
+        backfill_id BIGINT IDENTITY(1,1) NOT NULL,
+        entity_name VARCHAR(100) NOT NULL,
+        status VARCHAR(20) NOT NULL
+            CONSTRAINT DF_ctl_etl_backfill_status DEFAULT ('running'),
+        cutoff_updated_at DATETIME2(3) NOT NULL,
+        id_min BIGINT NOT NULL,
+        id_max BIGINT NOT NULL,
+        partition_count INT NOT NULL,
+        started_run_id BIGINT NULL,
+        last_run_id BIGINT NULL,
+        started_at DATETIME2(0) NOT NULL
+            CONSTRAINT DF_ctl_etl_backfill_started_at DEFAULT SYSUTCDATETIME(),
+        finished_at DATETIME2(0) NULL,
+        updated_at DATETIME2(0) NOT NULL
+            CONSTRAINT DF_ctl_etl_backfill_updated_at DEFAULT SYSUTCDATETIME(),
+        CONSTRAINT PK_ctl_etl_backfill PRIMARY KEY CLUSTERED (backfill_id),
+        CONSTRAINT FK_ctl_etl_backfill_entity FOREIGN KEY (entity_name)
+            REFERENCES ctl.etl_control (entity_name),
+        CONSTRAINT CK_ctl_etl_backfill_status CHECK (status IN ('running', 'failed', 'success')),
+        CONSTRAINT CK_ctl_etl_backfill_partition_count CHECK (partition_count >= 1)
+    );
+
+    PRINT 'Tabela ctl.etl_backfill criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Tabela ctl.etl_backfill ja existe.';
+END;
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE object_id = OBJECT_ID('ctl.etl_backfill')
+      AND name = 'IX_ctl_etl_backfill_entity_status'
+)
+BEGIN
+    CREATE NONCLUSTERED INDEX IX_ctl_etl_backfill_entity_status
+        ON ctl.etl_backfill (entity_name, status, backfill_id);
+
+    PRINT 'Indice IX_ctl_etl_backfill_entity_status criado.';
+END;
+GO
+
+IF OBJECT_ID('ctl.etl_backfill_partition', 'U') IS NULL
+BEGIN
+    CREATE TABLE ctl.etl_backfill_partition
+    (
+        backfill_id BIGINT NOT NULL,
+        partition_number INT NOT NULL,
+        id_from BIGINT NOT NULL,
+        id_to BIGINT NOT NULL,
+        status VARCHAR(20) NOT NULL
+            CONSTRAINT DF_ctl_etl_backfill_partition_status DEFAULT ('pending'),
+        last_id BIGINT NOT NULL,
+        max_source_updated_at DATETIME2(3) NULL,
+        max_source_id BIGINT NULL,
+        extracted_count BIGINT NOT NULL
+            CONSTRAINT DF_ctl_etl_backfill_partition_extracted DEFAULT (0),
+        upserted_count BIGINT NOT NULL
+            CONSTRAINT DF_ctl_etl_backfill_partition_upserted DEFAULT (0),
+        error_message NVARCHAR(4000) NULL,
+        updated_at DATETIME2(0) NOT NULL
+            CONSTRAINT DF_ctl_etl_backfill_partition_updated_at DEFAULT SYSUTCDATETIME(),
+        CONSTRAINT PK_ctl_etl_backfill_partition PRIMARY KEY CLUSTERED (backfill_id, partition_number),
+        CONSTRAINT FK_ctl_etl_backfill_partition_backfill FOREIGN KEY (backfill_id)
+            REFERENCES ctl.etl_backfill (backfill_id),
+        CONSTRAINT CK_ctl_etl_backfill_partition_status CHECK (
+            status IN ('pending', 'running', 'failed', 'success')
+        ),
+        CONSTRAINT CK_ctl_etl_backfill_partition_range CHECK (id_from < id_to)
+    );
+
+    PRINT 'Tabela ctl.etl_backfill_partition criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Tabela ctl.etl_backfill_partition ja existe.';
+END;
+GO
+
+-- Acompanhamento de um backfill em andamento:
+-- SELECT partition_number, status, id_from, id_to, last_id, extracted_count, upserted_count
+-- FROM ctl.etl_backfill_partition
+-- WHERE backfill_id = (SELECT MAX(backfill_id) FROM ctl.etl_backfill WHERE entity_name = 'fact_vendas')
+-- ORDER BY partition_number;
+
+SELECT backfill_id, entity_name, status, partition_count, started_at, finished_at
+FROM ctl.etl_backfill
+ORDER BY backfill_id DESC;
+GO
@@ -0,0 +1,86 @@
+-- ========================================
+-- SCRIPT: 20_add_etl_control_adaptive_batch.sql
+-- OBJETIVO: permitir batch adaptativo por entidade (limites e duracao alvo por lote);
+--           o tamanho em que o runner estabiliza e gravado de volta em batch_size
+-- ========================================
+
+USE DW_ECOMMERCE;
+GO
+
+IF OBJECT_ID('ctl.etl_control', 'U') IS NULL
+BEGIN
+    RAISERROR('Tabela ctl.etl_control nao existe. Execute 02_create_etl_control.sql antes.', 16, 1);
+    RETURN;
+END;
+GO
+
+IF COL_LENGTH('ctl.etl_control', 'adaptive_batch_size') IS NULL
+BEGIN
+    ALTER TABLE ctl.etl_control
+        ADD adaptive_batch_size BIT NOT NULL
+            CONSTRAINT DF_ctl_etl_control_adaptive_batch_size DEFAULT (0);
+
+    PRINT 'Coluna ctl.etl_control.adaptive_batch_size criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Coluna ctl.etl_control.adaptive_batch_size ja existe.';
+END;
+GO
+
+IF COL_LENGTH('ctl.etl_control', 'batch_size_min') IS NULL
+BEGIN
+    ALTER TABLE ctl.etl_control
+        ADD batch_size_min INT NULL;
+
+    PRINT 'Coluna ctl.etl_control.batch_size_min criada.';
+END;
+GO
+
+IF COL_LENGTH('ctl.etl_control', 'batch_size_max') IS NULL
+BEGIN
+    ALTER TABLE ctl.etl_control
+        ADD batch_size_max INT NULL;
+
+    PRINT 'Coluna ctl.etl_control.batch_size_max criada.';
+END;
+GO
+
+IF COL_LENGTH('ctl.etl_control', 'target_batch_seconds') IS NULL
+BEGIN
+    ALTER TABLE ctl.etl_control
+        ADD target_batch_seconds INT NULL;
+
+    PRINT 'Coluna ctl.etl_control.target_batch_seconds criada.';
+END;
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.check_constraints
+    WHERE parent_object_id = OBJECT_ID('ctl.etl_control')
+      AND name = 'CK_ctl_etl_control_adaptive_batch_bounds'
+)
+BEGIN
+    ALTER TABLE ctl.etl_control
+        ADD CONSTRAINT CK_ctl_etl_control_adaptive_batch_bounds CHECK (
+            (batch_size_min IS NULL OR batch_size_min BETWEEN 1 AND 100000)
+            AND (batch_size_max IS NULL OR batch_size_max BETWEEN 1 AND 100000)
+            AND (batch_size_min IS NULL OR batch_size_max IS NULL OR batch_size_min <= batch_size_max)
+            AND (target_batch_seconds IS NULL OR target_batch_seconds BETWEEN 1 AND 3600)
+        );
+
+    PRINT 'Constraint CK_ctl_etl_control_adaptive_batch_bounds criada.';
+END;
+GO
+
+-- Opt-in por entidade (limites nulos usam ETL_ADAPTIVE_BATCH_MIN/MAX e
+-- ETL_TARGET_BATCH_SECONDS), por exemplo:
+-- UPDATE ctl.etl_control
+--    SET adaptive_batch_size = 1, batch_size_min = 500, batch_size_max = 50000, target_batch_seconds = 10
+--  WHERE entity_name = 'fact_vendas';
+
+SELECT entity_name, batch_size, adaptive_batch_size, batch_size_min, batch_size_max, target_batch_seconds
+FROM ctl.etl_control
+ORDER BY entity_name;
+GO
@@ -0,0 +1,88 @@
+-- ========================================
+-- SCRIPT: 21_create_audit_etl_batch_metrics.sql
+-- OBJETIVO: registrar tempos por etapa (extracao, transformacao, upsert, commit),
+--           vazao, bytes lidos e pico de memoria de cada lote do ETL
+-- ========================================
+
+USE DW_ECOMMERCE;
+GO
+
+IF OBJECT_ID('audit.etl_run_entity', 'U') IS NULL
+BEGIN
+    RAISERROR('Tabela audit.etl_run_entity nao existe. Execute 03_create_audit_etl_tables.sql antes.', 16, 1);
+    RETURN;
+END;
+GO
+
+IF OBJECT_ID('audit.etl_batch_metrics', 'U') IS NULL
+BEGIN
+    CREATE TABLE audit.etl_batch_metrics
+    (
+        batch_metrics_id BIGINT IDENTITY(1,1) NOT NULL,
+        run_entity_id BIGINT NOT NULL,
+        batch_number INT NOT NULL,
+        batch_size INT NOT NULL,
+        extracted_count INT NOT NULL,
+        upserted_count INT NOT NULL,
+        extract_ms INT NOT NULL,
+        transform_ms INT NOT NULL,
+        upsert_ms INT NOT NULL,
+        commit_ms INT NOT NULL,
+        total_ms AS (extract_ms + transform_ms + upsert_ms + commit_ms) PERSISTED,
+        rows_per_second DECIMAL(18,2) NULL,
+        fetched_bytes BIGINT NOT NULL,
+        peak_rss_bytes BIGINT NULL,
+        recorded_at DATETIME2(3) NOT NULL
+            CONSTRAINT DF_audit_etl_batch_metrics_recorded_at DEFAULT SYSUTCDATETIME(),
+        CONSTRAINT PK_audit_etl_batch_metrics PRIMARY KEY CLUSTERED (batch_metrics_id),
+        CONSTRAINT FK_audit_etl_batch_metrics_run_entity FOREIGN KEY (run_entity_id)
+            REFERENCES audit.etl_run_entity (run_entity_id),
+        CONSTRAINT UQ_audit_etl_batch_metrics UNIQUE (run_entity_id, batch_number),
+        CONSTRAINT CK_audit_etl_batch_metrics_values CHECK (
+            batch_number >= 1
+            AND extracted_count >= 0 AND upserted_count >= 0
+            AND extract_ms >= 0 AND transform_ms >= 0 AND upsert_ms >= 0 AND commit_ms >= 0
+            AND fetched_bytes >= 0
+        )
+    );
+
+    PRINT 'Tabela audit.etl_batch_metrics criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Tabela audit.etl_batch_metrics ja existe.';
+END;
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE object_id = OBJECT_ID('audit.etl_batch_metrics')
+      AND name = 'IX_audit_etl_batch_metrics_recorded_at'
+)
+BEGIN
+    CREATE NONCLUSTERED INDEX IX_audit_etl_batch_metrics_recorded_at
+        ON audit.etl_batch_metrics (recorded_at)
+        INCLUDE (run_entity_id, extract_ms, transform_ms, upsert_ms, commit_ms, rows_per_second);
+
+    PRINT 'Indice IX_audit_etl_batch_metrics_recorded_at criado.';
+END;
+GO
+
+SELECT TOP (20)
+    bm.run_entity_id,
+    re.entity_name,
+    bm.batch_number,
+    bm.extracted_count,
+    bm.extract_ms,
+    bm.transform_ms,
+    bm.upsert_ms,
+    bm.commit_ms,
+    bm.rows_per_second,
+    bm.fetched_bytes,
+    bm.peak_rss_bytes
+FROM audit.etl_batch_metrics AS bm
+INNER JOIN audit.etl_run_entity AS re
+    ON re.run_entity_id = bm.run_entity_id
+ORDER BY bm.batch_metrics_id DESC;
+GO
@@ -0,0 +1,41 @@
+-- ========================================
+-- SCRIPT: 22_add_audit_checkpoint_count.sql
+-- OBJETIVO: registrar quantos checkpoints de watermark (upsert + watermark no
+--           mesmo commit) cada execucao de entidade gravou
+-- ========================================
+
+USE DW_ECOMMERCE;
+GO
+
+IF OBJECT_ID('audit.etl_run_entity', 'U') IS NULL
+BEGIN
+    RAISERROR('Tabela audit.etl_run_entity nao existe. Execute 03_create_audit_etl_tables.sql antes.', 16, 1);
+    RETURN;
+END;
+GO
+
+IF COL_LENGTH('audit.etl_run_entity', 'checkpoint_count') IS NULL
+BEGIN
+    ALTER TABLE audit.etl_run_entity
+        ADD checkpoint_count INT NOT NULL
+            CONSTRAINT DF_audit_etl_run_entity_checkpoint_count DEFAULT (0);
+
+    PRINT 'Coluna audit.etl_run_entity.checkpoint_count criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Coluna audit.etl_run_entity.checkpoint_count ja existe.';
+END;
+GO
+
+SELECT TOP (20)
+    run_entity_id,
+    entity_name,
+    status,
+    extracted_count,
+    checkpoint_count,
+    watermark_to_updated_at,
+    watermark_to_id
+FROM audit.etl_run_entity
+ORDER BY run_entity_id DESC;
+GO
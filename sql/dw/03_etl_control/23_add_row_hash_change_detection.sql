@@ -0,0 +1,81 @@
+-- ========================================
+-- SCRIPT: 23_add_row_hash_change_detection.sql
+-- OBJETIVO: adicionar row_hash (hash de conteudo por linha) nas tabelas
+--           carregadas pelo ETL, para que o MERGE nao reescreva linhas sem
+--           mudanca, e registrar quantas linhas foram ignoradas por execucao
+-- ========================================
+
+USE DW_ECOMMERCE;
+GO
+
+IF OBJECT_ID('audit.etl_run_entity', 'U') IS NULL
+BEGIN
+    RAISERROR('Tabela audit.etl_run_entity nao existe. Execute 03_create_audit_etl_tables.sql antes.', 16, 1);
+    RETURN;
+END;
+GO
+
+DECLARE @targets TABLE (table_name SYSNAME NOT NULL PRIMARY KEY);
+INSERT INTO @targets (table_name)
+VALUES
+    ('dim.DIM_CLIENTE'),
+    ('dim.DIM_PRODUTO'),
+    ('dim.DIM_REGIAO'),
+    ('dim.DIM_EQUIPE'),
+    ('dim.DIM_VENDEDOR'),
+    ('dim.DIM_DESCONTO'),
+    ('fact.FACT_VENDAS'),
+    ('fact.FACT_METAS'),
+    ('fact.FACT_DESCONTOS');
+
+DECLARE @table_name SYSNAME;
+DECLARE @sql NVARCHAR(MAX);
+
+SELECT @table_name = MIN(table_name) FROM @targets;
+WHILE @table_name IS NOT NULL
+BEGIN
+    IF OBJECT_ID(@table_name, 'U') IS NULL
+    BEGIN
+        PRINT CONCAT('Tabela ', @table_name, ' nao existe; row_hash nao adicionado.');
+    END
+    ELSE IF COL_LENGTH(@table_name, 'row_hash') IS NULL
+    BEGIN
+        -- NULL ate a proxima carga da linha: o MERGE trata NULL como alterado.
+        SET @sql = N'ALTER TABLE ' + @table_name + N' ADD row_hash BINARY(16) NULL;';
+        EXEC sys.sp_executesql @sql;
+
+        PRINT CONCAT('Coluna ', @table_name, '.row_hash criada.');
+    END
+    ELSE
+    BEGIN
+        PRINT CONCAT('Coluna ', @table_name, '.row_hash ja existe.');
+    END;
+
+    SELECT @table_name = MIN(table_name) FROM @targets WHERE table_name > @table_name;
+END;
+GO
+
+IF COL_LENGTH('audit.etl_run_entity', 'unchanged_count') IS NULL
+BEGIN
+    ALTER TABLE audit.etl_run_entity
+        ADD unchanged_count INT NOT NULL
+            CONSTRAINT DF_audit_etl_run_entity_unchanged_count DEFAULT (0);
+
+    PRINT 'Coluna audit.etl_run_entity.unchanged_count criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Coluna audit.etl_run_entity.unchanged_count ja existe.';
+END;
+GO
+
+SELECT TOP (20)
+    run_entity_id,
+    entity_name,
+    status,
+    extracted_count,
+    upserted_count,
+    unchanged_count
+FROM audit.etl_run_entity
+ORDER BY run_entity_id DESC;
+GO
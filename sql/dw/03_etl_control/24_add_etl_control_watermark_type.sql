@@ -0,0 +1,66 @@
+-- ========================================
+-- SCRIPT: 24_add_etl_control_watermark_type.sql
+-- OBJETIVO: permitir watermark por rowversion da origem (sem cutoff por relogio)
+--           como alternativa ao par updated_at + id
+-- ========================================
+
+USE DW_ECOMMERCE;
+GO
+
+IF OBJECT_ID('ctl.etl_control', 'U') IS NULL
+BEGIN
+    RAISERROR('Tabela ctl.etl_control nao existe. Execute 02_create_etl_control.sql antes.', 16, 1);
+    RETURN;
+END;
+GO
+
+IF COL_LENGTH('ctl.etl_control', 'watermark_type') IS NULL
+BEGIN
+    ALTER TABLE ctl.etl_control
+        ADD watermark_type VARCHAR(20) NOT NULL
+            CONSTRAINT DF_ctl_etl_control_watermark_type DEFAULT ('updated_at');
+
+    PRINT 'Coluna ctl.etl_control.watermark_type criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Coluna ctl.etl_control.watermark_type ja existe.';
+END;
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.check_constraints
+    WHERE parent_object_id = OBJECT_ID('ctl.etl_control')
+      AND name = 'CK_ctl_etl_control_watermark_type'
+)
+BEGIN
+    ALTER TABLE ctl.etl_control
+        ADD CONSTRAINT CK_ctl_etl_control_watermark_type CHECK (watermark_type IN ('updated_at', 'rowversion'));
+
+    PRINT 'Constraint CK_ctl_etl_control_watermark_type criada.';
+END;
+GO
+
+-- Ultimo row_version (CAST para BIGINT) confirmado no DW; NULL = desde o inicio.
+IF COL_LENGTH('ctl.etl_control', 'watermark_version') IS NULL
+BEGIN
+    ALTER TABLE ctl.etl_control
+        ADD watermark_version BIGINT NULL;
+
+    PRINT 'Coluna ctl.etl_control.watermark_version criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Coluna ctl.etl_control.watermark_version ja existe.';
+END;
+GO
+
+-- Opt-in por entidade (exige sql/oltp/01_ddl/02_add_row_version.sql na origem;
+-- fact_vendas e fact_descontos seguem somente por updated_at):
+-- UPDATE ctl.etl_control SET watermark_type = 'rowversion' WHERE entity_name = 'dim_cliente';
+
+SELECT entity_name, watermark_type, watermark_updated_at, watermark_id, watermark_version, cutoff_minutes
+FROM ctl.etl_control
+ORDER BY entity_name;
+GO
@@ -0,0 +1,102 @@
+-- ========================================
+-- SCRIPT: 25_add_etl_daemon_mode.sql
+-- OBJETIVO: suportar o modo continuo do runner (`run_etl.py --daemon`):
+--           intervalo de consulta por entidade e heartbeat do processo
+-- ========================================
+
+USE DW_ECOMMERCE;
+GO
+
+IF OBJECT_ID('ctl.etl_control', 'U') IS NULL
+BEGIN
+    RAISERROR('Tabela ctl.etl_control nao existe. Execute 02_create_etl_control.sql antes.', 16, 1);
+    RETURN;
+END;
+GO
+
+-- Segundos entre consultas de backlog da entidade no modo daemon; NULL = padrao do runner.
+IF COL_LENGTH('ctl.etl_control', 'poll_interval_seconds') IS NULL
+BEGIN
+    ALTER TABLE ctl.etl_control
+        ADD poll_interval_seconds INT NULL;
+
+    PRINT 'Coluna ctl.etl_control.poll_interval_seconds criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Coluna ctl.etl_control.poll_interval_seconds ja existe.';
+END;
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.check_constraints
+    WHERE parent_object_id = OBJECT_ID('ctl.etl_control')
+      AND name = 'CK_ctl_etl_control_poll_interval_seconds'
+)
+BEGIN
+    ALTER TABLE ctl.etl_control
+        ADD CONSTRAINT CK_ctl_etl_control_poll_interval_seconds
+            CHECK (poll_interval_seconds IS NULL OR poll_interval_seconds >= 1);
+
+    PRINT 'Constraint CK_ctl_etl_control_poll_interval_seconds criada.';
+END;
+GO
+
+-- Uma linha por processo daemon, atualizada a cada ciclo (inclusive ciclos sem
+-- backlog, que nao abrem audit.etl_run).
+IF OBJECT_ID('audit.etl_daemon_heartbeat', 'U') IS NULL
+BEGIN
+    CREATE TABLE audit.etl_daemon_heartbeat
+    (
+        daemon_id BIGINT IDENTITY(1,1) NOT NULL,
+        entities_requested VARCHAR(4000) NOT NULL,
+        started_by VARCHAR(128) NOT NULL,
+        host_name VARCHAR(128) NOT NULL,
+        process_id INT NOT NULL,
+        started_at DATETIME2(3) NOT NULL
+            CONSTRAINT DF_audit_etl_daemon_heartbeat_started_at DEFAULT SYSUTCDATETIME(),
+        last_heartbeat_at DATETIME2(3) NOT NULL
+            CONSTRAINT DF_audit_etl_daemon_heartbeat_last_heartbeat_at DEFAULT SYSUTCDATETIME(),
+        finished_at DATETIME2(3) NULL,
+        status VARCHAR(20) NOT NULL,
+        cycles_count BIGINT NOT NULL
+            CONSTRAINT DF_audit_etl_daemon_heartbeat_cycles_count DEFAULT (0),
+        runs_count BIGINT NOT NULL
+            CONSTRAINT DF_audit_etl_daemon_heartbeat_runs_count DEFAULT (0),
+        last_run_id BIGINT NULL,
+        last_loop_ms INT NULL,
+        max_loop_ms INT NULL,
+        last_lag_ms INT NULL,
+        error_message NVARCHAR(4000) NULL,
+        CONSTRAINT PK_audit_etl_daemon_heartbeat PRIMARY KEY CLUSTERED (daemon_id),
+        CONSTRAINT CK_audit_etl_daemon_heartbeat_status CHECK (status IN ('running', 'stopped', 'failed'))
+    );
+
+    PRINT 'Tabela audit.etl_daemon_heartbeat criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Tabela audit.etl_daemon_heartbeat ja existe.';
+END;
+GO
+
+-- Exemplo: fact_vendas consultada a cada 5 segundos no modo daemon.
+-- UPDATE ctl.etl_control SET poll_interval_seconds = 5 WHERE entity_name = 'fact_vendas';
+
+SELECT TOP (20)
+    daemon_id,
+    host_name,
+    process_id,
+    status,
+    started_at,
+    last_heartbeat_at,
+    cycles_count,
+    runs_count,
+    last_run_id,
+    last_loop_ms,
+    max_loop_ms,
+    last_lag_ms
+FROM audit.etl_daemon_heartbeat
+ORDER BY daemon_id DESC;
+GO
@@ -0,0 +1,115 @@
+-- ========================================
+-- SCRIPT: 26_create_audit_etl_freshness_histogram.sql
+-- OBJETIVO: histograma por lote do frescor ponta a ponta (commit no DW menos
+--           source_updated_at de cada linha gravada) e percentis por entidade
+-- ========================================
+
+USE DW_ECOMMERCE;
+GO
+
+IF OBJECT_ID('audit.etl_run_entity', 'U') IS NULL
+BEGIN
+    RAISERROR('Tabela audit.etl_run_entity nao existe. Execute 03_create_audit_etl_tables.sql antes.', 16, 1);
+    RETURN;
+END;
+GO
+
+-- Uma linha por faixa nao vazia de cada lote. bucket_upper_seconds e o limite
+-- superior (inclusivo) da faixa; 2147483647 = acima de 7 dias.
+IF OBJECT_ID('audit.etl_freshness_histogram', 'U') IS NULL
+BEGIN
+    CREATE TABLE audit.etl_freshness_histogram
+    (
+        freshness_histogram_id BIGINT IDENTITY(1,1) NOT NULL,
+        run_entity_id BIGINT NOT NULL,
+        batch_number INT NOT NULL,
+        committed_at DATETIME2(3) NOT NULL,
+        bucket_upper_seconds INT NOT NULL,
+        row_count INT NOT NULL,
+        CONSTRAINT PK_audit_etl_freshness_histogram PRIMARY KEY CLUSTERED (freshness_histogram_id),
+        CONSTRAINT FK_audit_etl_freshness_histogram_run_entity FOREIGN KEY (run_entity_id)
+            REFERENCES audit.etl_run_entity (run_entity_id),
+        CONSTRAINT UQ_audit_etl_freshness_histogram UNIQUE (run_entity_id, batch_number, bucket_upper_seconds),
+        CONSTRAINT CK_audit_etl_freshness_histogram_values CHECK (
+            batch_number >= 1 AND bucket_upper_seconds >= 1 AND row_count > 0
+        )
+    );
+
+    PRINT 'Tabela audit.etl_freshness_histogram criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Tabela audit.etl_freshness_histogram ja existe.';
+END;
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE object_id = OBJECT_ID('audit.etl_freshness_histogram')
+      AND name = 'IX_audit_etl_freshness_histogram_committed_at'
+)
+BEGIN
+    CREATE NONCLUSTERED INDEX IX_audit_etl_freshness_histogram_committed_at
+        ON audit.etl_freshness_histogram (committed_at)
+        INCLUDE (run_entity_id, bucket_upper_seconds, row_count);
+
+    PRINT 'Indice IX_audit_etl_freshness_histogram_committed_at criado.';
+END;
+GO
+
+-- Percentis das ultimas 24 horas por entidade. Cada percentil e o limite
+-- superior da primeira faixa cuja contagem acumulada alcanca o percentual,
+-- ou seja, "p95 <= N segundos".
+CREATE OR ALTER VIEW audit.vw_etl_freshness_percentiles
+AS
+WITH recent AS
+(
+    SELECT
+        re.entity_name,
+        h.bucket_upper_seconds,
+        SUM(CAST(h.row_count AS BIGINT)) AS row_count,
+        MAX(h.committed_at) AS last_committed_at
+    FROM audit.etl_freshness_histogram AS h
+    INNER JOIN audit.etl_run_entity AS re
+        ON re.run_entity_id = h.run_entity_id
+    WHERE h.committed_at >= DATEADD(HOUR, -24, SYSUTCDATETIME())
+    GROUP BY
+        re.entity_name,
+        h.bucket_upper_seconds
+),
+cumulative AS
+(
+    SELECT
+        entity_name,
+        bucket_upper_seconds,
+        last_committed_at,
+        SUM(row_count) OVER (
+            PARTITION BY entity_name
+            ORDER BY bucket_upper_seconds
+            ROWS UNBOUNDED PRECEDING
+        ) AS cumulative_rows,
+        SUM(row_count) OVER (PARTITION BY entity_name) AS total_rows
+    FROM recent
+)
+SELECT
+    entity_name,
+    MAX(total_rows) AS sample_rows,
+    MIN(CASE WHEN cumulative_rows >= 0.50 * total_rows THEN bucket_upper_seconds END) AS p50_seconds,
+    MIN(CASE WHEN cumulative_rows >= 0.95 * total_rows THEN bucket_upper_seconds END) AS p95_seconds,
+    MIN(CASE WHEN cumulative_rows >= 0.99 * total_rows THEN bucket_upper_seconds END) AS p99_seconds,
+    MAX(last_committed_at) AS last_committed_at
+FROM cumulative
+GROUP BY entity_name;
+GO
+
+SELECT
+    entity_name,
+    sample_rows,
+    p50_seconds,
+    p95_seconds,
+    p99_seconds,
+    last_committed_at
+FROM audit.vw_etl_freshness_percentiles
+ORDER BY entity_name;
+GO
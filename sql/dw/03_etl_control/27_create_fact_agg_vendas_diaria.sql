@@ -0,0 +1,138 @@
+-- ========================================
+-- SCRIPT: 27_create_fact_agg_vendas_diaria.sql
+-- OBJETIVO: agregado diario de vendas (dia x produto x regiao x vendedor)
+--           mantido incrementalmente pelo ETL de fact_vendas e view de
+--           consumo com os mesmos nomes de coluna de fact.VW_DASH_VENDAS_R1
+-- ========================================
+
+USE DW_ECOMMERCE;
+GO
+
+IF OBJECT_ID('fact.FACT_VENDAS', 'U') IS NULL
+BEGIN
+    RAISERROR('Tabela fact.FACT_VENDAS nao existe. Execute 13_ensure_fact_vendas_table.sql antes.', 16, 1);
+    RETURN;
+END;
+GO
+
+-- vendedor_id = 0 agrupa as vendas sem vendedor (a chave primaria nao aceita NULL).
+-- Todas as medidas sao aditivas: o ETL soma o delta de cada lote
+-- (imagem nova menos imagem anterior das vendas gravadas).
+IF OBJECT_ID('fact.AGG_VENDAS_DIARIA', 'U') IS NULL
+BEGIN
+    CREATE TABLE fact.AGG_VENDAS_DIARIA
+    (
+        data_id INT NOT NULL,
+        produto_id INT NOT NULL,
+        regiao_id INT NOT NULL,
+        vendedor_id INT NOT NULL,
+        linhas BIGINT NOT NULL,
+        quantidade_vendida BIGINT NOT NULL,
+        valor_total_bruto DECIMAL(19,2) NOT NULL,
+        valor_total_descontos DECIMAL(19,2) NOT NULL,
+        valor_total_liquido DECIMAL(19,2) NOT NULL,
+        custo_total DECIMAL(19,2) NOT NULL,
+        margem_bruta DECIMAL(19,2) NOT NULL,
+        quantidade_devolvida BIGINT NOT NULL,
+        valor_devolvido DECIMAL(19,2) NOT NULL,
+        valor_comissao DECIMAL(19,2) NOT NULL,
+        data_atualizacao DATETIME2(3) NOT NULL
+            CONSTRAINT DF_AGG_VENDAS_DIARIA_data_atualizacao DEFAULT SYSUTCDATETIME(),
+        CONSTRAINT PK_AGG_VENDAS_DIARIA PRIMARY KEY CLUSTERED (data_id, produto_id, regiao_id, vendedor_id),
+        CONSTRAINT CK_AGG_VENDAS_DIARIA_linhas CHECK (linhas > 0)
+    );
+
+    PRINT 'Tabela fact.AGG_VENDAS_DIARIA criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Tabela fact.AGG_VENDAS_DIARIA ja existe.';
+END;
+GO
+
+-- Carga inicial a partir da fato; depois disso so o ETL (ou
+-- `run_etl.py --sales-aggregate rebuild`) escreve na tabela.
+IF NOT EXISTS (SELECT 1 FROM fact.AGG_VENDAS_DIARIA)
+BEGIN
+    INSERT INTO fact.AGG_VENDAS_DIARIA
+    (
+        data_id,
+        produto_id,
+        regiao_id,
+        vendedor_id,
+        linhas,
+        quantidade_vendida,
+        valor_total_bruto,
+        valor_total_descontos,
+        valor_total_liquido,
+        custo_total,
+        margem_bruta,
+        quantidade_devolvida,
+        valor_devolvido,
+        valor_comissao,
+        data_atualizacao
+    )
+    SELECT
+        fv.data_id,
+        fv.produto_id,
+        fv.regiao_id,
+        ISNULL(fv.vendedor_id, 0),
+        COUNT_BIG(*),
+        SUM(CAST(fv.quantidade_vendida AS BIGINT)),
+        SUM(fv.valor_total_bruto),
+        SUM(fv.valor_total_descontos),
+        SUM(fv.valor_total_liquido),
+        SUM(fv.custo_total),
+        SUM(fv.valor_total_liquido - fv.custo_total),
+        SUM(CAST(fv.quantidade_devolvida AS BIGINT)),
+        SUM(fv.valor_devolvido),
+        SUM(ISNULL(fv.valor_comissao, 0)),
+        SYSUTCDATETIME()
+    FROM fact.FACT_VENDAS AS fv
+    GROUP BY
+        fv.data_id,
+        fv.produto_id,
+        fv.regiao_id,
+        ISNULL(fv.vendedor_id, 0);
+
+    PRINT CONCAT('Carga inicial de fact.AGG_VENDAS_DIARIA: ', @@ROWCOUNT, ' grupos.');
+END;
+GO
+
+CREATE OR ALTER VIEW fact.VW_AGG_VENDAS_DIARIA
+AS
+SELECT
+    a.data_id,
+    d.data_completa,
+    d.ano,
+    d.mes,
+    a.produto_id,
+    p.nome_produto,
+    p.categoria,
+    p.subcategoria,
+    a.regiao_id,
+    r.estado,
+    r.regiao_pais,
+    NULLIF(a.vendedor_id, 0) AS vendedor_id,
+    v.nome_vendedor,
+    v.nome_equipe,
+    a.linhas,
+    a.quantidade_vendida,
+    a.valor_total_bruto,
+    a.valor_total_descontos,
+    a.valor_total_liquido,
+    a.custo_total,
+    a.margem_bruta,
+    a.quantidade_devolvida,
+    a.valor_devolvido,
+    a.valor_comissao,
+    a.data_atualizacao
+FROM fact.AGG_VENDAS_DIARIA AS a
+INNER JOIN dim.DIM_DATA AS d ON d.data_id = a.data_id
+INNER JOIN dim.DIM_PRODUTO AS p ON p.produto_id = a.produto_id
+INNER JOIN dim.DIM_REGIAO AS r ON r.regiao_id = a.regiao_id
+LEFT JOIN dim.DIM_VENDEDOR AS v ON v.vendedor_id = NULLIF(a.vendedor_id, 0);
+GO
+
+PRINT 'View fact.VW_AGG_VENDAS_DIARIA pronta para consumo.';
+GO
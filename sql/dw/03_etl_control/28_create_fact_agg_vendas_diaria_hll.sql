@@ -0,0 +1,140 @@
+-- ========================================
+-- SCRIPT: 28_create_fact_agg_vendas_diaria_hll.sql
+-- OBJETIVO: sketch HyperLogLog de numero_pedido por celula de
+--           fact.AGG_VENDAS_DIARIA, para contar pedidos distintos (ticket
+--           medio) a partir do agregado, sem ler as linhas da fato
+-- ========================================
+
+USE DW_ECOMMERCE;
+GO
+
+IF OBJECT_ID('fact.AGG_VENDAS_DIARIA', 'U') IS NULL
+BEGIN
+    RAISERROR('Tabela fact.AGG_VENDAS_DIARIA nao existe. Execute 27_create_fact_agg_vendas_diaria.sql antes.', 16, 1);
+    RETURN;
+END;
+GO
+
+-- Registro HLL de um pedido (precisao p = 10, 1024 registros): os 2 primeiros
+-- bytes do MD5 escolhem o registro; rho e a posicao do primeiro bit 1 nos 4
+-- bytes seguintes (33 quando todos sao zero). A funcao e inline: o otimizador
+-- expande a expressao na consulta, sem custo de UDF escalar.
+-- O calculo e espelhado em dashboards/streamlit/vendas/sales_queries.py
+-- (`order_sketch_register`); mudar um exige mudar o outro.
+CREATE OR ALTER FUNCTION fact.fn_hll_numero_pedido (@numero_pedido VARCHAR(20))
+RETURNS TABLE
+AS
+RETURN
+(
+    SELECT
+        CAST(CAST(SUBSTRING(hashed.h, 1, 2) AS INT) % 1024 AS SMALLINT) AS registro,
+        CAST(
+            CASE
+                WHEN bits.w >= 2147483648 THEN 1
+                WHEN bits.w >= 1073741824 THEN 2
+                WHEN bits.w >= 536870912 THEN 3
+                WHEN bits.w >= 268435456 THEN 4
+                WHEN bits.w >= 134217728 THEN 5
+                WHEN bits.w >= 67108864 THEN 6
+                WHEN bits.w >= 33554432 THEN 7
+                WHEN bits.w >= 16777216 THEN 8
+                WHEN bits.w >= 8388608 THEN 9
+                WHEN bits.w >= 4194304 THEN 10
+                WHEN bits.w >= 2097152 THEN 11
+                WHEN bits.w >= 1048576 THEN 12
+                WHEN bits.w >= 524288 THEN 13
+                WHEN bits.w >= 262144 THEN 14
+                WHEN bits.w >= 131072 THEN 15
+                WHEN bits.w >= 65536 THEN 16
+                WHEN bits.w >= 32768 THEN 17
+                WHEN bits.w >= 16384 THEN 18
+                WHEN bits.w >= 8192 THEN 19
+                WHEN bits.w >= 4096 THEN 20
+                WHEN bits.w >= 2048 THEN 21
+                WHEN bits.w >= 1024 THEN 22
+                WHEN bits.w >= 512 THEN 23
+                WHEN bits.w >= 256 THEN 24
+                WHEN bits.w >= 128 THEN 25
+                WHEN bits.w >= 64 THEN 26
+                WHEN bits.w >= 32 THEN 27
+                WHEN bits.w >= 16 THEN 28
+                WHEN bits.w >= 8 THEN 29
+                WHEN bits.w >= 4 THEN 30
+                WHEN bits.w >= 2 THEN 31
+                WHEN bits.w >= 1 THEN 32
+                ELSE 33
+            END AS TINYINT
+        ) AS rho
+    FROM (SELECT HASHBYTES('MD5', @numero_pedido) AS h) AS hashed
+    CROSS APPLY (SELECT CAST(SUBSTRING(hashed.h, 3, 4) AS BIGINT) AS w) AS bits
+);
+GO
+
+-- Forma esparsa do sketch: uma linha por registro ocupado de cada celula, com
+-- o maior rho visto. Unir celulas e MAX(rho) por registro.
+IF OBJECT_ID('fact.AGG_VENDAS_DIARIA_HLL', 'U') IS NULL
+BEGIN
+    CREATE TABLE fact.AGG_VENDAS_DIARIA_HLL
+    (
+        data_id INT NOT NULL,
+        produto_id INT NOT NULL,
+        regiao_id INT NOT NULL,
+        vendedor_id INT NOT NULL,
+        registro SMALLINT NOT NULL,
+        rho TINYINT NOT NULL,
+        CONSTRAINT PK_AGG_VENDAS_DIARIA_HLL PRIMARY KEY CLUSTERED (data_id, produto_id, regiao_id, vendedor_id, registro),
+        CONSTRAINT CK_AGG_VENDAS_DIARIA_HLL_values CHECK (registro BETWEEN 0 AND 1023 AND rho BETWEEN 1 AND 33)
+    );
+
+    PRINT 'Tabela fact.AGG_VENDAS_DIARIA_HLL criada.';
+END
+ELSE
+BEGIN
+    PRINT 'Tabela fact.AGG_VENDAS_DIARIA_HLL ja existe.';
+END;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM fact.AGG_VENDAS_DIARIA_HLL)
+BEGIN
+    INSERT INTO fact.AGG_VENDAS_DIARIA_HLL (data_id, produto_id, regiao_id, vendedor_id, registro, rho)
+    SELECT
+        fv.data_id,
+        fv.produto_id,
+        fv.regiao_id,
+        ISNULL(fv.vendedor_id, 0),
+        hll.registro,
+        MAX(hll.rho)
+    FROM fact.FACT_VENDAS AS fv
+    CROSS APPLY fact.fn_hll_numero_pedido(fv.numero_pedido) AS hll
+    GROUP BY
+        fv.data_id,
+        fv.produto_id,
+        fv.regiao_id,
+        ISNULL(fv.vendedor_id, 0),
+        hll.registro;
+
+    PRINT CONCAT('Carga inicial de fact.AGG_VENDAS_DIARIA_HLL: ', @@ROWCOUNT, ' registros.');
+END;
+GO
+
+CREATE OR ALTER VIEW fact.VW_AGG_VENDAS_DIARIA_HLL
+AS
+SELECT
+    s.data_id,
+    d.data_completa,
+    p.categoria,
+    r.estado,
+    r.regiao_pais,
+    v.nome_vendedor,
+    v.nome_equipe,
+    s.registro,
+    s.rho
+FROM fact.AGG_VENDAS_DIARIA_HLL AS s
+INNER JOIN dim.DIM_DATA AS d ON d.data_id = s.data_id
+INNER JOIN dim.DIM_PRODUTO AS p ON p.produto_id = s.produto_id
+INNER JOIN dim.DIM_REGIAO AS r ON r.regiao_id = s.regiao_id
+LEFT JOIN dim.DIM_VENDEDOR AS v ON v.vendedor_id = NULLIF(s.vendedor_id, 0);
+GO
+
+PRINT 'View fact.VW_AGG_VENDAS_DIARIA_HLL pronta para consumo.';
+GO
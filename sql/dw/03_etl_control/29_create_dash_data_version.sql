@@ -0,0 +1,88 @@
+-- ========================================
+-- SCRIPT: 29_create_dash_data_version.sql
+-- OBJETIVO: versao de dados por entidade para invalidar o cache dos
+--           dashboards apenas quando um run do ETL gravou linhas no DW
+-- ========================================
+
+USE DW_ECOMMERCE;
+GO
+
+IF OBJECT_ID('ctl.etl_control', 'U') IS NULL OR OBJECT_ID('audit.etl_run_entity', 'U') IS NULL
+BEGIN
+    RAISERROR('Tabelas de controle ausentes. Execute 02_create_etl_control.sql e 03_create_audit_etl_tables.sql antes.', 16, 1);
+    RETURN;
+END;
+GO
+
+-- Busca do ultimo run com escrita por entidade sem varrer o historico de auditoria.
+-- Indice anterior sem todas as colunas lidas pela view e recriado.
+IF EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE object_id = OBJECT_ID('audit.etl_run_entity')
+      AND name = 'IX_audit_etl_run_entity_entity_name'
+)
+AND (
+    SELECT COUNT(*)
+    FROM sys.indexes AS i
+    INNER JOIN sys.index_columns AS ic
+        ON ic.object_id = i.object_id
+       AND ic.index_id = i.index_id
+    INNER JOIN sys.columns AS col
+        ON col.object_id = ic.object_id
+       AND col.column_id = ic.column_id
+    WHERE i.object_id = OBJECT_ID('audit.etl_run_entity')
+      AND i.name = 'IX_audit_etl_run_entity_entity_name'
+      AND ic.is_included_column = 1
+      AND col.name IN ('status', 'upserted_count', 'soft_deleted_count', 'entity_finished_at')
+) < 4
+BEGIN
+    DROP INDEX IX_audit_etl_run_entity_entity_name ON audit.etl_run_entity;
+    PRINT 'Indice IX_audit_etl_run_entity_entity_name removido para recriacao.';
+END;
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE object_id = OBJECT_ID('audit.etl_run_entity')
+      AND name = 'IX_audit_etl_run_entity_entity_name'
+)
+BEGIN
+    CREATE NONCLUSTERED INDEX IX_audit_etl_run_entity_entity_name
+        ON audit.etl_run_entity (entity_name, run_entity_id DESC)
+        INCLUDE (status, upserted_count, soft_deleted_count, entity_finished_at);
+END;
+GO
+
+-- data_version = ultimo run_entity_id finalizado que gravou linhas.
+-- Runs sem linhas novas (daemon ocioso, janelas vazias) nao mudam a versao,
+-- entao o cache dos dashboards so e descartado quando o dado muda de fato.
+-- upserted_count ja exclui as linhas com row_hash igual ao gravado
+-- (unchanged_count): reextrair um lote identico tambem nao muda a versao.
+-- A view fica no schema fact para o bi_reader consultar ctl/audit
+-- por encadeamento de propriedade, sem GRANT adicional.
+CREATE OR ALTER VIEW fact.VW_DASH_DATA_VERSION
+AS
+SELECT
+    c.entity_name,
+    c.target_table,
+    c.last_status,
+    c.last_success_at,
+    ISNULL(w.run_entity_id, 0) AS data_version,
+    w.entity_finished_at AS data_changed_at
+FROM ctl.etl_control AS c
+OUTER APPLY (
+    SELECT TOP (1)
+        re.run_entity_id,
+        re.entity_finished_at
+    FROM audit.etl_run_entity AS re
+    WHERE re.entity_name = c.entity_name
+      AND re.status <> 'running'
+      AND re.upserted_count + re.soft_deleted_count > 0
+    ORDER BY re.run_entity_id DESC
+) AS w;
+GO
+
+PRINT 'View fact.VW_DASH_DATA_VERSION pronta para consumo.';
+GO
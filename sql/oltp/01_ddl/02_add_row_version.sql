@@ -0,0 +1,81 @@
+-- ========================================
+-- SCRIPT: 02_add_row_version.sql
+-- OBJETIVO: coluna rowversion + indice nas tabelas lidas pelo ETL com
+--           watermark_type = 'rowversion' (extracao por seek na versao)
+-- BASE: ECOMMERCE_OLTP
+-- ========================================
+
+USE ECOMMERCE_OLTP;
+GO
+
+SET NOCOUNT ON;
+GO
+
+-- A versao e atribuida pelo SQL Server a cada INSERT/UPDATE, sem depender do
+-- relogio da aplicacao; o ETL le apenas versoes abaixo de MIN_ACTIVE_ROWVERSION().
+-- Em tabelas grandes o ALTER reescreve a tabela: executar em janela de manutencao.
+DECLARE @targets TABLE (table_name SYSNAME NOT NULL PRIMARY KEY, index_name SYSNAME NOT NULL);
+INSERT INTO @targets (table_name, index_name)
+VALUES
+    ('core.customers', 'IX_core_customers_row_version'),
+    ('core.discount_campaigns', 'IX_core_discount_campaigns_row_version'),
+    ('core.teams', 'IX_core_teams_row_version'),
+    ('core.products', 'IX_core_products_row_version'),
+    ('core.regions', 'IX_core_regions_row_version'),
+    ('core.sellers', 'IX_core_sellers_row_version'),
+    ('core.seller_targets_monthly', 'IX_core_seller_targets_monthly_row_version');
+
+DECLARE @table_name SYSNAME;
+DECLARE @index_name SYSNAME;
+DECLARE @sql NVARCHAR(MAX);
+
+SELECT @table_name = MIN(table_name) FROM @targets;
+WHILE @table_name IS NOT NULL
+BEGIN
+    SELECT @index_name = index_name FROM @targets WHERE table_name = @table_name;
+
+    IF OBJECT_ID(@table_name, 'U') IS NULL
+    BEGIN
+        PRINT CONCAT('Tabela ', @table_name, ' nao existe; row_version nao adicionado.');
+    END
+    ELSE
+    BEGIN
+        IF COL_LENGTH(@table_name, 'row_version') IS NULL
+        BEGIN
+            SET @sql = N'ALTER TABLE ' + @table_name + N' ADD row_version ROWVERSION NOT NULL;';
+            EXEC sys.sp_executesql @sql;
+            PRINT CONCAT('Coluna ', @table_name, '.row_version criada.');
+        END
+        ELSE
+        BEGIN
+            PRINT CONCAT('Coluna ', @table_name, '.row_version ja existe.');
+        END;
+
+        IF NOT EXISTS (
+            SELECT 1
+            FROM sys.indexes
+            WHERE object_id = OBJECT_ID(@table_name)
+              AND name = @index_name
+        )
+        BEGIN
+            SET @sql = N'CREATE INDEX ' + QUOTENAME(@index_name) + N' ON ' + @table_name + N'(row_version);';
+            EXEC sys.sp_executesql @sql;
+            PRINT CONCAT('Indice ', @index_name, ' criado.');
+        END;
+    END;
+
+    SELECT @table_name = MIN(table_name) FROM @targets WHERE table_name > @table_name;
+END;
+GO
+
+SELECT
+    t.name AS table_name,
+    c.name AS column_name,
+    TYPE_NAME(c.user_type_id) AS column_type
+FROM sys.columns AS c
+INNER JOIN sys.tables AS t
+    ON t.object_id = c.object_id
+WHERE SCHEMA_NAME(t.schema_id) = 'core'
+  AND c.name = 'row_version'
+ORDER BY t.name;
+GO